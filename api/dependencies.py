@@ -3,7 +3,9 @@ API 依赖模块
 
 此模块提供用于 FastAPI 依赖注入的函数，主要包括：
 1. MeilisearchService 实例的工厂函数
-2. 其他可能需要的依赖项
+2. 与 Search Bot 共享的搜索结果缓存
+3. 与写入路径共享的实时搜索订阅中心
+4. 其他可能需要的依赖项
 """
 
 import logging
@@ -13,8 +15,10 @@ from typing import Optional
 
 from dotenv import load_dotenv
 
-from core.meilisearch_service import MeiliSearchService
+from core.meilisearch_service import MeiliSearchService, get_shared_meilisearch_service
 from core.config_manager import ConfigManager
+from core.live_search import LiveSearchHub, get_live_search_hub
+from core.search_result_cache import SearchResultCache, get_search_result_cache
 
 
 # 加载环境变量（确保配置可用）
@@ -40,11 +44,12 @@ def get_meilisearch_service() -> MeiliSearchService:
     
     logger.info(f"创建 MeilisearchService 实例，连接到 {host}")
     
-    # 创建并返回 MeilisearchService 实例
-    return MeiliSearchService(
+    # 返回进程内共享的 MeilisearchService 实例（与 Bot 连接参数相同时共用，连接池参数来自 config.ini）
+    return get_shared_meilisearch_service(
         host=host,
         api_key=api_key,
-        index_name=index_name
+        index_name=index_name,
+        **get_config_manager().get_meili_http_options()
     )
 
 
@@ -73,4 +78,24 @@ def get_config_manager() -> ConfigManager:
         config_path=config_path,
         whitelist_path=whitelist_path,
         create_if_not_exists=True
-    )
\ No newline at end of file
+    )
+
+
+def get_result_cache() -> SearchResultCache:
+    """
+    获取与 Search Bot 共享的搜索结果缓存
+
+    Returns:
+        进程内唯一的 SearchResultCache 实例
+    """
+    return get_search_result_cache(get_config_manager())
+
+
+def get_live_search() -> LiveSearchHub:
+    """
+    获取与 UserBot 写入路径共享的实时搜索订阅中心
+
+    Returns:
+        进程内唯一的 LiveSearchHub 实例
+    """
+    return get_live_search_hub()
@@ -12,7 +12,8 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.routers import search, whitelist, cache, dialogs
+from core.meilisearch_service import close_shared_meilisearch_services
+from api.routers import search, multi_search, whitelist, cache, dialogs, index
 
 
 def create_app() -> FastAPI:
@@ -48,9 +49,11 @@ def create_app() -> FastAPI:
     
     # 注册路由器
     app.include_router(search.router, prefix="/api/v1", tags=["search"])
+    app.include_router(multi_search.router, prefix="/api/v1", tags=["search"])
     app.include_router(whitelist.router, prefix="/api/v1", tags=["whitelist"])
     app.include_router(cache.router, prefix="/api/v1", tags=["cache"])
     app.include_router(dialogs.router, prefix="/api/v1", tags=["dialogs"])
+    app.include_router(index.router, prefix="/api/v1", tags=["index"])
     
     # 注册启动事件
     @app.on_event("startup")
@@ -63,6 +66,8 @@ def create_app() -> FastAPI:
     async def shutdown_event():
         """应用关闭时执行的事件"""
         logging.getLogger(__name__).info("FastAPI 应用关闭")
+        # 关闭共享的 Meilisearch 异步连接池（与 main.py 一同运行时 Bot 已先行关闭）
+        await close_shared_meilisearch_services()
     
     return app
 
@@ -5,6 +5,7 @@
 1. 定义缓存管理相关的 API 端点
 2. 提供不同类型的缓存清除功能
 3. 与 MeiliSearchService 交互清除搜索数据
+4. 查看共享搜索结果缓存的统计信息并定向失效
 """
 
 import logging
@@ -13,7 +14,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 
 from core.meilisearch_service import MeiliSearchService
-from api.dependencies import get_meilisearch_service
+from core.index_generations import get_index_generations
+from core.search_result_cache import SearchResultCache
+from api.dependencies import get_meilisearch_service, get_result_cache
 
 
 # 定义数据模型
@@ -30,6 +33,18 @@ class ClearCacheResponse(BaseModel):
     details: Dict[str, Any] = Field(default_factory=dict, description="详细信息")
 
 
+class InvalidateSearchCacheRequest(BaseModel):
+    """搜索结果缓存定向失效请求模型"""
+    chat_ids: Optional[List[int]] = Field(None, description="失效可能包含这些聊天消息的缓存条目")
+    query: Optional[str] = Field(None, description="失效查询词包含该字符串的缓存条目")
+
+
+class InvalidateSearchCacheResponse(BaseModel):
+    """搜索结果缓存定向失效响应模型"""
+    invalidated: int = Field(..., description="失效的缓存条目数")
+    stats: Dict[str, Any] = Field(default_factory=dict, description="失效后的缓存统计信息")
+
+
 # 创建路由器
 router = APIRouter(
     prefix="/admin/cache",
@@ -71,6 +86,11 @@ async def get_cache_types() -> Dict[str, Any]:
             "name": "同步缓存",
             "description": "清除同步相关的缓存数据",
             "warning": "可能影响同步进度记录"
+        },
+        "search_results": {
+            "name": "搜索结果缓存",
+            "description": "清除 API 与 Search Bot 共享的搜索结果缓存",
+            "warning": "之后的搜索会直接查询 Meilisearch，直到缓存重新填充"
         }
     }
     
@@ -80,10 +100,61 @@ async def get_cache_types() -> Dict[str, Any]:
     }
 
 
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_cache_stats(
+    result_cache: SearchResultCache = Depends(get_result_cache),
+    meilisearch_service: MeiliSearchService = Depends(get_meilisearch_service)
+) -> Dict[str, Any]:
+    """
+    获取搜索结果缓存和搜索请求合并的统计信息
+
+    包括命中/未命中次数、命中率、当前条目数、容量和 TTL，
+    以及被合并到进行中请求的并发搜索次数
+
+    Args:
+        result_cache: 共享搜索结果缓存，通过依赖注入获取
+        meilisearch_service: MeilisearchService 实例，通过依赖注入获取
+
+    Returns:
+        统计信息字典
+    """
+    return {
+        "search_results": result_cache.get_stats(),
+        "search_flight": meilisearch_service.get_search_flight_stats(),
+    }
+
+
+@router.post("/search/invalidate", response_model=InvalidateSearchCacheResponse)
+async def invalidate_search_cache(
+    request: InvalidateSearchCacheRequest,
+    result_cache: SearchResultCache = Depends(get_result_cache)
+) -> Dict[str, Any]:
+    """
+    定向失效搜索结果缓存
+
+    按聊天ID或查询词失效相关条目；两者都未提供时清空整个缓存
+
+    Args:
+        request: 包含失效条件的请求模型
+        result_cache: 共享搜索结果缓存，通过依赖注入获取
+
+    Returns:
+        失效的条目数和最新统计信息
+    """
+    logger = logging.getLogger(__name__)
+    invalidated = result_cache.invalidate(chat_ids=request.chat_ids, query=request.query)
+    logger.info(f"搜索结果缓存定向失效: chat_ids={request.chat_ids}, query={request.query}, 共 {invalidated} 条")
+    return {
+        "invalidated": invalidated,
+        "stats": result_cache.get_stats()
+    }
+
+
 @router.post("/clear", response_model=ClearCacheResponse)
 async def clear_cache(
     request: ClearCacheRequest,
-    meilisearch_service: MeiliSearchService = Depends(get_meilisearch_service)
+    meilisearch_service: MeiliSearchService = Depends(get_meilisearch_service),
+    result_cache: SearchResultCache = Depends(get_result_cache)
 ) -> Dict[str, Any]:
     """
     清除指定类型的缓存
@@ -93,6 +164,7 @@ async def clear_cache(
     Args:
         request: 包含要清除的缓存类型的请求模型
         meilisearch_service: MeiliSearchService 实例，通过依赖注入获取
+        result_cache: 共享搜索结果缓存，通过依赖注入获取
         
     Returns:
         操作结果信息
@@ -111,6 +183,9 @@ async def clear_cache(
                 try:
                     # 删除所有文档
                     result = meilisearch_service.index.delete_all_documents()
+                    # 索引已清空，所有代数快照和缓存的搜索结果随之失效
+                    get_index_generations().bump()
+                    result_cache.clear()
                     cleared_types.append(cache_type)
                     details[cache_type] = {
                         "status": "success",
@@ -154,6 +229,16 @@ async def clear_cache(
                 }
                 logger.info("同步缓存清除完成")
             
+            elif cache_type == "search_results":
+                cleared = result_cache.clear()
+                cleared_types.append(cache_type)
+                details[cache_type] = {
+                    "status": "success",
+                    "cleared_entries": cleared,
+                    "message": "搜索结果缓存已清空"
+                }
+                logger.info("搜索结果缓存清除完成")
+            
             else:
                 error_msg = f"未知的缓存类型: {cache_type}"
                 logger.warning(error_msg)
@@ -188,7 +273,8 @@ async def clear_cache(
 
 @router.post("/clear/all", response_model=ClearCacheResponse)
 async def clear_all_cache(
-    meilisearch_service: MeiliSearchService = Depends(get_meilisearch_service)
+    meilisearch_service: MeiliSearchService = Depends(get_meilisearch_service),
+    result_cache: SearchResultCache = Depends(get_result_cache)
 ) -> Dict[str, Any]:
     """
     清除所有类型的缓存
@@ -197,6 +283,7 @@ async def clear_all_cache(
     
     Args:
         meilisearch_service: MeiliSearchService 实例，通过依赖注入获取
+        result_cache: 共享搜索结果缓存，通过依赖注入获取
         
     Returns:
         操作结果信息
@@ -205,8 +292,8 @@ async def clear_all_cache(
     logger.info("开始清除所有缓存")
     
     # 获取所有缓存类型
-    all_types = ["search_index", "frontend_state", "user_preferences", "sync_cache"]
+    all_types = ["search_index", "frontend_state", "user_preferences", "sync_cache", "search_results"]
     
     # 构建请求并调用清除方法
     request = ClearCacheRequest(cache_types=all_types)
-    return await clear_cache(request, meilisearch_service)
\ No newline at end of file
+    return await clear_cache(request, meilisearch_service, result_cache)
\ No newline at end of file
@@ -133,7 +133,7 @@ async def search_dialogs(
             if not session_types:
                 session_types = None
 
-        result = user_bot_client.search_sessions(
+        result = await user_bot_client.search_sessions(
             query=q,
             session_types=session_types,
             page=page,
@@ -0,0 +1,185 @@
+"""
+索引管理 API 路由模块
+
+此模块负责：
+1. 启动消息索引的零停机重建（影子索引 + swap-indexes）
+2. 查询重建进度
+3. 查询写入任务跟踪状态（积压、背压、失败的任务）并重新提交失败的文档
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+
+from core.index_rebuild import DEFAULT_COPY_BATCH_SIZE, IndexRebuilder, get_index_rebuilder, set_index_rebuilder
+from core.index_task_tracker import IndexTaskTracker, get_index_task_tracker
+from core.meilisearch_service import DOCUMENT_SCAN_PAGE_SIZE, MeiliSearchService
+from api.dependencies import get_meilisearch_service
+
+logger = logging.getLogger(__name__)
+
+
+class RebuildIndexRequest(BaseModel):
+    """索引重建请求模型"""
+    batch_size: int = Field(
+        DEFAULT_COPY_BATCH_SIZE, ge=DOCUMENT_SCAN_PAGE_SIZE, le=100000, description="写入影子索引的单批文档数"
+    )
+    keep_old_index: bool = Field(False, description="交换后是否保留旧索引（以影子索引名保留，可用于回滚）")
+
+
+class RebuildIndexProgress(BaseModel):
+    """索引重建进度模型"""
+    phase: str = Field(
+        ..., description="当前阶段: pending, creating, copying, catching_up, swapping, cleaning_up, done, failed"
+    )
+    index: str = Field(..., description="重建的索引")
+    shadow_index: str = Field(..., description="影子索引（交换后为旧索引的名称）")
+    total_documents: int = Field(..., description="开始时线上索引的文档数")
+    copied_documents: int = Field(..., description="已复制到影子索引的文档数")
+    percent: float = Field(..., description="复制进度百分比")
+    replayed_operations: int = Field(..., description="已重放的重建期间写入操作数")
+    pending_operations: int = Field(..., description="尚未重放的写入操作数")
+    catch_up_rounds: int = Field(..., description="已执行的重放轮数")
+    started_at: Optional[int] = Field(None, description="开始时间的 Unix 时间戳")
+    finished_at: Optional[int] = Field(None, description="结束时间的 Unix 时间戳")
+    error: Optional[str] = Field(None, description="失败原因")
+
+
+class IndexTaskRange(BaseModel):
+    """失败任务中单个聊天的文档范围"""
+    chat_id: int = Field(..., description="聊天ID")
+    min_message_id: int = Field(..., description="最小消息ID")
+    max_message_id: int = Field(..., description="最大消息ID")
+    count: int = Field(..., description="文档数")
+
+
+class IndexTaskFailure(BaseModel):
+    """失败的写入任务模型"""
+    task_uid: int = Field(..., description="Meilisearch 任务ID")
+    index_uid: str = Field(..., description="写入的索引")
+    status: str = Field(..., description="任务状态: failed 或 canceled")
+    error: Optional[str] = Field(None, description="失败原因")
+    ranges: List[IndexTaskRange] = Field(..., description="按聊天汇总的文档范围")
+    retryable: bool = Field(..., description="能否从消息归档重新提交（删除任务为 false）")
+    enqueued_at: int = Field(..., description="提交时间的 Unix 时间戳")
+    finished_at: int = Field(..., description="发现失败时间的 Unix 时间戳")
+
+
+class IndexTaskStatus(BaseModel):
+    """写入任务跟踪状态模型"""
+    backlog: int = Field(..., description="已提交但 Meilisearch 尚未处理完成的写入任务数")
+    throttling: bool = Field(..., description="是否正在暂停历史回溯")
+    high_watermark: int = Field(..., description="开始暂停历史回溯的积压任务数")
+    low_watermark: int = Field(..., description="恢复历史回溯的积压任务数")
+    stats: Dict[str, Any] = Field(..., description="累计计数（tracked、succeeded、failed、lost 等）")
+    failures: List[IndexTaskFailure] = Field(..., description="最近失败的任务")
+
+
+class RetryIndexTasksResponse(BaseModel):
+    """重新提交失败文档的响应模型"""
+    retried_documents: int = Field(..., description="重新提交的文档数")
+
+
+router = APIRouter(
+    prefix="/admin/index",
+    tags=["admin", "index"],
+    responses={
+        404: {"description": "Not found"},
+        409: {"description": "Conflict"}
+    },
+)
+
+
+@router.post("/rebuild", response_model=RebuildIndexProgress, status_code=status.HTTP_202_ACCEPTED)
+async def start_index_rebuild(
+    request: RebuildIndexRequest,
+    meilisearch_service: MeiliSearchService = Depends(get_meilisearch_service)
+) -> Dict[str, Any]:
+    """
+    启动消息索引的零停机重建
+
+    使用当前代码中的索引设置创建影子索引，复制全部文档并追平重建期间的写入后原子交换。
+    重建在后台执行，期间搜索不受影响，写入只在最后交换时短暂等待。
+
+    Args:
+        request: 重建参数
+        meilisearch_service: MeilisearchService 实例，通过依赖注入获取
+
+    Returns:
+        重建的初始进度
+    """
+    current = get_index_rebuilder()
+    if current is not None and current.is_running():
+        raise HTTPException(status_code=409, detail=f"索引重建正在进行: {current.shadow_uid}")
+
+    try:
+        rebuilder = IndexRebuilder(
+            meilisearch_service, batch_size=request.batch_size, keep_old_index=request.keep_old_index
+        )
+        set_index_rebuilder(rebuilder)
+        rebuilder.start()
+        logger.info(f"已启动索引重建: {rebuilder.index_uid} -> {rebuilder.shadow_uid}")
+        return rebuilder.get_progress()
+    except Exception as e:
+        logger.error(f"启动索引重建失败: {e}")
+        raise HTTPException(status_code=500, detail=f"启动索引重建失败: {e}")
+
+
+@router.get("/rebuild", response_model=RebuildIndexProgress)
+async def get_index_rebuild_progress() -> Dict[str, Any]:
+    """
+    获取最近一次索引重建的进度
+
+    Returns:
+        重建进度
+    """
+    rebuilder = get_index_rebuilder()
+    if rebuilder is None:
+        raise HTTPException(status_code=404, detail="尚未启动过索引重建")
+    return rebuilder.get_progress()
+
+
+def _require_task_tracker() -> IndexTaskTracker:
+    tracker = get_index_task_tracker()
+    if tracker is None:
+        raise HTTPException(status_code=404, detail="未启用索引任务跟踪")
+    return tracker
+
+
+@router.get("/tasks", response_model=IndexTaskStatus)
+async def get_index_task_status() -> Dict[str, Any]:
+    """
+    获取写入任务跟踪状态
+
+    Returns:
+        积压任务数、背压状态和最近失败的任务
+    """
+    tracker = _require_task_tracker()
+    stats = tracker.get_stats()
+    return {
+        "backlog": stats["backlog"],
+        "throttling": stats["throttling"],
+        "high_watermark": stats["high_watermark"],
+        "low_watermark": stats["low_watermark"],
+        "stats": stats,
+        "failures": tracker.get_failures(),
+    }
+
+
+@router.post("/tasks/retry", response_model=RetryIndexTasksResponse)
+async def retry_failed_index_tasks() -> Dict[str, Any]:
+    """
+    从本地消息归档读取失败任务涉及的文档并重新写入
+
+    Returns:
+        重新提交的文档数
+    """
+    tracker = _require_task_tracker()
+    try:
+        retried = await tracker.retry_failures()
+        return {"retried_documents": retried}
+    except Exception as e:
+        logger.error(f"重新提交失败的写入任务失败: {e}")
+        raise HTTPException(status_code=500, detail=f"重新提交失败的写入任务失败: {e}")
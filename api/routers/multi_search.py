@@ -0,0 +1,157 @@
+"""
+批量搜索 API 路由模块
+
+此模块负责：
+1. 定义批量搜索端点，一次请求同时搜索消息和会话
+2. 所有查询合并为一次 Meilisearch multi-search 往返
+3. 消息结果与 /search 的响应格式一致，会话结果与 /dialogs/search 的响应格式一致
+"""
+
+import logging
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from core.config_manager import ConfigManager
+from core.meilisearch_service import (
+    MeiliSearchService, MULTI_SEARCH_MESSAGES, MULTI_SEARCH_SESSIONS, PROJECTION_FULL
+)
+from api.dependencies import get_config_manager, get_meilisearch_service
+from api.routers.search import SearchResponse, SearchResultItem, _make_text_snippet
+from user_bot import user_bot_client
+
+logger = logging.getLogger(__name__)
+
+
+class MessageSearchQuery(BaseModel):
+    """批量搜索中的消息查询"""
+    query: str = Field(..., description="搜索关键词")
+    start_timestamp: Optional[int] = Field(None, description="起始时间的 Unix 时间戳")
+    end_timestamp: Optional[int] = Field(None, description="结束时间的 Unix 时间戳")
+    chat_types: Optional[List[str]] = Field(None, description="聊天类型列表，可选值: user, group, channel")
+    chat_ids: Optional[List[int]] = Field(None, description="聊天 ID 列表")
+    page: int = Field(1, ge=1, description="页码，从 1 开始")
+    hits_per_page: int = Field(10, ge=1, le=100, description="每页结果数量")
+    projection: Literal["snippet", "ids_only", "full"] = Field("snippet", description="字段投影，含义与 /search 相同")
+
+
+class SessionSearchQuery(BaseModel):
+    """批量搜索中的会话查询"""
+    query: str = Field(..., description="搜索关键词，支持会话名称和ID")
+    session_types: Optional[List[Literal["user", "group", "channel"]]] = Field(None, description="会话类型过滤")
+    page: int = Field(1, ge=1, description="页码，从 1 开始")
+    limit: int = Field(20, ge=1, le=100, description="每页会话数量")
+
+
+class MultiSearchRequest(BaseModel):
+    """批量搜索请求模型"""
+    messages: List[MessageSearchQuery] = Field(default_factory=list, description="消息查询列表")
+    sessions: List[SessionSearchQuery] = Field(default_factory=list, description="会话查询列表")
+
+
+class MultiSearchResponse(BaseModel):
+    """批量搜索响应模型，结果与请求中的查询一一对应"""
+    messages: List[SearchResponse]
+    sessions: List[Dict[str, Any]]
+
+
+router = APIRouter(
+    prefix="/multi-search",
+    tags=["search"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def _to_search_response(message_query: MessageSearchQuery, results: Dict[str, Any]) -> Dict[str, Any]:
+    """将单个消息查询的结果转换为 SearchResponse 格式"""
+    hits = [
+        SearchResultItem(
+            id=hit.get('id', ''),
+            chat_title=hit.get('chat_title', None),
+            sender_name=hit.get('sender_name', None),
+            text_snippet=_make_text_snippet(hit),
+            text=hit.get('text') if message_query.projection == PROJECTION_FULL else None,
+            date=hit.get('date', 0),
+            message_link=hit.get('message_link', '')
+        )
+        for hit in results.get('hits', [])
+    ]
+    return {
+        "hits": hits,
+        "query": message_query.query,
+        "processingTimeMs": results.get('processingTimeMs', 0),
+        "limit": message_query.hits_per_page,
+        "offset": (message_query.page - 1) * message_query.hits_per_page,
+        "estimatedTotalHits": results.get('estimatedTotalHits', 0),
+    }
+
+
+@router.post("", response_model=MultiSearchResponse)
+async def multi_search(
+    request: MultiSearchRequest,
+    meili_service: MeiliSearchService = Depends(get_meilisearch_service),
+    config_manager: ConfigManager = Depends(get_config_manager)
+) -> Dict[str, Any]:
+    """
+    批量搜索 API 端点
+
+    在一次 Meilisearch multi-search 请求中执行全部消息查询和会话查询，
+    适用于同时展示消息和会话结果的搜索页面。
+
+    Args:
+        request: 消息查询列表和会话查询列表
+        meili_service: MeilisearchService 实例，通过依赖注入获取
+        config_manager: 配置管理器，提供与 Search Bot 共用的摘要长度
+
+    Returns:
+        符合 MultiSearchResponse 模型的响应字典
+    """
+    if not request.messages and not request.sessions:
+        raise HTTPException(status_code=400, detail="至少需要一个消息查询或会话查询")
+
+    logger.info(f"收到批量搜索请求: {len(request.messages)} 个消息查询, {len(request.sessions)} 个会话查询")
+
+    crop_length = config_manager.get_search_snippet_crop_length()
+    searches = [
+        {
+            "target": MULTI_SEARCH_MESSAGES,
+            "query": q.query,
+            "sort": ["date:desc"],
+            "page": q.page,
+            "hits_per_page": q.hits_per_page,
+            "start_timestamp": q.start_timestamp,
+            "end_timestamp": q.end_timestamp,
+            "chat_types": q.chat_types,
+            "chat_ids": q.chat_ids,
+            "crop_length": crop_length,
+            "projection": q.projection,
+        }
+        for q in request.messages
+    ] + [
+        {
+            "target": MULTI_SEARCH_SESSIONS,
+            "query": q.query,
+            "session_types": q.session_types,
+            "page": q.page,
+            "hits_per_page": q.limit,
+            "sort": ["date:desc"],
+        }
+        for q in request.sessions
+    ]
+
+    try:
+        results = await meili_service.multi_search_async(searches)
+    except Exception as e:
+        logger.error(f"批量搜索时发生错误: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"批量搜索失败: {str(e)}")
+
+    message_results = results[:len(request.messages)]
+    session_results = results[len(request.messages):]
+    return {
+        "messages": [_to_search_response(q, r) for q, r in zip(request.messages, message_results)],
+        "sessions": [
+            user_bot_client.format_session_search_results(r, q.page, q.limit)
+            for q, r in zip(request.sessions, session_results)
+        ],
+    }
@@ -5,18 +5,36 @@
 1. 定义搜索相关的 API 端点
 2. 创建请求和响应数据模型
 3. 调用 MeilisearchService 执行搜索操作
+4. 通过与 Search Bot 共享的结果缓存避免重复查询
+5. 支持基于不透明游标的键集分页（cursor / next_cursor）
+6. 摘要由 Meilisearch 裁剪和高亮，长度与 Search Bot 共用同一配置
+7. 按字段投影（snippet / ids_only / full）只检索调用方需要的字段
+8. 统计结果在聊天、聊天类型、发送者上的分布和时间直方图（/search/facets）
+9. 通过 Server-Sent Events 推送新写入索引的匹配消息（/search/live）
 """
 
+import asyncio
+import json
 import logging
 import math
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Literal, Optional, Any, Union
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from core.meilisearch_service import MeiliSearchService
-from api.dependencies import get_meilisearch_service
+from core.config_manager import ConfigManager
+from core.live_search import LiveSearchHub, LiveSearchLimitError, LiveSubscription
+from core.meilisearch_service import MeiliSearchService, PROJECTION_FULL
+from core.search_cursor import InvalidCursorError, KeysetPaginationUnavailableError
+from core.search_result_cache import SearchResultCache
+from api.dependencies import get_config_manager, get_live_search, get_meilisearch_service, get_result_cache
+
+# 在共享搜索结果缓存中的命名空间
+CACHE_NAMESPACE = "api"
+# 实时搜索没有新消息时发送心跳注释的间隔（秒），防止代理断开空闲连接
+LIVE_HEARTBEAT_SECONDS = 15.0
 
 
 # 定义数据模型
@@ -29,6 +47,14 @@ class AdvancedSearchRequest(BaseModel):
     chat_ids: Optional[List[int]] = Field(None, description="聊天 ID 列表")
     page: int = Field(1, ge=1, description="页码，从 1 开始")
     hits_per_page: int = Field(10, ge=1, le=100, description="每页结果数量")
+    cursor: Optional[str] = Field(
+        None,
+        description="键集分页游标；传入空字符串从第一条开始，之后传入上一次响应的 next_cursor。提供时忽略 page"
+    )
+    projection: Literal["snippet", "ids_only", "full"] = Field(
+        "snippet",
+        description="字段投影：snippet 返回元数据和裁剪后的摘要；ids_only 只返回 id、chat_id、message_id、date；full 额外返回完整 text"
+    )
 
 
 # 保持向后兼容的旧模型
@@ -45,6 +71,14 @@ class SearchRequest(BaseModel):
     filters: Optional[SearchFilters] = Field(None, description="过滤条件")
     page: int = Field(1, ge=1, description="页码，从 1 开始")
     hits_per_page: int = Field(10, ge=1, le=100, description="每页结果数量")
+    cursor: Optional[str] = Field(
+        None,
+        description="键集分页游标；传入空字符串从第一条开始，之后传入上一次响应的 next_cursor。提供时忽略 page"
+    )
+    projection: Literal["snippet", "ids_only", "full"] = Field(
+        "snippet",
+        description="字段投影：snippet 返回元数据和裁剪后的摘要；ids_only 只返回 id、chat_id、message_id、date；full 额外返回完整 text"
+    )
 
 
 class SearchResultItem(BaseModel):
@@ -55,6 +89,7 @@ class SearchResultItem(BaseModel):
     text_snippet: str = Field(..., description="消息文本摘要")
     date: int
     message_link: str
+    text: Optional[str] = Field(None, description="完整消息文本，仅 projection=full 时返回")
 
 
 class SearchResponse(BaseModel):
@@ -65,6 +100,48 @@ class SearchResponse(BaseModel):
     limit: int
     offset: int
     estimatedTotalHits: int
+    next_cursor: Optional[str] = Field(None, description="下一页的游标，没有更多结果或未使用游标分页时为 None")
+
+
+class FacetSearchRequest(BaseModel):
+    """结果分布统计请求模型"""
+    query: str = Field(..., description="搜索关键词")
+    start_timestamp: Optional[int] = Field(None, description="起始时间的 Unix 时间戳，为空时从最早的结果开始")
+    end_timestamp: Optional[int] = Field(None, description="结束时间的 Unix 时间戳，为空时到最晚的结果为止")
+    chat_types: Optional[List[str]] = Field(None, description="聊天类型列表，可选值: user, group, channel")
+    chat_ids: Optional[List[int]] = Field(None, description="聊天 ID 列表")
+    interval: Literal["day", "week", "month"] = Field("month", description="时间直方图的桶宽度（按 UTC 日历）")
+
+
+class FacetValue(BaseModel):
+    """分面取值及其命中数"""
+    value: Union[int, str]
+    count: int
+
+
+class HistogramBucket(BaseModel):
+    """时间直方图桶，start 和 end 均包含在内"""
+    start: int
+    end: int
+    count: int
+
+
+class Histogram(BaseModel):
+    """时间直方图"""
+    interval: str
+    buckets: List[HistogramBucket]
+    truncated: bool = Field(False, description="桶数超过上限时只返回最近的桶")
+
+
+class FacetSearchResponse(BaseModel):
+    """结果分布统计响应模型"""
+    query: str
+    totalHits: int
+    processingTimeMs: int
+    facets: Dict[str, List[FacetValue]] = Field(
+        ..., description="chat_id、chat_type、sender_id 的取值及命中数，按命中数降序"
+    )
+    histogram: Histogram
 
 
 # 创建路由器
@@ -75,10 +152,115 @@ router = APIRouter(
 )
 
 
+def _make_text_snippet(hit: Dict[str, Any]) -> str:
+    """
+    生成结果摘要
+
+    摘要模式下 Meilisearch 已返回裁剪并高亮的窗口，直接使用；
+    否则回退为截取完整文本（优先使用高亮结果）。
+    """
+    formatted_text = hit.get('_formatted', {}).get('text')
+    if 'text' not in hit:
+        # 摘要模式返回裁剪窗口；ids_only 不含文本
+        return formatted_text or ''
+
+    if formatted_text is not None:
+        return formatted_text[:300] + ('...' if len(formatted_text) > 300 else '')
+    text = hit.get('text', '')
+    return text[:200] + ('...' if len(text) > 200 else '')
+
+
+async def _cached_search(
+    meili_service: MeiliSearchService,
+    result_cache: SearchResultCache,
+    query: str,
+    page: int,
+    hits_per_page: int,
+    filters: Optional[str] = None,
+    sort: Optional[List[str]] = None,
+    start_timestamp: Optional[int] = None,
+    end_timestamp: Optional[int] = None,
+    chat_types: Optional[List[str]] = None,
+    chat_ids: Optional[List[int]] = None,
+    cursor: Optional[str] = None,
+    crop_length: Optional[int] = None,
+    projection: str = PROJECTION_FULL
+) -> Dict[str, Any]:
+    """
+    执行搜索，优先返回共享缓存中的结果
+
+    cursor 不为 None 时使用键集分页，忽略 page 和 sort，结果中包含 nextCursor；
+    消息索引的排序规则不支持时抛出 KeysetPaginationUnavailableError（接口返回 400）。
+    projection 决定检索的字段，snippet 投影按 crop_length 裁剪文本。
+
+    缓存键包含规范化的查询词、全部过滤条件和分页参数；
+    结果按 chat_ids 登记，便于按聊天定向失效，并记录相关聊天的索引代数用于校验新鲜度。
+    """
+    cache_key = SearchResultCache.make_key(
+        CACHE_NAMESPACE,
+        query,
+        filters={
+            "filters": filters,
+            # 排序规则的顺序有意义，使用元组保留顺序
+            "sort": tuple(sort) if sort else None,
+            "start_timestamp": start_timestamp,
+            "end_timestamp": end_timestamp,
+            "chat_types": chat_types,
+            "chat_ids": chat_ids,
+            "cursor": cursor,
+            "crop_length": crop_length,
+            "projection": projection,
+        },
+        page=page if cursor is None else None,
+        hits_per_page=hits_per_page
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        logging.getLogger(__name__).debug(f"搜索缓存命中: '{query}' 第 {page} 页")
+        return cached
+
+    # 搜索前记录索引代数，搜索期间发生的写入会使该条目在下次读取时失效
+    generations = result_cache.snapshot(chat_ids)
+    if cursor is not None:
+        search_results = await meili_service.search_after_async(
+            query=query,
+            cursor=cursor or None,
+            limit=hits_per_page,
+            filters=filters,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            chat_types=chat_types,
+            chat_ids=chat_ids,
+            crop_length=crop_length,
+            projection=projection
+        )
+    else:
+        search_results = await meili_service.search_async(
+            query=query,
+            filters=filters,
+            sort=sort,
+            page=page,
+            hits_per_page=hits_per_page,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            chat_types=chat_types,
+            chat_ids=chat_ids,
+            crop_length=crop_length,
+            projection=projection
+        )
+    result_cache.set(
+        cache_key, search_results, namespace=CACHE_NAMESPACE, query=query,
+        chat_ids=chat_ids, generations=generations
+    )
+    return search_results
+
+
 @router.post("/advanced", response_model=SearchResponse)
 async def advanced_search_messages(
     search_request: AdvancedSearchRequest,
-    meili_service: MeiliSearchService = Depends(get_meilisearch_service)
+    meili_service: MeiliSearchService = Depends(get_meilisearch_service),
+    result_cache: SearchResultCache = Depends(get_result_cache),
+    config_manager: ConfigManager = Depends(get_config_manager)
 ) -> Dict[str, Any]:
     """
     高级搜索消息 API 端点
@@ -88,6 +270,8 @@ async def advanced_search_messages(
     Args:
         search_request: 包含查询条件和高级过滤参数的请求模型
         meili_service: MeilisearchService 实例，通过依赖注入获取
+        result_cache: 共享搜索结果缓存，通过依赖注入获取
+        config_manager: 配置管理器，提供与 Search Bot 共用的摘要长度
         
     Returns:
         符合 SearchResponse 模型的响应字典
@@ -101,7 +285,9 @@ async def advanced_search_messages(
         sort = ["date:desc"]
         
         # 执行高级搜索
-        search_results = meili_service.search(
+        search_results = await _cached_search(
+            meili_service,
+            result_cache,
             query=search_request.query,
             sort=sort,
             page=search_request.page,
@@ -109,27 +295,22 @@ async def advanced_search_messages(
             start_timestamp=search_request.start_timestamp,
             end_timestamp=search_request.end_timestamp,
             chat_types=search_request.chat_types,
-            chat_ids=search_request.chat_ids
+            chat_ids=search_request.chat_ids,
+            cursor=search_request.cursor,
+            crop_length=config_manager.get_search_snippet_crop_length(),
+            projection=search_request.projection
         )
         
         # 处理搜索结果
         hits = []
         for hit in search_results.get('hits', []):
-            # 创建文本摘要，优先使用高亮结果
-            text = hit.get('text', '')
-            
-            # 检查是否有高亮信息
-            if '_formatted' in hit and 'text' in hit['_formatted']:
-                text_snippet = hit['_formatted']['text'][:300] + ('...' if len(hit['_formatted']['text']) > 300 else '')
-            else:
-                text_snippet = text[:200] + ('...' if len(text) > 200 else '')
-            
             # 创建结果项
             hit_item = SearchResultItem(
                 id=hit.get('id', ''),
                 chat_title=hit.get('chat_title', None),
                 sender_name=hit.get('sender_name', None),
-                text_snippet=text_snippet,
+                text_snippet=_make_text_snippet(hit),
+                text=hit.get('text') if search_request.projection == PROJECTION_FULL else None,
                 date=hit.get('date', 0),
                 message_link=hit.get('message_link', '')
             )
@@ -141,13 +322,16 @@ async def advanced_search_messages(
             "query": search_request.query,
             "processingTimeMs": search_results.get('processingTimeMs', 0),
             "limit": search_request.hits_per_page,
-            "offset": (search_request.page - 1) * search_request.hits_per_page,
-            "estimatedTotalHits": search_results.get('estimatedTotalHits', 0)
+            "offset": (search_request.page - 1) * search_request.hits_per_page if search_request.cursor is None else 0,
+            "estimatedTotalHits": search_results.get('estimatedTotalHits', 0),
+            "next_cursor": search_results.get('nextCursor')
         }
         
         logger.info(f"高级搜索 '{search_request.query}' 找到 {len(hits)} 条结果，estimatedTotalHits={response['estimatedTotalHits']}")
         return response
         
+    except (InvalidCursorError, KeysetPaginationUnavailableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"高级搜索时发生错误: {str(e)}")
         raise HTTPException(status_code=500, detail=f"高级搜索失败: {str(e)}")
@@ -156,7 +340,9 @@ async def advanced_search_messages(
 @router.post("", response_model=SearchResponse)
 async def search_messages(
     search_request: SearchRequest,
-    meili_service: MeiliSearchService = Depends(get_meilisearch_service)
+    meili_service: MeiliSearchService = Depends(get_meilisearch_service),
+    result_cache: SearchResultCache = Depends(get_result_cache),
+    config_manager: ConfigManager = Depends(get_config_manager)
 ) -> Dict[str, Any]:
     """
     搜索消息 API 端点
@@ -166,6 +352,8 @@ async def search_messages(
     Args:
         search_request: 包含查询条件、过滤条件和分页信息的请求模型
         meili_service: MeilisearchService 实例，通过依赖注入获取
+        result_cache: 共享搜索结果缓存，通过依赖注入获取
+        config_manager: 配置管理器，提供与 Search Bot 共用的摘要长度
         
     Returns:
         符合 SearchResponse 模型的响应字典
@@ -174,35 +362,10 @@ async def search_messages(
     logger.info(f"收到搜索请求: {search_request.query}, 页码: {search_request.page}, 每页结果数: {search_request.hits_per_page}")
     
     try:
-        # 构建过滤条件字符串
-        filters = None
-        if search_request.filters:
-            filter_parts = []
-            
-            # 处理聊天类型过滤
-            if search_request.filters.chat_type:
-                chat_type_filters = [f"chat_type = '{chat_type}'" for chat_type in search_request.filters.chat_type]
-                if chat_type_filters:
-                    filter_parts.append(f"({' OR '.join(chat_type_filters)})")
-            
-            # 处理日期范围过滤
-            date_filters = []
-            if search_request.filters.date_from:
-                date_filters.append(f"date >= {search_request.filters.date_from}")
-            if search_request.filters.date_to:
-                date_filters.append(f"date <= {search_request.filters.date_to}")
-            
-            if date_filters:
-                filter_parts.append(f"({' AND '.join(date_filters)})")
-            
-            # 组合所有过滤条件
-            if filter_parts:
-                filters = " AND ".join(filter_parts)
-        
         # 设置排序（默认按日期降序）
         sort = ["date:desc"]
         
-        # 转换旧格式参数到新格式
+        # 转换旧格式参数到新格式，由 MeiliSearchService 生成规范的过滤条件
         start_timestamp = None
         end_timestamp = None
         chat_types = None
@@ -216,15 +379,19 @@ async def search_messages(
                 chat_types = search_request.filters.chat_type
         
         # 执行搜索（使用新的高级搜索功能）
-        search_results = meili_service.search(
+        search_results = await _cached_search(
+            meili_service,
+            result_cache,
             query=search_request.query,
-            filters=filters,  # 保留原有的filters参数以确保向后兼容
             sort=sort,
             page=search_request.page,
             hits_per_page=search_request.hits_per_page,
             start_timestamp=start_timestamp,
             end_timestamp=end_timestamp,
-            chat_types=chat_types
+            chat_types=chat_types,
+            cursor=search_request.cursor,
+            crop_length=config_manager.get_search_snippet_crop_length(),
+            projection=search_request.projection
         )
         # 详细记录搜索结果原始数据
         logger.info(f"Meilisearch返回的estimatedTotalHits: {search_results.get('estimatedTotalHits', 0)}")
@@ -234,21 +401,13 @@ async def search_messages(
         # 处理搜索结果，确保符合响应模型
         hits = []
         for hit in search_results.get('hits', []):
-            # 创建文本摘要，优先使用高亮结果
-            text = hit.get('text', '')
-            
-            # 检查是否有高亮信息
-            if '_formatted' in hit and 'text' in hit['_formatted']:
-                text_snippet = hit['_formatted']['text'][:300] + ('...' if len(hit['_formatted']['text']) > 300 else '')
-            else:
-                text_snippet = text[:200] + ('...' if len(text) > 200 else '')
-            
             # 创建结果项
             hit_item = SearchResultItem(
                 id=hit.get('id', ''),
                 chat_title=hit.get('chat_title', None),
                 sender_name=hit.get('sender_name', None),
-                text_snippet=text_snippet,
+                text_snippet=_make_text_snippet(hit),
+                text=hit.get('text') if search_request.projection == PROJECTION_FULL else None,
                 date=hit.get('date', 0),
                 message_link=hit.get('message_link', '')
             )
@@ -260,13 +419,161 @@ async def search_messages(
             "query": search_request.query,
             "processingTimeMs": search_results.get('processingTimeMs', 0),
             "limit": search_request.hits_per_page,
-            "offset": (search_request.page - 1) * search_request.hits_per_page,
-            "estimatedTotalHits": search_results.get('estimatedTotalHits', 0)
+            "offset": (search_request.page - 1) * search_request.hits_per_page if search_request.cursor is None else 0,
+            "estimatedTotalHits": search_results.get('estimatedTotalHits', 0),
+            "next_cursor": search_results.get('nextCursor')
         }
         
         logger.info(f"搜索 '{search_request.query}' 找到 {len(hits)} 条结果，estimatedTotalHits={response['estimatedTotalHits']}，计算得到totalPages={math.ceil(response['estimatedTotalHits'] / search_request.hits_per_page)}")
         return response
         
+    except (InvalidCursorError, KeysetPaginationUnavailableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"搜索时发生错误: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
+
+@router.post("/facets", response_model=FacetSearchResponse)
+async def search_facets(
+    facet_request: FacetSearchRequest,
+    meili_service: MeiliSearchService = Depends(get_meilisearch_service),
+    result_cache: SearchResultCache = Depends(get_result_cache)
+) -> Dict[str, Any]:
+    """
+    结果分布统计 API 端点
+
+    返回匹配结果在各聊天、聊天类型、发送者上的数量，以及按天/周/月统计的时间直方图，
+    供前端筛选控件显示每个选项的结果数。结果与搜索结果共用缓存。
+
+    Args:
+        facet_request: 查询条件和直方图桶宽度
+        meili_service: MeilisearchService 实例，通过依赖注入获取
+        result_cache: 共享搜索结果缓存，通过依赖注入获取
+
+    Returns:
+        符合 FacetSearchResponse 模型的响应字典
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"收到分布统计请求: {facet_request.query}, 时间范围: {facet_request.start_timestamp}-{facet_request.end_timestamp}, "
+                f"聊天类型: {facet_request.chat_types}, 聊天ID: {facet_request.chat_ids}, 间隔: {facet_request.interval}")
+
+    cache_key = SearchResultCache.make_key(
+        CACHE_NAMESPACE,
+        facet_request.query,
+        filters={
+            "facets": facet_request.interval,
+            "start_timestamp": facet_request.start_timestamp,
+            "end_timestamp": facet_request.end_timestamp,
+            "chat_types": facet_request.chat_types,
+            "chat_ids": facet_request.chat_ids,
+        }
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        logger.debug(f"分布统计缓存命中: '{facet_request.query}'")
+        return cached
+
+    try:
+        generations = result_cache.snapshot(facet_request.chat_ids)
+        results = await meili_service.facet_search_async(
+            query=facet_request.query,
+            start_timestamp=facet_request.start_timestamp,
+            end_timestamp=facet_request.end_timestamp,
+            chat_types=facet_request.chat_types,
+            chat_ids=facet_request.chat_ids,
+            interval=facet_request.interval
+        )
+    except Exception as e:
+        logger.error(f"分布统计时发生错误: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"分布统计失败: {str(e)}")
+
+    result_cache.set(
+        cache_key, results, namespace=CACHE_NAMESPACE, query=facet_request.query,
+        chat_ids=facet_request.chat_ids, generations=generations
+    )
+    return results
+
+
+def _sse_event(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """格式化一条 Server-Sent Event"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _live_search_events(request: Request, live_search: LiveSearchHub, subscription: LiveSubscription):
+    """
+    生成实时搜索事件流
+
+    先发送 ready 事件，之后每条匹配的新消息发送一个 message 事件（格式与搜索结果项相同）；
+    订阅队列溢出丢弃了消息时发送 dropped 事件。连接断开时取消订阅。
+    """
+    reported_dropped = 0
+    try:
+        yield _sse_event("ready", {"subscription_id": subscription.id, "query": subscription.live_query.query})
+        while True:
+            try:
+                doc = await asyncio.wait_for(subscription.queue.get(), timeout=LIVE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+
+            if subscription.dropped > reported_dropped:
+                yield _sse_event("dropped", {"count": subscription.dropped - reported_dropped})
+                reported_dropped = subscription.dropped
+
+            hit = doc.model_dump()
+            item = SearchResultItem(
+                id=doc.id,
+                chat_title=doc.chat_title,
+                sender_name=doc.sender_name,
+                text_snippet=_make_text_snippet(hit),
+                date=doc.date,
+                message_link=doc.message_link
+            )
+            yield _sse_event("message", item.model_dump(exclude_none=True), event_id=doc.id)
+    finally:
+        live_search.unsubscribe(subscription)
+
+
+@router.get("/live")
+async def live_search_messages(
+    request: Request,
+    query: str = Query(..., description="搜索关键词，支持 type:、chat:、from:、date: 等高级语法"),
+    chat_types: Optional[List[str]] = Query(None, description="聊天类型列表，可选值: user, group, channel"),
+    chat_ids: Optional[List[int]] = Query(None, description="聊天 ID 列表"),
+    live_search: LiveSearchHub = Depends(get_live_search)
+) -> StreamingResponse:
+    """
+    实时搜索 API 端点（Server-Sent Events）
+
+    客户端订阅一个查询后保持连接，新消息写入索引时在进程内与订阅匹配并立即推送，
+    替代反复轮询 /search。只推送订阅之后写入的消息，已有结果仍通过 /search 获取。
+
+    Args:
+        request: 用于检测客户端断开
+        query: 搜索关键词
+        chat_types: 聊天类型过滤
+        chat_ids: 聊天 ID 过滤
+        live_search: 实时搜索订阅中心，通过依赖注入获取
+
+    Returns:
+        text/event-stream 响应
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"收到实时搜索请求: {query}, 聊天类型: {chat_types}, 聊天ID: {chat_ids}")
+
+    try:
+        subscription = live_search.subscribe(query, chat_types=chat_types, chat_ids=chat_ids)
+    except LiveSearchLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return StreamingResponse(
+        _live_search_events(request, live_search, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,86 @@
+"""
+Aho-Corasick 多模式匹配模块
+
+此模块提供纯 Python 实现的 Aho-Corasick 自动机，包括：
+1. 一次构建包含全部模式串的自动机（字典树 + 失败指针）
+2. 对文本单次扫描即可找出所有出现过的模式，耗时与文本长度和命中数成正比，
+   与模式数量无关
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 自动机
+
+    模式串按传入顺序编号，find() 返回在文本中出现过的模式编号集合。
+    构建后不可修改，模式变化时重新构建一个新实例。
+    """
+
+    __slots__ = ("_goto", "_fail", "_output", "pattern_count")
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        """
+        构建自动机
+
+        Args:
+            patterns: 模式串（空串被忽略，但仍占用编号）
+        """
+        # 状态 0 为根；_goto[state] 为 字符 -> 下一状态
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self.pattern_count = 0
+
+        for index, pattern in enumerate(patterns):
+            self.pattern_count = index + 1
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        # 按层次遍历计算失败指针（根的子状态指向根），并把失败状态的输出合并到当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        """
+        查找文本中出现过的模式
+
+        Args:
+            text: 待扫描的文本
+
+        Returns:
+            Set[int]: 出现过的模式编号
+        """
+        found: Set[int] = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
@@ -5,7 +5,7 @@
 1. 从.env文件加载环境变量
 2. 从config.ini文件加载配置项
 3. 管理白名单（添加、移除、获取）
-4. 管理聊天同步点信息
+4. 管理聊天同步点信息（存储于 SyncStateStore）
 """
 
 import os
@@ -19,6 +19,8 @@ from configparser import ConfigParser
 import dotenv
 from dateutil import parser as date_parser
 
+from core.sync_state_store import SyncStateStore, get_sync_state_store
+
 
 class UserBotConfigError(Exception):
     """User Bot 配置相关错误"""
@@ -77,6 +79,37 @@ class ConfigManager:
         self.enable_search_cache: bool = True
         self.search_cache_ttl_seconds: int = 7200
         self.search_cache_initial_fetch_count: int = 15
+        self.search_cache_maxsize: int = 1000
+        self.search_full_fetch_max_results: int = 10000
+        self.search_snippet_crop_length: int = 40
+
+        # Sync Config - Defaults
+        self.ingest_batch_size: int = 500
+        self.ingest_flush_interval_seconds: float = 2.0
+        self.forward_sync_mode: str = "updates"
+        self.forward_resync_interval_seconds: float = 600.0
+        self.sync_max_concurrency: int = 3
+        self.sync_requests_per_second: float = 2.0
+        self.sync_burst: int = 5
+        self.sync_batches_per_turn: int = 1
+        self.sync_priority_chat_ids: List[int] = []
+        self.deletion_reconcile_interval_seconds: float = 21600.0
+        self.backfill_workers_per_chat: int = 4
+        self.backfill_min_range_size: int = 10000
+        self.index_task_poll_interval_seconds: float = 1.0
+        self.index_backlog_high_watermark: int = 20
+        self.index_backlog_low_watermark: int = 10
+
+        # Archive Config - Defaults
+        self.archive_enabled: bool = True
+        self.archive_path: str = "config/message_archive.db"
+        self.archive_reindex_batch_size: int = 10000
+
+        # MeiliSearch HTTP 连接池配置 - Defaults
+        self.meili_http_pool_size: int = 20
+        self.meili_http_keepalive: int = 10
+        self.meili_http_timeout_seconds: float = 10.0
+        self.meili_http_connect_timeout_seconds: float = 5.0
         
         # 加载配置
         self.load_env()
@@ -101,6 +134,9 @@ class ConfigManager:
         self.load_config()
         self.load_whitelist()
         self._load_search_bot_config() # Load SearchBot specific configs
+        self._load_sync_config()
+        self._load_archive_config()
+        self._load_meilisearch_http_config()
         
         # 创建示例文件
         self.create_example_files()
@@ -188,7 +224,34 @@ class ConfigManager:
         self.config["SearchBot"] = {
             "enable_search_cache": "true",
             "search_cache_ttl_seconds": "7200",
-            "search_cache_initial_fetch_count": "15"
+            "search_cache_initial_fetch_count": "15",
+            "search_cache_maxsize": "1000",
+            "search_full_fetch_max_results": "10000",
+            "search_snippet_crop_length": "40"
+        }
+
+        self.config["Sync"] = {
+            "ingest_batch_size": "500",
+            "ingest_flush_interval_seconds": "2.0",
+            "forward_sync_mode": "updates",
+            "forward_resync_interval_seconds": "600",
+            "sync_max_concurrency": "3",
+            "sync_requests_per_second": "2.0",
+            "sync_burst": "5",
+            "sync_batches_per_turn": "1",
+            "sync_priority_chat_ids": "",
+            "deletion_reconcile_interval_seconds": "21600",
+            "backfill_workers_per_chat": "4",
+            "backfill_min_range_size": "10000",
+            "index_task_poll_interval_seconds": "1.0",
+            "index_backlog_high_watermark": "20",
+            "index_backlog_low_watermark": "10"
+        }
+
+        self.config["Archive"] = {
+            "enabled": "true",
+            "path": "config/message_archive.db",
+            "reindex_batch_size": "10000"
         }
         
         with open(self.config_path, "w", encoding="utf-8") as f:
@@ -246,7 +309,15 @@ USER_SESSION_NAME=user_bot_session
         
         example_config["MeiliSearch"] = {
             "HOST": "http://localhost:7700",
-            "API_KEY": "your_meilisearch_api_key_here"
+            "API_KEY": "your_meilisearch_api_key_here",
+            "http_pool_size": "20",
+            "http_keepalive": "10",
+            "http_timeout_seconds": "10.0",
+            "http_connect_timeout_seconds": "5.0",
+            "# http_pool_size": "(integer, default: 20): 异步连接池的最大连接数。",
+            "# http_keepalive": "(integer, default: 10): 连接池保持的最大空闲 keep-alive 连接数。",
+            "# http_timeout_seconds": "(float, default: 10.0): 单次请求超时时间（秒）。",
+            "# http_connect_timeout_seconds": "(float, default: 5.0): 建立连接的超时时间（秒）。"
         }
         
         example_config["Telegram"] = {
@@ -267,9 +338,57 @@ USER_SESSION_NAME=user_bot_session
             "enable_search_cache": "true",
             "search_cache_ttl_seconds": "7200",
             "search_cache_initial_fetch_count": "15",
+            "search_cache_maxsize": "1000",
+            "search_full_fetch_max_results": "10000",
+            "search_snippet_crop_length": "40",
             "# enable_search_cache": "(boolean, default: true): 是否启用搜索结果缓存。",
             "# search_cache_ttl_seconds": "(integer, default: 7200 (2 hours)): 缓存的过期时间（秒）。",
-            "# search_cache_initial_fetch_count": "(integer, default: 15): 首次快速获取并展示给用户的条目数。"
+            "# search_cache_initial_fetch_count": "(integer, default: 15): 首次快速获取并展示给用户的条目数。",
+            "# search_cache_maxsize": "(integer, default: 1000): API 与 Search Bot 共享的搜索结果缓存的最大条目数。",
+            "# search_full_fetch_max_results": "(integer, default: 10000): 后台按游标分块获取完整结果时最多缓存的条目数。",
+            "# search_snippet_crop_length": "(integer, default: 40): API 与 Search Bot 共用的摘要长度（词数），由 Meilisearch 裁剪；0 表示返回完整文本。"
+        }
+
+        example_config["Sync"] = {
+            "ingest_batch_size": "500",
+            "ingest_flush_interval_seconds": "2.0",
+            "forward_sync_mode": "updates",
+            "forward_resync_interval_seconds": "600",
+            "sync_max_concurrency": "3",
+            "sync_requests_per_second": "2.0",
+            "sync_burst": "5",
+            "sync_batches_per_turn": "1",
+            "sync_priority_chat_ids": "",
+            "deletion_reconcile_interval_seconds": "21600",
+            "backfill_workers_per_chat": "4",
+            "backfill_min_range_size": "10000",
+            "index_task_poll_interval_seconds": "1.0",
+            "index_backlog_high_watermark": "20",
+            "index_backlog_low_watermark": "10",
+            "# ingest_batch_size": "(integer, default: 500): 批量写入 Meilisearch 的单批最大文档数。",
+            "# ingest_flush_interval_seconds": "(float, default: 2.0): 写入缓冲区的最长刷新间隔（秒）。",
+            "# forward_sync_mode": "(updates | poll, default: updates): 新消息同步方式，updates 由更新流驱动，poll 为逐聊天轮询。",
+            "# forward_resync_interval_seconds": "(float, default: 600): updates 模式下兜底补洞检查的间隔（秒），0 表示禁用。",
+            "# sync_max_concurrency": "(integer, default: 3): 同时执行历史回溯的聊天数上限。",
+            "# sync_requests_per_second": "(float, default: 2.0): 所有聊天共享的 Telegram 请求速率（令牌桶）。",
+            "# sync_burst": "(integer, default: 5): 令牌桶容量，即允许的突发请求数。",
+            "# sync_batches_per_turn": "(integer, default: 1): 每个聊天每轮最多执行的回溯批次数，越小越公平。",
+            "# sync_priority_chat_ids": "(逗号分隔的聊天ID, default: 空): 优先回溯的聊天。",
+            "# deletion_reconcile_interval_seconds": "(float, default: 21600 (6 hours)): 比对索引与 Telegram 以清理已删除消息的间隔（秒），0 表示禁用。",
+            "# backfill_workers_per_chat": "(integer, default: 4): 单个聊天的回溯被切分成的并行消息ID区间数，1 表示串行回溯。",
+            "# backfill_min_range_size": "(integer, default: 10000): 切分或再平衡时每个区间的最小消息ID跨度。",
+            "# index_task_poll_interval_seconds": "(float, default: 1.0): 轮询 Meilisearch 写入任务状态的间隔（秒），0 表示不跟踪任务。",
+            "# index_backlog_high_watermark": "(integer, default: 20): 未处理完成的写入任务数超过该值时暂停历史回溯，新消息不受影响。",
+            "# index_backlog_low_watermark": "(integer, default: 10): 未处理完成的写入任务数降到该值以下时恢复历史回溯。"
+        }
+
+        example_config["Archive"] = {
+            "enabled": "true",
+            "path": "config/message_archive.db",
+            "reindex_batch_size": "10000",
+            "# enabled": "(boolean, default: true): 是否在本地归档写入索引的原始消息，用于不经 Telegram 重建索引。",
+            "# path": "(string, default: config/message_archive.db): 消息归档数据库路径。",
+            "# reindex_batch_size": "(integer, default: 10000): 从归档重建索引（python -m core.message_archive reindex-from-archive）时每次批量写入的文档数。"
         }
         
         config_example_path = f"{self.config_path}.example"
@@ -454,6 +573,15 @@ USER_SESSION_NAME=user_bot_session
             self.search_cache_initial_fetch_count = self.config.getint(
                 "SearchBot", "search_cache_initial_fetch_count", fallback=15
             )
+            self.search_cache_maxsize = self.config.getint(
+                "SearchBot", "search_cache_maxsize", fallback=1000
+            )
+            self.search_full_fetch_max_results = self.config.getint(
+                "SearchBot", "search_full_fetch_max_results", fallback=10000
+            )
+            self.search_snippet_crop_length = max(0, self.config.getint(
+                "SearchBot", "search_snippet_crop_length", fallback=40
+            ))
             self.logger.info("已加载 SearchBot 缓存配置")
         else:
             self.logger.warning("配置文件中未找到 [SearchBot] section，将使用默认缓存配置")
@@ -471,6 +599,192 @@ USER_SESSION_NAME=user_bot_session
         """获取搜索缓存首次获取的条目数"""
         return self.search_cache_initial_fetch_count
 
+    def get_search_cache_maxsize(self) -> int:
+        """获取共享搜索结果缓存的最大条目数"""
+        return self.search_cache_maxsize
+
+    def get_search_full_fetch_max_results(self) -> int:
+        """获取后台完整获取搜索结果时最多缓存的条目数"""
+        return self.search_full_fetch_max_results
+
+    def get_search_snippet_crop_length(self) -> int:
+        """获取 API 与 Search Bot 共用的摘要长度（词数），0 表示返回完整文本"""
+        return self.search_snippet_crop_length
+
+    def _load_sync_config(self) -> None:
+        """
+        从配置文件加载同步相关的配置项
+        """
+        if "Sync" in self.config:
+            self.ingest_batch_size = self.config.getint(
+                "Sync", "ingest_batch_size", fallback=500
+            )
+            self.ingest_flush_interval_seconds = self.config.getfloat(
+                "Sync", "ingest_flush_interval_seconds", fallback=2.0
+            )
+            mode = self.config.get("Sync", "forward_sync_mode", fallback="updates").strip().lower()
+            if mode not in ("updates", "poll"):
+                self.logger.warning(f"无效的 forward_sync_mode: {mode}，使用默认值 updates")
+                mode = "updates"
+            self.forward_sync_mode = mode
+            self.forward_resync_interval_seconds = self.config.getfloat(
+                "Sync", "forward_resync_interval_seconds", fallback=600.0
+            )
+            self.sync_max_concurrency = self.config.getint(
+                "Sync", "sync_max_concurrency", fallback=3
+            )
+            self.sync_requests_per_second = self.config.getfloat(
+                "Sync", "sync_requests_per_second", fallback=2.0
+            )
+            self.sync_burst = self.config.getint("Sync", "sync_burst", fallback=5)
+            self.sync_batches_per_turn = self.config.getint(
+                "Sync", "sync_batches_per_turn", fallback=1
+            )
+            priority_ids = self.config.get("Sync", "sync_priority_chat_ids", fallback="")
+            self.sync_priority_chat_ids = []
+            for id_str in priority_ids.split(","):
+                id_str = id_str.strip()
+                if not id_str:
+                    continue
+                try:
+                    self.sync_priority_chat_ids.append(int(id_str))
+                except ValueError:
+                    self.logger.warning(f"忽略无效的 sync_priority_chat_ids 项: {id_str}")
+            self.deletion_reconcile_interval_seconds = self.config.getfloat(
+                "Sync", "deletion_reconcile_interval_seconds", fallback=21600.0
+            )
+            self.backfill_workers_per_chat = self.config.getint(
+                "Sync", "backfill_workers_per_chat", fallback=4
+            )
+            self.backfill_min_range_size = self.config.getint(
+                "Sync", "backfill_min_range_size", fallback=10000
+            )
+            self.index_task_poll_interval_seconds = self.config.getfloat(
+                "Sync", "index_task_poll_interval_seconds", fallback=1.0
+            )
+            self.index_backlog_high_watermark = self.config.getint(
+                "Sync", "index_backlog_high_watermark", fallback=20
+            )
+            self.index_backlog_low_watermark = self.config.getint(
+                "Sync", "index_backlog_low_watermark", fallback=10
+            )
+            self.logger.info("已加载 Sync 同步配置")
+        else:
+            self.logger.debug("配置文件中未找到 [Sync] section，将使用默认同步配置")
+
+    def get_ingest_batch_size(self) -> int:
+        """获取批量写入的单批最大文档数"""
+        return self.ingest_batch_size
+
+    def get_ingest_flush_interval(self) -> float:
+        """获取写入缓冲区的最长刷新间隔（秒）"""
+        return self.ingest_flush_interval_seconds
+
+    def get_forward_sync_mode(self) -> str:
+        """获取向前同步模式（updates 或 poll）"""
+        return self.forward_sync_mode
+
+    def get_forward_resync_interval(self) -> float:
+        """获取更新流模式下兜底补洞检查的间隔（秒）"""
+        return self.forward_resync_interval_seconds
+
+    def get_sync_max_concurrency(self) -> int:
+        """获取同时执行历史回溯的聊天数上限"""
+        return self.sync_max_concurrency
+
+    def get_sync_rate_limit(self) -> Tuple[float, int]:
+        """获取共享令牌桶的 (每秒请求数, 突发容量)"""
+        return self.sync_requests_per_second, self.sync_burst
+
+    def get_sync_batches_per_turn(self) -> int:
+        """获取每个聊天每轮最多执行的回溯批次数"""
+        return self.sync_batches_per_turn
+
+    def get_deletion_reconcile_interval(self) -> float:
+        """获取删除对账（比对索引与 Telegram）的间隔（秒），0 表示禁用"""
+        return self.deletion_reconcile_interval_seconds
+
+    def get_backfill_split(self) -> Tuple[int, int]:
+        """获取单个聊天回溯的 (并行区间数, 区间最小跨度)"""
+        return self.backfill_workers_per_chat, self.backfill_min_range_size
+
+    def get_index_task_poll_interval(self) -> float:
+        """获取轮询 Meilisearch 写入任务状态的间隔（秒），0 表示不跟踪任务"""
+        return self.index_task_poll_interval_seconds
+
+    def get_index_backlog_watermarks(self) -> Tuple[int, int]:
+        """获取历史回溯背压的 (高水位, 低水位)，单位为未处理完成的写入任务数"""
+        return self.index_backlog_high_watermark, self.index_backlog_low_watermark
+
+    def get_sync_priority(self, chat_id: int) -> int:
+        """
+        获取聊天的回溯优先级
+
+        sync_priority_chat_ids 中的聊天按列出顺序获得 0, 1, 2... 的优先级，
+        其他聊天使用较低的默认优先级。
+        """
+        if chat_id in self.sync_priority_chat_ids:
+            return self.sync_priority_chat_ids.index(chat_id)
+        return len(self.sync_priority_chat_ids) + 10
+
+    def _load_archive_config(self) -> None:
+        """
+        从配置文件加载本地消息归档相关的配置项
+        """
+        if "Archive" in self.config:
+            self.archive_enabled = self.config.getboolean("Archive", "enabled", fallback=True)
+            self.archive_path = self.config.get("Archive", "path", fallback="config/message_archive.db")
+            self.archive_reindex_batch_size = self.config.getint(
+                "Archive", "reindex_batch_size", fallback=10000
+            )
+            self.logger.info("已加载 Archive 归档配置")
+        else:
+            self.logger.debug("配置文件中未找到 [Archive] section，将使用默认归档配置")
+
+    def get_archive_enabled(self) -> bool:
+        """获取是否启用本地消息归档"""
+        return self.archive_enabled
+
+    def get_archive_path(self) -> str:
+        """获取本地消息归档数据库路径"""
+        return self.archive_path
+
+    def get_archive_reindex_batch_size(self) -> int:
+        """获取从归档重建索引时的单批文档数"""
+        return self.archive_reindex_batch_size
+
+    def _load_meilisearch_http_config(self) -> None:
+        """
+        从配置文件加载 MeiliSearch HTTP 连接池相关的配置项
+        """
+        if "MeiliSearch" in self.config:
+            self.meili_http_pool_size = self.config.getint(
+                "MeiliSearch", "http_pool_size", fallback=20
+            )
+            self.meili_http_keepalive = self.config.getint(
+                "MeiliSearch", "http_keepalive", fallback=10
+            )
+            self.meili_http_timeout_seconds = self.config.getfloat(
+                "MeiliSearch", "http_timeout_seconds", fallback=10.0
+            )
+            self.meili_http_connect_timeout_seconds = self.config.getfloat(
+                "MeiliSearch", "http_connect_timeout_seconds", fallback=5.0
+            )
+
+    def get_meili_http_options(self) -> Dict[str, Any]:
+        """
+        获取 MeiliSearchService 连接池参数
+
+        Returns:
+            Dict[str, Any]: 可直接作为关键字参数传给 MeiliSearchService 的字典
+        """
+        return {
+            "http_pool_size": self.meili_http_pool_size,
+            "http_keepalive": self.meili_http_keepalive,
+            "http_timeout": self.meili_http_timeout_seconds,
+            "http_connect_timeout": self.meili_http_connect_timeout_seconds,
+        }
+
     def get_oldest_sync_timestamp(self, chat_id: int) -> Optional[datetime]:
         """
         获取指定聊天的最旧同步时间戳
@@ -691,70 +1005,40 @@ USER_SESSION_NAME=user_bot_session
 class SyncPointManager:
     """
     同步点管理器类
-    
+
     负责管理和持久化聊天的同步点信息，包括：
-    1. 加载同步点信息
-    2. 获取特定聊天的同步点
-    3. 更新同步点信息
+    1. 获取特定聊天的同步点
+    2. 更新同步点信息
+    3. 记录向前/向后同步状态
+
+    同步点与 HistorySyncer 的光标保存在同一个 SyncStateStore（SQLite）中，
+    每次更新只写入对应聊天的一行。
     """
-    
-    def __init__(self, sync_points_path: str = "config/sync_points.json") -> None:
+
+    def __init__(self, *, db_path: Optional[str] = None, state_store: Optional[SyncStateStore] = None) -> None:
         """
         初始化同步点管理器
 
+        参数只能按关键字传入：旧版的第一个位置参数是 JSON 文件路径，
+        按位置传入会被误当作 SQLite 数据库路径。
+
         Args:
-            sync_points_path: 同步点文件的路径，默认为config/sync_points.json
+            db_path: 独立状态库路径（不迁移旧版 JSON 文件）；为 None 时使用全局 SyncStateStore
+            state_store: 直接指定的状态存储实例，优先于 db_path
         """
         self.logger = logging.getLogger(__name__)
-        self.sync_points_path = sync_points_path
-        self.sync_points: Dict[str, Dict[str, Any]] = {}
+        if state_store is not None:
+            self.state_store = state_store
+        elif db_path is not None:
+            self.state_store = SyncStateStore(db_path, legacy_json_path=None)
+        else:
+            self.state_store = get_sync_state_store()
 
-        # 确保同步点文件的目录存在
-        sync_dir = os.path.dirname(sync_points_path)
-        if sync_dir and not os.path.exists(sync_dir):
-            os.makedirs(sync_dir, exist_ok=True)
-            self.logger.info(f"已创建同步点目录 {sync_dir}")
+    @property
+    def sync_points(self) -> Dict[str, Dict[str, Any]]:
+        """所有聊天的同步点信息，键为字符串形式的聊天ID"""
+        return self.state_store.get_all_sync_points()
 
-        # 加载同步点信息
-        self.load_sync_points()
-        
-    def load_sync_points(self) -> None:
-        """
-        从文件加载同步点信息
-        
-        如果文件不存在，会初始化为空字典
-        """
-        if os.path.exists(self.sync_points_path):
-            try:
-                with open(self.sync_points_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, dict) and "sync_points" in data:
-                        self.sync_points = data["sync_points"]
-                    else:
-                        self.sync_points = {}
-                        self.logger.warning(f"同步点文件 {self.sync_points_path} 格式错误，已初始化为空")
-                self.logger.info(f"从 {self.sync_points_path} 加载同步点信息，共 {len(self.sync_points)} 个聊天")
-            except Exception as e:
-                self.sync_points = {}
-                self.logger.error(f"加载同步点文件 {self.sync_points_path} 时出错: {e}")
-        else:
-            self.sync_points = {}
-            self.logger.info(f"{self.sync_points_path} 文件不存在，已初始化为空")
-            
-    def save_sync_points(self) -> None:
-        """
-        保存同步点信息到文件
-        """
-        data = {
-            "sync_points": self.sync_points,
-            "updated_at": int(time.time())
-        }
-        
-        with open(self.sync_points_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-            
-        self.logger.info(f"已保存同步点信息到 {self.sync_points_path}，共 {len(self.sync_points)} 个聊天")
-        
     def get_sync_point(self, chat_id: int) -> Optional[Dict[str, Any]]:
         """
         获取特定聊天的同步点信息
@@ -765,8 +1049,7 @@ class SyncPointManager:
         Returns:
             同步点信息字典，包含message_id、date等，如不存在则返回None
         """
-        chat_id_str = str(chat_id)  # JSON中的键必须是字符串
-        return self.sync_points.get(chat_id_str)
+        return self.state_store.get_sync_point(chat_id)
         
     def update_sync_point(self, chat_id: int, message_id: int, date: Union[datetime, int], additional_info: Optional[Dict[str, Any]] = None) -> None:
         """
@@ -778,8 +1061,6 @@ class SyncPointManager:
             date: 消息日期（datetime对象或时间戳）
             additional_info: 其他额外信息，可选
         """
-        chat_id_str = str(chat_id)  # JSON中的键必须是字符串
-        
         # 转换date为时间戳
         if isinstance(date, datetime):
             date_timestamp = int(date.timestamp())
@@ -787,7 +1068,7 @@ class SyncPointManager:
             date_timestamp = date
             
         # 获取现有同步点信息（如果存在）
-        existing_sync_point = self.sync_points.get(chat_id_str, {})
+        existing_sync_point = self.state_store.get_sync_point(chat_id) or {}
 
         # 创建同步点信息
         sync_point = {
@@ -806,11 +1087,8 @@ class SyncPointManager:
             sync_point.update(additional_info)
 
         # 更新同步点
-        self.sync_points[chat_id_str] = sync_point
-        
-        # 保存到文件
-        self.save_sync_points()
-        
+        self.state_store.save_sync_point(chat_id, sync_point)
+
         self.logger.debug(f"更新聊天 {chat_id} 的同步点: message_id={message_id}, date={date_timestamp}")
         
     def delete_sync_point(self, chat_id: int) -> bool:
@@ -823,13 +1101,10 @@ class SyncPointManager:
         Returns:
             是否成功删除（如不存在则返回False）
         """
-        chat_id_str = str(chat_id)
-        if chat_id_str not in self.sync_points:
+        if not self.state_store.delete_sync_point(chat_id):
             self.logger.info(f"聊天 {chat_id} 的同步点不存在，无需删除")
             return False
-            
-        del self.sync_points[chat_id_str]
-        self.save_sync_points()
+
         self.logger.info(f"已删除聊天 {chat_id} 的同步点")
         return True
         
@@ -837,8 +1112,7 @@ class SyncPointManager:
         """
         重置所有同步点信息
         """
-        self.sync_points = {}
-        self.save_sync_points()
+        self.state_store.reset_all_sync_points()
         self.logger.info("已重置所有同步点信息")
 
     def update_sync_status(self, chat_id: int, sync_type: str, completed: bool = True) -> None:
@@ -850,11 +1124,10 @@ class SyncPointManager:
             sync_type: 同步类型，'forward' 或 'backward'
             completed: 是否完成同步
         """
-        chat_id_str = str(chat_id)
-
         # 获取现有同步点，如果不存在则创建
-        if chat_id_str not in self.sync_points:
-            self.sync_points[chat_id_str] = {
+        sync_point = self.state_store.get_sync_point(chat_id)
+        if sync_point is None:
+            sync_point = {
                 "message_id": 0,
                 "date": 0,
                 "updated_at": int(time.time()),
@@ -864,7 +1137,6 @@ class SyncPointManager:
                 "last_backward_sync": None
             }
 
-        sync_point = self.sync_points[chat_id_str]
         current_time = int(time.time())
 
         if sync_type == "forward":
@@ -876,8 +1148,7 @@ class SyncPointManager:
 
         sync_point["updated_at"] = current_time
 
-        # 保存到文件
-        self.save_sync_points()
+        self.state_store.save_sync_point(chat_id, sync_point)
 
         self.logger.debug(f"更新聊天 {chat_id} 的{sync_type}同步状态: {completed}")
 
@@ -891,8 +1162,7 @@ class SyncPointManager:
         Returns:
             包含同步状态信息的字典
         """
-        chat_id_str = str(chat_id)
-        sync_point = self.sync_points.get(chat_id_str, {})
+        sync_point = self.state_store.get_sync_point(chat_id) or {}
 
         return {
             "forward_sync_complete": sync_point.get("forward_sync_complete", False),
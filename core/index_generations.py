@@ -0,0 +1,84 @@
+"""
+索引代数模块
+
+此模块为每个聊天维护单调递增的索引代数（generation），包括：
+1. 写入路径（索引、编辑、删除文档）提交后递增对应聊天的代数；启用任务跟踪时，任务处理完成后再递增一次
+2. 全局代数：任意聊天的写入都会递增，用于未限定聊天的查询
+3. 纪元（epoch）：无法确定受影响聊天的写入（如清空索引）递增，使所有快照失效
+4. 生成代数快照，供搜索结果缓存校验条目是否仍然新鲜
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class IndexGenerations:
+    """
+    按聊天维护的索引代数
+
+    缓存条目写入时记录相关聊天的代数快照，读取时与当前快照比较，
+    不一致说明这些聊天在缓存之后有过写入，条目应视为过期。
+    """
+
+    def __init__(self) -> None:
+        self._generations: Dict[int, int] = {}
+        self._global = 0
+        self._epoch = 0
+
+    def bump(self, chat_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        记录一次写入
+
+        Args:
+            chat_ids: 受影响的聊天ID；为 None 表示无法确定，所有快照随之失效
+        """
+        if chat_ids is None:
+            self._epoch += 1
+            logger.debug(f"索引纪元递增: epoch={self._epoch}")
+            return
+        touched = False
+        for chat_id in set(chat_ids):
+            self._generations[chat_id] = self._generations.get(chat_id, 0) + 1
+            touched = True
+        if touched:
+            self._global += 1
+
+    def get(self, chat_id: int) -> int:
+        """获取单个聊天的当前代数"""
+        return self._generations.get(chat_id, 0)
+
+    def snapshot(self, chat_ids: Optional[Iterable[int]] = None) -> Tuple[Any, ...]:
+        """
+        生成代数快照
+
+        Args:
+            chat_ids: 查询限定的聊天ID；为 None 表示查询可能匹配任意聊天，使用全局代数
+
+        Returns:
+            可直接比较的快照元组
+        """
+        if chat_ids is None:
+            return (self._epoch, self._global)
+        return (self._epoch, tuple((cid, self.get(cid)) for cid in sorted(set(chat_ids))))
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取代数统计信息"""
+        return {
+            "tracked_chats": len(self._generations),
+            "global_generation": self._global,
+            "epoch": self._epoch,
+        }
+
+
+# 全局代数实例（API、Search Bot 和 User Bot 在同一进程内共享）
+_index_generations: Optional[IndexGenerations] = None
+
+
+def get_index_generations() -> IndexGenerations:
+    """获取全局索引代数实例"""
+    global _index_generations
+    if _index_generations is None:
+        _index_generations = IndexGenerations()
+    return _index_generations
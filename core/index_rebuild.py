@@ -0,0 +1,263 @@
+"""
+零停机索引重建模块
+
+修改消息索引的可搜索、可过滤属性或排序规则会使 Meilisearch 重新索引全部文档，
+直接在线上索引上修改时搜索会变慢甚至返回不完整的结果。此模块改为在影子索引上重建：
+1. 创建带版本后缀的影子索引（如 telegram_messages_v20240101120000），先应用 MESSAGE_INDEX_SETTINGS
+2. 按 (chat_id, message_id) 键集分页读取线上索引，以大批量写入影子索引
+3. 复制开始前启用写入日志，复制完成后分轮在影子索引上重放期间的写入，直到积压足够少
+4. 暂停异步写入，重放最后一轮，调用 swap-indexes 原子交换两个索引，然后恢复写入
+5. 交换后删除旧索引（此时名为影子索引名），并使搜索结果缓存失效
+
+重建在 API 所在的事件循环中运行（与 UserBot、Search Bot 同一进程），进度通过 API 查询。
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from core.index_generations import get_index_generations
+from core.index_write_journal import (
+    OP_DELETE, OP_DELETE_FILTER, OP_UPSERT, IndexWriteJournal, JournalOp, get_index_write_journal
+)
+from core.meilisearch_service import DOCUMENT_SCAN_PAGE_SIZE, MESSAGE_INDEX_SETTINGS, MeiliSearchService
+
+logger = logging.getLogger(__name__)
+
+# 默认参数
+DEFAULT_COPY_BATCH_SIZE = 10000    # 写入影子索引的单批文档数
+CATCH_UP_MAX_ROUNDS = 5            # 暂停写入前最多重放的轮数
+CATCH_UP_PAUSE_THRESHOLD = 100     # 积压的操作数不超过该值时进入暂停写入的最后一轮
+
+# 重建阶段
+PHASE_PENDING = "pending"
+PHASE_CREATING = "creating"
+PHASE_COPYING = "copying"
+PHASE_CATCHING_UP = "catching_up"
+PHASE_SWAPPING = "swapping"
+PHASE_CLEANING_UP = "cleaning_up"
+PHASE_DONE = "done"
+PHASE_FAILED = "failed"
+FINISHED_PHASES = (PHASE_DONE, PHASE_FAILED)
+
+
+class IndexRebuilder:
+    """
+    影子索引重建任务
+
+    每个实例只执行一次重建；start() 在后台运行 run()，get_progress() 可随时调用。
+    """
+
+    def __init__(self, meili_service: MeiliSearchService, batch_size: int = DEFAULT_COPY_BATCH_SIZE,
+                 keep_old_index: bool = False, journal: Optional[IndexWriteJournal] = None) -> None:
+        """
+        初始化重建任务
+
+        Args:
+            meili_service: MeiliSearchService 实例，重建其消息索引
+            batch_size: 写入影子索引的单批文档数
+            keep_old_index: 交换后是否保留旧索引（保留时名为影子索引名，可用于回滚）
+            journal: 写入日志，默认使用全局实例
+        """
+        self.meili_service = meili_service
+        self.batch_size = max(DOCUMENT_SCAN_PAGE_SIZE, batch_size)
+        self.keep_old_index = keep_old_index
+        self.journal = journal or get_index_write_journal()
+
+        self.index_uid = meili_service.index_name
+        self.shadow_uid = f"{self.index_uid}_v{datetime.now(timezone.utc):%Y%m%d%H%M%S}"
+        self._task: Optional[asyncio.Task] = None
+        self._progress: Dict[str, Any] = {
+            "phase": PHASE_PENDING,
+            "index": self.index_uid,
+            "shadow_index": self.shadow_uid,
+            "total_documents": 0,
+            "copied_documents": 0,
+            "replayed_operations": 0,
+            "catch_up_rounds": 0,
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+
+    # ----------------------- 生命周期 -----------------------
+    def start(self) -> asyncio.Task:
+        """在后台启动重建（需要运行中的事件循环）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(), name="index_rebuild")
+        return self._task
+
+    def is_running(self) -> bool:
+        """重建是否已开始且尚未结束"""
+        return self._progress["phase"] not in FINISHED_PHASES and self._progress["started_at"] is not None
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        执行重建
+
+        失败时写入日志停止记录、影子索引被删除，线上索引不受影响。
+
+        Returns:
+            dict: 最终进度（与 get_progress() 相同）
+        """
+        self._progress["started_at"] = int(time.time())
+        journal_started = swapped = False
+        try:
+            self.journal.start(self.index_uid)
+            journal_started = True
+            self._progress["total_documents"] = await self.meili_service.get_document_count_async()
+
+            self._set_phase(PHASE_CREATING)
+            await self.meili_service.create_index_async(self.shadow_uid, MESSAGE_INDEX_SETTINGS)
+
+            self._set_phase(PHASE_COPYING)
+            await self._copy_documents()
+
+            self._set_phase(PHASE_CATCHING_UP)
+            for _ in range(CATCH_UP_MAX_ROUNDS):
+                if self.journal.pending_count() <= CATCH_UP_PAUSE_THRESHOLD:
+                    break
+                await self._replay(self.shadow_uid, self.journal.drain())
+
+            # 最后一轮：暂停写入，追平后交换；交换任务完成后写入恢复并直接进入新索引
+            self._set_phase(PHASE_SWAPPING)
+            self.journal.pause_writes()
+            try:
+                await self._replay(self.shadow_uid, self.journal.drain())
+                await self.meili_service.swap_indexes_async(self.index_uid, self.shadow_uid)
+                swapped = True
+                # 暂停期间同步写入方法（不受暂停影响）写入的是旧索引，交换后重放到新索引
+                late_ops = self.journal.stop()
+                await self._replay(self.index_uid, late_ops)
+            finally:
+                self.journal.resume_writes()
+            get_index_generations().bump()
+
+            self._set_phase(PHASE_CLEANING_UP)
+            if not self.keep_old_index:
+                await self.meili_service.delete_index_async(self.shadow_uid)
+
+            self._set_phase(PHASE_DONE)
+            logger.info(
+                f"索引 {self.index_uid} 重建完成: 复制 {self._progress['copied_documents']} 条，"
+                f"重放 {self._progress['replayed_operations']} 个写入操作"
+            )
+        except asyncio.CancelledError:
+            self._fail("重建被取消", swapped)
+            raise
+        except Exception as e:
+            logger.error(f"索引 {self.index_uid} 重建失败: {e}", exc_info=True)
+            self._fail(str(e), swapped)
+        finally:
+            if journal_started:
+                self.journal.stop()
+            self._progress["finished_at"] = int(time.time())
+            if self._progress["phase"] == PHASE_FAILED and not swapped:
+                await self._drop_shadow()
+        return self.get_progress()
+
+    def _set_phase(self, phase: str) -> None:
+        self._progress["phase"] = phase
+        logger.info(f"索引重建 {self.index_uid} -> {self.shadow_uid}: {phase}")
+
+    def _fail(self, error: str, swapped: bool) -> None:
+        self._progress["phase"] = PHASE_FAILED
+        self._progress["error"] = error if not swapped else f"{error}（索引已交换，旧索引保留为 {self.shadow_uid}）"
+
+    async def _drop_shadow(self) -> None:
+        try:
+            await self.meili_service.delete_index_async(self.shadow_uid)
+        except Exception as e:
+            logger.warning(f"删除影子索引 {self.shadow_uid} 失败: {e}")
+
+    # ----------------------- 复制与重放 -----------------------
+    async def _copy_documents(self) -> None:
+        """键集分页读取线上索引，按批写入影子索引；最多一个写入任务在排队，读取与写入并行"""
+        batch: List[Dict[str, Any]] = []
+        after = None
+        pending_task: Optional[int] = None
+        while True:
+            page = await self.meili_service.fetch_documents_after_async(after, DOCUMENT_SCAN_PAGE_SIZE)
+            if page:
+                batch.extend(page)
+                after = (page[-1]["chat_id"], page[-1]["message_id"])
+            if len(batch) >= self.batch_size or (not page and batch):
+                task = await self.meili_service.add_documents_async(self.shadow_uid, batch)
+                if pending_task is not None:
+                    await self.meili_service.wait_for_task_async(pending_task)
+                pending_task = task.get("taskUid")
+                self._progress["copied_documents"] += len(batch)
+                batch = []
+            if not page:
+                break
+        if pending_task is not None:
+            await self.meili_service.wait_for_task_async(pending_task)
+
+    async def _replay(self, index_uid: str, ops: List[JournalOp]) -> None:
+        """按记录顺序在指定索引上重放写入，连续的写入合并为批量请求，等待最后一个任务完成"""
+        if not ops:
+            return
+        last_task: Optional[int] = None
+        upserts: List[Dict[str, Any]] = []
+
+        async def flush_upserts() -> Optional[int]:
+            task = None
+            for start in range(0, len(upserts), self.batch_size):
+                task = await self.meili_service.add_documents_async(index_uid, upserts[start:start + self.batch_size])
+            upserts.clear()
+            return task.get("taskUid") if task else None
+
+        for kind, payload in ops:
+            if kind == OP_UPSERT:
+                upserts.extend(payload)
+                continue
+            last_task = await flush_upserts() or last_task
+            if kind == OP_DELETE:
+                task = await self.meili_service.delete_documents_async(index_uid, payload)
+            elif kind == OP_DELETE_FILTER:
+                task = await self.meili_service.delete_documents_by_filter_async(index_uid, payload)
+            else:
+                continue
+            last_task = task.get("taskUid")
+        last_task = await flush_upserts() or last_task
+
+        if last_task is not None:
+            await self.meili_service.wait_for_task_async(last_task)
+        self._progress["replayed_operations"] += len(ops)
+        self._progress["catch_up_rounds"] += 1
+        logger.info(f"已在索引 {index_uid} 上重放 {len(ops)} 个写入操作")
+
+    # ----------------------- 进度 -----------------------
+    def get_progress(self) -> Dict[str, Any]:
+        """
+        获取重建进度
+
+        Returns:
+            dict: 包含 phase、index、shadow_index、total_documents、copied_documents、
+                percent、replayed_operations、pending_operations、started_at、finished_at、error
+        """
+        total = self._progress["total_documents"]
+        copied = self._progress["copied_documents"]
+        if self._progress["phase"] == PHASE_DONE:
+            percent = 100.0
+        else:
+            percent = round(min(copied / total, 1.0) * 100, 1) if total else 0.0
+        pending = self.journal.pending_count() if self.journal.index_uid == self.index_uid else 0
+        return {**self._progress, "percent": percent, "pending_operations": pending}
+
+
+# 最近一次重建任务（由 API 启动时设置）
+_index_rebuilder: Optional[IndexRebuilder] = None
+
+
+def get_index_rebuilder() -> Optional[IndexRebuilder]:
+    """获取最近一次的索引重建任务；从未启动时返回 None"""
+    return _index_rebuilder
+
+
+def set_index_rebuilder(rebuilder: Optional[IndexRebuilder]) -> None:
+    """设置当前的索引重建任务"""
+    global _index_rebuilder
+    _index_rebuilder = rebuilder
@@ -0,0 +1,340 @@
+"""
+索引任务跟踪模块
+
+Meilisearch 的写入是异步任务：add_documents 只返回 taskUid，文档在任务处理完成后才可搜索。
+此模块跟踪写入消息的任务，包括：
+1. MeiliSearchService 的消息写入方法把返回的 taskUid 连同文档ID登记到跟踪器
+2. 后台任务按批（GET /tasks?uids=...）轮询尚未完成的任务，完成后移出跟踪
+3. 任务结束时递增受影响聊天的索引代数：写入请求返回时 Meilisearch 尚未处理文档，
+   在此期间缓存的搜索结果仍是旧数据，需要在任务完成后再次失效
+4. 失败或被取消的写入任务按聊天记录文档的消息ID范围，可从本地消息归档重新提交
+5. 未完成的任务数超过高水位时对历史回溯施加背压，降到低水位以下后恢复；
+   向前同步与实时消息不受影响，保证新消息优先写入
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Optional
+
+from core.index_generations import get_index_generations
+from core.message_archive import MessageArchive, get_message_archive
+
+if TYPE_CHECKING:
+    from core.meilisearch_service import MeiliSearchService
+
+logger = logging.getLogger(__name__)
+
+# 默认参数
+DEFAULT_POLL_INTERVAL = 1.0        # 轮询任务状态的间隔（秒）
+DEFAULT_HIGH_WATERMARK = 20        # 未完成任务数超过该值时暂停历史回溯
+DEFAULT_LOW_WATERMARK = 10         # 未完成任务数降到该值以下时恢复历史回溯
+POLL_BATCH_SIZE = 100              # 单次 /tasks 请求查询的任务数
+MAX_RECORDED_FAILURES = 1000       # 最多保留的失败记录数
+
+FINISHED_STATUSES = ("succeeded", "failed", "canceled")
+
+
+def summarize_document_ranges(document_ids: Iterable[str]) -> List[Dict[str, int]]:
+    """
+    按聊天汇总文档ID（{chat_id}_{message_id}）的消息ID范围
+
+    Returns:
+        list: [{"chat_id", "min_message_id", "max_message_id", "count"}, ...]，按 chat_id 排序
+    """
+    ranges: Dict[int, Dict[str, int]] = {}
+    for doc_id in document_ids:
+        chat_part, _, message_part = doc_id.rpartition("_")
+        try:
+            chat_id, message_id = int(chat_part), int(message_part)
+        except ValueError:
+            continue
+        entry = ranges.get(chat_id)
+        if entry is None:
+            ranges[chat_id] = {
+                "chat_id": chat_id, "min_message_id": message_id, "max_message_id": message_id, "count": 1
+            }
+        else:
+            entry["min_message_id"] = min(entry["min_message_id"], message_id)
+            entry["max_message_id"] = max(entry["max_message_id"], message_id)
+            entry["count"] += 1
+    return [ranges[chat_id] for chat_id in sorted(ranges)]
+
+
+class _TrackedTask:
+    """一个尚未完成的写入任务"""
+
+    __slots__ = ("task_uid", "index_uid", "document_ids", "chat_ids", "retryable", "enqueued_at")
+
+    def __init__(self, task_uid: int, index_uid: str, document_ids: List[str],
+                 chat_ids: Optional[List[int]], retryable: bool) -> None:
+        self.task_uid = task_uid
+        self.index_uid = index_uid
+        self.document_ids = document_ids
+        self.chat_ids = chat_ids
+        self.retryable = retryable
+        self.enqueued_at = time.time()
+
+
+class IndexTaskTracker:
+    """
+    Meilisearch 写入任务跟踪器
+
+    track() 是线程安全的（同步写入方法可能在其它线程中调用）；
+    轮询、背压等待和重试需要运行中的事件循环。
+    """
+
+    def __init__(self, meili_service: "MeiliSearchService", poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 high_watermark: int = DEFAULT_HIGH_WATERMARK, low_watermark: int = DEFAULT_LOW_WATERMARK) -> None:
+        """
+        初始化任务跟踪器
+
+        Args:
+            meili_service: 用于查询任务状态和重新提交文档的 MeiliSearchService 实例
+            poll_interval: 轮询任务状态的间隔（秒）
+            high_watermark: 未完成任务数超过该值时开始背压
+            low_watermark: 未完成任务数不超过该值时解除背压（不大于 high_watermark）
+        """
+        self.meili_service = meili_service
+        self.poll_interval = max(0.1, poll_interval)
+        self.high_watermark = max(1, high_watermark)
+        self.low_watermark = max(0, min(low_watermark, self.high_watermark))
+
+        self._lock = threading.Lock()
+        self._pending: Dict[int, _TrackedTask] = {}
+        self._failures: Deque[Dict[str, Any]] = deque(maxlen=MAX_RECORDED_FAILURES)
+        self._throttled = False
+        self._poll_task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, int] = {
+            "tracked": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "lost": 0,
+            "throttle_events": 0,
+            "throttled_waits": 0,
+            "retried_documents": 0,
+        }
+
+    # ----------------------- 生命周期 -----------------------
+    def start(self) -> None:
+        """启动后台轮询任务（需要运行中的事件循环）"""
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop(), name="index_task_tracker")
+            logger.info(
+                f"索引任务跟踪已启动: 轮询间隔={self.poll_interval}s, "
+                f"背压水位={self.low_watermark}/{self.high_watermark}"
+            )
+
+    async def stop(self) -> None:
+        """停止后台轮询并解除背压"""
+        if self._poll_task is not None and not self._poll_task.done():
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+        self._poll_task = None
+        self._throttled = False
+        logger.info(f"索引任务跟踪已停止: {self.get_stats()}")
+
+    def is_running(self) -> bool:
+        """后台轮询是否在运行"""
+        return self._poll_task is not None and not self._poll_task.done()
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"轮询 Meilisearch 任务状态失败: {e}")
+
+    # ----------------------- 登记与轮询 -----------------------
+    def track(self, index_uid: str, task_uid: int, document_ids: List[str],
+              chat_ids: Optional[Iterable[int]], retryable: bool = True) -> None:
+        """
+        登记一个写入任务
+
+        Args:
+            index_uid: 写入的索引
+            task_uid: Meilisearch 返回的 taskUid
+            document_ids: 本任务写入或删除的文档ID
+            chat_ids: 受影响的聊天，任务结束时递增其索引代数；为 None 表示影响所有聊天
+            retryable: 失败后能否从消息归档重新提交（删除任务为 False）
+        """
+        chats = None if chat_ids is None else sorted(set(chat_ids))
+        with self._lock:
+            self._pending[task_uid] = _TrackedTask(task_uid, index_uid, list(document_ids), chats, retryable)
+            self._stats["tracked"] += 1
+            self._update_throttle()
+
+    def backlog(self) -> int:
+        """已登记但 Meilisearch 尚未处理完成的任务数"""
+        return len(self._pending)
+
+    def is_throttling(self) -> bool:
+        """是否正在对历史回溯施加背压"""
+        return self._throttled
+
+    def _update_throttle(self) -> None:
+        """按高低水位更新背压状态（调用方持有 _lock）"""
+        backlog = len(self._pending)
+        if not self._throttled and backlog > self.high_watermark:
+            self._throttled = True
+            self._stats["throttle_events"] += 1
+            logger.warning(f"Meilisearch 任务积压 {backlog} 个，暂停历史回溯")
+        elif self._throttled and backlog <= self.low_watermark:
+            self._throttled = False
+            logger.info(f"Meilisearch 任务积压降至 {backlog} 个，恢复历史回溯")
+
+    async def poll_once(self) -> int:
+        """
+        按批查询所有未完成任务的状态，处理已结束的任务
+
+        Returns:
+            int: 本次结束的任务数
+        """
+        with self._lock:
+            task_uids = sorted(self._pending)
+        finished = 0
+        for start in range(0, len(task_uids), POLL_BATCH_SIZE):
+            batch = task_uids[start:start + POLL_BATCH_SIZE]
+            tasks = await self.meili_service.get_tasks_async(batch)
+            statuses = {task.get("uid"): task for task in tasks}
+            ended: List[_TrackedTask] = []
+            with self._lock:
+                for task_uid in batch:
+                    task = statuses.get(task_uid)
+                    if task is None:
+                        # 任务已被 Meilisearch 清理，无法得知结果
+                        tracked = self._pending.pop(task_uid, None)
+                        if tracked is not None:
+                            self._stats["lost"] += 1
+                            ended.append(tracked)
+                        continue
+                    if task.get("status") not in FINISHED_STATUSES:
+                        continue
+                    tracked = self._pending.pop(task_uid, None)
+                    if tracked is None:
+                        continue
+                    ended.append(tracked)
+                    if task["status"] == "succeeded":
+                        self._stats["succeeded"] += 1
+                    else:
+                        self._record_failure(tracked, task)
+                self._update_throttle()
+            # 任务结束后文档才对搜索可见（或确定未写入），再次失效相关聊天的缓存结果
+            generations = get_index_generations()
+            for tracked in ended:
+                generations.bump(tracked.chat_ids)
+            finished += len(ended)
+        return finished
+
+    def _record_failure(self, tracked: _TrackedTask, task: Dict[str, Any]) -> None:
+        """记录失败的任务（调用方持有 _lock）"""
+        error = task.get("error") or {}
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        ranges = summarize_document_ranges(tracked.document_ids)
+        self._failures.append({
+            "task_uid": tracked.task_uid,
+            "index_uid": tracked.index_uid,
+            "status": task.get("status"),
+            "error": message or task.get("status"),
+            "ranges": ranges,
+            "retryable": tracked.retryable,
+            "document_ids": tracked.document_ids,
+            "enqueued_at": int(tracked.enqueued_at),
+            "finished_at": int(time.time()),
+        })
+        self._stats["failed"] += 1
+        logger.error(
+            f"Meilisearch 任务 {tracked.task_uid} {task.get('status')}: {message}，"
+            f"涉及 {len(tracked.document_ids)} 条文档: {ranges}"
+        )
+
+    # ----------------------- 背压 -----------------------
+    async def wait_for_capacity(self) -> None:
+        """
+        背压期间等待积压降到低水位
+
+        由历史回溯在每次请求 Telegram 之前调用；跟踪器未运行时直接返回，避免无人轮询时永久等待。
+        """
+        if not self._throttled or not self.is_running():
+            return
+        self._stats["throttled_waits"] += 1
+        while self._throttled and self.is_running():
+            await asyncio.sleep(self.poll_interval)
+
+    # ----------------------- 失败与重试 -----------------------
+    def get_failures(self) -> List[Dict[str, Any]]:
+        """获取失败的任务记录（不含文档ID列表），按失败时间排序"""
+        with self._lock:
+            return [{k: v for k, v in failure.items() if k != "document_ids"} for failure in self._failures]
+
+    async def retry_failures(self, archive: Optional[MessageArchive] = None) -> int:
+        """
+        从本地消息归档读取失败任务涉及的文档并重新写入
+
+        成功重新提交的失败记录被移除，新任务同样会被跟踪；删除任务的失败记录保留，不会重新写入文档。
+
+        Args:
+            archive: 消息归档，默认使用全局归档
+
+        Returns:
+            int: 重新提交的文档数
+
+        Raises:
+            RuntimeError: 未启用消息归档
+        """
+        archive = archive or get_message_archive()
+        if archive is None:
+            raise RuntimeError("未启用本地消息归档，无法重新提交失败的文档")
+
+        with self._lock:
+            failures = [failure for failure in self._failures if failure["retryable"]]
+        retried = 0
+        for failure in failures:
+            docs = await asyncio.to_thread(archive.read_documents, failure["document_ids"])
+            if docs:
+                await self.meili_service.index_messages_bulk_async(docs)
+                retried += len(docs)
+            with self._lock:
+                try:
+                    self._failures.remove(failure)
+                except ValueError:
+                    pass
+            logger.info(f"已重新提交失败任务 {failure['task_uid']} 的 {len(docs)} 条文档")
+        self._stats["retried_documents"] += retried
+        return retried
+
+    # ----------------------- 统计 -----------------------
+    def get_stats(self) -> Dict[str, Any]:
+        """获取任务跟踪统计信息"""
+        return {
+            **self._stats,
+            "backlog": len(self._pending),
+            "throttling": self._throttled,
+            "recorded_failures": len(self._failures),
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+            "poll_interval": self.poll_interval,
+        }
+
+
+# 全局任务跟踪器（由 UserBot 启动时按配置设置）
+_index_task_tracker: Optional[IndexTaskTracker] = None
+
+
+def get_index_task_tracker() -> Optional[IndexTaskTracker]:
+    """获取当前的索引任务跟踪器；未启用时返回 None"""
+    return _index_task_tracker
+
+
+def set_index_task_tracker(tracker: Optional[IndexTaskTracker]) -> None:
+    """设置全局索引任务跟踪器"""
+    global _index_task_tracker
+    _index_task_tracker = tracker
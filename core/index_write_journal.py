@@ -0,0 +1,142 @@
+"""
+索引写入日志模块
+
+此模块在重建索引期间记录对源索引的写入，供影子索引追平，包括：
+1. 开始记录后，MeiliSearchService 的写入方法（索引、删除、按条件删除）把写入按顺序追加到日志
+2. 重建任务分轮取出日志，在影子索引上按相同顺序重放
+3. 交换索引前短暂暂停异步写入：写入方法等待恢复后再发送，
+   保证最后一轮重放与交换之间没有遗漏的写入
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 日志操作类型
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+OP_DELETE_FILTER = "delete_filter"
+
+JournalOp = Tuple[str, Any]
+
+
+class IndexWriteJournal:
+    """
+    索引写入日志
+
+    同一时间只记录一个索引；未开始记录时所有 record_* 调用直接返回。
+    记录方法是线程安全的（同步写入方法可能在其它线程中调用）。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._index_uid: Optional[str] = None
+        self._ops: List[JournalOp] = []
+        self._resume: Optional[asyncio.Event] = None
+        self._stats: Dict[str, int] = {"recorded": 0, "paused_writes": 0}
+
+    @property
+    def index_uid(self) -> Optional[str]:
+        """正在记录的索引，未记录时为 None"""
+        return self._index_uid
+
+    def start(self, index_uid: str) -> None:
+        """
+        开始记录某个索引的写入
+
+        Raises:
+            RuntimeError: 已在记录其它索引
+        """
+        with self._lock:
+            if self._index_uid is not None:
+                raise RuntimeError(f"索引写入日志已在记录 {self._index_uid}")
+            self._index_uid = index_uid
+            self._ops = []
+        logger.info(f"开始记录索引 {index_uid} 的写入")
+
+    def stop(self) -> List[JournalOp]:
+        """停止记录并恢复写入，返回尚未取出的操作"""
+        with self._lock:
+            ops, self._ops = self._ops, []
+            index_uid, self._index_uid = self._index_uid, None
+        self.resume_writes()
+        if index_uid is not None:
+            logger.info(f"停止记录索引 {index_uid} 的写入")
+        return ops
+
+    def drain(self) -> List[JournalOp]:
+        """取出已记录的全部操作（按写入顺序）"""
+        with self._lock:
+            ops, self._ops = self._ops, []
+        return ops
+
+    def pending_count(self) -> int:
+        """尚未取出的操作数"""
+        return len(self._ops)
+
+    # ----------------------- 记录 -----------------------
+    def _record(self, index_uid: str, op: JournalOp) -> None:
+        if self._index_uid is None or index_uid != self._index_uid:
+            return
+        with self._lock:
+            if index_uid == self._index_uid:
+                self._ops.append(op)
+                self._stats["recorded"] += 1
+
+    def record_upsert(self, index_uid: str, documents: List[Dict[str, Any]]) -> None:
+        """记录写入的文档（已序列化的字典）"""
+        self._record(index_uid, (OP_UPSERT, documents))
+
+    def record_delete(self, index_uid: str, document_ids: List[str]) -> None:
+        """记录按文档ID删除"""
+        self._record(index_uid, (OP_DELETE, list(document_ids)))
+
+    def record_delete_filter(self, index_uid: str, filter_expr: str) -> None:
+        """记录按过滤条件删除"""
+        self._record(index_uid, (OP_DELETE_FILTER, filter_expr))
+
+    # ----------------------- 暂停写入 -----------------------
+    def pause_writes(self) -> None:
+        """暂停正在记录的索引的异步写入，直到 resume_writes() 或 stop()"""
+        if self._resume is None:
+            self._resume = asyncio.Event()
+            logger.info(f"已暂停索引 {self._index_uid} 的写入")
+
+    def resume_writes(self) -> None:
+        """恢复写入"""
+        if self._resume is not None:
+            self._resume.set()
+            self._resume = None
+            logger.info("已恢复索引写入")
+
+    async def wait_writable(self, index_uid: str) -> None:
+        """写入暂停时等待恢复；由异步写入方法在发送请求前调用"""
+        resume = self._resume
+        if resume is None or index_uid != self._index_uid:
+            return
+        self._stats["paused_writes"] += 1
+        await resume.wait()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入日志统计信息"""
+        return {
+            **self._stats,
+            "index_uid": self._index_uid,
+            "pending": len(self._ops),
+            "paused": self._resume is not None,
+        }
+
+
+# 全局写入日志实例（API、Search Bot 和 User Bot 在同一进程内共享）
+_index_write_journal: Optional[IndexWriteJournal] = None
+
+
+def get_index_write_journal() -> IndexWriteJournal:
+    """获取全局索引写入日志实例"""
+    global _index_write_journal
+    if _index_write_journal is None:
+        _index_write_journal = IndexWriteJournal()
+    return _index_write_journal
@@ -0,0 +1,323 @@
+"""
+批量写入缓冲模块
+
+此模块提供所有聊天共享的异步写入缓冲区，包括：
+1. 汇总来自不同聊天的 MeiliMessageDoc
+2. 按数量阈值或时间阈值通过 index_messages_bulk_async 批量写入
+3. 在写入成功后执行回调（例如持久化同步光标）；写入失败的文档和回调放回队列，退避后重试
+4. 关闭时刷新剩余文档（失败时重试，仍失败则报告未写入的文档），并提供排队、写入、失败计数
+5. 每批写入成功后推送给实时搜索订阅，并执行已保存搜索
+6. 写入 Meilisearch 之前先写入本地消息归档（启用时）
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.live_search import get_live_search_hub
+from core.meilisearch_service import MeiliSearchService
+from core.message_archive import archive_messages
+from core.saved_searches import get_percolator
+from core.models import MeiliMessageDoc
+
+logger = logging.getLogger(__name__)
+
+# 默认阈值
+DEFAULT_MAX_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 2.0
+MAX_RETRY_DELAY = 60.0     # 写入失败后重试的最长退避时间（秒）
+FINAL_FLUSH_ATTEMPTS = 3   # 关闭时最终刷新的最多尝试次数
+LOST_IDS_LOG_LIMIT = 20    # 关闭时未写入文档在日志中列出的最多 id 数
+
+FlushCallback = Callable[[], Awaitable[None]]
+
+
+class IngestBuffer:
+    """
+    Meilisearch 写入缓冲区
+
+    add() 只把文档放入内存队列；后台任务在队列达到 max_batch_size
+    或距离上次刷新超过 flush_interval 秒时，将全部待写文档合并为一次
+    index_messages_bulk_async 调用。同一 id 的文档在批内去重，后写入者覆盖先写入者。
+    """
+
+    def __init__(
+        self,
+        meili_service: MeiliSearchService,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        """
+        初始化写入缓冲区
+
+        Args:
+            meili_service: 用于批量写入的 MeiliSearchService 实例
+            max_batch_size: 单批最大文档数，达到后立即刷新
+            flush_interval: 最长刷新间隔（秒）
+        """
+        self.meili_service = meili_service
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = max(0.1, flush_interval)
+
+        self._pending: Dict[str, MeiliMessageDoc] = {}
+        self._callbacks: List[FlushCallback] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+        # 上次写入失败后的退避时间，写入成功后清零
+        self._retry_delay = 0.0
+
+        self._stats: Dict[str, int] = {
+            "queued": 0,
+            "flushed": 0,
+            "failed": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "requeued": 0,
+        }
+
+    # ----------------------- 生命周期 -----------------------
+    def _ensure_started(self) -> None:
+        """在首次使用时创建后台刷新任务（需要运行中的事件循环）"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop(), name="ingest_buffer_flush")
+            logger.info(
+                f"写入缓冲区已启动: max_batch_size={self.max_batch_size}, flush_interval={self.flush_interval}s"
+            )
+
+    async def _flush_loop(self) -> None:
+        """后台刷新循环：按时间阈值或被唤醒时刷新；上次写入失败时先退避再重试"""
+        while not self._closed:
+            if self._retry_delay:
+                await asyncio.sleep(self._retry_delay)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"写入缓冲区刷新循环出错: {e}", exc_info=True)
+
+    async def close(self) -> None:
+        """
+        停止后台任务并刷新剩余文档
+
+        最终刷新失败时按退避时间重试，最多 FINAL_FLUSH_ATTEMPTS 次。
+
+        Raises:
+            RuntimeError: 重试后仍有文档未写入（已记录数量和 id），由关闭流程报告
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task and not self._flush_task.done():
+            self._wakeup.set()
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        await self._final_flush()
+        logger.info(f"写入缓冲区已关闭: {self.get_stats()}")
+
+    async def _final_flush(self) -> None:
+        """
+        关闭后刷新剩余文档；没有后台任务重试，因此在这里重试，仍失败则报告丢失
+
+        Raises:
+            RuntimeError: 重试后仍有文档未写入
+        """
+        for attempt in range(FINAL_FLUSH_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(self._retry_delay)
+            await self.flush()
+            if not self._pending:
+                return
+
+        lost_ids = list(self._pending)
+        dropped_callbacks = len(self._callbacks)
+        self._pending = {}
+        self._callbacks = []
+        shown = ", ".join(lost_ids[:LOST_IDS_LOG_LIMIT])
+        more = f" 等（另有 {len(lost_ids) - LOST_IDS_LOG_LIMIT} 条）" if len(lost_ids) > LOST_IDS_LOG_LIMIT else ""
+        logger.error(
+            f"写入缓冲区关闭时 {len(lost_ids)} 条文档在 {FINAL_FLUSH_ATTEMPTS} 次尝试后仍未写入 Meilisearch，"
+            f"{dropped_callbacks} 个写入完成回调未执行: {shown}{more}"
+        )
+        raise RuntimeError(f"写入缓冲区关闭时 {len(lost_ids)} 条文档未写入 Meilisearch")
+
+    # ----------------------- 写入 -----------------------
+    async def add(self, doc: MeiliMessageDoc) -> None:
+        """
+        将单条文档加入缓冲区
+
+        Args:
+            doc: 待写入的消息文档
+        """
+        await self.add_many([doc])
+
+    async def add_many(self, docs: List[MeiliMessageDoc]) -> None:
+        """
+        将多条文档加入缓冲区，达到批量阈值时唤醒刷新
+
+        Args:
+            docs: 待写入的消息文档列表
+        """
+        if not docs:
+            return
+        if self._closed:
+            # 关闭后仍有写入（例如关闭过程中到达的消息），直接同步写入避免丢失
+            logger.warning(f"写入缓冲区已关闭，直接写入 {len(docs)} 条文档")
+            self._pending.update((doc.id, doc) for doc in docs)
+            self._stats["queued"] += len(docs)
+            await self._final_flush()
+            return
+
+        self._ensure_started()
+        for doc in docs:
+            self._pending[doc.id] = doc
+        self._stats["queued"] += len(docs)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def call_after_flush(self, callback: FlushCallback) -> None:
+        """
+        注册一个回调，在当前已入队文档全部成功写入后执行
+
+        用于在文档真正落入 Meilisearch 之后再持久化同步光标。
+        若对应批次写入失败，回调与未写入的文档一起放回队列，等重试成功后再执行。
+
+        Args:
+            callback: 无参数的异步回调
+        """
+        self._callbacks.append(callback)
+        if not self._closed:
+            self._ensure_started()
+
+    async def flush(self) -> int:
+        """
+        立即将缓冲区内所有文档写入 Meilisearch
+
+        Returns:
+            int: 本次成功写入的文档数
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            if not self._pending and not self._callbacks:
+                return 0
+
+            docs = list(self._pending.values())
+            callbacks = self._callbacks
+            self._pending = {}
+            self._callbacks = []
+
+            flushed = 0
+            if docs:
+                await archive_messages(docs)
+                for start in range(0, len(docs), self.max_batch_size):
+                    batch = docs[start:start + self.max_batch_size]
+                    try:
+                        await self.meili_service.index_messages_bulk_async(batch)
+                    except Exception as e:
+                        failed = docs[flushed:]
+                        self._requeue(failed, callbacks)
+                        self._stats["failed"] += len(failed)
+                        self._stats["failed_batches"] += 1
+                        self._retry_delay = min(max(self._retry_delay * 2, self.flush_interval), MAX_RETRY_DELAY)
+                        logger.error(
+                            f"批量写入 Meilisearch 失败，{len(failed)} 条文档放回队列，{self._retry_delay:.0f} 秒后重试: {e}"
+                        )
+                        # 回调随文档放回队列，重试成功前不执行，光标不会越过未写入的文档
+                        return flushed
+                    flushed += len(batch)
+                    self._stats["flushed"] += len(batch)
+                    self._stats["batches"] += 1
+                    self._notify_written(batch)
+
+            self._retry_delay = 0.0
+
+            for callback in callbacks:
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.error(f"写入完成回调执行失败: {e}", exc_info=True)
+
+            if flushed:
+                logger.debug(f"写入缓冲区已刷新 {flushed} 条文档")
+            return flushed
+
+    def _notify_written(self, batch: List[MeiliMessageDoc]) -> None:
+        """把已写入的批次推送给实时搜索订阅并执行已保存搜索；这些步骤出错不影响写入结果"""
+        try:
+            get_live_search_hub().publish(batch)
+        except Exception as e:
+            logger.error(f"推送实时搜索结果失败: {e}", exc_info=True)
+        try:
+            percolator = get_percolator()
+            if percolator is not None:
+                percolator.percolate(batch)
+        except Exception as e:
+            logger.error(f"执行已保存搜索失败: {e}", exc_info=True)
+
+    def _requeue(self, docs: List[MeiliMessageDoc], callbacks: List[FlushCallback]) -> None:
+        """把写入失败的文档和回调放回队列，排在写入期间新加入的内容之前"""
+        requeued = {doc.id: doc for doc in docs}
+        # 写入期间又加入的同 id 文档更新，保留新版本
+        requeued.update(self._pending)
+        self._pending = requeued
+        self._callbacks = callbacks + self._callbacks
+        self._stats["requeued"] += len(docs)
+
+    # ----------------------- 统计 -----------------------
+    def pending_count(self) -> int:
+        """返回尚未写入的文档数"""
+        return len(self._pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取写入缓冲区统计信息
+
+        Returns:
+            dict: 包含 queued、flushed、failed、batches 等计数
+        """
+        return {
+            **self._stats,
+            "pending": len(self._pending),
+            "max_batch_size": self.max_batch_size,
+            "flush_interval": self.flush_interval,
+            "closed": self._closed,
+        }
+
+
+# 全局写入缓冲区实例
+_ingest_buffer: Optional[IngestBuffer] = None
+
+
+def get_ingest_buffer(
+    meili_service: Optional[MeiliSearchService] = None,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+) -> IngestBuffer:
+    """
+    获取全局写入缓冲区实例
+
+    首次调用时必须提供 meili_service；之后的调用返回同一实例，其余参数被忽略。
+    """
+    global _ingest_buffer
+    if _ingest_buffer is None or _ingest_buffer._closed:
+        if meili_service is None:
+            raise RuntimeError("首次获取写入缓冲区时必须提供 MeiliSearchService")
+        _ingest_buffer = IngestBuffer(meili_service, max_batch_size, flush_interval)
+    return _ingest_buffer
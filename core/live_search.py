@@ -0,0 +1,191 @@
+"""
+实时搜索模块
+
+此模块在进程内把新写入索引的消息推送给订阅了查询的客户端，包括：
+1. 将查询编译为进程内匹配器：过滤条件语法树求值 + 关键词逐词匹配
+2. 每个订阅使用有界队列接收匹配的文档，客户端消费过慢时丢弃新文档并计数，不阻塞写入路径
+3. 写入路径（新消息事件、历史同步的写入缓冲区）写入成功后调用 publish()，
+   订阅方无需反复轮询 /search
+"""
+
+import asyncio
+import logging
+import secrets
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.models import MeiliMessageDoc
+from core.query_language import And, build_filter_ast, keyword_terms, match_filter, parse_query
+
+logger = logging.getLogger(__name__)
+
+# 默认的最大订阅数和每个订阅的队列长度
+DEFAULT_MAX_SUBSCRIPTIONS = 100
+DEFAULT_QUEUE_SIZE = 100
+# 匹配关键词的文档字段，与消息索引的可搜索属性一致
+MATCH_FIELDS = ("text", "sender_name", "chat_title")
+
+
+class LiveSearchLimitError(Exception):
+    """订阅数已达上限"""
+
+
+class LiveQuery:
+    """
+    编译后的实时查询
+
+    查询支持与 Search Bot 相同的高级语法（type:、chat:、from:、date: 等），
+    另可通过 chat_types、chat_ids 追加条件，所有条件同时满足。
+    关键词在进程内按子串匹配（不区分大小写，每个词或双引号短语都必须出现在
+    text、sender_name、chat_title 之一中），是 Meilisearch 匹配规则的近似：
+    不做拼写容错，但也不依赖分词，中文等不以空格分词的文本同样适用。
+    """
+
+    __slots__ = ("query", "terms", "filter_node")
+
+    def __init__(self, query: str, chat_types: Optional[List[str]] = None,
+                 chat_ids: Optional[List[int]] = None) -> None:
+        self.query = query
+        text, filters = parse_query(query)
+        self.terms = keyword_terms(text)
+
+        nodes = [
+            node for node in (
+                build_filter_ast(filters),
+                build_filter_ast({"chat_type": chat_types or [], "chat_id": chat_ids or []}),
+            )
+            if node is not None
+        ]
+        self.filter_node = nodes[0] if len(nodes) == 1 else (And(tuple(nodes)) if nodes else None)
+
+    def matches(self, doc: MeiliMessageDoc) -> bool:
+        """判断文档是否匹配查询"""
+        if not match_filter(self.filter_node, doc):
+            return False
+        if not self.terms:
+            return True
+        haystack = "\n".join(getattr(doc, field, None) or "" for field in MATCH_FIELDS).casefold()
+        return all(term in haystack for term in self.terms)
+
+
+class LiveSubscription:
+    """单个客户端的实时搜索订阅"""
+
+    __slots__ = ("id", "live_query", "queue", "dropped")
+
+    def __init__(self, subscription_id: str, live_query: LiveQuery, queue_size: int) -> None:
+        self.id = subscription_id
+        self.live_query = live_query
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+
+class LiveSearchHub:
+    """
+    实时搜索订阅中心
+
+    subscribe() / unsubscribe() 由 SSE 端点调用，publish() 由写入路径调用。
+    所有方法都在同一个事件循环中执行（主程序在一个事件循环中运行 UserBot、Search Bot 和 API），
+    publish() 只做内存匹配和非阻塞入队，不会拖慢写入。
+    """
+
+    def __init__(self, max_subscriptions: int = DEFAULT_MAX_SUBSCRIPTIONS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        """
+        初始化订阅中心
+
+        Args:
+            max_subscriptions: 同时存在的最大订阅数
+            queue_size: 每个订阅最多缓存的待推送文档数
+        """
+        self.max_subscriptions = max(1, max_subscriptions)
+        self.queue_size = max(1, queue_size)
+        self._subscriptions: Dict[str, LiveSubscription] = {}
+        self._stats: Dict[str, int] = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def subscribe(self, query: str, chat_types: Optional[List[str]] = None,
+                  chat_ids: Optional[List[int]] = None) -> LiveSubscription:
+        """
+        订阅查询
+
+        Args:
+            query: 搜索关键词，支持高级搜索语法
+            chat_types: 聊天类型列表
+            chat_ids: 聊天 ID 列表
+
+        Returns:
+            LiveSubscription: 新订阅，匹配的文档会放入其 queue
+
+        Raises:
+            LiveSearchLimitError: 订阅数已达上限
+        """
+        if len(self._subscriptions) >= self.max_subscriptions:
+            raise LiveSearchLimitError(f"实时搜索订阅数已达上限 ({self.max_subscriptions})")
+        subscription = LiveSubscription(
+            secrets.token_urlsafe(8), LiveQuery(query, chat_types, chat_ids), self.queue_size
+        )
+        self._subscriptions[subscription.id] = subscription
+        logger.info(f"新增实时搜索订阅 {subscription.id}: '{query}'，当前订阅数 {len(self._subscriptions)}")
+        return subscription
+
+    def unsubscribe(self, subscription: LiveSubscription) -> None:
+        """取消订阅（重复取消无影响）"""
+        if self._subscriptions.pop(subscription.id, None) is not None:
+            logger.info(
+                f"取消实时搜索订阅 {subscription.id}，丢弃 {subscription.dropped} 条，"
+                f"当前订阅数 {len(self._subscriptions)}"
+            )
+
+    def publish(self, docs: Iterable[MeiliMessageDoc]) -> int:
+        """
+        将新写入的文档推送给匹配的订阅
+
+        订阅的队列已满时丢弃该文档并计数，不等待客户端消费。
+
+        Args:
+            docs: 已成功写入索引的消息文档
+
+        Returns:
+            int: 放入订阅队列的文档数（同一文档匹配多个订阅时分别计数）
+        """
+        if not self._subscriptions:
+            return 0
+        delivered = 0
+        for doc in docs:
+            self._stats["published"] += 1
+            for subscription in list(self._subscriptions.values()):
+                if not subscription.live_query.matches(doc):
+                    continue
+                try:
+                    subscription.queue.put_nowait(doc)
+                    delivered += 1
+                except asyncio.QueueFull:
+                    subscription.dropped += 1
+                    self._stats["dropped"] += 1
+        self._stats["delivered"] += delivered
+        return delivered
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取订阅中心统计信息
+
+        Returns:
+            dict: 包含 subscriptions、published、delivered、dropped 等计数
+        """
+        return {
+            **self._stats,
+            "subscriptions": len(self._subscriptions),
+            "max_subscriptions": self.max_subscriptions,
+            "queue_size": self.queue_size,
+        }
+
+
+# 全局订阅中心实例
+_live_search_hub: Optional[LiveSearchHub] = None
+
+
+def get_live_search_hub() -> LiveSearchHub:
+    """获取全局实时搜索订阅中心实例"""
+    global _live_search_hub
+    if _live_search_hub is None:
+        _live_search_hub = LiveSearchHub()
+    return _live_search_hub
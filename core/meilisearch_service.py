@@ -8,15 +8,219 @@ Meilisearch 服务模块
 4. 搜索消息
 5. 删除消息（可选）
 6. 会话索引与搜索功能
+7. 基于 httpx 连接池的异步接口（*_async 方法），避免阻塞事件循环
+8. 写入或删除消息后递增相关聊天的索引代数，供搜索结果缓存校验新鲜度
+9. 基于 (date, chat_id, message_id) 游标的键集分页（search_after / search_after_async），
+   线上索引的排序规则无法保证顺序时拒绝键集分页
+10. 字段投影（full / snippet / ids_only）：每个调用方只取需要的字段，
+    snippet 由 Meilisearch 裁剪并高亮 text，只返回裁剪后的窗口
+11. 异步搜索请求合并（single-flight）：相同的并发搜索只向 Meilisearch 发送一次
+12. 多索引批量搜索（multi_search / multi_search_async）：消息与会话查询在一次 multi-search 请求中完成
+13. 索引管理（创建、交换、删除索引，按主键顺序读取文档，等待任务完成），供零停机重建索引使用
+14. 启动时只提交与当前索引设置不同的设置项；进程内通过 get_shared_meilisearch_service 共享同一个服务实例
+15. 消息写入任务登记到索引任务跟踪器（启用时），由其轮询任务结果并对历史回溯施加背压
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Optional, Dict, Any, Union
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Iterable, Tuple, Union
 
+import httpx
 import meilisearch
+from meilisearch.errors import MeilisearchApiError
 from pydantic import BaseModel
 
+from core.index_generations import get_index_generations
+from core.index_task_tracker import get_index_task_tracker
+from core.index_write_journal import get_index_write_journal
 from core.models import MeiliMessageDoc
+from core.query_language import CHAT_TYPES, build_chat_id_filter, build_meilisearch_filter
+from core.search_cursor import KeysetPaginationUnavailableError, SearchCursor, keyset_sort
+from core.search_result_cache import normalize_query
+from core.single_flight import get_search_flight
+
+
+# 字段投影：full 返回全部显示属性和高亮后的完整 text；
+# snippet 返回元数据和裁剪后的 text 窗口；ids_only 只返回定位消息所需的字段，不做高亮
+PROJECTION_FULL = "full"
+PROJECTION_SNIPPET = "snippet"
+PROJECTION_IDS_ONLY = "ids_only"
+SEARCH_PROJECTIONS = (PROJECTION_FULL, PROJECTION_SNIPPET, PROJECTION_IDS_ONLY)
+
+# 摘要模式下返回的属性（不含完整 text，裁剪后的 text 位于 _formatted 中）
+SNIPPET_ATTRIBUTES_TO_RETRIEVE = [
+    "id", "message_id", "chat_id", "chat_title", "chat_type",
+    "sender_id", "sender_name", "date", "message_link"
+]
+# ids_only 返回的属性，包含键集分页游标所需的排序键
+IDS_ONLY_ATTRIBUTES_TO_RETRIEVE = ["id", "chat_id", "message_id", "date"]
+# 摘要被裁剪时的省略标记
+SNIPPET_CROP_MARKER = "…"
+
+# 键集分页要求结果匹配全部关键词；需要与键集分页结果一致的页码分页使用同一策略
+KEYSET_MATCHING_STRATEGY = "all"
+# 键集分页前读取的消息索引排序规则的缓存时间（秒）；交换索引后立即失效
+RANKING_RULES_CACHE_TTL_SECONDS = 60.0
+
+# 批量搜索中单个查询的目标：消息索引或会话索引
+MULTI_SEARCH_MESSAGES = "messages"
+MULTI_SEARCH_SESSIONS = "sessions"
+
+# 等待 Meilisearch 任务完成的默认超时与轮询间隔（秒）
+TASK_WAIT_TIMEOUT_SECONDS = 3600.0
+TASK_POLL_INTERVAL_SECONDS = 0.5
+# 按主键顺序读取文档时单页的最大文档数（不超过索引默认的 maxTotalHits）
+DOCUMENT_SCAN_PAGE_SIZE = 1000
+
+# 结果分布统计的分面属性（均为可过滤属性），数值型分面的值转换为整数
+FACET_ATTRIBUTES = ("chat_id", "chat_type", "sender_id")
+NUMERIC_FACET_ATTRIBUTES = ("chat_id", "sender_id")
+# 每个分面最多返回的取值数（按命中数降序）
+FACET_MAX_VALUES = 100
+# 时间直方图的桶宽度（UTC 自然日、自然周（周一开始）、自然月），以及单次请求的最大桶数
+HISTOGRAM_INTERVALS = ("day", "week", "month")
+MAX_HISTOGRAM_BUCKETS = 120
+# totalHits 最多只计到 pagination.maxTotalHits（默认 1000），分面计数则覆盖全部命中；
+# 每条消息恰好有一个 chat_type 且取值只有三个，其分面计数之和即精确命中数
+COUNT_FACET_ATTRIBUTE = "chat_type"
+
+
+# 消息索引的设置（Meilisearch settings 对象），ensure_index_setup 与索引重建共用
+MESSAGE_INDEX_SETTINGS: Dict[str, Any] = {
+    # 可搜索属性 - text 优先级最高
+    "searchableAttributes": ["text", "sender_name", "chat_title"],
+    "filterableAttributes": ["chat_id", "chat_type", "sender_id", "date", "message_id"],
+    # 可排序属性 - chat_id 和 message_id 用于键集分页时打破同一时间戳的并列
+    "sortableAttributes": ["date", "chat_id", "message_id"],
+    # 排序规则 - 使用默认规则，适合中文搜索；键集分页是否可用取决于线上索引的实际规则（见 ranking_rules_support_keyset）
+    "rankingRules": ["words", "typo", "proximity", "attribute", "sort", "exactness"],
+    # 分面设置 - 结果分布统计按命中数返回最多的取值，而不是按字母顺序截断
+    "faceting": {"maxValuesPerFacet": FACET_MAX_VALUES, "sortFacetValuesBy": {"*": "count"}},
+    "displayedAttributes": [
+        "id", "message_id", "chat_id", "chat_title", "chat_type",
+        "sender_id", "sender_name", "text", "date", "message_link"
+    ],
+}
+
+# 会话索引的设置
+SESSION_INDEX_SETTINGS: Dict[str, Any] = {
+    # 可搜索属性 - name 优先级最高
+    "searchableAttributes": ["name", "id"],
+    "filterableAttributes": ["type", "unread_count"],
+    "sortableAttributes": ["date", "unread_count", "name"],
+    "rankingRules": ["words", "typo", "proximity", "attribute", "sort", "exactness"],
+    "displayedAttributes": ["id", "name", "type", "unread_count", "date", "avatar_key"],
+}
+
+# 顺序无关的设置项（Meilisearch 返回时可能重新排序）
+UNORDERED_SETTINGS = ("filterableAttributes", "sortableAttributes")
+# 改变已有索引的相关性排序的设置项：启动时不对已有索引提交，只在新建索引或重建（影子索引）时应用
+REBUILD_ONLY_SETTINGS = ("rankingRules",)
+
+
+def ranking_rules_support_keyset(ranking_rules: Optional[List[str]]) -> bool:
+    """
+    判断排序规则能否保证键集分页的顺序
+
+    键集分页使用 matchingStrategy=all，所有结果都落在 words 的同一个桶中；只有 sort 之前
+    没有 words 以外的规则时，结果才严格按 (date, chat_id, message_id) 排列。否则同一页中
+    排在后面相关性桶里的较新结果会被游标过滤条件永久跳过。
+    """
+    rules = list(ranking_rules or [])
+    if "sort" not in rules:
+        return False
+    return rules[:rules.index("sort")] in ([], ["words"])
+
+
+def _attribute_names(values: Any) -> set:
+    """把属性列表转换为名称集合；兼容新版 Meilisearch 以 {"attributePatterns": [...]} 返回的可过滤属性"""
+    names = set()
+    for value in values or []:
+        if isinstance(value, dict):
+            names.update(value.get("attributePatterns", []))
+        else:
+            names.add(value)
+    return names
+
+
+def diff_index_settings(current: Dict[str, Any], desired: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    比较索引当前设置与期望设置
+
+    可过滤、可排序属性按集合比较；分面等对象类设置只比较期望中给出的键；
+    其余设置（可搜索属性、排序规则、显示属性）顺序有意义，按列表比较。
+
+    Args:
+        current: index.get_settings() 的返回值（索引不存在时为空字典）
+        desired: 期望的设置
+
+    Returns:
+        dict: 需要提交的设置项（取期望值），无差异时为空字典
+    """
+    changes: Dict[str, Any] = {}
+    for key, value in desired.items():
+        existing = current.get(key)
+        if key in UNORDERED_SETTINGS:
+            same = existing is not None and _attribute_names(existing) == set(value)
+        elif isinstance(value, dict):
+            same = isinstance(existing, dict) and all(existing.get(k) == v for k, v in value.items())
+        else:
+            same = existing == value
+        if not same:
+            changes[key] = value
+    return changes
+
+
+def _histogram_buckets(start: int, end: int, interval: str) -> List[Tuple[int, int]]:
+    """
+    将 [start, end] 按 UTC 日历切分为直方图桶
+
+    Returns:
+        List[Tuple[int, int]]: (桶起始, 桶结束) 的 Unix 时间戳列表，两端都包含；
+            首尾两个桶被裁剪到 [start, end] 内
+    """
+    if interval not in HISTOGRAM_INTERVALS:
+        raise ValueError(f"未知的直方图间隔: {interval}，可选值: {list(HISTOGRAM_INTERVALS)}")
+
+    current = datetime.fromtimestamp(start, tz=timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "week":
+        current -= timedelta(days=current.weekday())
+    elif interval == "month":
+        current = current.replace(day=1)
+
+    buckets = []
+    while int(current.timestamp()) <= end:
+        if interval == "day":
+            following = current + timedelta(days=1)
+        elif interval == "week":
+            following = current + timedelta(weeks=1)
+        elif current.month == 12:
+            following = current.replace(year=current.year + 1, month=1)
+        else:
+            following = current.replace(month=current.month + 1)
+        buckets.append((max(start, int(current.timestamp())), min(end, int(following.timestamp()) - 1)))
+        current = following
+    return buckets
+
+
+def _chat_id_from_document_id(document_id: str) -> Optional[int]:
+    """从文档ID（"{chat_id}_{message_id}"）中解析聊天ID，无法解析时返回 None"""
+    try:
+        return int(str(document_id).rsplit("_", 1)[0])
+    except ValueError:
+        return None
+
+
+def _chat_ids_from_document_ids(document_ids: List[str]) -> Optional[List[int]]:
+    """解析一组文档ID涉及的聊天；任一无法解析时返回 None（视为影响所有聊天）"""
+    chat_ids = [_chat_id_from_document_id(doc_id) for doc_id in document_ids]
+    if any(chat_id is None for chat_id in chat_ids):
+        return None
+    return chat_ids
 
 
 class MeiliSearchService:
@@ -25,9 +229,16 @@ class MeiliSearchService:
     
     负责与 Meilisearch 搜索引擎交互，提供消息索引、搜索和管理功能
     支持会话索引与搜索功能
+
+    同步方法（search、index_message 等）供脚本和启动阶段使用；
+    在事件循环中应调用对应的 *_async 方法，它们通过共享的 keep-alive
+    连接池直接请求 Meilisearch HTTP API，不会阻塞事件循环。
+    两套方法共用同一份参数构建与结果标准化逻辑。
     """
     
-    def __init__(self, host: str, api_key: Optional[str] = None, index_name: str = "telegram_messages") -> None:
+    def __init__(self, host: str, api_key: Optional[str] = None, index_name: str = "telegram_messages",
+                 http_pool_size: int = 20, http_keepalive: int = 10,
+                 http_timeout: float = 10.0, http_connect_timeout: float = 5.0) -> None:
         """
         初始化 Meilisearch 服务
         
@@ -35,15 +246,31 @@ class MeiliSearchService:
             host: Meilisearch 服务的主机地址，如 http://localhost:7700
             api_key: Meilisearch 的 API Key，用于认证，可选
             index_name: 索引名称，默认为 telegram_messages
+            http_pool_size: 异步连接池的最大连接数
+            http_keepalive: 异步连接池保持的最大空闲 keep-alive 连接数
+            http_timeout: 单次请求的超时时间（秒）
+            http_connect_timeout: 建立连接的超时时间（秒）
         """
         self.logger = logging.getLogger(__name__)
         self.host = host
         self.api_key = api_key
         self.index_name = index_name
         self.sessions_index_name = "telegram_sessions"  # 会话索引名称
+
+        # 异步连接池配置，连接池在首次调用 *_async 方法时创建
+        self.http_pool_size = http_pool_size
+        self.http_keepalive = http_keepalive
+        self.http_timeout = http_timeout
+        self.http_connect_timeout = http_connect_timeout
+        self._async_client: Optional[httpx.AsyncClient] = None
+        # 消息索引当前的排序规则及读取时间（time.monotonic），用于判断键集分页是否可用
+        self._ranking_rules: Optional[List[str]] = None
+        self._ranking_rules_loaded_at = 0.0
+        # 合并相同的并发搜索请求（进程内共享，API 与 Bot 各自的服务实例之间也会合并）
+        self._search_flight = get_search_flight()
         
         # 初始化 Meilisearch 客户端
-        self.client = meilisearch.Client(self.host, self.api_key)
+        self.client = meilisearch.Client(self.host, self.api_key, timeout=int(self.http_timeout))
         self.logger.info(f"已连接到 Meilisearch 服务: {self.host}")
         
         # 获取或创建消息索引
@@ -60,223 +287,62 @@ class MeiliSearchService:
     
     def ensure_index_setup(self) -> None:
         """
-        确保索引存在并配置正确
-        
-        检查索引是否存在，不存在则创建。
-        配置索引的可搜索属性、可过滤属性、可排序属性和排序规则。
+        确保消息索引存在并配置正确
+
+        读取一次当前设置，与 MESSAGE_INDEX_SETTINGS 比较，只提交有变化的设置项。
+        索引不存在时以 id 为主键创建。设置已是最新时不产生任何任务，
+        避免每次启动都让 Meilisearch 排队设置任务甚至重新索引全部文档。
+        已有索引的排序规则（REBUILD_ONLY_SETTINGS）不在启动时修改，需通过索引重建应用。
         """
-        # 获取所有索引
-        indexes = self.client.get_indexes()
-        
-        # 兼容不同版本 Meilisearch API 的返回结构
-        # 如果 indexes 是字典（新版 API），则尝试从不同的可能键中获取索引列表
-        # 如果 indexes 有 .results 属性（旧版 API），则使用该属性
-        if hasattr(indexes, 'results'):
-            # 旧版 API 结构
-            index_list = indexes.results
-            index_names = [index.uid for index in index_list]
-        else:
-            # 新版 API 结构 - indexes 是字典
-            self.logger.debug(f"Meilisearch get_indexes 返回的是字典: {indexes}")
-            
-            # 尝试获取索引列表 - 可能存在于不同的键下或直接是列表
-            if isinstance(indexes, list):
-                index_list = indexes
-            elif isinstance(indexes, dict):
-                # 尝试常见的键名
-                if 'results' in indexes:
-                    index_list = indexes['results']
-                elif 'items' in indexes:
-                    index_list = indexes['items']
-                else:
-                    # 如果没有找到预期的键，可能索引列表直接就是字典值
-                    self.logger.warning("无法确定 Meilisearch 索引列表位置，尝试使用整个返回值")
-                    index_list = indexes
-            else:
-                self.logger.warning(f"Meilisearch get_indexes 返回了未知类型: {type(indexes)}")
-                index_list = []
-            
-            # 从索引列表中提取 uid - 处理可能每个索引是对象或字典的情况
-            index_names = []
-            for index_item in index_list:
-                if hasattr(index_item, 'uid'):
-                    index_names.append(index_item.uid)
-                elif isinstance(index_item, dict) and 'uid' in index_item:
-                    index_names.append(index_item['uid'])
-        
-        # 检查是否需要创建索引
-        if self.index_name not in index_names:
-            self.logger.info(f"索引 {self.index_name} 不存在，正在创建...")
-            # 显式指定 id 字段为主键
-            self.client.create_index(self.index_name, {'primaryKey': 'id'})
-            self.logger.info(f"已指定 'id' 为索引的主键")
-        else:
-            # 确保已有索引的主键设置正确
-            try:
-                index_info = self.client.get_index(self.index_name)
-                if not hasattr(index_info, 'primary_key') or index_info.primary_key != 'id':
-                    self.logger.warning(f"索引 {self.index_name} 的主键不是 'id'，尝试更新")
-                    # 注意：有些版本的 Meilisearch 不允许修改已有索引的主键
-                    # 此处可能需要删除并重建索引
-                    pass
-            except Exception as e:
-                self.logger.warning(f"检查索引主键时出错: {str(e)}")
-        
-        # 配置索引设置
-        # 可搜索属性 - text 优先级最高
-        self.index.update_searchable_attributes([
-            "text",
-            "sender_name",
-            "chat_title"
-        ])
-        self.logger.info("已配置可搜索属性: ['text', 'sender_name', 'chat_title']")
-        
-        # 可过滤属性
-        self.index.update_filterable_attributes([
-            "chat_id",
-            "chat_type",
-            "sender_id",
-            "date"
-        ])
-        self.logger.info("已配置可过滤属性: ['chat_id', 'chat_type', 'sender_id', 'date']")
-        
-        # 可排序属性
-        self.index.update_sortable_attributes([
-            "date"
-        ])
-        self.logger.info("已配置可排序属性: ['date']")
-        
-        # 排序规则 - 使用默认规则，适合中文搜索
-        self.index.update_ranking_rules([
-            "words",
-            "typo",
-            "proximity",
-            "attribute",
-            "sort",
-            "exactness"
-        ])
-        self.logger.info("已配置排序规则: ['words', 'typo', 'proximity', 'attribute', 'sort', 'exactness']")
-        
-        # 配置高亮属性
-        self.index.update_displayed_attributes([
-            "id",
-            "message_id",
-            "chat_id",
-            "chat_title",
-            "chat_type",
-            "sender_id",
-            "sender_name",
-            "text",
-            "date",
-            "message_link"
-        ])
-        self.logger.info("已配置显示属性")
-        
-        # 日志记录关于停用词和同义词
-        self.logger.info("注意: stopWords(停用词)和synonyms(同义词)配置不在初始设置中，可通过单独的方法配置")
-    
+        self._sync_index_settings(self.index, MESSAGE_INDEX_SETTINGS, "消息索引", REBUILD_ONLY_SETTINGS)
+        # 停用词和同义词不在初始设置中，通过 update_stop_words / update_synonyms 单独配置
+
     def ensure_sessions_index_setup(self) -> None:
         """
         确保会话索引存在并配置正确
-        
-        配置会话索引的可搜索属性、可过滤属性、可排序属性和排序规则。
+
+        与 ensure_index_setup 相同，只提交与 SESSION_INDEX_SETTINGS 不一致的设置项。
         """
-        # 获取所有索引
-        indexes = self.client.get_indexes()
-        
-        # 兼容不同版本 Meilisearch API 的返回结构
-        if hasattr(indexes, 'results'):
-            # 旧版 API 结构
-            index_list = indexes.results
-            index_names = [index.uid for index in index_list]
-        else:
-            # 新版 API 结构 - indexes 是字典
-            self.logger.debug(f"Meilisearch get_indexes 返回的是字典: {indexes}")
-            
-            # 尝试获取索引列表 - 可能存在于不同的键下或直接是列表
-            if isinstance(indexes, list):
-                index_list = indexes
-            elif isinstance(indexes, dict):
-                # 尝试常见的键名
-                if 'results' in indexes:
-                    index_list = indexes['results']
-                elif 'items' in indexes:
-                    index_list = indexes['items']
-                else:
-                    # 如果没有找到预期的键，可能索引列表直接就是字典值
-                    self.logger.warning("无法确定 Meilisearch 索引列表位置，尝试使用整个返回值")
-                    index_list = indexes
-            else:
-                self.logger.warning(f"Meilisearch get_indexes 返回了未知类型: {type(indexes)}")
-                index_list = []
-            
-            # 从索引列表中提取 uid - 处理可能每个索引是对象或字典的情况
-            index_names = []
-            for index_item in index_list:
-                if hasattr(index_item, 'uid'):
-                    index_names.append(index_item.uid)
-                elif isinstance(index_item, dict) and 'uid' in index_item:
-                    index_names.append(index_item['uid'])
-        
-        # 检查是否需要创建会话索引
-        if self.sessions_index_name not in index_names:
-            self.logger.info(f"会话索引 {self.sessions_index_name} 不存在，正在创建...")
-            # 显式指定 id 字段为主键
-            self.client.create_index(self.sessions_index_name, {'primaryKey': 'id'})
-            self.logger.info(f"已指定 'id' 为会话索引的主键")
-        else:
-            # 确保已有索引的主键设置正确
-            try:
-                index_info = self.client.get_index(self.sessions_index_name)
-                if not hasattr(index_info, 'primary_key') or index_info.primary_key != 'id':
-                    self.logger.warning(f"会话索引 {self.sessions_index_name} 的主键不是 'id'，尝试更新")
-            except Exception as e:
-                self.logger.warning(f"检查会话索引主键时出错: {str(e)}")
-        
-        # 配置会话索引设置
-        # 可搜索属性 - name 优先级最高
-        self.sessions_index.update_searchable_attributes([
-            "name",
-            "id"
-        ])
-        self.logger.info("已配置会话索引可搜索属性: ['name', 'id']")
-        
-        # 可过滤属性
-        self.sessions_index.update_filterable_attributes([
-            "type",
-            "unread_count"
-        ])
-        self.logger.info("已配置会话索引可过滤属性: ['type', 'unread_count']")
-        
-        # 可排序属性
-        self.sessions_index.update_sortable_attributes([
-            "date",
-            "unread_count",
-            "name"
-        ])
-        self.logger.info("已配置会话索引可排序属性: ['date', 'unread_count', 'name']")
-        
-        # 排序规则
-        self.sessions_index.update_ranking_rules([
-            "words",
-            "typo",
-            "proximity",
-            "attribute",
-            "sort",
-            "exactness"
-        ])
-        self.logger.info("已配置会话索引排序规则")
-        
-        # 配置高亮属性
-        self.sessions_index.update_displayed_attributes([
-            "id",
-            "name",
-            "type",
-            "unread_count",
-            "date",
-            "avatar_key"
-        ])
-        self.logger.info("已配置会话索引显示属性")
+        self._sync_index_settings(self.sessions_index, SESSION_INDEX_SETTINGS, "会话索引")
+
+    def _sync_index_settings(self, index: Any, desired: Dict[str, Any], label: str,
+                             rebuild_only: Tuple[str, ...] = ()) -> None:
+        """
+        读取索引当前设置并只更新有差异的部分
+
+        Args:
+            index: meilisearch Index 对象
+            desired: 期望的设置
+            label: 日志中的索引描述
+            rebuild_only: 只在新建索引时提交的设置项；已有索引上的差异只记录警告
+        """
+        try:
+            current = index.get_settings()
+        except MeilisearchApiError as e:
+            if e.code != "index_not_found":
+                raise
+            self.logger.info(f"{label} {index.uid} 不存在，正在创建（主键 id）...")
+            self.client.create_index(index.uid, {"primaryKey": "id"})
+            current = {}
+
+        changes = diff_index_settings(current, desired)
+        if current:
+            deferred = sorted(key for key in rebuild_only if key in changes)
+            for key in deferred:
+                del changes[key]
+            if deferred:
+                self.logger.warning(
+                    f"{label} {index.uid} 的 {deferred} 与期望不一致，会改变现有结果的相关性，启动时不自动修改；"
+                    f"请通过 POST /api/v1/admin/index/rebuild 重建索引后生效"
+                )
+        if not changes:
+            self.logger.info(f"{label} {index.uid} 的设置已是最新，无需更新")
+            return
+        task = index.update_settings(changes)
+        self.logger.info(
+            f"已更新{label} {index.uid} 的设置: {sorted(changes)}，任务ID: {getattr(task, 'task_uid', None)}"
+        )
+
     
     def index_message(self, message_doc: MeiliMessageDoc) -> dict:
         """
@@ -293,6 +359,9 @@ class MeiliSearchService:
         
         # 添加到 Meilisearch 索引
         result = self.index.add_documents([doc_dict])
+        get_index_generations().bump([message_doc.chat_id])
+        get_index_write_journal().record_upsert(self.index_name, [doc_dict])
+        self._track_write_task(result, [message_doc.id], [message_doc.chat_id])
         
         # 适配新版 Meilisearch API 返回值处理
         task_id = "unknown"
@@ -345,6 +414,9 @@ class MeiliSearchService:
 
         # 批量添加到 Meilisearch 索引
         result = self.index.add_documents(docs_dict)
+        get_index_generations().bump(chat_ids)
+        get_index_write_journal().record_upsert(self.index_name, docs_dict)
+        self._track_write_task(result, [doc["id"] for doc in docs_dict], chat_ids)
 
         # 适配新版 Meilisearch API 返回值处理
         task_id = "unknown"
@@ -363,7 +435,9 @@ class MeiliSearchService:
     def search(self, query: str, filters: Optional[str] = None, sort: Optional[List[str]] = None,
                page: int = 1, hits_per_page: int = 10,
                start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
-               chat_types: Optional[List[str]] = None, chat_ids: Optional[List[int]] = None) -> dict:
+               chat_types: Optional[List[str]] = None, chat_ids: Optional[List[int]] = None,
+               crop_length: Optional[int] = None, projection: str = PROJECTION_FULL,
+               matching_strategy: Optional[str] = None) -> dict:
         """
         搜索消息
         
@@ -377,10 +451,212 @@ class MeiliSearchService:
             end_timestamp: 结束时间的 Unix 时间戳
             chat_types: 聊天类型列表，例如 ["group", "channel", "user"]
             chat_ids: 聊天 ID 列表，例如 [12345, 67890]
+            crop_length: snippet 投影的摘要长度（词数）；为空或 0 时 snippet 退化为 full
+            projection: 字段投影，可选 full（默认）、snippet、ids_only；
+                        snippet 结果不含完整 text，只在 _formatted.text 中返回裁剪并高亮后的窗口
+            matching_strategy: Meilisearch 的 matchingStrategy（last、all 或 frequency）；
+                               为 None 时使用 Meilisearch 默认值（last）
             
         Returns:
             Meilisearch 的搜索结果字典
         """
+        search_params = self._build_search_params(
+            filters=filters, sort=sort, page=page, hits_per_page=hits_per_page,
+            start_timestamp=start_timestamp, end_timestamp=end_timestamp,
+            chat_types=chat_types, chat_ids=chat_ids, crop_length=crop_length,
+            projection=projection, matching_strategy=matching_strategy
+        )
+        
+        # 执行搜索
+        self.logger.debug(f"执行搜索: 关键词='{query}', 参数={search_params}")
+        results = self.index.search(query, search_params)
+        
+        # 记录原始搜索结果以便排查问题
+        self.logger.debug(f"Meilisearch 原始搜索结果: {results}")
+        
+        return self._finalize_search_results(results, query, search_params)
+
+    async def search_async(self, query: str, filters: Optional[str] = None, sort: Optional[List[str]] = None,
+                           page: int = 1, hits_per_page: int = 10,
+                           start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                           chat_types: Optional[List[str]] = None, chat_ids: Optional[List[int]] = None,
+                           crop_length: Optional[int] = None, projection: str = PROJECTION_FULL,
+                           matching_strategy: Optional[str] = None) -> dict:
+        """
+        异步搜索消息
+
+        参数与返回值与 search() 相同，请求通过共享连接池发送，不阻塞事件循环。
+        """
+        search_params = self._build_search_params(
+            filters=filters, sort=sort, page=page, hits_per_page=hits_per_page,
+            start_timestamp=start_timestamp, end_timestamp=end_timestamp,
+            chat_types=chat_types, chat_ids=chat_ids, crop_length=crop_length,
+            projection=projection, matching_strategy=matching_strategy
+        )
+
+        self.logger.debug(f"执行异步搜索: 关键词='{query}', 参数={search_params}")
+        results = await self._search_request_async(self.index_name, query, search_params)
+        self.logger.debug(f"Meilisearch 原始搜索结果: {results}")
+
+        return self._finalize_search_results(results, query, search_params)
+
+    def supports_keyset_pagination(self, query: str) -> bool:
+        """
+        判断当前消息索引能否对 query 使用键集分页
+
+        空查询（占位搜索）只按 sort 排序，总是可以；其它查询要求线上索引的排序规则满足
+        ranking_rules_support_keyset。排序规则缓存 RANKING_RULES_CACHE_TTL_SECONDS 秒。
+        """
+        if not (query or "").strip():
+            return True
+        if self._ranking_rules_stale():
+            self._remember_ranking_rules(self.index.get_ranking_rules())
+        return ranking_rules_support_keyset(self._ranking_rules)
+
+    async def supports_keyset_pagination_async(self, query: str) -> bool:
+        """异步判断当前消息索引能否对 query 使用键集分页，含义与 supports_keyset_pagination() 相同"""
+        if not (query or "").strip():
+            return True
+        if self._ranking_rules_stale():
+            self._remember_ranking_rules(
+                await self._request_async("GET", f"/indexes/{self.index_name}/settings/ranking-rules")
+            )
+        return ranking_rules_support_keyset(self._ranking_rules)
+
+    def _ranking_rules_stale(self) -> bool:
+        """缓存的排序规则是否需要重新读取"""
+        return (self._ranking_rules is None
+                or time.monotonic() - self._ranking_rules_loaded_at >= RANKING_RULES_CACHE_TTL_SECONDS)
+
+    def _remember_ranking_rules(self, ranking_rules: List[str]) -> None:
+        """缓存读取到的排序规则"""
+        self._ranking_rules = list(ranking_rules)
+        self._ranking_rules_loaded_at = time.monotonic()
+
+    def _keyset_unavailable_error(self) -> KeysetPaginationUnavailableError:
+        """构建键集分页不可用的异常，消息中包含当前排序规则"""
+        return KeysetPaginationUnavailableError(
+            f"消息索引 {self.index_name} 的排序规则 {self._ranking_rules} 中 sort 之前还有 words 以外的规则，"
+            f"键集分页会遗漏结果，请改用页码分页"
+        )
+
+    def search_after(self, query: str, cursor: Optional[str] = None, limit: int = 20,
+                     filters: Optional[str] = None, descending: bool = True,
+                     start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                     chat_types: Optional[List[str]] = None, chat_ids: Optional[List[int]] = None,
+                     crop_length: Optional[int] = None, projection: str = PROJECTION_FULL) -> dict:
+        """
+        键集分页搜索消息
+
+        结果按 (date, chat_id, message_id) 排序，每页都从 offset 0 开始查询，
+        通过游标过滤掉已返回的结果，因此深度翻页的开销与第一页相同，且不受 1000 条上限限制。
+        为保证顺序严格，键集分页要求结果匹配全部关键词（matchingStrategy=all，见 KEYSET_MATCHING_STRATEGY），
+        且非空查询要求线上索引的排序规则中 sort 之前只有 words（见 supports_keyset_pagination）。
+
+        Args:
+            query: 搜索关键词
+            cursor: 上一页返回的 nextCursor；为 None 时从第一条开始
+            limit: 本页最多返回的结果数
+            filters: Meilisearch 过滤字符串
+            descending: 是否按时间降序；提供 cursor 时以游标中记录的方向为准
+            start_timestamp: 开始时间的 Unix 时间戳
+            end_timestamp: 结束时间的 Unix 时间戳
+            chat_types: 聊天类型列表
+            chat_ids: 聊天 ID 列表
+            crop_length: 摘要长度（词数），含义与 search() 相同
+            projection: 字段投影，含义与 search() 相同
+
+        Returns:
+            dict: 与 search() 相同的结果字典，另含 nextCursor（没有更多结果时为 None）
+
+        Raises:
+            InvalidCursorError: cursor 无法解析
+            KeysetPaginationUnavailableError: 索引的排序规则不支持对该查询使用键集分页
+        """
+        if not self.supports_keyset_pagination(query):
+            raise self._keyset_unavailable_error()
+        search_params, descending = self._build_keyset_params(
+            cursor, limit, filters, descending, start_timestamp, end_timestamp, chat_types, chat_ids,
+            crop_length, projection
+        )
+        self.logger.debug(f"执行键集分页搜索: 关键词='{query}', 参数={search_params}")
+        results = self.index.search(query, search_params)
+        return self._finalize_keyset_results(results, query, search_params, limit, descending)
+
+    async def search_after_async(self, query: str, cursor: Optional[str] = None, limit: int = 20,
+                                 filters: Optional[str] = None, descending: bool = True,
+                                 start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                                 chat_types: Optional[List[str]] = None,
+                                 chat_ids: Optional[List[int]] = None,
+                                 crop_length: Optional[int] = None, projection: str = PROJECTION_FULL) -> dict:
+        """异步键集分页搜索消息，参数、返回值与异常与 search_after() 相同"""
+        if not await self.supports_keyset_pagination_async(query):
+            raise self._keyset_unavailable_error()
+        search_params, descending = self._build_keyset_params(
+            cursor, limit, filters, descending, start_timestamp, end_timestamp, chat_types, chat_ids,
+            crop_length, projection
+        )
+        self.logger.debug(f"执行异步键集分页搜索: 关键词='{query}', 参数={search_params}")
+        results = await self._search_request_async(self.index_name, query, search_params)
+        return self._finalize_keyset_results(results, query, search_params, limit, descending)
+
+    def _build_keyset_params(self, cursor: Optional[str], limit: int, filters: Optional[str],
+                             descending: bool, start_timestamp: Optional[int], end_timestamp: Optional[int],
+                             chat_types: Optional[List[str]],
+                             chat_ids: Optional[List[int]],
+                             crop_length: Optional[int] = None,
+                             projection: str = PROJECTION_FULL) -> Tuple[Dict[str, Any], bool]:
+        """构建键集分页搜索参数，返回参数字典和实际使用的排序方向"""
+        decoded = SearchCursor.decode(cursor) if cursor else None
+        if decoded is not None:
+            descending = decoded.descending
+            filters = f"({filters}) AND {decoded.to_filter()}" if filters else decoded.to_filter()
+
+        search_params = self._build_search_params(
+            filters=filters, sort=keyset_sort(descending),
+            start_timestamp=start_timestamp, end_timestamp=end_timestamp,
+            chat_types=chat_types, chat_ids=chat_ids, crop_length=crop_length,
+            projection=projection
+        )
+        # 多取一条用于判断是否还有下一页
+        del search_params["page"], search_params["hitsPerPage"]
+        search_params["offset"] = 0
+        search_params["limit"] = limit + 1
+        search_params["matchingStrategy"] = KEYSET_MATCHING_STRATEGY
+        return search_params, descending
+
+    def _finalize_keyset_results(self, results: Any, query: str, search_params: Dict[str, Any],
+                                 limit: int, descending: bool) -> dict:
+        """标准化键集分页结果，截断多取的一条并生成 nextCursor"""
+        results_dict = self._finalize_search_results(results, query, search_params)
+        hits = results_dict["hits"]
+        has_more = len(hits) > limit
+        results_dict["hits"] = hits[:limit]
+        results_dict["nextCursor"] = (
+            SearchCursor.from_hit(hits[limit - 1], descending).encode() if has_more and limit > 0 else None
+        )
+        return results_dict
+
+    def _build_search_params(self, filters: Optional[str] = None, sort: Optional[List[str]] = None,
+                             page: int = 1, hits_per_page: int = 10,
+                             start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                             chat_types: Optional[List[str]] = None,
+                             chat_ids: Optional[List[int]] = None,
+                             crop_length: Optional[int] = None,
+                             projection: str = PROJECTION_FULL,
+                             matching_strategy: Optional[str] = None) -> Dict[str, Any]:
+        """
+        构建消息搜索参数（同步与异步搜索共用）
+
+        projection 决定返回的字段：snippet（且 crop_length 为正数）由 Meilisearch 裁剪并高亮 text，
+        不返回完整 text；ids_only 只返回定位消息所需的字段且不做高亮。
+
+        Raises:
+            ValueError: projection 不是 SEARCH_PROJECTIONS 之一
+
+        Returns:
+            Dict[str, Any]: Meilisearch 搜索参数，包含分页、过滤、排序和高亮设置
+        """
         # 构建过滤条件
         filter_parts = []
         
@@ -388,24 +664,23 @@ class MeiliSearchService:
         if filters:
             filter_parts.append(f"({filters})")
         
-        # 处理时间范围过滤
-        if start_timestamp is not None:
-            filter_parts.append(f"date >= {start_timestamp}")
-        if end_timestamp is not None:
-            filter_parts.append(f"date <= {end_timestamp}")
+        # 时间范围和聊天类型过滤使用与 Search Bot 查询语法相同的规范形式
+        ast_filters: Dict[str, Any] = {}
+        if start_timestamp is not None or end_timestamp is not None:
+            ast_filters["date_range"] = {"start": start_timestamp, "end": end_timestamp}
         
         # 处理聊天类型过滤
         if chat_types:
             # 验证聊天类型的有效性
-            valid_chat_types = {"user", "group", "channel"}
-            invalid_types = [t for t in chat_types if t not in valid_chat_types]
+            invalid_types = [t for t in chat_types if t not in CHAT_TYPES]
             if invalid_types:
-                self.logger.warning(f"发现无效的聊天类型: {invalid_types}, 有效类型: {list(valid_chat_types)}")
+                self.logger.warning(f"发现无效的聊天类型: {invalid_types}, 有效类型: {list(CHAT_TYPES)}")
             
-            valid_types = [t for t in chat_types if t in valid_chat_types]
-            if valid_types:
-                chat_type_filters = [f'chat_type = "{chat_type}"' for chat_type in valid_types]
-                filter_parts.append(f"({' OR '.join(chat_type_filters)})")
+            ast_filters["chat_type"] = [t for t in chat_types if t in CHAT_TYPES]
+        
+        compiled_filters = build_meilisearch_filter(ast_filters)
+        if compiled_filters:
+            filter_parts.append(compiled_filters)
         
         # 处理聊天ID过滤
         if chat_ids:
@@ -418,8 +693,7 @@ class MeiliSearchService:
                     self.logger.warning(f"聊天ID必须是整数，忽略: {chat_id}")
             
             if valid_chat_ids:
-                chat_id_filters = [f"chat_id = {chat_id}" for chat_id in valid_chat_ids]
-                filter_parts.append(f"({' OR '.join(chat_id_filters)})")
+                filter_parts.append(build_chat_id_filter(valid_chat_ids))
         
         # 构建搜索参数
         search_params: Dict[str, Any] = {
@@ -427,6 +701,16 @@ class MeiliSearchService:
             "hitsPerPage": hits_per_page,
             "attributesToHighlight": ["text"]
         }
+        if projection not in SEARCH_PROJECTIONS:
+            raise ValueError(f"未知的字段投影: {projection}，可选值: {list(SEARCH_PROJECTIONS)}")
+        if projection == PROJECTION_IDS_ONLY:
+            search_params["attributesToRetrieve"] = IDS_ONLY_ATTRIBUTES_TO_RETRIEVE
+            search_params["attributesToHighlight"] = []
+        elif projection == PROJECTION_SNIPPET and crop_length:
+            search_params["attributesToRetrieve"] = SNIPPET_ATTRIBUTES_TO_RETRIEVE
+            search_params["attributesToCrop"] = ["text"]
+            search_params["cropLength"] = crop_length
+            search_params["cropMarker"] = SNIPPET_CROP_MARKER
         
         # 添加组合后的过滤条件
         if filter_parts:
@@ -439,16 +723,26 @@ class MeiliSearchService:
             search_params["sort"] = sort
         else:
             search_params["sort"] = ["date:desc"]
+
+        if matching_strategy:
+            search_params["matchingStrategy"] = matching_strategy
         
-        # 执行搜索
-        self.logger.debug(f"执行搜索: 关键词='{query}', 参数={search_params}")
         self.logger.debug(f"高级过滤参数: start_timestamp={start_timestamp}, end_timestamp={end_timestamp}, "
                          f"chat_types={chat_types}, chat_ids={chat_ids}")
-        results = self.index.search(query, search_params)
-        
-        # 记录原始搜索结果以便排查问题
-        self.logger.debug(f"Meilisearch 原始搜索结果: {results}")
-        
+        return search_params
+
+    def _finalize_search_results(self, results: Any, query: str, search_params: Dict[str, Any]) -> dict:
+        """
+        标准化消息搜索结果并记录日志（同步与异步搜索共用）
+
+        Args:
+            results: Meilisearch 原始返回值
+            query: 搜索关键词
+            search_params: 本次搜索使用的参数
+
+        Returns:
+            dict: 至少包含 hits、estimatedTotalHits、processingTimeMs、query 的结果字典
+        """
         # 处理不同版本 Meilisearch API 的返回结构
         # 确保结果包含必要的键，兼容新旧版 API
         # 标准化为字典格式
@@ -506,8 +800,8 @@ class MeiliSearchService:
         self.logger.info(
             f"搜索 '{query}' 找到 {results_dict['estimatedTotalHits']} 条结果，"
             f"处理时间: {results_dict['processingTimeMs']}ms，"
-            f"每页限制: {search_params['hitsPerPage']}，"
-            f"当前页码: {search_params['page']}，"
+            f"每页限制: {search_params.get('hitsPerPage', search_params.get('limit'))}，"
+            f"当前页码: {search_params.get('page', '-')}，"
             f"实际返回结果数: {len(results_dict['hits'])}，"
             f"估计总结果数: {results_dict['estimatedTotalHits']}"
         )
@@ -525,6 +819,10 @@ class MeiliSearchService:
             Meilisearch 的响应字典，通常包含任务信息
         """
         result = self.index.delete_document(document_id)
+        chat_ids = _chat_ids_from_document_ids([document_id])
+        get_index_generations().bump(chat_ids)
+        get_index_write_journal().record_delete(self.index_name, [document_id])
+        self._track_write_task(result, [document_id], chat_ids, retryable=False)
         
         # 适配新版 Meilisearch API 返回值处理
         task_id = "unknown"
@@ -540,6 +838,38 @@ class MeiliSearchService:
         
         return result
     
+    def delete_messages_bulk(self, document_ids: List[str]) -> dict:
+        """
+        批量删除消息
+
+        Args:
+            document_ids: 文档ID列表
+
+        Returns:
+            Meilisearch 的响应字典，通常包含任务信息
+        """
+        if not document_ids:
+            self.logger.warning("批量删除时提供的文档ID列表为空")
+            return {"message": "No documents to delete"}
+
+        result = self.index.delete_documents(document_ids)
+        chat_ids = _chat_ids_from_document_ids(document_ids)
+        get_index_generations().bump(chat_ids)
+        get_index_write_journal().record_delete(self.index_name, document_ids)
+        self._track_write_task(result, document_ids, chat_ids, retryable=False)
+
+        task_id = "unknown"
+        if hasattr(result, 'task_uid'):
+            task_id = result.task_uid
+        elif hasattr(result, 'uid'):
+            task_id = result.uid
+        elif isinstance(result, dict) and 'taskUid' in result:
+            task_id = result['taskUid']
+
+        self.logger.info(f"已批量删除 {len(document_ids)} 条消息，任务ID: {task_id}")
+
+        return result
+
     def update_stop_words(self, stop_words: List[str]) -> dict:
         """
         更新停用词列表
@@ -670,6 +1000,41 @@ class MeiliSearchService:
         Returns:
             搜索结果字典，包含hits、estimatedTotalHits等信息
         """
+        search_params = self._build_session_search_params(
+            session_types=session_types, page=page, hits_per_page=hits_per_page, sort=sort
+        )
+        
+        # 执行搜索
+        self.logger.debug(f"执行会话搜索: 关键词='{query}', 参数={search_params}")
+        results = self.sessions_index.search(query, search_params)
+        
+        # 记录原始搜索结果以便排查问题
+        self.logger.debug(f"Meilisearch 会话搜索原始结果: {results}")
+        
+        return self._finalize_session_search_results(results, query, search_params)
+
+    async def search_sessions_async(self, query: str, session_types: Optional[List[str]] = None,
+                                    page: int = 1, hits_per_page: int = 20,
+                                    sort: Optional[List[str]] = None) -> dict:
+        """
+        异步搜索会话
+
+        参数与返回值与 search_sessions() 相同，请求通过共享连接池发送。
+        """
+        search_params = self._build_session_search_params(
+            session_types=session_types, page=page, hits_per_page=hits_per_page, sort=sort
+        )
+
+        self.logger.debug(f"执行异步会话搜索: 关键词='{query}', 参数={search_params}")
+        results = await self._search_request_async(self.sessions_index_name, query, search_params)
+        self.logger.debug(f"Meilisearch 会话搜索原始结果: {results}")
+
+        return self._finalize_session_search_results(results, query, search_params)
+
+    def _build_session_search_params(self, session_types: Optional[List[str]] = None,
+                                     page: int = 1, hits_per_page: int = 20,
+                                     sort: Optional[List[str]] = None) -> Dict[str, Any]:
+        """构建会话搜索参数（同步与异步会话搜索共用）"""
         filter_parts = []
         
         # 处理会话类型过滤
@@ -704,13 +1069,11 @@ class MeiliSearchService:
         else:
             search_params["sort"] = ["date:desc"]
         
-        # 执行搜索
-        self.logger.debug(f"执行会话搜索: 关键词='{query}', 参数={search_params}")
-        results = self.sessions_index.search(query, search_params)
-        
-        # 记录原始搜索结果以便排查问题
-        self.logger.debug(f"Meilisearch 会话搜索原始结果: {results}")
-        
+        return search_params
+
+    def _finalize_session_search_results(self, results: Any, query: str,
+                                         search_params: Dict[str, Any]) -> dict:
+        """标准化会话搜索结果并记录日志（同步与异步会话搜索共用）"""
         # 处理不同版本 Meilisearch API 的返回结构
         if not isinstance(results, dict):
             self.logger.debug(f"会话搜索结果不是字典，类型: {type(results)}")
@@ -758,6 +1121,232 @@ class MeiliSearchService:
         
         return results_dict
 
+    def multi_search(self, searches: List[Dict[str, Any]]) -> List[dict]:
+        """
+        在一次 Meilisearch multi-search 请求中执行多个消息或会话搜索
+
+        Args:
+            searches: 查询列表，每项包含 target（messages 或 sessions，默认 messages）、query，
+                      其余键为对应单次搜索的参数：消息搜索同 search()，会话搜索同 search_sessions()
+
+        Returns:
+            List[dict]: 与 searches 顺序一致的结果列表，每项与对应单次搜索的返回值相同
+
+        Raises:
+            ValueError: target 未知，或 projection 不是 SEARCH_PROJECTIONS 之一
+        """
+        queries, finalizers = self._build_multi_search_queries(searches)
+        if not queries:
+            return []
+        self.logger.debug(f"执行批量搜索: {len(queries)} 个查询")
+        response = self.client.multi_search(queries)
+        return self._finalize_multi_search_results(response, finalizers)
+
+    async def multi_search_async(self, searches: List[Dict[str, Any]]) -> List[dict]:
+        """
+        异步批量搜索
+
+        参数与返回值与 multi_search() 相同，请求通过共享连接池发送，
+        所有查询只占用一次到 Meilisearch 的往返。
+        """
+        queries, finalizers = self._build_multi_search_queries(searches)
+        if not queries:
+            return []
+        self.logger.debug(f"执行异步批量搜索: {len(queries)} 个查询")
+        response = await self._request_async("POST", "/multi-search", json={"queries": queries})
+        return self._finalize_multi_search_results(response, finalizers)
+
+    def _build_multi_search_queries(self, searches: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        """构建 multi-search 的查询列表，以及按顺序标准化每个结果的函数"""
+        queries = []
+        finalizers = []
+        for search in searches:
+            params = dict(search)
+            target = params.pop("target", MULTI_SEARCH_MESSAGES)
+            query = params.pop("query", "")
+            if target == MULTI_SEARCH_MESSAGES:
+                index_uid = self.index_name
+                search_params = self._build_search_params(**params)
+                finalize = self._finalize_search_results
+            elif target == MULTI_SEARCH_SESSIONS:
+                index_uid = self.sessions_index_name
+                search_params = self._build_session_search_params(**params)
+                finalize = self._finalize_session_search_results
+            else:
+                raise ValueError(
+                    f"未知的批量搜索目标: {target}，可选值: {[MULTI_SEARCH_MESSAGES, MULTI_SEARCH_SESSIONS]}"
+                )
+            queries.append({"indexUid": index_uid, "q": query, **search_params})
+            finalizers.append(lambda results, f=finalize, q=query, sp=search_params: f(results, q, sp))
+        return queries, finalizers
+
+    def _finalize_multi_search_results(self, response: Any, finalizers: List[Any]) -> List[dict]:
+        """按查询顺序标准化 multi-search 返回的每个结果"""
+        results = response.get("results", []) if isinstance(response, dict) else getattr(response, "results", [])
+        if len(results) != len(finalizers):
+            raise ValueError(f"批量搜索返回 {len(results)} 个结果，预期 {len(finalizers)} 个")
+        return [finalize(result) for finalize, result in zip(finalizers, results)]
+
+    def facet_search(self, query: str, filters: Optional[str] = None,
+                     start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                     chat_types: Optional[List[str]] = None, chat_ids: Optional[List[int]] = None,
+                     interval: str = "month") -> dict:
+        """
+        统计搜索结果的分布
+
+        第一次请求不返回任何命中，只取 chat_id、chat_type、sender_id 的分面计数和 date 的最小/最大值；
+        第二次请求把时间范围按 interval 切分为桶，每个桶一个只计数的查询，合并为一次 multi-search。
+        总数和每个桶的计数取自 chat_type 的分面计数之和，不受 pagination.maxTotalHits 限制。
+
+        Args:
+            query: 搜索关键词
+            filters: Meilisearch 过滤字符串
+            start_timestamp: 开始时间的 Unix 时间戳，为空时从最早的命中开始
+            end_timestamp: 结束时间的 Unix 时间戳，为空时到最晚的命中为止
+            chat_types: 聊天类型列表
+            chat_ids: 聊天 ID 列表
+            interval: 直方图桶宽度，可选 day、week、month
+
+        Returns:
+            dict: 包含 query、totalHits、processingTimeMs、facets（属性 -> [{value, count}]）
+                和 histogram（interval、buckets、truncated）的字典
+
+        Raises:
+            ValueError: interval 不是 HISTOGRAM_INTERVALS 之一
+        """
+        search_kwargs, facet_params = self._build_facet_params(
+            filters, start_timestamp, end_timestamp, chat_types, chat_ids, interval
+        )
+        self.logger.debug(f"执行分面统计: 关键词='{query}', 参数={facet_params}")
+        facet_results = self.index.search(query, facet_params)
+
+        buckets, bucket_queries, truncated = self._build_histogram_queries(
+            query, facet_results, search_kwargs, start_timestamp, end_timestamp, interval
+        )
+        bucket_response = self.client.multi_search(bucket_queries) if bucket_queries else {}
+        return self._finalize_facet_results(query, facet_results, buckets, bucket_response, interval, truncated)
+
+    async def facet_search_async(self, query: str, filters: Optional[str] = None,
+                                 start_timestamp: Optional[int] = None, end_timestamp: Optional[int] = None,
+                                 chat_types: Optional[List[str]] = None, chat_ids: Optional[List[int]] = None,
+                                 interval: str = "month") -> dict:
+        """异步统计搜索结果的分布，参数与返回值与 facet_search() 相同"""
+        search_kwargs, facet_params = self._build_facet_params(
+            filters, start_timestamp, end_timestamp, chat_types, chat_ids, interval
+        )
+        self.logger.debug(f"执行异步分面统计: 关键词='{query}', 参数={facet_params}")
+        facet_results = await self._search_request_async(self.index_name, query, facet_params)
+
+        buckets, bucket_queries, truncated = self._build_histogram_queries(
+            query, facet_results, search_kwargs, start_timestamp, end_timestamp, interval
+        )
+        bucket_response = (
+            await self._request_async("POST", "/multi-search", json={"queries": bucket_queries})
+            if bucket_queries else {}
+        )
+        return self._finalize_facet_results(query, facet_results, buckets, bucket_response, interval, truncated)
+
+    def _build_facet_params(self, filters: Optional[str], start_timestamp: Optional[int],
+                            end_timestamp: Optional[int], chat_types: Optional[List[str]],
+                            chat_ids: Optional[List[int]], interval: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """构建只计数的搜索参数，返回直方图桶查询共用的 _build_search_params 参数和分面请求参数"""
+        if interval not in HISTOGRAM_INTERVALS:
+            raise ValueError(f"未知的直方图间隔: {interval}，可选值: {list(HISTOGRAM_INTERVALS)}")
+
+        # hitsPerPage=0 时 Meilisearch 不返回命中；totalHits 受 maxTotalHits 限制，精确计数取自分面
+        search_kwargs = {
+            "filters": filters, "chat_types": chat_types, "chat_ids": chat_ids,
+            "page": 1, "hits_per_page": 0, "projection": PROJECTION_IDS_ONLY,
+        }
+        facet_params = self._build_search_params(
+            start_timestamp=start_timestamp, end_timestamp=end_timestamp, **search_kwargs
+        )
+        del facet_params["sort"]
+        facet_params["facets"] = [*FACET_ATTRIBUTES, "date"]
+        return search_kwargs, facet_params
+
+    def _build_histogram_queries(self, query: str, facet_results: Any, search_kwargs: Dict[str, Any],
+                                 start_timestamp: Optional[int], end_timestamp: Optional[int],
+                                 interval: str) -> Tuple[List[Tuple[int, int]], List[Dict[str, Any]], bool]:
+        """
+        根据分面请求返回的时间范围构建每个直方图桶的 multi-search 计数查询
+
+        Returns:
+            Tuple: (直方图桶, 与桶一一对应的查询, 是否截断了较早的桶)
+        """
+        date_stats = (self._result_field(facet_results, "facetStats") or {}).get("date") or {}
+        start = start_timestamp if start_timestamp is not None else date_stats.get("min")
+        end = end_timestamp if end_timestamp is not None else date_stats.get("max")
+        if not self._result_field(facet_results, "totalHits") or start is None or end is None or start > end:
+            return [], [], False
+
+        buckets = _histogram_buckets(int(start), int(end), interval)
+        truncated = len(buckets) > MAX_HISTOGRAM_BUCKETS
+        if truncated:
+            # 保留最近的桶
+            buckets = buckets[-MAX_HISTOGRAM_BUCKETS:]
+        queries = []
+        for bucket_start, bucket_end in buckets:
+            params = self._build_search_params(
+                start_timestamp=bucket_start, end_timestamp=bucket_end, **search_kwargs
+            )
+            del params["sort"]
+            params["facets"] = [COUNT_FACET_ATTRIBUTE]
+            queries.append({"indexUid": self.index_name, "q": query, **params})
+        return buckets, queries, truncated
+
+    @staticmethod
+    def _result_field(results: Any, field: str) -> Any:
+        """读取原始搜索结果中的字段（兼容字典和对象）"""
+        return results.get(field) if isinstance(results, dict) else getattr(results, field, None)
+
+    @classmethod
+    def _exact_hit_count(cls, results: Any) -> int:
+        """由 COUNT_FACET_ATTRIBUTE 的分面计数求精确命中数（不小于受 maxTotalHits 限制的 totalHits）"""
+        distribution = cls._result_field(results, "facetDistribution") or {}
+        facet_total = sum((distribution.get(COUNT_FACET_ATTRIBUTE) or {}).values())
+        return max(cls._result_field(results, "totalHits") or 0, facet_total)
+
+    def _finalize_facet_results(self, query: str, facet_results: Any, buckets: List[Tuple[int, int]],
+                                bucket_response: Any, interval: str, truncated: bool) -> dict:
+        """将分面计数和直方图桶的计数整理为统一格式"""
+        distribution = self._result_field(facet_results, "facetDistribution") or {}
+        facets = {}
+        for attribute in FACET_ATTRIBUTES:
+            values = []
+            for value, count in (distribution.get(attribute) or {}).items():
+                if attribute in NUMERIC_FACET_ATTRIBUTES:
+                    try:
+                        value = int(value)
+                    except (TypeError, ValueError):
+                        continue
+                values.append({"value": value, "count": count})
+            values.sort(key=lambda item: (-item["count"], str(item["value"])))
+            facets[attribute] = values
+
+        bucket_results = self._result_field(bucket_response, "results") or []
+        if len(bucket_results) != len(buckets):
+            raise ValueError(f"直方图查询返回 {len(bucket_results)} 个结果，预期 {len(buckets)} 个")
+        histogram = [
+            {"start": bucket_start, "end": bucket_end, "count": self._exact_hit_count(result)}
+            for (bucket_start, bucket_end), result in zip(buckets, bucket_results)
+        ]
+        processing_time = (self._result_field(facet_results, "processingTimeMs") or 0) + max(
+            (result.get("processingTimeMs", 0) for result in bucket_results), default=0
+        )
+        total_hits = self._exact_hit_count(facet_results)
+        self.logger.info(
+            f"分面统计 '{query}': {total_hits} 条结果，{len(histogram)} 个直方图桶（{interval}），"
+            f"处理时间: {processing_time}ms"
+        )
+        return {
+            "query": query,
+            "totalHits": total_hits,
+            "processingTimeMs": processing_time,
+            "facets": facets,
+            "histogram": {"interval": interval, "buckets": histogram, "truncated": truncated},
+        }
+
     def clear_sessions_index(self) -> dict:
         """
         清空会话索引
@@ -778,4 +1367,374 @@ class MeiliSearchService:
             
         self.logger.info(f"已清空会话索引，任务ID: {task_id}")
         
-        return result
\ No newline at end of file
+        return result
+
+    # ----------------------- 异步接口 -----------------------
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        获取共享的异步 HTTP 连接池（首次调用时创建）
+
+        Returns:
+            httpx.AsyncClient: 带 keep-alive 连接复用的异步客户端
+        """
+        if self._async_client is None or self._async_client.is_closed:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._async_client = httpx.AsyncClient(
+                base_url=self.host.rstrip("/"),
+                headers=headers,
+                limits=httpx.Limits(
+                    max_connections=self.http_pool_size,
+                    max_keepalive_connections=self.http_keepalive
+                ),
+                timeout=httpx.Timeout(self.http_timeout, connect=self.http_connect_timeout)
+            )
+            self.logger.info(
+                f"已创建 Meilisearch 异步连接池: max_connections={self.http_pool_size}, "
+                f"keepalive={self.http_keepalive}, timeout={self.http_timeout}s"
+            )
+        return self._async_client
+
+    async def _request_async(self, method: str, path: str, json: Any = None) -> Any:
+        """
+        通过连接池发送请求并返回解析后的 JSON
+
+        Raises:
+            httpx.HTTPStatusError: Meilisearch 返回错误状态码
+            httpx.TransportError: 网络错误或超时
+        """
+        client = self._get_async_client()
+        response = await client.request(method, path, json=json)
+        if response.is_error:
+            self.logger.error(
+                f"Meilisearch 请求失败: {method} {path} -> {response.status_code} {response.text}"
+            )
+        response.raise_for_status()
+        if not response.content:
+            return {}
+        return response.json()
+
+    async def _search_request_async(self, index_uid: str, query: str, search_params: Dict[str, Any]) -> dict:
+        """
+        发送搜索请求，相同的并发请求只发送一次
+
+        请求以索引名和规范化后的查询词、参数作为键合并（Meilisearch 搜索不区分大小写和多余空白）。
+        每个调用方拿到结果的浅拷贝（hits 列表单独复制，query 为调用方自己的查询词），
+        后续标准化处理不会相互影响。
+        """
+        key = (self.host, index_uid, json.dumps({"q": normalize_query(query), **search_params}, sort_keys=True, ensure_ascii=False))
+        result = await self._search_flight.do(
+            key, lambda: self._request_async(
+                "POST", f"/indexes/{index_uid}/search", json={"q": query, **search_params}
+            )
+        )
+        if isinstance(result, dict):
+            result = {**result, "hits": list(result.get("hits", [])), "query": query}
+        return result
+
+    def get_search_flight_stats(self) -> Dict[str, Any]:
+        """获取搜索请求合并统计信息"""
+        return self._search_flight.get_stats()
+
+    async def index_message_async(self, message_doc: MeiliMessageDoc) -> dict:
+        """异步索引单条消息，参数与返回值与 index_message() 相同"""
+        doc_dict = message_doc.model_dump()
+        journal = get_index_write_journal()
+        await journal.wait_writable(self.index_name)
+        result = await self._request_async("POST", f"/indexes/{self.index_name}/documents", json=[doc_dict])
+        get_index_generations().bump([message_doc.chat_id])
+        journal.record_upsert(self.index_name, [doc_dict])
+        self._track_write_task(result, [message_doc.id], [message_doc.chat_id])
+        self.logger.debug(f"已索引消息: {message_doc.id}, 任务ID: {result.get('taskUid', 'unknown')}")
+        return result
+
+    async def index_messages_bulk_async(self, message_docs: List[MeiliMessageDoc]) -> dict:
+        """异步批量索引消息，参数与返回值与 index_messages_bulk() 相同"""
+        if not message_docs:
+            self.logger.warning("批量索引时提供的消息列表为空")
+            return {"message": "No documents to index"}
+
+        docs_dict = [doc.model_dump() for doc in message_docs]
+        journal = get_index_write_journal()
+        await journal.wait_writable(self.index_name)
+        result = await self._request_async("POST", f"/indexes/{self.index_name}/documents", json=docs_dict)
+        chat_ids = {doc.chat_id for doc in message_docs}
+        get_index_generations().bump(chat_ids)
+        journal.record_upsert(self.index_name, docs_dict)
+        self._track_write_task(result, [doc["id"] for doc in docs_dict], chat_ids)
+        self.logger.info(f"已批量索引 {len(message_docs)} 条消息，任务ID: {result.get('taskUid', 'unknown')}")
+        return result
+
+    async def delete_message_async(self, document_id: str) -> dict:
+        """异步删除单条消息，参数与返回值与 delete_message() 相同"""
+        journal = get_index_write_journal()
+        await journal.wait_writable(self.index_name)
+        result = await self._request_async("DELETE", f"/indexes/{self.index_name}/documents/{document_id}")
+        chat_ids = _chat_ids_from_document_ids([document_id])
+        get_index_generations().bump(chat_ids)
+        journal.record_delete(self.index_name, [document_id])
+        self._track_write_task(result, [document_id], chat_ids, retryable=False)
+        self.logger.info(f"已删除消息: {document_id}, 任务ID: {result.get('taskUid', 'unknown')}")
+        return result
+
+    async def delete_messages_bulk_async(self, document_ids: List[str]) -> dict:
+        """异步批量删除消息，参数与返回值与 delete_messages_bulk() 相同"""
+        if not document_ids:
+            self.logger.warning("批量删除时提供的文档ID列表为空")
+            return {"message": "No documents to delete"}
+
+        journal = get_index_write_journal()
+        await journal.wait_writable(self.index_name)
+        result = await self._request_async(
+            "POST", f"/indexes/{self.index_name}/documents/delete-batch", json=list(document_ids)
+        )
+        chat_ids = _chat_ids_from_document_ids(document_ids)
+        get_index_generations().bump(chat_ids)
+        journal.record_delete(self.index_name, document_ids)
+        self._track_write_task(result, document_ids, chat_ids, retryable=False)
+        self.logger.info(f"已批量删除 {len(document_ids)} 条消息，任务ID: {result.get('taskUid', 'unknown')}")
+        return result
+
+    async def delete_messages_by_filter_async(self, filter_expr: str,
+                                              chat_ids: Optional[List[int]] = None) -> dict:
+        """
+        异步按过滤条件删除消息
+
+        Args:
+            filter_expr: Meilisearch 过滤表达式，例如 "chat_id = 123 AND message_id IN [1, 2]"
+            chat_ids: 过滤条件可能涉及的聊天，用于递增索引代数；为 None 时视为影响所有聊天
+
+        Returns:
+            Meilisearch 的响应字典，通常包含任务信息
+        """
+        journal = get_index_write_journal()
+        await journal.wait_writable(self.index_name)
+        result = await self._request_async(
+            "POST", f"/indexes/{self.index_name}/documents/delete", json={"filter": filter_expr}
+        )
+        get_index_generations().bump(chat_ids)
+        journal.record_delete_filter(self.index_name, filter_expr)
+        self._track_write_task(result, [], chat_ids, retryable=False)
+        self.logger.info(f"已按条件删除消息: {filter_expr}, 任务ID: {result.get('taskUid', 'unknown')}")
+        return result
+
+    async def get_indexed_message_ids_async(self, chat_id: int, offset: int = 0, limit: int = 1000) -> List[int]:
+        """
+        异步获取某个聊天已索引的消息ID（分页）
+
+        Args:
+            chat_id: 聊天ID
+            offset: 跳过的文档数
+            limit: 本页最多返回的文档数
+
+        Returns:
+            List[int]: 本页的消息ID列表，为空表示已取完
+        """
+        result = await self._request_async(
+            "POST", f"/indexes/{self.index_name}/documents/fetch",
+            json={
+                "filter": f"chat_id = {chat_id}",
+                "fields": ["message_id"],
+                "offset": offset,
+                "limit": limit,
+            }
+        )
+        return [doc["message_id"] for doc in result.get("results", []) if "message_id" in doc]
+
+    # ----------------------- 索引管理（异步） -----------------------
+    def _track_write_task(self, result: Any, document_ids: List[str], chat_ids: Optional[Iterable[int]],
+                          retryable: bool = True) -> None:
+        """
+        把写入任务登记到索引任务跟踪器（未启用跟踪时不做任何事）
+
+        提交请求时已递增一次索引代数；跟踪器在任务结束时再递增一次，
+        使 Meilisearch 处理期间缓存的旧结果同样失效。
+        """
+        tracker = get_index_task_tracker()
+        if tracker is None:
+            return
+        task_uid = result.get("taskUid") if isinstance(result, dict) else getattr(result, "task_uid", None)
+        if task_uid is not None:
+            tracker.track(self.index_name, task_uid, document_ids, chat_ids, retryable=retryable)
+
+    async def get_tasks_async(self, task_uids: List[int]) -> List[dict]:
+        """
+        批量查询任务状态
+
+        Args:
+            task_uids: 任务ID列表
+
+        Returns:
+            list: 任务对象列表（已被 Meilisearch 清理的任务不在其中）
+        """
+        if not task_uids:
+            return []
+        uids = ",".join(str(uid) for uid in task_uids)
+        response = await self._request_async("GET", f"/tasks?uids={uids}&limit={len(task_uids)}")
+        return response.get("results", [])
+
+    async def wait_for_task_async(self, task_uid: int, timeout: float = TASK_WAIT_TIMEOUT_SECONDS,
+                                  poll_interval: float = TASK_POLL_INTERVAL_SECONDS) -> dict:
+        """
+        等待 Meilisearch 任务处理完成
+
+        Args:
+            task_uid: 任务ID
+            timeout: 最长等待时间（秒）
+            poll_interval: 轮询间隔（秒）
+
+        Returns:
+            dict: 处理成功的任务对象
+
+        Raises:
+            RuntimeError: 任务失败或被取消
+            TimeoutError: 超时仍未处理完成
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            task = await self._request_async("GET", f"/tasks/{task_uid}")
+            status = task.get("status")
+            if status == "succeeded":
+                return task
+            if status in ("failed", "canceled"):
+                error = (task.get("error") or {}).get("message", "")
+                raise RuntimeError(f"Meilisearch 任务 {task_uid} {status}: {error}")
+            if loop.time() >= deadline:
+                raise TimeoutError(f"等待 Meilisearch 任务 {task_uid} 超时（{timeout} 秒）")
+            await asyncio.sleep(poll_interval)
+
+    async def create_index_async(self, index_uid: str, settings: Dict[str, Any]) -> None:
+        """
+        创建以 id 为主键的索引并应用设置（等待两个任务完成）
+
+        在空索引上应用设置不会触发重新索引。
+        """
+        task = await self._request_async("POST", "/indexes", json={"uid": index_uid, "primaryKey": "id"})
+        await self.wait_for_task_async(task["taskUid"])
+        task = await self._request_async("PATCH", f"/indexes/{index_uid}/settings", json=settings)
+        await self.wait_for_task_async(task["taskUid"])
+        self.logger.info(f"已创建索引 {index_uid} 并应用设置")
+
+    async def swap_indexes_async(self, first: str, second: str) -> dict:
+        """
+        原子交换两个索引的文档与设置（等待任务完成）
+
+        Returns:
+            dict: 处理成功的任务对象
+        """
+        task = await self._request_async("POST", "/swap-indexes", json=[{"indexes": [first, second]}])
+        result = await self.wait_for_task_async(task["taskUid"])
+        # 交换后消息索引的排序规则可能已改变
+        self._ranking_rules = None
+        self.logger.info(f"已交换索引 {first} <-> {second}")
+        return result
+
+    async def delete_index_async(self, index_uid: str) -> dict:
+        """删除索引（不等待任务完成）"""
+        result = await self._request_async("DELETE", f"/indexes/{index_uid}")
+        self.logger.info(f"已删除索引 {index_uid}, 任务ID: {result.get('taskUid', 'unknown')}")
+        return result
+
+    async def get_document_count_async(self, index_uid: Optional[str] = None) -> int:
+        """获取索引的文档数，index_uid 默认为消息索引"""
+        stats = await self._request_async("GET", f"/indexes/{index_uid or self.index_name}/stats")
+        return stats.get("numberOfDocuments", 0)
+
+    async def fetch_documents_after_async(self, after: Optional[Tuple[int, int]] = None,
+                                          limit: int = DOCUMENT_SCAN_PAGE_SIZE,
+                                          index_uid: Optional[str] = None) -> List[dict]:
+        """
+        按 (chat_id, message_id) 升序读取一页完整文档
+
+        以上一页最后一条文档的排序键作为过滤条件（键集分页），
+        读取期间的写入和删除不会导致漏读或重复读取已存在的文档。
+
+        Args:
+            after: 上一页最后一条文档的 (chat_id, message_id)，首页为 None
+            limit: 本页最多返回的文档数（不超过 DOCUMENT_SCAN_PAGE_SIZE）
+            index_uid: 读取的索引，默认为消息索引
+
+        Returns:
+            List[dict]: 文档列表，为空表示已读完
+        """
+        params: Dict[str, Any] = {
+            "q": "",
+            "sort": ["chat_id:asc", "message_id:asc"],
+            "limit": min(limit, DOCUMENT_SCAN_PAGE_SIZE),
+        }
+        if after is not None:
+            chat_id, message_id = after
+            params["filter"] = f"chat_id > {chat_id} OR (chat_id = {chat_id} AND message_id > {message_id})"
+        result = await self._request_async("POST", f"/indexes/{index_uid or self.index_name}/search", json=params)
+        return result.get("hits", [])
+
+    async def add_documents_async(self, index_uid: str, documents: List[Dict[str, Any]]) -> dict:
+        """向指定索引写入已序列化的文档（不递增索引代数，也不记录写入日志）"""
+        return await self._request_async("POST", f"/indexes/{index_uid}/documents", json=documents)
+
+    async def delete_documents_async(self, index_uid: str, document_ids: List[str]) -> dict:
+        """从指定索引按文档ID删除（不递增索引代数，也不记录写入日志）"""
+        return await self._request_async("POST", f"/indexes/{index_uid}/documents/delete-batch", json=list(document_ids))
+
+    async def delete_documents_by_filter_async(self, index_uid: str, filter_expr: str) -> dict:
+        """从指定索引按过滤条件删除（不递增索引代数，也不记录写入日志）"""
+        return await self._request_async("POST", f"/indexes/{index_uid}/documents/delete", json={"filter": filter_expr})
+
+    async def aclose(self) -> None:
+        """关闭异步连接池"""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+            self.logger.info("Meilisearch 异步连接池已关闭")
+        self._async_client = None
+
+
+# 进程内共享的服务实例（API、Search Bot 和 User Bot 在同一进程内），按 (host, api_key, index_name) 区分
+_shared_services: Dict[Tuple[str, Optional[str], str], MeiliSearchService] = {}
+_shared_services_lock = threading.Lock()
+
+
+def get_shared_meilisearch_service(host: str, api_key: Optional[str] = None,
+                                   index_name: str = "telegram_messages", **http_options: Any) -> MeiliSearchService:
+    """
+    获取进程内共享的 MeiliSearchService 实例
+
+    同一连接参数只创建一次实例，索引设置检查和异步连接池也只有一份；
+    连接池参数以首次创建时为准。
+
+    Args:
+        host: Meilisearch 服务的主机地址
+        api_key: Meilisearch 的 API Key，可选
+        index_name: 消息索引名称
+        **http_options: 传给 MeiliSearchService 的连接池参数（http_pool_size 等）
+
+    Returns:
+        MeiliSearchService: 共享的服务实例
+    """
+    key = (host, api_key, index_name)
+    with _shared_services_lock:
+        service = _shared_services.get(key)
+        if service is None:
+            service = MeiliSearchService(host, api_key, index_name=index_name, **http_options)
+            _shared_services[key] = service
+        return service
+
+
+async def close_shared_meilisearch_services() -> None:
+    """
+    关闭全部共享实例的异步连接池
+
+    只应在进程退出时调用一次：实例由 API、Search Bot 和 User Bot 共用，
+    任何一个组件单独关闭都会影响仍在运行的其它组件。实例本身保留，再次请求时重新创建连接池。
+    """
+    with _shared_services_lock:
+        services = list(_shared_services.values())
+    for service in services:
+        await service.aclose()
+
+
+def clear_shared_meilisearch_services() -> None:
+    """清空共享实例（用于测试或重新加载配置）"""
+    with _shared_services_lock:
+        _shared_services.clear()
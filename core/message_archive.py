@@ -0,0 +1,406 @@
+"""
+本地消息归档模块
+
+此模块在本地保存写入索引的原始消息字段，使重建索引不再需要重新抓取 Telegram，包括：
+1. 使用嵌入式 SQLite（WAL 模式）按追加方式保存每条消息的每个版本，
+   消息字段序列化为 JSON 后以带预置字典的 deflate 压缩存放
+2. 写入路径（新消息、编辑、历史同步的写入缓冲区）在写入 Meilisearch 之前先写入归档，
+   删除事件与删除对账追加删除标记
+3. 按文档ID分页读取每条消息的最新版本（跳过已删除的消息），
+   reindex_from_archive() 以大批量将归档重新写入 Meilisearch
+
+命令行用法:
+    python -m core.message_archive reindex-from-archive [--batch-size 10000] [--chat-id ID ...]
+    python -m core.message_archive stats
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.models import MeiliMessageDoc
+
+logger = logging.getLogger(__name__)
+
+# 默认路径与批量大小
+DEFAULT_DB_PATH = "config/message_archive.db"
+DEFAULT_REINDEX_BATCH_SIZE = 10000
+
+# 归档格式版本，记录在 PRAGMA user_version 中；压缩字典变化时必须递增
+ARCHIVE_FORMAT_VERSION = 1
+# deflate 预置字典：消息文档的字段名和常见取值，单条消息很短，预置字典能明显提高压缩率
+_ZDICT = (
+    '{"id":"-100","message_id":,"chat_id":-100,"chat_title":"","chat_type":"channel",'
+    '"chat_type":"group","chat_type":"user","sender_id":,"sender_name":"","text":"",'
+    '"date":17,"message_link":"https://t.me/c/"}'
+).encode("utf-8")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_id      TEXT NOT NULL,
+    chat_id     INTEGER NOT NULL,
+    message_id  INTEGER NOT NULL,
+    archived_at INTEGER NOT NULL,
+    payload     BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_archive_doc ON archive (doc_id, seq);
+CREATE INDEX IF NOT EXISTS idx_archive_message ON archive (message_id);
+"""
+
+
+def encode_payload(doc: MeiliMessageDoc) -> bytes:
+    """将消息文档编码为压缩后的归档数据"""
+    raw = json.dumps(doc.model_dump(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=_ZDICT)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def decode_payload(payload: bytes) -> MeiliMessageDoc:
+    """将归档数据解码为消息文档"""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=_ZDICT)
+    raw = decompressor.decompress(payload) + decompressor.flush()
+    return MeiliMessageDoc(**json.loads(raw))
+
+
+def _split_document_id(doc_id: str) -> Tuple[int, int]:
+    """文档ID的格式为 {chat_id}_{message_id}"""
+    chat_id, _, message_id = doc_id.rpartition("_")
+    return int(chat_id), int(message_id)
+
+
+class MessageArchive:
+    """
+    本地消息归档
+
+    archive 表只追加不修改：每次写入追加一行，同一文档以 seq 最大的一行为准，
+    payload 为 NULL 的行是删除标记。内容与最新版本相同的文档不重复追加，
+    历史同步的重叠窗口不会使归档膨胀。
+    所有方法都是线程安全的，可通过 asyncio.to_thread 在事件循环外调用。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH) -> None:
+        """
+        初始化归档
+
+        Args:
+            db_path: SQLite 数据库文件路径
+
+        Raises:
+            RuntimeError: 归档由不兼容的格式版本创建
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"appended": 0, "unchanged": 0, "tombstones": 0}
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version={ARCHIVE_FORMAT_VERSION}")
+        elif version != ARCHIVE_FORMAT_VERSION:
+            self._conn.close()
+            raise RuntimeError(f"不支持的消息归档格式版本 {version}: {db_path}")
+
+    def _latest_payload(self, doc_id: str) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT payload FROM archive WHERE doc_id = ? ORDER BY seq DESC LIMIT 1", (doc_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    # ----------------------- 写入 -----------------------
+    def append(self, docs: Iterable[MeiliMessageDoc]) -> int:
+        """
+        追加消息文档
+
+        Args:
+            docs: 消息文档，同一批内的同一文档以最后一个为准
+
+        Returns:
+            int: 实际追加的行数（与最新版本相同的文档被跳过）
+        """
+        latest: Dict[str, MeiliMessageDoc] = {doc.id: doc for doc in docs}
+        if not latest:
+            return 0
+        now = int(time.time())
+        with self._lock:
+            rows = []
+            for doc in latest.values():
+                payload = encode_payload(doc)
+                if self._latest_payload(doc.id) == payload:
+                    continue
+                rows.append((doc.id, doc.chat_id, doc.message_id, now, payload))
+            if rows:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO archive (doc_id, chat_id, message_id, archived_at, payload) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            self._stats["appended"] += len(rows)
+            self._stats["unchanged"] += len(latest) - len(rows)
+        return len(rows)
+
+    def append_tombstones(self, doc_ids: Iterable[str]) -> int:
+        """
+        为已删除的消息追加删除标记
+
+        Args:
+            doc_ids: 文档ID（{chat_id}_{message_id}）
+
+        Returns:
+            int: 追加的删除标记数（归档中不存在或已删除的文档被跳过）
+        """
+        now = int(time.time())
+        with self._lock:
+            rows = []
+            for doc_id in dict.fromkeys(doc_ids):
+                if self._latest_payload(doc_id) is None:
+                    continue
+                chat_id, message_id = _split_document_id(doc_id)
+                rows.append((doc_id, chat_id, message_id, now))
+            if rows:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO archive (doc_id, chat_id, message_id, archived_at, payload) "
+                        "VALUES (?, ?, ?, ?, NULL)",
+                        rows,
+                    )
+            self._stats["tombstones"] += len(rows)
+        return len(rows)
+
+    def find_document_ids(self, chat_ids: List[int], message_ids: List[int]) -> List[str]:
+        """
+        查找给定聊天范围内具有给定消息ID的文档
+
+        用于只知道消息ID、不知道所属聊天的删除事件（私聊和普通群组）。
+        """
+        if not chat_ids or not message_ids:
+            return []
+        chat_marks = ", ".join("?" * len(chat_ids))
+        message_marks = ", ".join("?" * len(message_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT doc_id FROM archive "
+                f"WHERE message_id IN ({message_marks}) AND chat_id IN ({chat_marks})",
+                [*message_ids, *chat_ids],
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    # ----------------------- 读取 -----------------------
+    def read_latest_page(self, after_doc_id: str = "", limit: int = DEFAULT_REINDEX_BATCH_SIZE,
+                         chat_ids: Optional[List[int]] = None) -> Tuple[List[MeiliMessageDoc], Optional[str]]:
+        """
+        按文档ID顺序读取一页文档的最新版本
+
+        Args:
+            after_doc_id: 上一页返回的游标，首页为空字符串
+            limit: 本页最多扫描的文档数（已删除的文档不返回，因此结果可能少于 limit）
+            chat_ids: 只读取这些聊天的文档，None 表示全部
+
+        Returns:
+            (文档列表, 下一页游标)；没有更多文档时游标为 None
+        """
+        chat_clause = ""
+        params: List[Any] = [after_doc_id]
+        if chat_ids:
+            chat_clause = f" AND chat_id IN ({', '.join('?' * len(chat_ids))})"
+            params.extend(chat_ids)
+        params.append(limit)
+        # 聚合查询中与 MAX() 同行的其它列取自 seq 最大的那一行
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT doc_id, payload, MAX(seq) FROM archive WHERE doc_id > ?{chat_clause} "
+                f"GROUP BY doc_id ORDER BY doc_id LIMIT ?",
+                params,
+            ).fetchall()
+        docs = [decode_payload(payload) for _, payload, _ in rows if payload is not None]
+        next_cursor = rows[-1][0] if len(rows) == limit else None
+        return docs, next_cursor
+
+    def read_documents(self, doc_ids: Iterable[str]) -> List[MeiliMessageDoc]:
+        """
+        读取指定文档的最新版本（已删除或不在归档中的文档被跳过）
+
+        用于重新提交写入失败的索引任务。
+        """
+        with self._lock:
+            payloads = [self._latest_payload(doc_id) for doc_id in dict.fromkeys(doc_ids)]
+        return [decode_payload(payload) for payload in payloads if payload is not None]
+
+    def iter_latest(self, batch_size: int = DEFAULT_REINDEX_BATCH_SIZE,
+                    chat_ids: Optional[List[int]] = None) -> Iterator[List[MeiliMessageDoc]]:
+        """按批迭代归档中所有未删除文档的最新版本"""
+        cursor: Optional[str] = ""
+        while cursor is not None:
+            docs, cursor = self.read_latest_page(cursor, batch_size, chat_ids)
+            if docs:
+                yield docs
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取归档统计信息
+
+        Returns:
+            dict: 包含本进程的 appended、unchanged、tombstones 计数，以及总行数和文件大小
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+        return {
+            **self._stats,
+            "rows": rows,
+            "db_path": self.db_path,
+            "size_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+        }
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# 全局归档实例（由 UserBot 启动时按配置设置）
+_message_archive: Optional[MessageArchive] = None
+
+
+def get_message_archive() -> Optional[MessageArchive]:
+    """获取当前的消息归档；未启用归档时返回 None"""
+    return _message_archive
+
+
+def set_message_archive(archive: Optional[MessageArchive]) -> None:
+    """设置全局消息归档"""
+    global _message_archive
+    _message_archive = archive
+
+
+async def archive_messages(docs: List[MeiliMessageDoc]) -> None:
+    """将消息写入全局归档（未启用时不做任何事）；失败只记录日志，不影响索引写入"""
+    archive = get_message_archive()
+    if archive is None or not docs:
+        return
+    try:
+        await asyncio.to_thread(archive.append, docs)
+    except Exception as e:
+        logger.error(f"写入消息归档失败，{len(docs)} 条消息未归档: {e}")
+
+
+async def archive_deletions(doc_ids: List[str]) -> None:
+    """为已删除的消息在全局归档中追加删除标记（未启用时不做任何事）；失败只记录日志"""
+    archive = get_message_archive()
+    if archive is None or not doc_ids:
+        return
+    try:
+        await asyncio.to_thread(archive.append_tombstones, doc_ids)
+    except Exception as e:
+        logger.error(f"写入消息归档删除标记失败: {e}")
+
+
+async def reindex_from_archive(archive: MessageArchive, meili_service: Any,
+                               batch_size: int = DEFAULT_REINDEX_BATCH_SIZE,
+                               chat_ids: Optional[List[int]] = None) -> int:
+    """
+    将归档中所有未删除消息的最新版本重新写入 Meilisearch
+
+    读取下一页与提交上一页并行进行；每页作为一次批量写入提交，
+    Meilisearch 在后台排队处理，重建速度只受本地磁盘和 Meilisearch 写入速度限制。
+
+    Args:
+        archive: 消息归档
+        meili_service: MeiliSearchService 实例
+        batch_size: 每次批量写入的文档数
+        chat_ids: 只重建这些聊天，None 表示全部
+
+    Returns:
+        int: 提交写入的文档数
+    """
+    batch_size = max(1, batch_size)
+    started = time.monotonic()
+    submitted = 0
+
+    next_page = asyncio.create_task(asyncio.to_thread(archive.read_latest_page, "", batch_size, chat_ids))
+    try:
+        while True:
+            docs, cursor = await next_page
+            if cursor is not None:
+                next_page = asyncio.create_task(
+                    asyncio.to_thread(archive.read_latest_page, cursor, batch_size, chat_ids)
+                )
+            if docs:
+                await meili_service.index_messages_bulk_async(docs)
+                submitted += len(docs)
+                elapsed = max(time.monotonic() - started, 1e-6)
+                logger.info(f"已从归档提交 {submitted} 条消息（{submitted / elapsed:.0f} 条/秒）")
+            if cursor is None:
+                break
+    finally:
+        if not next_page.done():
+            next_page.cancel()
+
+    logger.info(f"归档重建完成，共提交 {submitted} 条消息，用时 {time.monotonic() - started:.1f} 秒")
+    return submitted
+
+
+async def _run_reindex(args: argparse.Namespace) -> None:
+    from core.config_manager import ConfigManager
+    from core.meilisearch_service import MeiliSearchService
+
+    config = ConfigManager()
+    meili_service = MeiliSearchService(
+        host=config.get_env("MEILISEARCH_HOST") or config.get_config("MeiliSearch", "HOST", "http://localhost:7700"),
+        api_key=config.get_env("MEILISEARCH_API_KEY") or config.get_config("MeiliSearch", "API_KEY"),
+        **config.get_meili_http_options()
+    )
+    archive = MessageArchive(args.db or config.get_archive_path())
+    try:
+        await reindex_from_archive(
+            archive, meili_service,
+            batch_size=args.batch_size or config.get_archive_reindex_batch_size(),
+            chat_ids=args.chat_id,
+        )
+    finally:
+        archive.close()
+        await meili_service.aclose()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(prog="python -m core.message_archive", description="本地消息归档")
+    parser.add_argument("--db", help="归档数据库路径，默认使用配置中的 [Archive] path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reindex = subparsers.add_parser("reindex-from-archive", help="从本地归档重建 Meilisearch 消息索引")
+    reindex.add_argument("--batch-size", type=int, help="每次批量写入的文档数，默认使用配置中的 reindex_batch_size")
+    reindex.add_argument("--chat-id", type=int, action="append", help="只重建指定聊天，可重复")
+    subparsers.add_parser("stats", help="显示归档统计信息")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    if args.command == "reindex-from-archive":
+        asyncio.run(_run_reindex(args))
+    else:
+        from core.config_manager import ConfigManager
+
+        archive = MessageArchive(args.db or ConfigManager().get_archive_path())
+        try:
+            print(json.dumps(archive.get_stats(), ensure_ascii=False, indent=2))
+        finally:
+            archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+搜索查询语言模块
+
+此模块解析 Search Bot 的高级搜索语法并生成 Meilisearch 过滤条件，包括：
+1. 使用预编译的正则表达式一次切分查询，识别筛选操作符，其余部分作为关键词
+2. 支持 type:、chat:、from:、date:、before:、after: 以及在操作符前加 "-" 取反
+3. 解析结果按查询字符串缓存，且过滤条件字典是规范化的（值排序、去重），
+   语义相同的查询得到相同的缓存键
+4. 类型化的过滤条件语法树（In / Range / Not / And），编译为唯一的规范 Meilisearch 过滤字符串
+5. 聊天ID集合的 IN 过滤条件按集合缓存，常用的聊天集合（如全部白名单群组）无需重复生成
+6. 在进程内对单条消息文档求值语法树，并把关键词拆分为匹配用的词（用于实时搜索）
+"""
+
+import copy
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# 可识别的聊天类型
+CHAT_TYPES = ("user", "group", "channel")
+
+# 查询切分：可取反的 "操作符:值"（值可加双引号）、双引号短语或普通词
+_TOKEN_PATTERN = re.compile(r'(-?)([a-zA-Z]+):(?:"([^"]*)"|(\S+))|"[^"]*"|\S+')
+_DATE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:_(\d{4}-\d{2}-\d{2}))?$")
+_INT_PATTERN = re.compile(r"^-?\d+$")
+
+# 操作符 -> (过滤条件字典中的键, 取反时的键)
+_SET_OPERATORS = {
+    "type": ("chat_type", "exclude_chat_type"),
+    "chat": ("chat_id", "exclude_chat_id"),
+    "from": ("sender_id", "exclude_sender_id"),
+}
+
+# 解析缓存的最大查询数
+PARSE_CACHE_SIZE = 1024
+# 聊天ID集合过滤条件缓存的最大集合数
+CHAT_ID_FILTER_CACHE_SIZE = 256
+
+
+class In(NamedTuple):
+    """字段取值属于给定集合"""
+    field: str
+    values: Tuple[Union[int, str], ...]
+
+
+class Range(NamedTuple):
+    """字段与数值比较，op 为 >=、<=、>、<"""
+    field: str
+    op: str
+    value: int
+
+
+class Not(NamedTuple):
+    """取反"""
+    node: Any
+
+
+class And(NamedTuple):
+    """全部子条件同时满足"""
+    children: Tuple[Any, ...]
+
+
+FilterNode = Union[In, Range, Not, And]
+
+
+def _day_start(date_str: str) -> int:
+    """日期当天 00:00:00 的本地 Unix 时间戳"""
+    return int(datetime.strptime(date_str, "%Y-%m-%d").timestamp())
+
+
+def _day_end(date_str: str) -> int:
+    """日期当天 23:59:59 的本地 Unix 时间戳"""
+    return int((datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)).timestamp()) - 1
+
+
+def _parse_set_value(operator: str, value: str) -> Optional[Union[int, str]]:
+    """解析集合操作符的值，无效时返回 None"""
+    if operator == "type":
+        value = value.lower()
+        return value if value in CHAT_TYPES else None
+    # chat: 和 from: 只接受数字ID
+    return int(value) if _INT_PATTERN.match(value) else None
+
+
+def _parse_date_value(operator: str, value: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    解析日期操作符的值，返回 (start, end)，无效时返回 None
+
+    date:起始[_结束] 包含首尾两天；after:日期 包含当天；before:日期 不包含当天。
+    只给出起始日期时不设上限（而不是截止到 "今天"），因此解析结果可以长期缓存。
+    """
+    match = _DATE_PATTERN.match(value)
+    if not match:
+        return None
+    try:
+        if operator == "date":
+            start = _day_start(match.group(1))
+            end = _day_end(match.group(2)) if match.group(2) else None
+            return start, end
+        if match.group(2):
+            return None
+        if operator == "after":
+            return _day_start(match.group(1)), None
+        return None, _day_start(match.group(1)) - 1
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_query_cached(query: str) -> Tuple[str, Dict[str, Any]]:
+    """解析查询字符串（结果被缓存，调用方不得修改返回的字典）"""
+    # (词, 是否为无效的 type: 条件)
+    text_tokens: List[Tuple[str, bool]] = []
+    sets: Dict[str, set] = {}
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+    for match in _TOKEN_PATTERN.finditer(query):
+        negated, operator, quoted_value, value = match.groups()
+        operator = operator.lower() if operator else None
+        value = quoted_value if quoted_value is not None else value
+
+        if operator in _SET_OPERATORS:
+            parsed = _parse_set_value(operator, value)
+            if parsed is not None:
+                key = _SET_OPERATORS[operator][1 if negated else 0]
+                sets.setdefault(key, set()).add(parsed)
+                continue
+        elif operator in ("date", "after", "before") and not negated:
+            bounds = _parse_date_value(operator, value)
+            if bounds is not None:
+                # 多个时间条件取交集
+                if bounds[0] is not None:
+                    start = bounds[0] if start is None else max(start, bounds[0])
+                if bounds[1] is not None:
+                    end = bounds[1] if end is None else min(end, bounds[1])
+                continue
+        text_tokens.append((match.group(0), operator == "type"))
+
+    filters: Dict[str, Any] = {key: sorted(values) for key, values in sorted(sets.items())}
+    if start is not None or end is not None:
+        filters["date_range"] = {
+            bound: ts for bound, ts in (("start", start), ("end", end)) if ts is not None
+        }
+    # 与原有语法一致：存在有效的类型条件时，无效的 type: 条件一并移除
+    has_type = "chat_type" in filters or "exclude_chat_type" in filters
+    return " ".join(token for token, invalid_type in text_tokens if not (has_type and invalid_type)), filters
+
+
+def parse_query(query: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    解析高级搜索语法
+
+    支持的语法:
+    - type:类型 (user/group/channel)，chat:聊天ID，from:发送者ID；同一操作符多次出现时为 "或"
+    - 在上述操作符前加 "-" 表示排除，如 -type:channel
+    - date:起始_结束 / date:起始 (YYYY-MM-DD)，after:日期，before:日期；多个时间条件取交集
+    - 其余内容（包括双引号短语和无法识别的操作符）作为关键词原样保留
+
+    Args:
+        query: 原始查询字符串
+
+    Returns:
+        Tuple[str, Dict[str, Any]]: 关键词和规范化的过滤条件字典
+            （键: chat_type、chat_id、sender_id 及对应的 exclude_*、date_range）
+    """
+    text, filters = _parse_query_cached(query)
+    return text, copy.deepcopy(filters)
+
+
+def build_filter_ast(filters: Dict[str, Any]) -> Optional[FilterNode]:
+    """
+    根据过滤条件字典构建语法树
+
+    Args:
+        filters: parse_query 返回的过滤条件字典（chat_type 也可为单个字符串）
+
+    Returns:
+        Optional[FilterNode]: 语法树，没有任何条件时为 None
+    """
+    nodes: List[FilterNode] = []
+    for field in ("chat_type", "chat_id", "sender_id"):
+        for key, negated in ((field, False), (f"exclude_{field}", True)):
+            values = filters.get(key)
+            if not values:
+                continue
+            if isinstance(values, (str, int)):
+                values = [values]
+            node = In(field, tuple(sorted(set(values))))
+            nodes.append(Not(node) if negated else node)
+
+    date_range = filters.get("date_range") or {}
+    if date_range.get("start") is not None:
+        nodes.append(Range("date", ">=", int(date_range["start"])))
+    if date_range.get("end") is not None:
+        nodes.append(Range("date", "<=", int(date_range["end"])))
+
+    if not nodes:
+        return None
+    return nodes[0] if len(nodes) == 1 else And(tuple(nodes))
+
+
+def _format_value(value: Union[int, str]) -> str:
+    """格式化过滤值：字符串统一使用双引号并转义"""
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return str(value)
+
+
+def compile_filter(node: Optional[FilterNode]) -> Optional[str]:
+    """
+    将语法树编译为 Meilisearch 过滤字符串
+
+    同一语法树总是得到同一字符串：单个值编译为 "="，多个值编译为 IN，取反编译为 NOT (...)。
+    """
+    if node is None:
+        return None
+    if isinstance(node, In):
+        if len(node.values) == 1:
+            return f"{node.field} = {_format_value(node.values[0])}"
+        return f"{node.field} IN [{', '.join(_format_value(v) for v in node.values)}]"
+    if isinstance(node, Range):
+        return f"{node.field} {node.op} {node.value}"
+    if isinstance(node, Not):
+        return f"NOT ({compile_filter(node.node)})"
+    if isinstance(node, And):
+        return " AND ".join(compile_filter(child) for child in node.children)
+    raise TypeError(f"未知的过滤条件节点: {node!r}")
+
+
+def build_meilisearch_filter(filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """根据过滤条件字典生成规范的 Meilisearch 过滤字符串，没有条件时返回 None"""
+    return compile_filter(build_filter_ast(filters)) if filters else None
+
+
+@lru_cache(maxsize=CHAT_ID_FILTER_CACHE_SIZE)
+def _chat_id_filter_cached(chat_ids: frozenset) -> str:
+    return compile_filter(In("chat_id", tuple(sorted(chat_ids))))
+
+
+def build_chat_id_filter(chat_ids: Iterable[int]) -> Optional[str]:
+    """
+    生成聊天ID集合的过滤条件
+
+    多个ID编译为一个 chat_id IN [...]，而不是逐个 OR 连接，过滤字符串更短，
+    Meilisearch 解析和求值也更快；同一集合（与顺序无关）的结果被缓存。
+
+    Args:
+        chat_ids: 聊天ID
+
+    Returns:
+        Optional[str]: 过滤字符串，集合为空时为 None
+    """
+    key = frozenset(chat_ids)
+    return _chat_id_filter_cached(key) if key else None
+
+
+def match_filter(node: Optional[FilterNode], doc: Any) -> bool:
+    """
+    在进程内判断文档是否满足语法树描述的条件
+
+    与 Meilisearch 对同一过滤字符串的求值结果一致，用于在文档写入时直接匹配，无需查询索引。
+
+    Args:
+        node: 语法树，为 None 时视为没有条件
+        doc: 具有 chat_id、chat_type、sender_id、date 等属性的文档（如 MeiliMessageDoc）
+
+    Returns:
+        bool: 文档是否满足条件
+    """
+    if node is None:
+        return True
+    if isinstance(node, In):
+        return getattr(doc, node.field, None) in node.values
+    if isinstance(node, Range):
+        value = getattr(doc, node.field, None)
+        if value is None:
+            return False
+        if node.op == ">=":
+            return value >= node.value
+        if node.op == "<=":
+            return value <= node.value
+        if node.op == ">":
+            return value > node.value
+        return value < node.value
+    if isinstance(node, Not):
+        return not match_filter(node.node, doc)
+    if isinstance(node, And):
+        return all(match_filter(child, doc) for child in node.children)
+    raise TypeError(f"未知的过滤条件节点: {node!r}")
+
+
+def keyword_terms(text: str) -> Tuple[str, ...]:
+    """
+    将关键词拆分为进程内匹配用的词
+
+    双引号短语作为一个整体，所有词统一 casefold 并去重（保持顺序）。
+
+    Args:
+        text: parse_query 返回的关键词
+
+    Returns:
+        Tuple[str, ...]: 匹配用的词，关键词为空时为空元组
+    """
+    terms: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        term = match.group(0)
+        if len(term) >= 2 and term[0] == term[-1] == '"':
+            term = term[1:-1]
+        term = " ".join(term.split()).casefold()
+        if term and term not in terms:
+            terms.append(term)
+    return tuple(terms)
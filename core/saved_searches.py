@@ -0,0 +1,329 @@
+"""
+已保存搜索（订阅提醒）模块
+
+此模块在写入时对新消息执行已保存的搜索，包括：
+1. 使用嵌入式 SQLite（WAL 模式）按 Bot 用户持久化已保存的搜索
+2. 将全部已保存搜索编译为一个匹配器：所有关键词构成一个 Aho-Corasick 自动机，
+   每条消息只扫描一次，再对关键词全部命中的候选搜索求值 chat_id / chat_type 等过滤条件，
+   单条消息的匹配开销不随已保存搜索的数量线性增长
+3. 写入路径（新消息事件、历史同步的写入缓冲区）写入成功后调用 percolate()，
+   匹配结果放入有界的提醒队列，由 Search Bot 的后台任务发送给对应用户
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from core.aho_corasick import AhoCorasick
+from core.live_search import MATCH_FIELDS, LiveQuery
+from core.models import MeiliMessageDoc
+from core.query_language import match_filter
+
+logger = logging.getLogger(__name__)
+
+# 默认路径
+DEFAULT_DB_PATH = "config/saved_searches.db"
+# 每个用户最多保存的搜索数
+MAX_SAVED_SEARCHES_PER_USER = 50
+# 待发送提醒队列的最大长度
+DEFAULT_ALERT_QUEUE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS saved_searches (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id    INTEGER NOT NULL,
+    query      TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_saved_searches_user ON saved_searches (user_id);
+"""
+
+
+class SavedSearch(NamedTuple):
+    """已保存的搜索"""
+    id: int
+    user_id: int
+    query: str
+    created_at: int
+
+
+class SavedSearchAlert(NamedTuple):
+    """一条消息命中某个用户的一个或多个已保存搜索"""
+    user_id: int
+    doc: MeiliMessageDoc
+    searches: Tuple[SavedSearch, ...]
+
+
+class SavedSearchStore:
+    """
+    已保存搜索的存储
+
+    所有方法都是线程安全的，可通过 asyncio.to_thread 在事件循环外调用。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH) -> None:
+        """
+        初始化存储
+
+        Args:
+            db_path: SQLite 数据库文件路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> SavedSearch:
+        return SavedSearch(row["id"], row["user_id"], row["query"], row["created_at"])
+
+    def add(self, user_id: int, query: str) -> SavedSearch:
+        """保存一个搜索，返回带 ID 的记录"""
+        created_at = int(time.time())
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO saved_searches (user_id, query, created_at) VALUES (?, ?, ?)",
+                (user_id, query, created_at),
+            )
+        return SavedSearch(cursor.lastrowid, user_id, query, created_at)
+
+    def remove(self, user_id: int, search_id: int) -> bool:
+        """
+        删除用户的一个已保存搜索
+
+        Returns:
+            是否存在并已删除（只能删除自己的搜索）
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM saved_searches WHERE id = ? AND user_id = ?", (search_id, user_id)
+            )
+        return cursor.rowcount > 0
+
+    def list_for_user(self, user_id: int) -> List[SavedSearch]:
+        """获取用户的全部已保存搜索，按保存顺序排列"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM saved_searches WHERE user_id = ? ORDER BY id", (user_id,)
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def list_all(self) -> List[SavedSearch]:
+        """获取所有用户的已保存搜索"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM saved_searches ORDER BY id").fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class _CompiledSearches:
+    """全部已保存搜索编译后的只读快照，变更时整体替换"""
+
+    __slots__ = ("searches", "queries", "required_terms", "term_searches", "automaton")
+
+    def __init__(self, searches: List[SavedSearch]) -> None:
+        self.searches = searches
+        self.queries = [LiveQuery(search.query) for search in searches]
+        # 每个搜索需要命中的不同关键词数
+        self.required_terms = [len(query.terms) for query in self.queries]
+
+        # 相同的关键词只进入自动机一次，命中后映射回所有包含它的搜索
+        term_ids: Dict[str, int] = {}
+        self.term_searches: List[List[int]] = []
+        for index, query in enumerate(self.queries):
+            for term in query.terms:
+                term_id = term_ids.setdefault(term, len(term_ids))
+                if term_id == len(self.term_searches):
+                    self.term_searches.append([])
+                self.term_searches[term_id].append(index)
+        self.automaton = AhoCorasick(term_ids)
+
+
+class Percolator:
+    """
+    已保存搜索的匹配器
+
+    add() / remove() 修改存储并重新编译匹配器；percolate() 由写入路径调用，
+    只做内存匹配和非阻塞入队，提醒由 run_notifier() 在后台发送。
+    只提醒在搜索保存之后发送的消息，历史同步写入的旧消息不会触发提醒。
+    """
+
+    def __init__(self, store: SavedSearchStore, alert_queue_size: int = DEFAULT_ALERT_QUEUE_SIZE) -> None:
+        """
+        初始化匹配器并编译已有的搜索
+
+        Args:
+            store: 已保存搜索的存储
+            alert_queue_size: 待发送提醒队列的最大长度，溢出的提醒被丢弃
+        """
+        self.store = store
+        self._alerts: asyncio.Queue = asyncio.Queue(maxsize=max(1, alert_queue_size))
+        self._stats: Dict[str, int] = {"percolated": 0, "alerts": 0, "dropped": 0, "sent": 0, "failed": 0}
+        self._compiled = _CompiledSearches(store.list_all())
+        logger.info(f"已编译 {len(self._compiled.searches)} 个已保存搜索")
+
+    def _recompile(self) -> None:
+        self._compiled = _CompiledSearches(self.store.list_all())
+
+    # ----------------------- 管理 -----------------------
+    def add(self, user_id: int, query: str) -> SavedSearch:
+        """
+        为用户保存一个搜索
+
+        Args:
+            user_id: Bot 用户ID
+            query: 搜索关键词，支持与 /search 相同的高级语法
+
+        Returns:
+            SavedSearch: 新保存的搜索
+
+        Raises:
+            ValueError: 查询不含关键词（只有过滤条件），或用户的搜索数已达上限
+        """
+        if not LiveQuery(query).terms:
+            raise ValueError("已保存的搜索至少需要一个关键词")
+        if len(self.store.list_for_user(user_id)) >= MAX_SAVED_SEARCHES_PER_USER:
+            raise ValueError(f"每个用户最多保存 {MAX_SAVED_SEARCHES_PER_USER} 个搜索")
+        search = self.store.add(user_id, query)
+        self._recompile()
+        logger.info(f"用户 {user_id} 保存了搜索 #{search.id}: '{query}'")
+        return search
+
+    def remove(self, user_id: int, search_id: int) -> bool:
+        """
+        删除用户的已保存搜索
+
+        Returns:
+            是否存在并已删除
+        """
+        removed = self.store.remove(user_id, search_id)
+        if removed:
+            self._recompile()
+            logger.info(f"用户 {user_id} 删除了搜索 #{search_id}")
+        return removed
+
+    def list_for_user(self, user_id: int) -> List[SavedSearch]:
+        """获取用户的全部已保存搜索"""
+        return self.store.list_for_user(user_id)
+
+    # ----------------------- 匹配 -----------------------
+    def match(self, doc: MeiliMessageDoc) -> List[SavedSearch]:
+        """
+        返回文档命中的已保存搜索
+
+        先用自动机一次扫描找出文档中出现的关键词，统计每个搜索命中的关键词数，
+        只有关键词全部命中的搜索才继续求值过滤条件。
+        """
+        compiled = self._compiled
+        if not compiled.searches:
+            return []
+        # 字段之间用换行分隔，关键词不含换行，不会跨字段匹配
+        haystack = "\n".join(getattr(doc, field, None) or "" for field in MATCH_FIELDS).casefold()
+
+        hit_counts: Dict[int, int] = {}
+        for term_id in compiled.automaton.find(haystack):
+            for index in compiled.term_searches[term_id]:
+                hit_counts[index] = hit_counts.get(index, 0) + 1
+
+        matched = []
+        for index, count in hit_counts.items():
+            search = compiled.searches[index]
+            if (count == compiled.required_terms[index] and doc.date >= search.created_at
+                    and match_filter(compiled.queries[index].filter_node, doc)):
+                matched.append(search)
+        matched.sort(key=lambda search: search.id)
+        return matched
+
+    def percolate(self, docs: Iterable[MeiliMessageDoc]) -> int:
+        """
+        对新写入的文档执行全部已保存搜索，并把提醒放入队列
+
+        同一条消息命中同一用户的多个搜索时合并为一条提醒。
+
+        Args:
+            docs: 已成功写入索引的消息文档
+
+        Returns:
+            int: 放入队列的提醒数
+        """
+        if not self._compiled.searches:
+            return 0
+        queued = 0
+        for doc in docs:
+            self._stats["percolated"] += 1
+            by_user: Dict[int, List[SavedSearch]] = {}
+            for search in self.match(doc):
+                by_user.setdefault(search.user_id, []).append(search)
+            for user_id, searches in by_user.items():
+                try:
+                    self._alerts.put_nowait(SavedSearchAlert(user_id, doc, tuple(searches)))
+                    queued += 1
+                except asyncio.QueueFull:
+                    self._stats["dropped"] += 1
+                    if self._stats["dropped"] % 100 == 1:
+                        logger.warning(f"提醒队列已满，累计丢弃 {self._stats['dropped']} 条提醒")
+        self._stats["alerts"] += queued
+        return queued
+
+    async def run_notifier(self, send: Callable[[SavedSearchAlert], Awaitable[None]]) -> None:
+        """
+        持续从队列取出提醒并发送，直到任务被取消
+
+        Args:
+            send: 发送单条提醒的异步函数，抛出的异常只记录日志
+        """
+        while True:
+            alert = await self._alerts.get()
+            try:
+                await send(alert)
+                self._stats["sent"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["failed"] += 1
+                logger.error(f"发送已保存搜索提醒给用户 {alert.user_id} 失败: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取匹配器统计信息
+
+        Returns:
+            dict: 包含 saved_searches、terms、percolated、alerts、sent 等计数
+        """
+        return {
+            **self._stats,
+            "saved_searches": len(self._compiled.searches),
+            "terms": self._compiled.automaton.pattern_count,
+            "pending": self._alerts.qsize(),
+        }
+
+
+# 全局匹配器实例（由 Search Bot 启动时设置）
+_percolator: Optional[Percolator] = None
+
+
+def get_percolator() -> Optional[Percolator]:
+    """获取当前的已保存搜索匹配器；Search Bot 未启动时返回 None"""
+    return _percolator
+
+
+def set_percolator(percolator: Optional[Percolator]) -> None:
+    """设置全局已保存搜索匹配器"""
+    global _percolator
+    _percolator = percolator
@@ -0,0 +1,77 @@
+"""
+搜索游标模块
+
+此模块实现基于 (date, chat_id, message_id) 的键集（search-after）分页，包括：
+1. 游标的编码与解码，对调用方而言是不透明的 URL 安全令牌
+2. 根据游标生成 "排在该条之后" 的 Meilisearch 过滤条件
+3. 键集分页使用的排序规则
+
+每一页都从 offset 0 开始查询并用过滤条件跳过已返回的结果，
+因此第 N+1 页与第 1 页的开销相同，也不受 Meilisearch maxTotalHits（默认 1000）限制。
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, NamedTuple
+
+
+class InvalidCursorError(ValueError):
+    """游标令牌无法解析"""
+
+
+class KeysetPaginationUnavailableError(ValueError):
+    """消息索引当前的排序规则无法保证键集分页的顺序，需改用页码分页"""
+
+
+class SearchCursor(NamedTuple):
+    """键集分页游标：上一页最后一条结果的排序键"""
+    date: int
+    chat_id: int
+    message_id: int
+    descending: bool = True
+
+    @classmethod
+    def from_hit(cls, hit: Dict[str, Any], descending: bool = True) -> "SearchCursor":
+        """根据搜索结果中的一条文档生成游标"""
+        return cls(int(hit["date"]), int(hit["chat_id"]), int(hit["message_id"]), descending)
+
+    def encode(self) -> str:
+        """编码为不透明的 URL 安全令牌"""
+        raw = json.dumps(
+            [self.date, self.chat_id, self.message_id, 1 if self.descending else 0],
+            separators=(",", ":")
+        )
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "SearchCursor":
+        """
+        解码游标令牌
+
+        Raises:
+            InvalidCursorError: 令牌格式不正确
+        """
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            date, chat_id, message_id, descending = json.loads(base64.urlsafe_b64decode(padded))
+            return cls(int(date), int(chat_id), int(message_id), bool(descending))
+        except Exception as e:
+            raise InvalidCursorError(f"无效的游标令牌: {token}") from e
+
+    def to_filter(self) -> str:
+        """
+        生成只匹配排在本游标之后的文档的过滤条件
+
+        降序时为 (date, chat_id, message_id) 严格小于游标，升序时为严格大于。
+        """
+        op = "<" if self.descending else ">"
+        return (
+            f"(date {op} {self.date} OR (date = {self.date} AND "
+            f"(chat_id {op} {self.chat_id} OR (chat_id = {self.chat_id} AND message_id {op} {self.message_id}))))"
+        )
+
+
+def keyset_sort(descending: bool = True) -> List[str]:
+    """键集分页的排序规则，(date, chat_id, message_id) 唯一确定一条消息"""
+    direction = "desc" if descending else "asc"
+    return [f"date:{direction}", f"chat_id:{direction}", f"message_id:{direction}"]
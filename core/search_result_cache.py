@@ -0,0 +1,298 @@
+"""
+搜索结果缓存模块
+
+此模块提供进程内共享的搜索结果缓存，供 HTTP API 和 Search Bot 共同使用，包括：
+1. 以规范化的查询词 + 过滤条件 + 分页参数作为缓存键
+2. 条目数量（maxsize）和过期时间（TTL）双重上限
+3. 命中/未命中统计
+4. 按聊天ID或查询词定向失效
+5. 按索引代数校验条目新鲜度：条目记录写入时相关聊天的代数，读取时代数变化即视为过期
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+
+from cachetools import TTLCache
+
+from core.config_manager import ConfigManager
+from core.index_generations import get_index_generations
+
+logger = logging.getLogger(__name__)
+
+# 默认参数
+DEFAULT_MAXSIZE = 1000
+DEFAULT_TTL = 7200
+
+
+class _CacheEntry(NamedTuple):
+    """缓存条目：值及用于定向失效的元数据"""
+    value: Any
+    namespace: str
+    query: str
+    # None 表示结果可能来自任意聊天
+    chat_ids: Optional[FrozenSet[int]]
+    # 写入时相关聊天的索引代数快照
+    generations: Tuple[Any, ...]
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询词：去除首尾空白、合并连续空白并转为小写"""
+    return " ".join(query.split()).lower()
+
+
+class SearchResultCache:
+    """
+    共享搜索结果缓存
+
+    不同调用方通过 namespace 区分各自的缓存格式（例如 "api" 缓存单页结果，
+    "bot" 缓存完整结果列表），但共享同一个容量上限、TTL 和统计信息。
+
+    由于每个条目都会按索引代数校验，新写入的消息不会被过期结果掩盖，
+    因此 TTL 可以设置得较长，主要用于限制内存占用。
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: int = DEFAULT_TTL, enabled: bool = True) -> None:
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大条目数
+            ttl: 条目过期时间（秒）
+            enabled: 是否启用缓存；禁用时 get 总是未命中，set 不做任何事
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "invalidations": 0,
+            "stale": 0,
+        }
+
+    def configure(self, enabled: bool, ttl: int, maxsize: int) -> None:
+        """
+        更新缓存配置；TTL 或容量变化时清空并重建缓存
+
+        Args:
+            enabled: 是否启用缓存
+            ttl: 条目过期时间（秒）
+            maxsize: 最大条目数
+        """
+        self.enabled = enabled
+        if ttl != self.ttl or maxsize != self.maxsize:
+            self.ttl = ttl
+            self.maxsize = maxsize
+            self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+            logger.info(f"搜索结果缓存已重建: TTL={ttl}s, Maxsize={maxsize}")
+
+    # ----------------------- 键 -----------------------
+    @staticmethod
+    def make_key(namespace: str, query: str, filters: Optional[Dict[str, Any]] = None,
+                 page: Optional[int] = None, hits_per_page: Optional[int] = None) -> str:
+        """
+        生成缓存键
+
+        过滤条件按键排序，列表/集合值也排序，保证等价请求得到相同的键。
+
+        Args:
+            namespace: 调用方命名空间
+            query: 搜索关键词
+            filters: 过滤条件字典，值为 None 的项会被忽略
+            page: 页码
+            hits_per_page: 每页结果数
+        """
+        key_parts = [namespace, normalize_query(query)]
+        for k, v in sorted((filters or {}).items()):
+            if v is None:
+                continue
+            if isinstance(v, (list, set)):
+                key_parts.append(f"{k}:{','.join(sorted(str(item) for item in v))}")
+            else:
+                key_parts.append(f"{k}:{v}")
+        if page is not None:
+            key_parts.append(f"page:{page}")
+        if hits_per_page is not None:
+            key_parts.append(f"hpp:{hits_per_page}")
+        raw_key = "|".join(key_parts)
+        return hashlib.md5(raw_key.encode("utf-8")).hexdigest()
+
+    # ----------------------- 读写 -----------------------
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值，未命中或缓存禁用时返回 None"""
+        if not self.enabled:
+            return None
+        entry = self._cache.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if entry.generations != self.snapshot(entry.chat_ids):
+            # 相关聊天在缓存之后有过写入
+            self._cache.pop(key, None)
+            self._stats["stale"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return entry.value
+
+    @staticmethod
+    def snapshot(chat_ids: Optional[Iterable[int]] = None) -> Tuple[Any, ...]:
+        """
+        获取相关聊天当前的索引代数快照
+
+        调用方可在发起搜索前取快照并传给 set()，避免搜索期间发生的写入被掩盖。
+        """
+        return get_index_generations().snapshot(frozenset(chat_ids) if chat_ids else None)
+
+    def set(self, key: str, value: Any, namespace: str = "", query: str = "",
+            chat_ids: Optional[Iterable[int]] = None,
+            generations: Optional[Tuple[Any, ...]] = None) -> None:
+        """
+        写入缓存
+
+        Args:
+            key: make_key 生成的缓存键
+            value: 要缓存的值
+            namespace: 调用方命名空间
+            query: 原始查询词，用于按查询词失效
+            chat_ids: 结果限定的聊天ID；为 None 表示可能来自任意聊天
+            generations: 搜索前通过 snapshot() 取得的代数快照；为 None 时使用当前快照
+        """
+        if not self.enabled:
+            return
+        chat_set = frozenset(chat_ids) if chat_ids else None
+        self._cache[key] = _CacheEntry(
+            value=value,
+            namespace=namespace,
+            query=normalize_query(query),
+            chat_ids=chat_set,
+            generations=generations if generations is not None else self.snapshot(chat_set),
+        )
+        self._stats["sets"] += 1
+
+    def peek(self, key: str) -> Optional[Any]:
+        """获取仍然新鲜的缓存值，不计入命中统计；未命中或已过期时返回 None"""
+        if not self.enabled:
+            return None
+        entry = self._cache.get(key)
+        if entry is None or entry.generations != self.snapshot(entry.chat_ids):
+            return None
+        return entry.value
+
+    def update(self, key: str, value: Any) -> bool:
+        """
+        替换已有条目的值，保留其元数据和索引代数快照
+
+        用于逐步补全同一次查询的结果（例如后台分块获取），
+        保留原快照可确保补全期间发生的写入仍能使条目失效。
+
+        Returns:
+            bool: 条目不存在或已过期时返回 False，不写入
+        """
+        if not self.enabled:
+            return False
+        entry = self._cache.get(key)
+        if entry is None or entry.generations != self.snapshot(entry.chat_ids):
+            return False
+        self._cache[key] = entry._replace(value=value)
+        return True
+
+    def delete(self, key: str) -> None:
+        """删除单个缓存条目"""
+        self._cache.pop(key, None)
+
+    # ----------------------- 失效 -----------------------
+    def invalidate(self, chat_ids: Optional[Iterable[int]] = None, query: Optional[str] = None) -> int:
+        """
+        定向失效缓存条目
+
+        Args:
+            chat_ids: 失效可能包含这些聊天消息的条目（未限定聊天的条目总会失效）
+            query: 失效查询词包含该子串的条目
+
+        Returns:
+            int: 失效的条目数
+        """
+        if chat_ids is None and query is None:
+            return self.clear()
+
+        target_chats = frozenset(chat_ids) if chat_ids is not None else None
+        target_query = normalize_query(query) if query is not None else None
+
+        stale = []
+        for key, entry in list(self._cache.items()):
+            if target_chats is not None and (entry.chat_ids is None or entry.chat_ids & target_chats):
+                stale.append(key)
+            elif target_query is not None and target_query in entry.query:
+                stale.append(key)
+        for key in stale:
+            self._cache.pop(key, None)
+
+        self._stats["invalidations"] += len(stale)
+        if stale:
+            logger.info(f"搜索结果缓存定向失效 {len(stale)} 条: chat_ids={chat_ids}, query={query}")
+        return len(stale)
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """
+        清空缓存
+
+        Args:
+            namespace: 仅清空该命名空间；为 None 时清空全部
+
+        Returns:
+            int: 清除的条目数
+        """
+        if namespace is None:
+            count = len(self._cache)
+            self._cache.clear()
+        else:
+            keys = [key for key, entry in list(self._cache.items()) if entry.namespace == namespace]
+            for key in keys:
+                self._cache.pop(key, None)
+            count = len(keys)
+        self._stats["invalidations"] += count
+        logger.info(f"搜索结果缓存已清空 {count} 条 (namespace={namespace})")
+        return count
+
+    # ----------------------- 统计 -----------------------
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "currsize": len(self._cache),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "enabled": self.enabled,
+            "generations": get_index_generations().get_stats(),
+        }
+
+
+# 全局缓存实例
+_search_result_cache: Optional[SearchResultCache] = None
+
+
+def get_search_result_cache(config_manager: Optional[ConfigManager] = None) -> SearchResultCache:
+    """
+    获取全局搜索结果缓存实例
+
+    首次调用时若提供 config_manager，则按 [SearchBot] 中的缓存配置创建；
+    之后的调用返回同一实例。
+    """
+    global _search_result_cache
+    if _search_result_cache is None:
+        if config_manager is not None:
+            _search_result_cache = SearchResultCache(
+                maxsize=config_manager.get_search_cache_maxsize(),
+                ttl=config_manager.get_search_cache_ttl(),
+                enabled=config_manager.get_search_cache_enabled(),
+            )
+        else:
+            _search_result_cache = SearchResultCache()
+        logger.info(f"搜索结果缓存已创建: {_search_result_cache.get_stats()}")
+    return _search_result_cache
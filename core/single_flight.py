@@ -0,0 +1,90 @@
+"""
+请求合并模块
+
+此模块提供 single-flight 请求合并：同一时刻相同键的并发请求只执行一次，
+其余调用方等待同一个进行中的任务并共享结果，包括：
+1. 以调用方给出的键识别相同请求
+2. 执行任务与发起者解耦，单个调用方被取消不会影响其他等待者
+3. 合并次数统计
+4. 进程内共享的搜索请求合并器（API、Search Bot 和 User Bot 的搜索互相合并）
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    并发请求合并器
+
+    只合并同时进行中的请求，不缓存已完成的结果；
+    结果缓存由 SearchResultCache 负责。
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._stats: Dict[str, int] = {
+            "calls": 0,
+            "executions": 0,
+            "collapsed": 0,
+        }
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行请求；若相同键的请求正在进行，则等待其结果
+
+        Args:
+            key: 请求键，相同键的并发请求会被合并
+            fn: 实际执行请求的协程工厂，只在没有进行中的相同请求时调用
+
+        Returns:
+            请求结果；所有合并的调用方拿到同一个结果对象（或同一个异常）
+        """
+        self._stats["calls"] += 1
+        loop_key = (id(asyncio.get_running_loop()), key)
+
+        task = self._inflight.get(loop_key)
+        if task is not None:
+            self._stats["collapsed"] += 1
+            logger.debug(f"合并进行中的请求: {key}")
+        else:
+            self._stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[loop_key] = task
+            task.add_done_callback(lambda t: self._on_done(loop_key, t))
+
+        # shield: 单个调用方被取消时任务继续执行，其他等待者仍能拿到结果
+        return await asyncio.shield(task)
+
+    def _on_done(self, loop_key: Hashable, task: asyncio.Task) -> None:
+        """任务结束后移除进行中记录，并取走异常避免 "never retrieved" 警告"""
+        if self._inflight.get(loop_key) is task:
+            del self._inflight[loop_key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        calls = self._stats["calls"]
+        return {
+            **self._stats,
+            "in_flight": len(self._inflight),
+            "collapse_rate": round(self._stats["collapsed"] / calls, 4) if calls else 0.0,
+        }
+
+
+# 全局搜索请求合并器（同一进程内所有 MeiliSearchService 实例共享）
+_search_flight: Optional[SingleFlight] = None
+
+
+def get_search_flight() -> SingleFlight:
+    """获取全局搜索请求合并器实例"""
+    global _search_flight
+    if _search_flight is None:
+        _search_flight = SingleFlight()
+    return _search_flight
@@ -0,0 +1,277 @@
+"""
+同步状态存储模块
+
+此模块使用嵌入式 SQLite（WAL 模式）持久化每个聊天的同步状态，包括：
+1. HistorySyncer 的双光标（cutoff_id / last_newest_id / next_oldest_id 等）
+2. 单个聊天并行回溯时各消息ID区间的独立光标
+3. SyncPointManager 的同步点与同步状态信息
+4. 以单行 UPSERT 更新单个聊天，不再整体重写文件
+5. 首次启动时一次性迁移旧的 config/sync_points.json
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认路径
+DEFAULT_DB_PATH = "config/sync_state.db"
+LEGACY_JSON_PATH = "config/sync_points.json"
+
+# 光标字段（与 HistorySyncer.state 的键一致）
+CURSOR_FIELDS = ("cutoff_ts", "cutoff_id", "last_newest_id", "next_oldest_id", "overlap")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    chat_id        INTEGER PRIMARY KEY,
+    cutoff_ts      INTEGER,
+    cutoff_id      INTEGER,
+    last_newest_id INTEGER,
+    next_oldest_id INTEGER,
+    overlap        INTEGER,
+    sync_point     TEXT,
+    updated_at     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS backfill_ranges (
+    chat_id  INTEGER NOT NULL,
+    range_id INTEGER NOT NULL,
+    low      INTEGER NOT NULL,
+    next_id  INTEGER NOT NULL,
+    PRIMARY KEY (chat_id, range_id)
+);
+"""
+
+
+class SyncStateStore:
+    """
+    同步状态存储
+
+    每个聊天对应 sync_state 表中的一行：光标字段为独立列，
+    SyncPointManager 的同步点信息以 JSON 存放在 sync_point 列。
+    所有方法都是线程安全的，可通过 asyncio.to_thread 在事件循环外调用。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, legacy_json_path: Optional[str] = LEGACY_JSON_PATH) -> None:
+        """
+        初始化状态存储
+
+        Args:
+            db_path: SQLite 数据库文件路径
+            legacy_json_path: 旧版 JSON 状态文件路径；存在时迁移一次后重命名为 *.migrated
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # isolation_level=None：由我们显式控制事务
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 足以保证崩溃后一致，且提交时无需 fsync
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        if legacy_json_path:
+            self._migrate_legacy_json(legacy_json_path)
+
+    # ----------------------- 迁移 -----------------------
+    def _migrate_legacy_json(self, path: str) -> None:
+        """
+        从旧版 JSON 文件导入状态
+
+        兼容两种格式：HistorySyncer 的 {chat_id: {...光标}}，
+        以及 SyncPointManager 的 {"sync_points": {chat_id: {...}}, "updated_at": ...}。
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"读取旧版状态文件 {path} 失败，跳过迁移: {e}")
+            return
+        if not isinstance(data, dict):
+            logger.warning(f"旧版状态文件 {path} 格式错误，跳过迁移")
+            return
+
+        cursors = 0
+        sync_points = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key, value in data.items():
+                    if key == "sync_points" and isinstance(value, dict):
+                        for chat_id_str, point in value.items():
+                            self._upsert_sync_point(int(chat_id_str), point)
+                            sync_points += 1
+                    elif isinstance(value, dict) and key.lstrip("-").isdigit():
+                        self._upsert_cursor(int(key), value)
+                        cursors += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                logger.error(f"迁移旧版状态文件 {path} 失败", exc_info=True)
+                return
+
+        os.replace(path, f"{path}.migrated")
+        logger.info(f"已从 {path} 迁移 {cursors} 个聊天光标和 {sync_points} 个同步点到 {self.db_path}")
+
+    # ----------------------- 光标 -----------------------
+    def _upsert_cursor(self, chat_id: int, state: Dict[str, Any]) -> None:
+        values = [state.get(field, 0) or 0 for field in CURSOR_FIELDS]
+        self._conn.execute(
+            """
+            INSERT INTO sync_state (chat_id, cutoff_ts, cutoff_id, last_newest_id, next_oldest_id, overlap, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                cutoff_ts = excluded.cutoff_ts,
+                cutoff_id = excluded.cutoff_id,
+                last_newest_id = excluded.last_newest_id,
+                next_oldest_id = excluded.next_oldest_id,
+                overlap = excluded.overlap,
+                updated_at = excluded.updated_at
+            """,
+            (chat_id, *values, int(time.time())),
+        )
+
+    def get_cursor(self, chat_id: int) -> Optional[Dict[str, Any]]:
+        """
+        获取聊天的同步光标
+
+        Returns:
+            与 HistorySyncer.state 格式一致的字典；尚未保存过光标时返回 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sync_state WHERE chat_id = ? AND last_newest_id IS NOT NULL", (chat_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"chat_id": chat_id, **{field: row[field] for field in CURSOR_FIELDS}}
+
+    def save_cursor(self, chat_id: int, state: Dict[str, Any],
+                    ranges: Optional[List[Dict[str, int]]] = None) -> None:
+        """
+        保存聊天的同步光标（单行 UPSERT，不影响其他聊天）
+
+        Args:
+            chat_id: 聊天ID
+            state: 包含 CURSOR_FIELDS 的状态字典
+            ranges: 回溯区间列表（见 get_ranges）；提供时在同一事务中替换该聊天的全部区间
+        """
+        with self._lock:
+            if ranges is None:
+                self._upsert_cursor(chat_id, state)
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._upsert_cursor(chat_id, state)
+                self._conn.execute("DELETE FROM backfill_ranges WHERE chat_id = ?", (chat_id,))
+                self._conn.executemany(
+                    "INSERT INTO backfill_ranges (chat_id, range_id, low, next_id) VALUES (?, ?, ?, ?)",
+                    [(chat_id, r["id"], r["low"], r["next"]) for r in ranges],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_ranges(self, chat_id: int) -> List[Dict[str, int]]:
+        """
+        获取聊天未完成的回溯区间
+
+        Returns:
+            区间列表，每项为 {"id", "low", "next"}：区间覆盖 low < message_id < next，
+            按 next 从大到小回溯
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT range_id, low, next_id FROM backfill_ranges WHERE chat_id = ? ORDER BY range_id",
+                (chat_id,),
+            ).fetchall()
+        return [{"id": row["range_id"], "low": row["low"], "next": row["next_id"]} for row in rows]
+
+    # ----------------------- 同步点 -----------------------
+    def _upsert_sync_point(self, chat_id: int, sync_point: Dict[str, Any]) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO sync_state (chat_id, sync_point, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                sync_point = excluded.sync_point,
+                updated_at = excluded.updated_at
+            """,
+            (chat_id, json.dumps(sync_point, ensure_ascii=False), int(time.time())),
+        )
+
+    def get_sync_point(self, chat_id: int) -> Optional[Dict[str, Any]]:
+        """获取聊天的同步点信息，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sync_point FROM sync_state WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        if row is None or row["sync_point"] is None:
+            return None
+        return json.loads(row["sync_point"])
+
+    def save_sync_point(self, chat_id: int, sync_point: Dict[str, Any]) -> None:
+        """保存聊天的同步点信息"""
+        with self._lock:
+            self._upsert_sync_point(chat_id, sync_point)
+
+    def delete_sync_point(self, chat_id: int) -> bool:
+        """
+        删除聊天的同步点信息（光标保留）
+
+        Returns:
+            是否存在并已删除
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE sync_state SET sync_point = NULL, updated_at = ? "
+                "WHERE chat_id = ? AND sync_point IS NOT NULL",
+                (int(time.time()), chat_id),
+            )
+        return cursor.rowcount > 0
+
+    def get_all_sync_points(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有同步点信息，键为字符串形式的聊天ID"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chat_id, sync_point FROM sync_state WHERE sync_point IS NOT NULL"
+            ).fetchall()
+        return {str(row["chat_id"]): json.loads(row["sync_point"]) for row in rows}
+
+    def reset_all_sync_points(self) -> None:
+        """清空所有同步点信息（光标保留）"""
+        with self._lock:
+            self._conn.execute("UPDATE sync_state SET sync_point = NULL, updated_at = ?", (int(time.time()),))
+
+    # ----------------------- 生命周期 -----------------------
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+# 全局状态存储实例
+_sync_state_store: Optional[SyncStateStore] = None
+
+
+def get_sync_state_store(db_path: str = DEFAULT_DB_PATH) -> SyncStateStore:
+    """
+    获取全局同步状态存储实例
+
+    首次调用时创建（并迁移旧版 JSON 文件）；之后的调用返回同一实例，db_path 被忽略。
+    """
+    global _sync_state_store
+    if _sync_state_store is None:
+        _sync_state_store = SyncStateStore(db_path)
+    return _sync_state_store
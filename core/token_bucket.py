@@ -0,0 +1,107 @@
+"""
+令牌桶限流模块
+
+此模块提供全局共享的异步令牌桶，包括：
+1. 按固定速率补充令牌，允许一定突发
+2. 在请求前异步等待可用令牌
+3. 收到 FloodWait 时冻结整个令牌桶，所有使用者一起退避
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    异步令牌桶
+
+    Telegram 的限流是账号级别的，因此所有聊天的同步请求共享同一个令牌桶。
+    stall() 会让所有等待者暂停到指定时间之后。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（最大突发请求数），默认与 rate 相同
+        """
+        self.rate = max(0.01, rate)
+        self.capacity = max(1.0, capacity if capacity is not None else self.rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._stalled_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+        self._stats: Dict[str, float] = {
+            "acquired": 0,
+            "stalls": 0,
+            "stalled_seconds": 0.0,
+        }
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        获取令牌，不足或处于冻结期时等待
+
+        Args:
+            tokens: 本次请求消耗的令牌数
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # 按到达顺序排队，避免后来的请求插队
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._stalled_until:
+                    await asyncio.sleep(self._stalled_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self._stats["acquired"] += 1
+                    return
+
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def stall(self, seconds: float) -> None:
+        """
+        冻结令牌桶（通常在收到 FloodWait 时调用）
+
+        Args:
+            seconds: 冻结时长（秒）
+        """
+        until = time.monotonic() + seconds
+        if until > self._stalled_until:
+            self._stalled_until = until
+            # 冻结结束后从空桶开始，避免立即突发
+            self._tokens = 0.0
+            self._updated_at = until
+            self._stats["stalls"] += 1
+            self._stats["stalled_seconds"] += seconds
+            logger.warning(f"令牌桶已冻结 {seconds}s")
+
+    def stalled_for(self) -> float:
+        """返回剩余冻结时间（秒），未冻结时为 0"""
+        return max(0.0, self._stalled_until - time.monotonic())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取令牌桶统计信息"""
+        return {
+            **self._stats,
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "stalled_for": round(self.stalled_for(), 2),
+        }
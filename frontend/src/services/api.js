@@ -76,6 +76,50 @@ export const searchMessages = async (query, filters = {}, page = 1, hitsPerPage
   });
 };
 
+/**
+ * 批量搜索API - 在一次请求中同时搜索消息和会话，调用后端/api/v1/multi-search端点
+ * @param {Array} messages - 消息查询列表，如 [{query, chat_types, page, hits_per_page}]
+ * @param {Array} sessions - 会话查询列表，如 [{query, session_types, page, limit}]
+ * @returns {Promise} - {messages: [...], sessions: [...]}，与查询按顺序一一对应
+ */
+export const multiSearch = async (messages = [], sessions = []) => {
+  return apiRequest('/api/v1/multi-search', {
+    method: 'POST',
+    body: JSON.stringify({ messages, sessions })
+  });
+};
+
+/**
+ * 结果分布API - 统计匹配结果在聊天、聊天类型、发送者上的数量和时间直方图，调用后端/api/v1/search/facets端点
+ * @param {string} query - 搜索关键词
+ * @param {Object} filters - 过滤条件 {start_timestamp, end_timestamp, chat_types, chat_ids}
+ * @param {string} interval - 直方图桶宽度: 'day' | 'week' | 'month'
+ * @returns {Promise} - {totalHits, facets: {chat_id, chat_type, sender_id}, histogram: {interval, buckets, truncated}}
+ */
+export const getSearchFacets = async (query, filters = {}, interval = 'month') => {
+  return apiRequest('/api/v1/search/facets', {
+    method: 'POST',
+    body: JSON.stringify({ query, ...filters, interval })
+  });
+};
+
+/**
+ * 实时搜索API - 通过 Server-Sent Events 订阅/api/v1/search/live，新写入的匹配消息到达时回调
+ * @param {string} query - 搜索关键词
+ * @param {Object} filters - 过滤条件 {chat_types, chat_ids}
+ * @param {Function} onMessage - 收到匹配消息时的回调，参数与搜索结果项相同
+ * @returns {EventSource} - 调用 close() 取消订阅
+ */
+export const subscribeLiveSearch = (query, filters = {}, onMessage) => {
+  const params = new URLSearchParams({ query });
+  (filters.chat_types || []).forEach((chatType) => params.append('chat_types', chatType));
+  (filters.chat_ids || []).forEach((chatId) => params.append('chat_ids', chatId));
+
+  const source = new EventSource(`${API_BASE_URL}/api/v1/search/live?${params.toString()}`);
+  source.addEventListener('message', (event) => onMessage(JSON.parse(event.data)));
+  return source;
+};
+
 /**
  * 白名单API - 获取白名单列表
  * @returns {Promise} - 白名单数据Promise
@@ -247,6 +291,120 @@ export const clearAllCache = async () => {
   }
 };
 
+/**
+ * 索引API - 启动消息索引的零停机重建
+ * @param {number} batchSize - 写入影子索引的单批文档数
+ * @param {boolean} keepOldIndex - 交换后是否保留旧索引
+ * @returns {Promise} - 重建进度Promise
+ */
+export const startIndexRebuild = async (batchSize = 10000, keepOldIndex = false) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/v1/admin/index/rebuild`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        batch_size: batchSize,
+        keep_old_index: keepOldIndex
+      }),
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(
+        errorData.detail || `启动索引重建失败 (${response.status}: ${response.statusText})`
+      );
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('启动索引重建API调用失败:', error);
+    throw error;
+  }
+};
+
+/**
+ * 索引API - 获取最近一次索引重建的进度
+ * @returns {Promise} - 重建进度Promise
+ */
+export const getIndexRebuildProgress = async () => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/v1/admin/index/rebuild`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(
+        errorData.detail || `获取索引重建进度失败 (${response.status}: ${response.statusText})`
+      );
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('获取索引重建进度API调用失败:', error);
+    throw error;
+  }
+};
+
+/**
+ * 索引API - 获取写入任务跟踪状态（积压、背压和失败的任务）
+ * @returns {Promise} - 任务跟踪状态Promise
+ */
+export const getIndexTaskStatus = async () => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/v1/admin/index/tasks`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(
+        errorData.detail || `获取写入任务状态失败 (${response.status}: ${response.statusText})`
+      );
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('获取写入任务状态API调用失败:', error);
+    throw error;
+  }
+};
+
+/**
+ * 索引API - 从本地归档重新提交失败的写入任务
+ * @returns {Promise} - 重新提交结果Promise
+ */
+export const retryFailedIndexTasks = async () => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/v1/admin/index/tasks/retry`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(
+        errorData.detail || `重新提交失败的写入任务失败 (${response.status}: ${response.statusText})`
+      );
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('重新提交失败的写入任务API调用失败:', error);
+    throw error;
+  }
+};
+
 /**
  * Dialogs API - 获取用户会话列表
  * @param {number} page - 当前页码，从1开始
@@ -328,12 +486,19 @@ export const getChatOldestSyncTimestamp = async (chatId) => {
 
 export default {
   searchMessages,
+  multiSearch,
+  getSearchFacets,
+  subscribeLiveSearch,
   getWhitelist,
   addToWhitelist,
   removeFromWhitelist,
   getCacheTypes,
   clearCacheTypes,
   clearAllCache,
+  startIndexRebuild,
+  getIndexRebuildProgress,
+  getIndexTaskStatus,
+  retryFailedIndexTasks,
   getDialogs,
   getCacheStatus,
   refreshCache,
@@ -20,6 +20,7 @@ from search_bot.bot import SearchBot
 from api.main import app as fastapi_app
 from core.shutdown_manager import get_shutdown_manager
 from core.async_task_manager import get_task_manager
+from core.meilisearch_service import close_shared_meilisearch_services
 
 # 全局变量，存储客户端实例，用于在程序退出时确保它们被断开连接
 user_bot_client: Optional[UserBotClient] = None
@@ -133,6 +134,12 @@ async def shutdown_clients() -> None:
                 logger.debug(f"强制取消任务: {name}")
                 task.cancel()
 
+    # 所有组件停止后关闭共享的 Meilisearch 连接池（各组件不单独关闭）
+    try:
+        await close_shared_meilisearch_services()
+    except Exception as e:
+        logger.error(f"关闭 Meilisearch 连接池时出错: {str(e)}")
+
 async def restart_userbot_task() -> None:
     """
     监听重启事件并重启User Bot任务
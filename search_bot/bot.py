@@ -5,6 +5,7 @@ Search Bot 客户端模块
 1. 初始化和管理 Telethon 客户端（使用 Bot Token 认证）
 2. 注册命令处理器和回调查询处理器
 3. 启动客户端服务响应用户交互
+4. 在后台发送已保存搜索的新消息提醒
 """
 
 import os
@@ -15,15 +16,18 @@ from typing import Optional
 import asyncio
 
 from telethon import TelegramClient
-from telethon.errors import ApiIdInvalidError, AuthKeyUnregisteredError
+from telethon.errors import ApiIdInvalidError, AuthKeyUnregisteredError, FloodWaitError
 from telethon.tl.types import BotCommand
 from telethon.tl.functions.bots import SetBotCommandsRequest
 from telethon.tl.types import BotCommandScopeDefault
 
 from core.config_manager import ConfigManager
-from core.meilisearch_service import MeiliSearchService
+from core.meilisearch_service import get_shared_meilisearch_service
+from core.saved_searches import Percolator, SavedSearchAlert, SavedSearchStore, set_percolator
+from core.token_bucket import TokenBucket
 from search_bot.command_handlers import CommandHandlers
 from search_bot.callback_query_handlers import CallbackQueryHandlers
+from search_bot.message_formatters import format_saved_search_alert
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -31,11 +35,17 @@ logger = logging.getLogger(__name__)
 # 会话文件目录
 SESSIONS_DIR = ".sessions"
 
+# 已保存搜索提醒的发送速率（每秒消息数），低于 Bot API 的全局限制
+ALERT_MESSAGES_PER_SECOND = 20.0
+
 # 默认命令列表，用于设置Telegram Bot的快捷命令
 DEFAULT_COMMANDS = [
     BotCommand(command="start", description="欢迎使用并显示帮助信息"),
     BotCommand(command="help", description="显示帮助信息"),
     BotCommand(command="search", description="搜索消息，支持高级语法"),
+    BotCommand(command="watch", description="保存搜索，新消息匹配时通知"),
+    BotCommand(command="watches", description="查看已保存的搜索"),
+    BotCommand(command="unwatch", description="删除已保存的搜索"),
     BotCommand(command="get_dialogs", description="获取用户所有对话列表 (管理员)"),
     BotCommand(command="add_whitelist", description="添加用户/群组到白名单 (管理员)"),
     BotCommand(command="remove_whitelist", description="从白名单移除用户/群组 (管理员)"),
@@ -117,12 +127,16 @@ class SearchBot:
         logger.info(f"初始化 Search Bot TelegramClient，会话文件: {session_path}")
         self.client = TelegramClient(session_path, api_id, api_hash)
         
-        # 初始化 MeiliSearch 服务
+        # 获取进程内共享的 MeiliSearch 服务（与 UserBot、API 共用同一实例）
         meili_host = self.config_manager.get_env("MEILISEARCH_HOST") or \
                      self.config_manager.get_config("MeiliSearch", "HOST", "http://localhost:7700")
         meili_api_key = self.config_manager.get_env("MEILISEARCH_API_KEY") or \
                         self.config_manager.get_config("MeiliSearch", "API_KEY")
-        self.meilisearch_service = MeiliSearchService(meili_host, meili_api_key)
+        self.meilisearch_service = get_shared_meilisearch_service(
+            meili_host,
+            meili_api_key,
+            **self.config_manager.get_meili_http_options()
+        )
         
         # 获取管理员 ID 列表
         admin_ids_str = self.config_manager.get_env("ADMIN_IDS") or \
@@ -132,6 +146,11 @@ class SearchBot:
         # 初始化事件处理器（在注册前不实例化）
         self.command_handlers = None
         self.callback_query_handlers = None
+
+        # 已保存搜索匹配器在注册事件处理器时创建，提醒由后台任务发送
+        self.percolator: Optional[Percolator] = None
+        self._alert_task: Optional[asyncio.Task] = None
+        self._alert_bucket = TokenBucket(ALERT_MESSAGES_PER_SECOND)
     
     def _ensure_sessions_dir_exists(self) -> None:
         """
@@ -146,15 +165,20 @@ class SearchBot:
         """
         注册所有事件处理器
         
-        初始化并注册命令处理器和回调查询处理器
+        初始化并注册命令处理器和回调查询处理器，
+        并创建写入路径共用的已保存搜索匹配器
         """
+        self.percolator = Percolator(SavedSearchStore())
+        set_percolator(self.percolator)
+
         # 初始化命令处理器和回调查询处理器
         self.command_handlers = CommandHandlers(
             client=self.client,
             meilisearch_service=self.meilisearch_service,
             config_manager=self.config_manager,
             admin_ids=self.admin_ids,
-            userbot_restart_event=self.userbot_restart_event
+            userbot_restart_event=self.userbot_restart_event,
+            percolator=self.percolator
         )
         
         self.callback_query_handlers = CallbackQueryHandlers(
@@ -206,6 +230,11 @@ class SearchBot:
             
             # 设置Bot命令列表
             await self.set_bot_commands()
+
+            # 启动已保存搜索提醒的发送任务
+            self._alert_task = asyncio.create_task(
+                self.percolator.run_notifier(self._send_saved_search_alert), name="saved_search_alerts"
+            )
             
             # 保持运行直到断开连接
             await self.client.run_until_disconnected()
@@ -227,12 +256,36 @@ class SearchBot:
             # 确保客户端断开连接
             await self.disconnect()
     
+    async def _send_saved_search_alert(self, alert: SavedSearchAlert) -> None:
+        """发送一条已保存搜索提醒，遇到 FloodWait 时冻结令牌桶后重试一次"""
+        message = format_saved_search_alert(alert.doc, alert.searches)
+        for attempt in range(2):
+            await self._alert_bucket.acquire()
+            try:
+                await self.client.send_message(alert.user_id, message, parse_mode='md', link_preview=False)
+                return
+            except FloodWaitError as e:
+                logger.warning(f"发送已保存搜索提醒触发 FloodWait，等待 {e.seconds} 秒")
+                self._alert_bucket.stall(e.seconds)
+                if attempt:
+                    raise
+
     async def disconnect(self) -> None:
         """
         断开与 Telegram 服务器的连接
         
         在应用程序结束时调用，确保优雅地关闭连接
         """
+        if self._alert_task and not self._alert_task.done():
+            self._alert_task.cancel()
+            try:
+                await self._alert_task
+            except asyncio.CancelledError:
+                pass
+        set_percolator(None)
+        if self.percolator is not None:
+            self.percolator.store.close()
+
         if self.client and self.client.is_connected():
             logger.info("断开 Search Bot 连接...")
             try:
@@ -251,6 +304,7 @@ class SearchBot:
                     logger.error(f"强制断开 Search Bot 连接也失败: {str(force_e)}")
         elif self.client:
             logger.info("Search Bot 已经断开连接")
+        # Meilisearch 连接池与 User Bot、API 共享，由进程退出时统一关闭
 
 
 # 主程序入口
@@ -1,9 +1,7 @@
-import hashlib
-import json
-from typing import Optional, Any, Dict, Tuple
+from typing import Optional, Any, Dict, List, Tuple
 
-from cachetools import TTLCache
 from core.config_manager import ConfigManager
+from core.search_result_cache import SearchResultCache, get_search_result_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,50 +10,72 @@ logger = logging.getLogger(__name__)
 # (data, is_partial, total_hits, timestamp_of_full_fetch_start_if_any)
 CacheEntry = Tuple[Any, bool, Optional[int], Optional[float]]
 
+# 在共享搜索结果缓存中的命名空间
+CACHE_NAMESPACE = "bot"
+
+
+def _chat_ids_from_filters(filters: Optional[Dict[str, Any]]) -> Optional[List[int]]:
+    """
+    从过滤条件字典中取出结果限定的聊天ID
+
+    只有 chat: 条件能限定结果来自哪些聊天；没有该条件时返回 None（结果可能来自任意聊天）。
+    """
+    if not filters:
+        return None
+    chat_ids = filters.get("chat_id")
+    if isinstance(chat_ids, int):
+        return [chat_ids]
+    return list(chat_ids) if chat_ids else None
+
 
 class SearchCacheService:
     """
     管理搜索结果缓存的服务。
+
+    条目存放在与 HTTP API 共享的 SearchResultCache 中（命名空间 "bot"），
+    因此容量、TTL、命中统计和失效操作对两者一致。
     """
-    def __init__(self, config_manager: ConfigManager, maxsize: int = 200):
+    def __init__(self, config_manager: ConfigManager, maxsize: Optional[int] = None):
         """
         初始化缓存服务。
 
         Args:
             config_manager: 配置管理器实例。
-            maxsize: 缓存的最大条目数。
+            maxsize: 共享缓存的最大条目数，默认使用 search_cache_maxsize 配置。
         """
         self.config = config_manager
         self.cache_enabled = self.config.get_search_cache_enabled()
         self.ttl = self.config.get_search_cache_ttl()
         self.initial_fetch_count = self.config.get_search_cache_initial_fetch_count()
 
+        self.maxsize = maxsize
+        self._cache: Optional[SearchResultCache] = None
+
         if self.cache_enabled:
-            self.cache: TTLCache[str, CacheEntry] = TTLCache(maxsize=maxsize, ttl=self.ttl)
             logger.info(
-                f"搜索缓存已启用。TTL: {self.ttl}s, Maxsize: {maxsize}, Initial Fetch: {self.initial_fetch_count}"
+                f"搜索缓存已启用。TTL: {self.ttl}s, Initial Fetch: {self.initial_fetch_count}"
             )
         else:
-            self.cache = None # type: ignore
             logger.info("搜索缓存已禁用。")
 
+    @property
+    def cache(self) -> SearchResultCache:
+        """共享搜索结果缓存（首次访问时获取，并按当前配置调整 TTL 和容量）"""
+        if self._cache is None:
+            self._cache = get_search_result_cache(self.config)
+            self._cache.configure(
+                enabled=self.cache_enabled,
+                ttl=self.ttl,
+                maxsize=self.maxsize or self.config.get_search_cache_maxsize(),
+            )
+        return self._cache
+
     def _generate_cache_key(self, query: str, filters: Optional[Dict[str, Any]] = None) -> str:
         """
         根据搜索关键词和过滤器生成唯一的缓存键。
         过滤器需要排序以保证键的一致性。
         """
-        key_parts = [query.lower().strip()]
-        if filters:
-            # 对过滤器按键排序，然后按值排序（如果值是列表，也排序）
-            sorted_filters = sorted(filters.items())
-            for k, v in sorted_filters:
-                if isinstance(v, list):
-                    key_parts.append(f"{k}:{','.join(sorted(str(item) for item in v))}")
-                else:
-                    key_parts.append(f"{k}:{str(v)}")
-        
-        raw_key = "|".join(key_parts)
-        return hashlib.md5(raw_key.encode('utf-8')).hexdigest()
+        return SearchResultCache.make_key(CACHE_NAMESPACE, query, filters)
 
     def get_from_cache(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Optional[CacheEntry]:
         """
@@ -68,10 +88,21 @@ class SearchCacheService:
         Returns:
             缓存条目 (data, is_partial, total_hits, timestamp_of_full_fetch_start_if_any) 或 None。
         """
-        if not self.cache_enabled or self.cache is None:
+        return self.get_from_cache_by_key(self._generate_cache_key(query, filters))
+
+    def get_from_cache_by_key(self, cache_key: str) -> Optional[CacheEntry]:
+        """
+        按已生成的缓存键获取数据（翻页时由查询会话提供，无需重新生成键）。
+
+        Args:
+            cache_key: _generate_cache_key 生成的缓存键。
+
+        Returns:
+            缓存条目或 None。
+        """
+        if not self.cache_enabled:
             return None
-        
-        cache_key = self._generate_cache_key(query, filters)
+
         cached_item = self.cache.get(cache_key)
         if cached_item:
             logger.debug(f"缓存命中: key='{cache_key}'")
@@ -80,16 +111,30 @@ class SearchCacheService:
         logger.debug(f"缓存未命中: key='{cache_key}'")
         return None
 
+    def snapshot(self, filters: Optional[Dict[str, Any]] = None) -> Tuple[Any, ...]:
+        """
+        获取查询相关聊天当前的索引代数快照。
+
+        应在发起搜索前调用并把结果传给 store_in_cache，搜索期间发生的写入会使条目失效。
+
+        Args:
+            filters: 应用的过滤器。
+        """
+        return SearchResultCache.snapshot(_chat_ids_from_filters(filters))
+
     def store_in_cache(self, 
                        query: str, 
                        filters: Optional[Dict[str, Any]], 
                        data: Any, 
                        total_hits: int,
                        is_partial: bool = True,
-                       full_fetch_initiated_timestamp: Optional[float] = None) -> None:
+                       full_fetch_initiated_timestamp: Optional[float] = None,
+                       generations: Optional[Tuple[Any, ...]] = None) -> None:
         """
         将数据存入缓存。
 
+        条目限定在过滤器的 chat: 条件涉及的聊天上，其它聊天的写入不会使其失效。
+
         Args:
             query: 搜索查询。
             filters: 应用的过滤器。
@@ -97,17 +142,73 @@ class SearchCacheService:
             total_hits: MeiliSearch返回的总命中数。
             is_partial: 标记数据是否为部分数据 (初始获取)。默认为 True。
             full_fetch_initiated_timestamp: 如果启动了完整获取，则为启动时间戳。
+            generations: 搜索前通过 snapshot() 取得的代数快照；为 None 时使用当前快照。
         """
-        if not self.cache_enabled or self.cache is None:
+        if not self.cache_enabled:
             return
 
         cache_key = self._generate_cache_key(query, filters)
         # Store: (actual_data, is_partial_flag, total_hits_from_meili, timestamp_of_full_fetch_start_if_any)
         entry: CacheEntry = (data, is_partial, total_hits, full_fetch_initiated_timestamp)
-        self.cache[cache_key] = entry
+        self.cache.set(
+            cache_key, entry, namespace=CACHE_NAMESPACE, query=query,
+            chat_ids=_chat_ids_from_filters(filters), generations=generations
+        )
         status = "部分" if is_partial else "完整"
         logger.info(f"结果已存入缓存: key='{cache_key}', 状态='{status}', 条目数={len(data) if isinstance(data, list) else 1}, 总命中数={total_hits}")
 
+    def append_to_cache(self,
+                        query: str,
+                        filters: Optional[Dict[str, Any]],
+                        chunk: List[Any]) -> bool:
+        """
+        将后台分块获取的一批结果追加到部分缓存条目，追加后的页面立即可以从缓存提供。
+
+        条目保留首批结果前的代数快照，只有条目限定的聊天（见 store_in_cache）有新写入时才会失效。
+
+        Args:
+            query: 搜索查询。
+            filters: 应用的过滤器。
+            chunk: 新获取的一批结果。
+
+        Returns:
+            bool: 条目不存在、已失效或已是完整数据时返回 False，调用方应停止继续获取。
+        """
+        if not self.cache_enabled:
+            return False
+
+        cache_key = self._generate_cache_key(query, filters)
+        entry = self.cache.peek(cache_key)
+        if entry is None or not entry[1]:
+            return False
+        data, is_partial, total_hits, fetch_ts = entry
+        updated: CacheEntry = (data + list(chunk), True, total_hits, fetch_ts)
+        if not self.cache.update(cache_key, updated):
+            return False
+        logger.debug(f"缓存已追加 {len(chunk)} 条: key='{cache_key}', 当前条目数={len(updated[0])}")
+        return True
+
+    def mark_cache_complete(self, query: str, filters: Optional[Dict[str, Any]]) -> bool:
+        """
+        将部分缓存条目标记为完整，总命中数以实际缓存的条目数为准。
+
+        Returns:
+            bool: 条目不存在或已失效时返回 False。
+        """
+        if not self.cache_enabled:
+            return False
+
+        cache_key = self._generate_cache_key(query, filters)
+        entry = self.cache.peek(cache_key)
+        if entry is None:
+            return False
+        data = entry[0]
+        completed: CacheEntry = (data, False, len(data), None)
+        if not self.cache.update(cache_key, completed):
+            return False
+        logger.info(f"缓存已标记为完整数据: key='{cache_key}', 条目数={len(data)}")
+        return True
+
     def update_cache_to_complete(self, 
                                  query: str, 
                                  filters: Optional[Dict[str, Any]], 
@@ -122,13 +223,15 @@ class SearchCacheService:
             full_data: 完整的搜索结果数据。
             total_hits: MeiliSearch返回的总命中数 (应该与初始获取时一致)。
         """
-        if not self.cache_enabled or self.cache is None:
+        if not self.cache_enabled:
             return
 
         cache_key = self._generate_cache_key(query, filters)
         # Update to: (full_data, False (not partial), total_hits, None (full fetch completed))
         entry: CacheEntry = (full_data, False, total_hits, None)
-        self.cache[cache_key] = entry
+        self.cache.set(
+            cache_key, entry, namespace=CACHE_NAMESPACE, query=query, chat_ids=_chat_ids_from_filters(filters)
+        )
         logger.info(f"缓存已更新为完整数据: key='{cache_key}', 条目数={len(full_data) if isinstance(full_data, list) else 1}, 总命中数={total_hits}")
 
     def get_initial_fetch_count(self) -> int:
@@ -140,18 +243,13 @@ class SearchCacheService:
         return self.cache_enabled
 
     def clear_cache(self) -> None:
-        """清空整个缓存"""
-        if self.cache_enabled and self.cache:
+        """清空整个缓存（包括 HTTP API 的缓存条目）"""
+        if self.cache_enabled:
             self.cache.clear()
             logger.info("搜索缓存已清空。")
 
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存的统计信息"""
-        if self.cache_enabled and self.cache:
-            return {
-                "currsize": self.cache.currsize,
-                "maxsize": self.cache.maxsize,
-                "ttl": self.ttl,
-                "enabled": True
-            }
+        if self.cache_enabled:
+            return self.cache.get_stats()
         return {"enabled": False}
\ No newline at end of file
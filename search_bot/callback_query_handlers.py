@@ -19,6 +19,10 @@ from search_bot.message_formatters import format_search_results, format_error_me
 # Import CommandHandlers for type hinting, assuming it won't create circular dependency
 # If it does, we might need to use 'from typing import TYPE_CHECKING' and forward reference
 from search_bot.command_handlers import CommandHandlers
+from search_bot.query_session_store import QuerySession
+
+# 基于查询会话令牌的分页回调数据 sp:{令牌}:{页码}
+SESSION_PAGE_PATTERN = r"^sp:([A-Za-z0-9_-]+):(\d+)$"
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -54,7 +58,13 @@ class CallbackQueryHandlers:
         """
         注册所有回调查询处理函数
         """
-        # 分页按钮回调处理 - New pattern for base64 encoded full query
+        # 分页按钮回调处理 - 查询状态保存在服务端，按钮只携带会话令牌和页码
+        self.client.add_event_handler(
+            self.session_pagination_callback,
+            events.CallbackQuery(pattern=SESSION_PAGE_PATTERN)
+        )
+
+        # 旧格式分页按钮 (base64 encoded full query)，兼容已发送消息上的按钮
         self.client.add_event_handler(
             self.pagination_callback,
             events.CallbackQuery(pattern=r"^search_page:(\d+):(.+)$") # Updated pattern for search
@@ -82,7 +92,9 @@ class CallbackQueryHandlers:
 
     async def pagination_callback(self, event: CallbackQuery.Event) -> None:
         """
-        处理搜索结果分页按钮的回调查询 (search_page:<page_num>:<original_query_b64>)
+        处理旧格式搜索结果分页按钮的回调查询 (search_page:<page_num>:<original_query_b64>)
+
+        新的搜索结果使用 sp:<token>:<page_num> 按钮，此处理函数保证已发送消息上的旧按钮仍然可用。
         """
         try:
             sender = await event.get_sender()
@@ -111,85 +123,129 @@ class CallbackQueryHandlers:
             # Use command_handler methods to parse and build filters
             parsed_query, filters_dict = self.command_handler._parse_advanced_syntax(original_query) # pylint: disable=protected-access
             meili_filters = self.command_handler._build_meilisearch_filters(filters_dict) if filters_dict else None # pylint: disable=protected-access
+            session = self.command_handler.query_sessions.create(
+                original_query, parsed_query, filters_dict, meili_filters,
+                self.cache_service._generate_cache_key(parsed_query, filters_dict) # pylint: disable=protected-access
+            )
+
+            await self._show_search_page(event, session, page)
+
+        except Exception as e:
+            await self._report_pagination_error(event, e)
+
+    async def session_pagination_callback(self, event: CallbackQuery.Event) -> None:
+        """
+        处理搜索结果分页按钮的回调查询 (sp:<token>:<page_num>)
+
+        查询、过滤条件和缓存键都保存在服务端查询会话中，翻页只需一次字典查找和缓存切片。
+        """
+        try:
+            data = event.data.decode('utf-8')
+            match = re.match(SESSION_PAGE_PATTERN, data)
+            if not match:
+                logger.warning(f"无效的搜索分页回调数据格式: {data}")
+                await event.answer("无效的请求格式", alert=True)
+                return
+
+            token, page = match.group(1), int(match.group(2))
+            session = self.command_handler.query_sessions.get(token)
+            if session is None:
+                logger.info(f"查询会话已过期: token='{token}'")
+                await event.answer("搜索已过期，请重新搜索", alert=True)
+                return
+
+            logger.info(f"处理搜索分页请求: 页码={page}, 会话='{token}', 原始查询='{session.original_query}'")
+            await self._show_search_page(event, session, page)
+
+        except Exception as e:
+            await self._report_pagination_error(event, e)
+
+    async def _show_search_page(self, event: CallbackQuery.Event, session: QuerySession, page: int) -> None:
+        """
+        按查询会话编辑消息为指定页的搜索结果
+
+        优先从缓存切片；请求的页尚未到达时提示等待，后台任务已中断则从会话游标继续获取；
+        缓存不可用时直接从 MeiliSearch 获取该页。
+        """
+        parsed_query = session.parsed_query
+        hits_per_page = 5  # Standard items per page for search
+        sort_options = ["date:desc"]
+
+        def render(hits: List[Dict[str, Any]], total_hits: int, processing_time: int = 0):
+            results_to_format = {
+                'hits': hits, 'query': parsed_query,
+                'processingTimeMs': processing_time, 'estimatedTotalHits': total_hits
+            }
+            total_pages = (total_hits + hits_per_page - 1) // hits_per_page if total_hits > 0 else 0
+            return format_search_results(
+                results_to_format, page, total_pages,
+                query_original=session.original_query, session_token=session.token
+            )
 
-            hits_per_page = 5  # Standard items per page for search
-            sort_options = ["date:desc"]
-
-            # Check cache
-            cached_entry = None
-            if self.cache_service.is_cache_enabled():
-                cached_entry = self.cache_service.get_from_cache(parsed_query, filters_dict)
-
-            if cached_entry:
-                cached_results, is_partial, total_hits_from_cache, fetch_ts = cached_entry
-                logger.info(f"搜索分页缓存命中 for '{parsed_query}'. Partial: {is_partial}, Total Hits: {total_hits_from_cache}")
-
-                if not is_partial: # Full data in cache
-                    results_to_format = {
-                        'hits': cached_results[(page - 1) * hits_per_page : page * hits_per_page],
-                        'query': parsed_query, 'processingTimeMs': 0, 'estimatedTotalHits': total_hits_from_cache
-                    }
-                    total_pages = (total_hits_from_cache + hits_per_page - 1) // hits_per_page if total_hits_from_cache > 0 else 0
-                    formatted_msg, buttons = format_search_results(results_to_format, page, total_pages, query_original=original_query)
+        # Check cache
+        cached_entry = None
+        if self.cache_service.is_cache_enabled():
+            cached_entry = self.cache_service.get_from_cache_by_key(session.cache_key)
+
+        if cached_entry:
+            cached_results, is_partial, total_hits_from_cache, fetch_ts = cached_entry
+            logger.info(f"搜索分页缓存命中 for '{parsed_query}'. Partial: {is_partial}, Total Hits: {total_hits_from_cache}")
+            page_hits = cached_results[(page - 1) * hits_per_page : page * hits_per_page]
+
+            # 完整缓存，或页面已到达（首批结果或后台已追加的块）
+            if not is_partial or (total_hits_from_cache is not None and page * hits_per_page <= len(cached_results)):
+                formatted_msg, buttons = render(page_hits, total_hits_from_cache or 0)
+                await event.edit(formatted_msg, buttons=buttons, parse_mode='md')
+                await event.answer() # Acknowledge callback
+                return
+
+            if total_hits_from_cache is not None: # Requested page is beyond the data fetched so far
+                if session.cache_key in self.command_handler.active_full_fetches:
+                    await event.answer("⏳ 更多结果加载中，请稍候再试...", alert=False) # Toast notification
+                    return
+                # 后台任务已结束但条目仍为部分数据（如进程重启前的任务被中断），从会话游标继续
+                if self.command_handler._resume_full_fetch(session, len(cached_results), total_hits_from_cache): # pylint: disable=protected-access
+                    await event.answer("⏳ 正在继续加载更多结果，请稍候再试...", alert=False)
+                    return
+                if fetch_ts is not None and time.time() - fetch_ts < 60: # Recently started
+                    await event.answer("⏳ 更多结果加载中，请稍候再试...", alert=False)
+                    return
+                # Full fetch might have completed or failed. Re-check cache.
+                fresh_cached_entry = self.cache_service.get_from_cache_by_key(session.cache_key)
+                if fresh_cached_entry and not fresh_cached_entry[1]: # is_partial is False
+                    cached_results_upd, _, total_hits_upd, _ = fresh_cached_entry
+                    formatted_msg, buttons = render(
+                        cached_results_upd[(page - 1) * hits_per_page : page * hits_per_page], total_hits_upd
+                    )
                     await event.edit(formatted_msg, buttons=buttons, parse_mode='md')
                     await event.answer() # Acknowledge callback
                     return
 
-                # Partial data in cache
-                if total_hits_from_cache is not None:
-                    if page * hits_per_page <= len(cached_results): # Page is within the initial fetch
-                        results_to_format = {
-                            'hits': cached_results[(page - 1) * hits_per_page : page * hits_per_page],
-                            'query': parsed_query, 'processingTimeMs': 0, 'estimatedTotalHits': total_hits_from_cache
-                        }
-                        total_pages = (total_hits_from_cache + hits_per_page - 1) // hits_per_page if total_hits_from_cache > 0 else 0
-                        formatted_msg, buttons = format_search_results(results_to_format, page, total_pages, query_original=original_query)
-                        await event.edit(formatted_msg, buttons=buttons, parse_mode='md')
-                        await event.answer() # Acknowledge callback
-                        return
-                    else: # Requested page is beyond initial fetch
-                        cache_key_for_async = self.cache_service._generate_cache_key(parsed_query, filters_dict) # pylint: disable=protected-access
-                        if cache_key_for_async in self.command_handler.active_full_fetches or \
-                           (fetch_ts is not None and time.time() - fetch_ts < 60): # Task running or recently started
-                            await event.answer("⏳ 更多结果加载中，请稍候再试...", alert=False) # Toast notification
-                            return
-                        else: # Full fetch might have completed or failed. Re-check cache.
-                            fresh_cached_entry = self.cache_service.get_from_cache(parsed_query, filters_dict)
-                            if fresh_cached_entry and not fresh_cached_entry[1]: # is_partial is False
-                                cached_results_upd, _, total_hits_upd, _ = fresh_cached_entry
-                                results_to_format = {
-                                    'hits': cached_results_upd[(page - 1) * hits_per_page : page * hits_per_page],
-                                    'query': parsed_query, 'processingTimeMs': 0, 'estimatedTotalHits': total_hits_upd
-                                }
-                                total_pages = (total_hits_upd + hits_per_page - 1) // hits_per_page if total_hits_upd > 0 else 0
-                                formatted_msg, buttons = format_search_results(results_to_format, page, total_pages, query_original=original_query)
-                                await event.edit(formatted_msg, buttons=buttons, parse_mode='md')
-                                await event.answer() # Acknowledge callback
-                                return
-            
-            # Cache miss or partial data not sufficient, and async fetch not helpful. Fetch directly.
-            logger.info(f"搜索分页缓存未命中/不足 for '{parsed_query}', page {page}. 直接从 MeiliSearch 获取。")
-            await event.answer("正在加载新页面...") # Toast notification
-            
-            page_specific_results_obj = await self.command_handler._get_results_from_meili( # pylint: disable=protected-access
-                parsed_query, meili_filters, sort_options, page, hits_per_page
-            )
-            estimated_total_hits = page_specific_results_obj.get('estimatedTotalHits', 0)
-            total_pages = (estimated_total_hits + hits_per_page - 1) // hits_per_page if estimated_total_hits > 0 else 0
-            
-            formatted_msg, buttons = format_search_results(page_specific_results_obj, page, total_pages, query_original=original_query)
-            await event.edit(formatted_msg, buttons=buttons, parse_mode='md')
+        # Cache miss or partial data not sufficient, and async fetch not helpful. Fetch directly.
+        logger.info(f"搜索分页缓存未命中/不足 for '{parsed_query}', page {page}. 直接从 MeiliSearch 获取。")
+        await event.answer("正在加载新页面...") # Toast notification
 
-        except Exception as e:
-            logger.error(f"处理搜索分页回调时出错: {e}", exc_info=True)
+        page_specific_results_obj = await self.command_handler._get_results_from_meili( # pylint: disable=protected-access
+            parsed_query, session.meili_filters, sort_options, page, hits_per_page
+        )
+        formatted_msg, buttons = render(
+            page_specific_results_obj.get('hits', []),
+            page_specific_results_obj.get('estimatedTotalHits', 0),
+            page_specific_results_obj.get('processingTimeMs', 0)
+        )
+        await event.edit(formatted_msg, buttons=buttons, parse_mode='md')
+
+    async def _report_pagination_error(self, event: CallbackQuery.Event, e: Exception) -> None:
+        """通知用户搜索分页出错"""
+        logger.error(f"处理搜索分页回调时出错: {e}", exc_info=True)
+        try:
+            await event.answer(f"加载页面出错: {str(e)[:190]}", alert=True)
+        except Exception:
             try:
-                await event.answer(f"加载页面出错: {str(e)[:190]}", alert=True)
+                error_text = format_error_message(f"加载页面时出错: {str(e)}")
+                await event.edit(error_text, parse_mode='md')
             except Exception:
-                try:
-                    error_text = format_error_message(f"加载页面时出错: {str(e)}")
-                    await event.edit(error_text, parse_mode='md')
-                except Exception:
-                    logger.error("无法通过 answer 或 edit 通知用户搜索分页错误")
+                logger.error("无法通过 answer 或 edit 通知用户搜索分页错误")
 
     async def dialog_pagination_callback(self, event: CallbackQuery.Event) -> None:
         """
@@ -5,6 +5,7 @@
 1. 基本命令：/start, /help
 2. 搜索命令：/search <关键词>
 3. 管理员命令：/add_whitelist, /remove_whitelist
+4. 已保存搜索命令：/watch <关键词>, /watches, /unwatch <编号>
 """
 
 import logging
@@ -12,21 +13,29 @@ import re
 import asyncio
 import time # Added for cache timestamping
 from typing import List, Optional, Union, Dict, Any, Tuple
-from datetime import datetime
 
 from telethon import events, Button
 from telethon.tl.types import User
 
-from core.meilisearch_service import MeiliSearchService
+from core.meilisearch_service import KEYSET_MATCHING_STRATEGY, MeiliSearchService, PROJECTION_SNIPPET
 from core.config_manager import ConfigManager
+from core.query_language import build_meilisearch_filter, parse_query
+from core.search_cursor import KeysetPaginationUnavailableError
+from core.saved_searches import Percolator, get_percolator
 from .cache_service import SearchCacheService # Added
 from .dialogs_cache_service import DialogsCacheService # Added for dialogs caching
-from search_bot.message_formatters import format_search_results, format_error_message, format_help_message, format_dialogs_list
+from .query_session_store import QuerySession, QuerySessionStore
+from search_bot.message_formatters import (
+    format_search_results, format_error_message, format_help_message, format_dialogs_list, format_saved_searches_list
+)
 from user_bot.client import UserBotClient
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
 
+# 后台流式获取时每次按游标请求的条目数，每块到达后即可提供对应页面
+FULL_FETCH_CHUNK_SIZE = 500
+
 
 class CommandHandlers:
     """
@@ -41,7 +50,8 @@ class CommandHandlers:
         meilisearch_service: MeiliSearchService,
         config_manager: ConfigManager,
         admin_ids: List[int],
-        userbot_restart_event: Optional[asyncio.Event] = None
+        userbot_restart_event: Optional[asyncio.Event] = None,
+        percolator: Optional[Percolator] = None
     ) -> None:
         """
         初始化命令处理器
@@ -52,6 +62,7 @@ class CommandHandlers:
             config_manager: 配置管理器实例
             admin_ids: 管理员用户 ID 列表
             userbot_restart_event: User Bot 重启事件，用于触发重启
+            percolator: 已保存搜索匹配器，未提供时使用全局实例
         """
         self.client = client
         self.meilisearch_service = meilisearch_service
@@ -61,6 +72,8 @@ class CommandHandlers:
         self.cache_service = SearchCacheService(config_manager)
         self.dialogs_cache_service = DialogsCacheService(config_manager) # Added for dialogs caching
         self.active_full_fetches: Dict[str, asyncio.Task] = {} # For managing async full-fetch tasks
+        self.query_sessions = QuerySessionStore() # 分页按钮引用的服务端查询状态
+        self.percolator = percolator if percolator is not None else get_percolator()
         
         # 注册命令处理函数
         self.register_handlers()
@@ -88,6 +101,20 @@ class CommandHandlers:
             events.NewMessage(pattern=r"^/search(?:\s+(.+))?$")
         )
         
+        # 已保存搜索命令
+        self.client.add_event_handler(
+            self.watch_command,
+            events.NewMessage(pattern=r"^/watch(?:\s+(.+))?$")
+        )
+        self.client.add_event_handler(
+            self.list_watches_command,
+            events.NewMessage(pattern=r"^/watches$")
+        )
+        self.client.add_event_handler(
+            self.unwatch_command,
+            events.NewMessage(pattern=r"^/unwatch(?:\s+(\d+))?$")
+        )
+        
         # 管理员命令
         self.client.add_event_handler(
             self.add_whitelist_command,
@@ -186,6 +213,9 @@ class CommandHandlers:
             r"^/start$",
             r"^/help$",
             r"^/search(?:\s+(.+))?$",
+            r"^/watch(?:\s+(.+))?$",
+            r"^/watches$",
+            r"^/unwatch(?:\s+(\d+))?$",
             r"^/add_whitelist(?:\s+(-?\d+))?$",
             r"^/remove_whitelist(?:\s+(-?\d+))?$",
             r"^/set_userbot_config(?:\s+(\S+))?(?:\s+(.+))?$",
@@ -300,9 +330,13 @@ class CommandHandlers:
                                       hits_per_page: int,
                                       start_timestamp: Optional[int] = None,
                                       end_timestamp: Optional[int] = None,
-                                      chat_types: Optional[List[str]] = None) -> Dict[str, Any]:
+                                      chat_types: Optional[List[str]] = None,
+                                      projection: str = PROJECTION_SNIPPET) -> Dict[str, Any]:
         """
         Helper function to call MeiliSearch and return results.
+
+        首批结果和后台获取使用键集分页（matchingStrategy=all），缓存未命中时按页码直接获取的页面
+        使用同一匹配策略，保证同一查询的总数和结果集一致。
         
         Args:
             parsed_query: 解析后的查询字符串
@@ -313,11 +347,12 @@ class CommandHandlers:
             start_timestamp: 开始时间戳（可选）
             end_timestamp: 结束时间戳（可选）
             chat_types: 聊天类型列表（可选）
+            projection: 字段投影，默认 snippet（仅取展示所需的元数据和裁剪后的摘要）
             
         Returns:
             Dict[str, Any]: Meilisearch 搜索结果
         """
-        return self.meilisearch_service.search(
+        return await self.meilisearch_service.search_async(
             query=parsed_query,
             filters=filters,
             sort=sort,
@@ -325,80 +360,104 @@ class CommandHandlers:
             hits_per_page=hits_per_page,
             start_timestamp=start_timestamp,
             end_timestamp=end_timestamp,
-            chat_types=chat_types
+            chat_types=chat_types,
+            crop_length=self.config_manager.get_search_snippet_crop_length(),
+            projection=projection,
+            matching_strategy=KEYSET_MATCHING_STRATEGY
+        )
+
+    async def _get_results_after_cursor(self,
+                                        parsed_query: str,
+                                        filters: Optional[str],
+                                        cursor: Optional[str],
+                                        limit: int,
+                                        start_timestamp: Optional[int] = None,
+                                        end_timestamp: Optional[int] = None,
+                                        chat_types: Optional[List[str]] = None,
+                                        projection: str = PROJECTION_SNIPPET) -> Dict[str, Any]:
+        """
+        按游标（键集分页）从 MeiliSearch 获取下一批结果
+
+        Args:
+            parsed_query: 解析后的查询字符串
+            filters: Meilisearch 过滤条件字符串
+            cursor: 上一批结果返回的 nextCursor；为 None 时从第一条开始
+            limit: 本批最多返回的结果数
+            start_timestamp: 开始时间戳（可选）
+            end_timestamp: 结束时间戳（可选）
+            chat_types: 聊天类型列表（可选）
+            projection: 字段投影，默认 snippet
+
+        Returns:
+            Dict[str, Any]: Meilisearch 搜索结果，包含 nextCursor
+        """
+        return await self.meilisearch_service.search_after_async(
+            query=parsed_query,
+            cursor=cursor,
+            limit=limit,
+            filters=filters,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            chat_types=chat_types,
+            crop_length=self.config_manager.get_search_snippet_crop_length(),
+            projection=projection
         )
 
-    async def _fetch_all_results_async(self, cache_key: str, parsed_query: str, filters_dict: Optional[Dict[str, Any]], meili_filters: Optional[str], sort_options: List[str], total_hits_estimate: int):
+    async def _fetch_all_results_async(self, cache_key: str, parsed_query: str, filters_dict: Optional[Dict[str, Any]],
+                                       meili_filters: Optional[str], initial_count: int,
+                                       next_cursor: Optional[str], total_hits_estimate: int,
+                                       session: Optional[QuerySession] = None,
+                                       sort_options: Optional[List[str]] = None):
         """
-        异步获取所有搜索结果并更新缓存。
+        异步流式获取剩余搜索结果并逐块追加到缓存。
+
+        从首批结果返回的游标开始按键集分页分块获取，每块的开销与首批相同，
+        不受 Meilisearch 单次查询 1000 条的限制；最多缓存 search_full_fetch_max_results 条。
+        每块到达后立即追加到部分缓存条目，翻页到已到达的页面时无需等待整个结果集。
+        提供查询会话时，每块追加后记录已到达的游标，任务中断后可从该处继续获取。
+        提供 sort_options 时（索引的排序规则不支持键集分页，首批按页码获取），以同一排序按页码分块获取，
+        最多取到 Meilisearch 的 maxTotalHits 条，任务中断后不能继续。
         """
         try:
-            logger.info(f"后台任务开始: 为 key='{cache_key}' 获取全部 {total_hits_estimate} 条结果。")
-            # Fetch all results. MeiliSearch's limit parameter can be high.
-            # We assume meilisearch_service.search handles pagination if we ask for all hits.
-            # Let's fetch all in one go if total_hits_estimate is manageable, e.g., < 1000.
-            # Otherwise, we might need a loop here, but for now, try to get all.
-            # The MeiliSearch Python SDK's `search` method with `hits_per_page` set to total_hits
-            # should ideally return all results if the server limit allows.
-            # If total_hits_estimate is very large, this might be slow or hit server limits.
-            # For now, we'll request all items.
-            
-            # A more robust approach for very large result sets would be to fetch in chunks
-            # and append, but that complicates cache updates significantly.
-            # Let's assume total_hits_estimate is within a reasonable limit for a single fetch.
-            # The default limit for MeiliSearch is 1000 per query if not specified otherwise by `hitsPerPage`.
-            
-            all_results_data = []
-            # If total_hits_estimate is 0, no need to fetch
-            if total_hits_estimate == 0:
-                logger.info(f"后台任务: key='{cache_key}', 总命中数为0，无需获取。")
-                self.cache_service.update_cache_to_complete(parsed_query, filters_dict, [], 0)
-                return
+            logger.info(f"后台任务开始: 为 key='{cache_key}' 获取全部约 {total_hits_estimate} 条结果。")
+            fetched = initial_count
+            max_results = self.config_manager.get_search_full_fetch_max_results()
+
+            cursor = next_cursor
+            has_more = bool(cursor) or sort_options is not None
+            while has_more and fetched < max_results:
+                if sort_options is None:
+                    chunk_obj = await self._get_results_after_cursor(
+                        parsed_query, meili_filters, cursor,
+                        min(FULL_FETCH_CHUNK_SIZE, max_results - fetched)
+                    )
+                    chunk = chunk_obj.get('hits', [])
+                    cursor = chunk_obj.get('nextCursor')
+                    has_more = bool(cursor)
+                else:
+                    # 取包含第 fetched 条的整页，跳过其中已缓存的部分
+                    page_number = fetched // FULL_FETCH_CHUNK_SIZE + 1
+                    page_hits = (await self._get_results_from_meili(
+                        parsed_query, meili_filters, sort_options, page_number, FULL_FETCH_CHUNK_SIZE
+                    )).get('hits', [])
+                    chunk = page_hits[fetched - (page_number - 1) * FULL_FETCH_CHUNK_SIZE:][:max_results - fetched]
+                    has_more = len(page_hits) == FULL_FETCH_CHUNK_SIZE
+                if not self.cache_service.append_to_cache(parsed_query, filters_dict, chunk):
+                    # 条目已过期或因新的写入失效，继续获取也无法被使用
+                    logger.info(f"后台任务中止: key='{cache_key}' 的缓存条目已失效，已获取 {fetched} 条。")
+                    return
+                fetched += len(chunk)
+                if session is not None:
+                    session.next_cursor = cursor
 
-            # Fetch all results. The MeiliSearch client handles pagination internally if we set a high limit.
-            # We'll fetch all results in one go.
-            # The `search` method in MeiliSearchService already handles `page` and `hits_per_page`.
-            # To get all, we can set hits_per_page to total_hits and page to 1.
-            # However, MeiliSearch has a default limit (often 1000).
-            # For simplicity, we'll fetch up to a practical limit (e.g. 1000) for the "full" cache.
-            # If total_hits > 1000, the "full" cache will contain the first 1000.
-            # This is a pragmatic choice to avoid excessive memory/network for huge result sets.
-            # The user can still paginate through MeiliSearch directly via callbacks if needed beyond this.
-            
-            fetch_limit = min(total_hits_estimate, 1000) # Cap full fetch at 1000 for now
-
-            if fetch_limit > 0:
-                # 准备筛选参数
-                start_timestamp = None
-                end_timestamp = None
-                chat_types = None
-                
-                if filters_dict:
-                    # 提取日期范围
-                    if 'date_range' in filters_dict:
-                        date_range = filters_dict['date_range']
-                        start_timestamp = date_range.get('start')
-                        end_timestamp = date_range.get('end')
-                    
-                    # 提取聊天类型
-                    if 'chat_type' in filters_dict:
-                        chat_types = filters_dict['chat_type']
-                
-                # 获取所有结果
-                full_search_results_obj = await self._get_results_from_meili(
-                    parsed_query=parsed_query,
-                    filters=meili_filters,
-                    sort=sort_options,
-                    page=1, # Get all from the first page
-                    hits_per_page=fetch_limit, # Request all (up to the cap)
-                    start_timestamp=start_timestamp,
-                    end_timestamp=end_timestamp,
-                    chat_types=chat_types
-                )
-                all_results_data = full_search_results_obj.get('hits', [])
-            
-            self.cache_service.update_cache_to_complete(parsed_query, filters_dict, all_results_data, total_hits_estimate)
-            logger.info(f"后台任务完成: key='{cache_key}' 的缓存已更新为 {len(all_results_data)} 条完整结果 (总预估 {total_hits_estimate})。")
+            if has_more:
+                logger.info(f"后台任务: key='{cache_key}' 已达到缓存上限 {max_results} 条，停止获取。")
+
+            # 以实际缓存的条数作为总数，保证所有页码都能从缓存中取到
+            if session is not None:
+                session.next_cursor = None
+            if self.cache_service.mark_cache_complete(parsed_query, filters_dict):
+                logger.info(f"后台任务完成: key='{cache_key}' 的缓存已更新为 {fetched} 条完整结果 (总预估 {total_hits_estimate})。")
 
         except Exception as e:
             logger.error(f"后台任务失败: key='{cache_key}' 获取全部结果时出错: {e}", exc_info=True)
@@ -408,6 +467,30 @@ class CommandHandlers:
             if cache_key in self.active_full_fetches:
                 del self.active_full_fetches[cache_key]
 
+    def _resume_full_fetch(self, session: QuerySession, fetched: int, total_hits_estimate: int) -> bool:
+        """
+        从查询会话记录的游标继续后台获取（任务已中断而部分缓存条目仍有效时）
+
+        Args:
+            session: 查询会话
+            fetched: 部分缓存条目中已有的条目数
+            total_hits_estimate: 预估总命中数
+
+        Returns:
+            bool: 是否启动了新的后台任务
+        """
+        if not session.next_cursor or session.cache_key in self.active_full_fetches:
+            return False
+        logger.info(f"恢复后台任务: 从会话 '{session.token}' 的游标继续获取 key='{session.cache_key}'，已有 {fetched} 条。")
+        task = asyncio.create_task(
+            self._fetch_all_results_async(
+                session.cache_key, session.parsed_query, session.filters_dict, session.meili_filters,
+                fetched, session.next_cursor, total_hits_estimate, session=session
+            )
+        )
+        self.active_full_fetches[session.cache_key] = task
+        return True
+
     async def _perform_search(self, event, query: str, page: int = 1, is_direct_search: bool = False) -> None:
         """
         执行搜索操作并回复结果。集成了缓存逻辑。
@@ -424,13 +507,17 @@ class CommandHandlers:
 
             parsed_query, filters_dict = self._parse_advanced_syntax(query)
             meili_filters = self._build_meilisearch_filters(filters_dict) if filters_dict else None
+            session = self.query_sessions.create(
+                query, parsed_query, filters_dict, meili_filters,
+                self.cache_service._generate_cache_key(parsed_query, filters_dict) # pylint: disable=protected-access
+            )
             
             hits_per_page = 5  # Standard items per page for display
             sort_options = ["date:desc"] # Default sort
 
             cached_data_entry = None
             if self.cache_service.is_cache_enabled():
-                cached_data_entry = self.cache_service.get_from_cache(parsed_query, filters_dict)
+                cached_data_entry = self.cache_service.get_from_cache_by_key(session.cache_key)
 
             if cached_data_entry:
                 cached_results, is_partial, total_hits_from_cache, fetch_ts = cached_data_entry
@@ -444,14 +531,14 @@ class CommandHandlers:
                         'estimatedTotalHits': total_hits_from_cache
                     }
                     total_pages = (total_hits_from_cache + hits_per_page - 1) // hits_per_page if total_hits_from_cache > 0 else 0
-                    formatted_message, buttons = format_search_results(results_to_format, page, total_pages, query_original=query)
+                    formatted_message, buttons = format_search_results(results_to_format, page, total_pages, query_original=query, session_token=session.token)
                     await event.respond(formatted_message, buttons=buttons, parse_mode='md')
                     logger.info(f"已从完整缓存向用户 {sender_id} 发送第 {page} 页结果")
                     return
 
                 # Partial data in cache
                 if total_hits_from_cache is not None:
-                    # Check if requested page is within the initial fetch
+                    # 请求的页面已在缓存中（首批结果或后台已追加的块）
                     if page * hits_per_page <= len(cached_results):
                         results_to_format = {
                             'hits': cached_results[ (page - 1) * hits_per_page : page * hits_per_page ],
@@ -460,14 +547,14 @@ class CommandHandlers:
                             'estimatedTotalHits': total_hits_from_cache
                         }
                         total_pages = (total_hits_from_cache + hits_per_page - 1) // hits_per_page if total_hits_from_cache > 0 else 0
-                        formatted_message, buttons = format_search_results(results_to_format, page, total_pages, query_original=query)
+                        formatted_message, buttons = format_search_results(results_to_format, page, total_pages, query_original=query, session_token=session.token)
                         await event.respond(formatted_message, buttons=buttons, parse_mode='md')
                         logger.info(f"已从部分缓存 (初始获取部分) 向用户 {sender_id} 发送第 {page} 页结果")
                         return
                     else:
                         # Requested page is beyond initial fetch.
                         # Check if full fetch is ongoing or completed.
-                        cache_key_for_async = self.cache_service._generate_cache_key(parsed_query, filters_dict) # pylint: disable=protected-access
+                        cache_key_for_async = session.cache_key
                         if cache_key_for_async in self.active_full_fetches or (fetch_ts is not None and time.time() - fetch_ts < 60): # Task running or recently started (give it 60s)
                             # Chosen:方案A (提示用户等待) for pagination beyond initial while async fetch is running
                             await event.respond("⏳ 正在加载更多结果，请稍候片刻再尝试翻页...", parse_mode='md')
@@ -485,7 +572,7 @@ class CommandHandlers:
                         else:
                             # Full fetch might have completed and updated the cache, or failed/timed out.
                             # Re-check cache, it might be complete now.
-                            fresh_cached_entry = self.cache_service.get_from_cache(parsed_query, filters_dict)
+                            fresh_cached_entry = self.cache_service.get_from_cache_by_key(session.cache_key)
                             if fresh_cached_entry and not fresh_cached_entry[1]: # is_partial is False
                                 cached_results_updated, _, total_hits_updated, _ = fresh_cached_entry
                                 results_to_format = {
@@ -495,7 +582,7 @@ class CommandHandlers:
                                     'estimatedTotalHits': total_hits_updated
                                 }
                                 total_pages = (total_hits_updated + hits_per_page - 1) // hits_per_page if total_hits_updated > 0 else 0
-                                formatted_message, buttons = format_search_results(results_to_format, page, total_pages, query_original=query)
+                                formatted_message, buttons = format_search_results(results_to_format, page, total_pages, query_original=query, session_token=session.token)
                                 await event.respond(formatted_message, buttons=buttons, parse_mode='md')
                                 logger.info(f"已从更新后的完整缓存向用户 {sender_id} 发送第 {page} 页结果")
                                 return
@@ -509,45 +596,49 @@ class CommandHandlers:
                 status_message = await event.respond("🔍 正在搜索，请稍候...", parse_mode='md')
                 
                 initial_fetch_count = self.cache_service.get_initial_fetch_count()
+                # 搜索前记录相关聊天的索引代数，搜索期间发生的写入会使缓存条目失效
+                generations = self.cache_service.snapshot(filters_dict)
                 
-                # 准备筛选参数
-                start_timestamp = None
-                end_timestamp = None
-                chat_types = None
-                
-                if filters_dict:
-                    # 提取日期范围
-                    if 'date_range' in filters_dict:
-                        date_range = filters_dict['date_range']
-                        start_timestamp = date_range.get('start')
-                        end_timestamp = date_range.get('end')
-                    
-                    # 提取聊天类型
-                    if 'chat_type' in filters_dict:
-                        chat_types = filters_dict['chat_type']
-                
-                # Stage 1: Initial Fetch
-                initial_results_obj = await self._get_results_from_meili(
-                    parsed_query, meili_filters, sort_options, 1, initial_fetch_count,
-                    start_timestamp=start_timestamp, end_timestamp=end_timestamp, chat_types=chat_types
-                )
+                # Stage 1: Initial Fetch（键集分页，后台任务从返回的游标继续）
+                page_sort_options = None
+                try:
+                    initial_results_obj = await self._get_results_after_cursor(
+                        parsed_query, meili_filters, None, initial_fetch_count
+                    )
+                except KeysetPaginationUnavailableError as e:
+                    # 索引的排序规则不支持键集分页，首批和后台获取都改用页码分页
+                    logger.info(f"无法使用键集分页，改用页码分页: {e}")
+                    page_sort_options = sort_options
+                    initial_results_obj = await self._get_results_from_meili(
+                        parsed_query, meili_filters, sort_options, 1, initial_fetch_count
+                    )
                 initial_hits_data = initial_results_obj.get('hits', [])
+                next_cursor = initial_results_obj.get('nextCursor')
+                session.next_cursor = next_cursor
                 estimated_total_hits = initial_results_obj.get('estimatedTotalHits', 0)
+                if page_sort_options is None:
+                    has_more = bool(next_cursor)
+                else:
+                    has_more = len(initial_hits_data) == initial_fetch_count and estimated_total_hits > initial_fetch_count
+                if not has_more:
+                    # 首批已包含全部结果
+                    estimated_total_hits = len(initial_hits_data)
 
                 # Store initial results in cache
                 full_fetch_ts = None
                 if self.cache_service.is_cache_enabled():
-                    if estimated_total_hits > len(initial_hits_data):
+                    if has_more:
                         full_fetch_ts = time.time() # Mark time if async fetch will be needed
                     self.cache_service.store_in_cache(
                         parsed_query, filters_dict, initial_hits_data, estimated_total_hits,
-                        is_partial=(estimated_total_hits > len(initial_hits_data)),
-                        full_fetch_initiated_timestamp=full_fetch_ts
+                        is_partial=has_more,
+                        full_fetch_initiated_timestamp=full_fetch_ts,
+                        generations=generations
                     )
 
                 # Format and send initial results
                 total_pages_for_initial = (estimated_total_hits + hits_per_page - 1) // hits_per_page if estimated_total_hits > 0 else 0
-                formatted_message, buttons = format_search_results(initial_results_obj, 1, total_pages_for_initial, query_original=query)
+                formatted_message, buttons = format_search_results(initial_results_obj, 1, total_pages_for_initial, query_original=query, session_token=session.token)
                 
                 try:
                     await status_message.edit(formatted_message, buttons=buttons, parse_mode='md')
@@ -556,13 +647,15 @@ class CommandHandlers:
                 logger.info(f"已向用户 {sender_id} 发送初始 {len(initial_hits_data)} 条搜索结果 (总共 {estimated_total_hits} 条)")
 
                 # Stage 2: Asynchronous Full Fetch (if needed)
-                if self.cache_service.is_cache_enabled() and estimated_total_hits > len(initial_hits_data):
-                    cache_key_for_async = self.cache_service._generate_cache_key(parsed_query, filters_dict) # pylint: disable=protected-access
+                if self.cache_service.is_cache_enabled() and has_more:
+                    cache_key_for_async = session.cache_key
                     if cache_key_for_async not in self.active_full_fetches:
                         logger.info(f"启动后台任务: 为 key='{cache_key_for_async}' 获取剩余结果。")
                         task = asyncio.create_task(
                             self._fetch_all_results_async(
-                                cache_key_for_async, parsed_query, filters_dict, meili_filters, sort_options, estimated_total_hits
+                                cache_key_for_async, parsed_query, filters_dict, meili_filters,
+                                len(initial_hits_data), next_cursor, estimated_total_hits, session=session,
+                                sort_options=page_sort_options
                             )
                         )
                         self.active_full_fetches[cache_key_for_async] = task
@@ -579,31 +672,14 @@ class CommandHandlers:
                 logger.warning(f"缓存未命中或数据不足 (页码 {page}) for '{parsed_query}'. 直接从 MeiliSearch 获取。")
                 status_message = await event.respond(f"🔍 正在加载第 {page} 页，请稍候...", parse_mode='md')
                 
-                # 准备筛选参数
-                start_timestamp = None
-                end_timestamp = None
-                chat_types = None
-                
-                if filters_dict:
-                    # 提取日期范围
-                    if 'date_range' in filters_dict:
-                        date_range = filters_dict['date_range']
-                        start_timestamp = date_range.get('start')
-                        end_timestamp = date_range.get('end')
-                    
-                    # 提取聊天类型
-                    if 'chat_type' in filters_dict:
-                        chat_types = filters_dict['chat_type']
-                
                 # 获取特定页面的结果
                 page_specific_results_obj = await self._get_results_from_meili(
-                    parsed_query, meili_filters, sort_options, page, hits_per_page,
-                    start_timestamp=start_timestamp, end_timestamp=end_timestamp, chat_types=chat_types
+                    parsed_query, meili_filters, sort_options, page, hits_per_page
                 )
                 estimated_total_hits = page_specific_results_obj.get('estimatedTotalHits', 0) # Re-confirm total
                 total_pages = (estimated_total_hits + hits_per_page - 1) // hits_per_page if estimated_total_hits > 0 else 0
                 
-                formatted_message, buttons = format_search_results(page_specific_results_obj, page, total_pages, query_original=query)
+                formatted_message, buttons = format_search_results(page_specific_results_obj, page, total_pages, query_original=query, session_token=session.token)
                 try:
                     await status_message.edit(formatted_message, buttons=buttons, parse_mode='md')
                 except Exception:
@@ -643,6 +719,71 @@ class CommandHandlers:
         # For /search command, it's always the first page initially
         await self._perform_search(event, query, page=1)
     
+    async def watch_command(self, event) -> None:
+        """
+        处理 /watch 命令
+
+        保存一个搜索，之后写入索引的新消息匹配时通知用户
+
+        Args:
+            event: Telethon 事件对象
+        """
+        match = re.match(r"^/watch(?:\s+(.+))?$", event.message.text)
+        if not match or not match.group(1):
+            await event.respond("请提供要保存的搜索，例如：`/watch 发布 type:group`\n新消息匹配时 Bot 会通知你。")
+            return
+        if self.percolator is None:
+            await event.respond("⚠️ 已保存搜索功能未启用。")
+            return
+
+        query = match.group(1).strip()
+        try:
+            sender = await event.get_sender()
+            # 已保存搜索存放在 SQLite 中，读写放到线程池执行，避免阻塞事件循环
+            search = await asyncio.to_thread(self.percolator.add, sender.id, query)
+            await event.respond(
+                f"✅ 已保存搜索 `#{search.id}`: {query}\n新消息匹配时会通知你，使用 `/unwatch {search.id}` 取消。",
+                parse_mode='md'
+            )
+        except ValueError as e:
+            await event.respond(f"⚠️ {e}")
+        except Exception as e:
+            logger.error(f"处理 /watch 命令时出错: {e}", exc_info=True)
+            await event.respond("😕 保存搜索时出现错误，请稍后再试。")
+
+    async def list_watches_command(self, event) -> None:
+        """处理 /watches 命令，列出用户的已保存搜索"""
+        if self.percolator is None:
+            await event.respond("⚠️ 已保存搜索功能未启用。")
+            return
+        try:
+            sender = await event.get_sender()
+            searches = await asyncio.to_thread(self.percolator.list_for_user, sender.id)
+            await event.respond(format_saved_searches_list(searches), parse_mode='md')
+        except Exception as e:
+            logger.error(f"处理 /watches 命令时出错: {e}", exc_info=True)
+            await event.respond("😕 获取已保存的搜索时出现错误，请稍后再试。")
+
+    async def unwatch_command(self, event) -> None:
+        """处理 /unwatch 命令，删除用户的一个已保存搜索"""
+        match = re.match(r"^/unwatch(?:\s+(\d+))?$", event.message.text)
+        if not match or not match.group(1):
+            await event.respond("请提供要删除的搜索编号，例如：`/unwatch 3`\n发送 `/watches` 查看编号。")
+            return
+        if self.percolator is None:
+            await event.respond("⚠️ 已保存搜索功能未启用。")
+            return
+        try:
+            sender = await event.get_sender()
+            search_id = int(match.group(1))
+            if await asyncio.to_thread(self.percolator.remove, sender.id, search_id):
+                await event.respond(f"✅ 已删除搜索 `#{search_id}`。", parse_mode='md')
+            else:
+                await event.respond(f"⚠️ 未找到编号为 {search_id} 的已保存搜索。")
+        except Exception as e:
+            logger.error(f"处理 /unwatch 命令时出错: {e}", exc_info=True)
+            await event.respond("😕 删除搜索时出现错误，请稍后再试。")
+
     def _parse_advanced_syntax(self, query: str) -> Tuple[str, Dict[str, Any]]:
         """
         解析高级搜索语法
@@ -651,60 +792,21 @@ class CommandHandlers:
         - 精确短语: "关键短语"
         - 类型筛选: type:类型 (user/group/channel)
           可以多次使用此语法来筛选多种类型，如: type:group type:channel
-        - 时间筛选: date:起始_结束 (YYYY-MM-DD_YYYY-MM-DD)
+        - 聊天/发送者筛选: chat:聊天ID, from:发送者ID
+        - 时间筛选: date:起始_结束 (YYYY-MM-DD_YYYY-MM-DD), after:日期, before:日期
+        - 排除: 在操作符前加 "-"，如 -type:channel
+        
+        解析由 core.query_language 完成，结果按查询字符串缓存。
         
         Args:
             query: 原始查询字符串
             
         Returns:
-            Tuple[str, Dict[str, Any]]: 处理后的查询和过滤条件字典
+            Tuple[str, Dict[str, Any]]: 处理后的查询和规范化的过滤条件字典
         """
-        # 初始化结果
-        filters = {}
-        
-        # 处理类型筛选 (可能有多个)
-        chat_types = []
-        type_matches = re.finditer(r'type:(\w+)', query)
-        valid_chat_types = ['user', 'group', 'channel']
-        
-        for match in type_matches:
-            chat_type = match.group(1).lower()
-            if chat_type in valid_chat_types and chat_type not in chat_types:
-                chat_types.append(chat_type)
-        
-        if chat_types:
-            filters['chat_type'] = chat_types
-            # 从查询中移除所有 type: 部分
-            query = re.sub(r'type:\w+', '', query).strip()
-        
-        # 处理时间筛选
-        date_match = re.search(r'date:(\d{4}-\d{2}-\d{2})(?:_(\d{4}-\d{2}-\d{2}))?', query)
-        if date_match:
-            start_date = date_match.group(1)
-            end_date = date_match.group(2) if date_match.group(2) else datetime.now().strftime('%Y-%m-%d')
-            
-            # 转换为 Unix 时间戳
-            try:
-                start_timestamp = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp())
-                # 对于结束日期，设置为当天的最后一秒
-                end_timestamp = int(datetime.strptime(end_date + ' 23:59:59', '%Y-%m-%d %H:%M:%S').timestamp())
-                
-                filters['date_range'] = {
-                    'start': start_timestamp,
-                    'end': end_timestamp
-                }
-                
-                # 从查询中移除 date: 部分
-                query = re.sub(r'date:\d{4}-\d{2}-\d{2}(?:_\d{4}-\d{2}-\d{2})?', '', query).strip()
-            except ValueError as e:
-                logger.warning(f"日期解析错误: {e}")
-        
-        # 清理查询字符串，移除多余空格
-        clean_query = re.sub(r'\s+', ' ', query).strip()
-        
-        return clean_query, filters
+        return parse_query(query)
     
-    def _build_meilisearch_filters(self, filters_dict: Dict[str, Any]) -> str:
+    def _build_meilisearch_filters(self, filters_dict: Dict[str, Any]) -> Optional[str]:
         """
         构建 Meilisearch 过滤条件字符串
         
@@ -712,29 +814,9 @@ class CommandHandlers:
             filters_dict: 过滤条件字典
             
         Returns:
-            str: Meilisearch 过滤条件字符串
+            Optional[str]: 规范的 Meilisearch 过滤条件字符串，没有条件时为 None
         """
-        filter_parts = []
-        
-        # 处理聊天类型过滤
-        if 'chat_type' in filters_dict:
-            chat_type_value = filters_dict['chat_type']
-            
-            # 如果是列表，构建 OR 条件
-            if isinstance(chat_type_value, list) and chat_type_value:
-                chat_type_conditions = [f"chat_type = '{chat_type}'" for chat_type in chat_type_value]
-                filter_parts.append(f"({' OR '.join(chat_type_conditions)})")
-            # 如果是单个值，直接添加条件
-            elif isinstance(chat_type_value, str):
-                filter_parts.append(f"chat_type = '{chat_type_value}'")
-        
-        # 处理日期范围过滤
-        if 'date_range' in filters_dict:
-            date_range = filters_dict['date_range']
-            filter_parts.append(f"date >= {date_range['start']} AND date <= {date_range['end']}")
-        
-        # 组合所有过滤条件
-        return ' AND '.join(filter_parts) if filter_parts else None
+        return build_meilisearch_filter(filters_dict)
     
     async def add_whitelist_command(self, event) -> None:
         """
@@ -1054,8 +1136,12 @@ class CommandHandlers:
                 config_text += "**缓存状态:**\n"
                 config_text += f"- 当前条目数: `{cache_stats.get('currsize', 'N/A')}`\n"
                 config_text += f"- 最大条目数: `{cache_stats.get('maxsize', 'N/A')}`\n"
+                config_text += f"- 命中/未命中: `{cache_stats.get('hits', 0)}` / `{cache_stats.get('misses', 0)}`\n"
             else:
                 config_text += "**缓存状态:** `已禁用`\n"
+
+            flight_stats = self.meilisearch_service.get_search_flight_stats()
+            config_text += f"- 合并的并发搜索: `{flight_stats.get('collapsed', 0)}` / `{flight_stats.get('calls', 0)}`\n"
             
             await event.respond(config_text, parse_mode='md')
             logger.info(f"管理员 {(await event.get_sender()).id} 查看搜索缓存配置")
@@ -8,7 +8,7 @@
 import logging
 import re
 import base64 # Added
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from telethon import Button
 
@@ -20,6 +20,16 @@ MARKDOWN_PATTERNS = [
     (r'\[(.*?)\]\((.*?)\)', r'\1')  # 移除链接标记 [text](url) -> text
 ]
 
+# Meilisearch 默认的高亮标签，展示时转换为 Markdown 加粗
+HIGHLIGHT_PRE_TAG = "<em>"
+HIGHLIGHT_POST_TAG = "</em>"
+
+# 未启用摘要模式（结果包含完整 text）时的预览长度
+FALLBACK_PREVIEW_LENGTH = 150
+
+# 基于查询会话令牌的分页回调前缀：sp:{令牌}:{页码}
+SESSION_PAGE_CALLBACK_PREFIX = "sp"
+
 # 配置日志记录器
 logger = logging.getLogger(__name__)
 
@@ -28,7 +38,8 @@ def format_search_results(
     results: Dict[str, Any],
     current_page: int,
     total_pages: int,
-    query_original: Optional[str] = None  # Added: The original full query for callback data
+    query_original: Optional[str] = None,  # Added: The original full query for callback data
+    session_token: Optional[str] = None
 ) -> Tuple[str, Optional[List[List[Button]]]]:
     """
     格式化 Meilisearch 搜索结果为用户友好的文本
@@ -42,6 +53,7 @@ def format_search_results(
         current_page: 当前页码，从 1 开始
         total_pages: 总页数
         query_original: 原始的、未解析的搜索查询字符串 (包含过滤器等)
+        session_token: 服务端查询会话令牌；提供时分页按钮只携带令牌和页码
         
     Returns:
         Tuple[str, Optional[List[List[Button]]]]:
@@ -61,11 +73,11 @@ def format_search_results(
     # query_displayed will be the parsed query from Meili results,
     # query_original is the full user input used for consistent callbacks
     query_displayed = results.get('query', '未知查询')
-    if query_original is None:
+    if query_original is None and session_token is None:
         logger.warning("format_search_results called without query_original. Pagination might lose filters.")
         query_for_callback_raw = query_displayed # Fallback, might be just keywords
     else:
-        query_for_callback_raw = query_original
+        query_for_callback_raw = query_original or query_displayed
 
     total_hits = results.get('estimatedTotalHits', len(hits))
     processing_time = results.get('processingTimeMs', 0)
@@ -93,18 +105,19 @@ def format_search_results(
         # 获取消息链接
         message_link = hit.get('message_link', '')
         
-        # 获取消息文本，安全处理高亮片段
-        original_text = hit.get('text', '')
+        # 获取消息文本：摘要模式下结果不含完整 text，Meilisearch 已裁剪并高亮，只需处理这一小段窗口
+        if 'text' not in hit and 'text' in hit.get('_formatted', {}):
+            text_preview = hit['_formatted']['text']
+        else:
+            original_text = hit.get('text', '')
+            text_preview = original_text[:FALLBACK_PREVIEW_LENGTH]
+            if len(original_text) > FALLBACK_PREVIEW_LENGTH:
+                text_preview += '...'
         
-        # 清理原始文本中的Markdown标记，避免解析冲突
-        cleaned_text = original_text
+        # 清理文本中的Markdown标记，避免解析冲突，然后将高亮标签转换为加粗
         for pattern, replacement in MARKDOWN_PATTERNS:
-            cleaned_text = re.sub(pattern, replacement, cleaned_text)
-        
-        # 截取文本预览并处理长度
-        text_preview = cleaned_text[:150]
-        if len(cleaned_text) > 150:
-            text_preview += '...'
+            text_preview = re.sub(pattern, replacement, text_preview)
+        text_preview = text_preview.replace(HIGHLIGHT_PRE_TAG, "**").replace(HIGHLIGHT_POST_TAG, "**")
         
         # 格式化单条消息，确保所有变量都不为空，防止实体边界问题
         safe_sender = sender_name or "未知发送者"
@@ -133,28 +146,20 @@ def format_search_results(
         # 5. 末页按钮 (如果不在最后一页)
         buttons_row = []
         
-        # 每个按钮存储数据格式：search_page:{页码}:{base64_encoded_original_query}
-        try:
-            encoded_query_for_callback = base64.b64encode(query_for_callback_raw.encode('utf-8')).decode('utf-8')
-        except Exception as e:
-            logger.error(f"无法对查询进行Base64编码: '{query_for_callback_raw}', error: {e}")
-            # Fallback: use a placeholder or truncated query if encoding fails, though this is bad.
-            # This should ideally not happen.
-            encoded_query_for_callback = base64.b64encode("error_encoding_query".encode('utf-8')).decode('utf-8')
-
+        page_callback = _make_page_callback(session_token, query_for_callback_raw)
         
         # 首页和上一页按钮 (如果当前不在第一页)
         if current_page > 1:
-            buttons_row.append(Button.inline("⏮ 首页", f"search_page:1:{encoded_query_for_callback}"))
-            buttons_row.append(Button.inline("◀️ 上一页", f"search_page:{current_page - 1}:{encoded_query_for_callback}"))
+            buttons_row.append(Button.inline("⏮ 首页", page_callback(1)))
+            buttons_row.append(Button.inline("◀️ 上一页", page_callback(current_page - 1)))
         
         # 当前页/总页数按钮 (不可点击)
         buttons_row.append(Button.inline(f"📄 {current_page}/{total_pages}", f"noop")) # noop is fine
         
         # 下一页和末页按钮 (如果当前不在最后一页)
         if current_page < total_pages:
-            buttons_row.append(Button.inline("▶️ 下一页", f"search_page:{current_page + 1}:{encoded_query_for_callback}"))
-            buttons_row.append(Button.inline("⏭ 末页", f"search_page:{total_pages}:{encoded_query_for_callback}"))
+            buttons_row.append(Button.inline("▶️ 下一页", page_callback(current_page + 1)))
+            buttons_row.append(Button.inline("⏭ 末页", page_callback(total_pages)))
         
         buttons = [buttons_row]
         
@@ -171,6 +176,70 @@ def format_search_results(
     return formatted_message, buttons
 
 
+def _make_page_callback(session_token: Optional[str], query_for_callback_raw: str) -> Callable[[int], str]:
+    """
+    生成分页按钮的回调数据构造函数
+
+    有会话令牌时格式为 sp:{令牌}:{页码}，长度固定且远低于 Telegram 的 64 字节上限；
+    否则回退到旧格式 search_page:{页码}:{base64_encoded_original_query}。
+    """
+    if session_token:
+        return lambda page: f"{SESSION_PAGE_CALLBACK_PREFIX}:{session_token}:{page}"
+
+    try:
+        encoded_query_for_callback = base64.b64encode(query_for_callback_raw.encode('utf-8')).decode('utf-8')
+    except Exception as e:
+        logger.error(f"无法对查询进行Base64编码: '{query_for_callback_raw}', error: {e}")
+        # Fallback: use a placeholder or truncated query if encoding fails, though this is bad.
+        # This should ideally not happen.
+        encoded_query_for_callback = base64.b64encode("error_encoding_query".encode('utf-8')).decode('utf-8')
+    return lambda page: f"search_page:{page}:{encoded_query_for_callback}"
+
+
+def format_saved_search_alert(doc: Any, searches: List[Any]) -> str:
+    """
+    格式化已保存搜索的提醒消息
+
+    Args:
+        doc: 命中的消息文档（MeiliMessageDoc）
+        searches: 该消息命中的已保存搜索（SavedSearch）
+
+    Returns:
+        str: Markdown 格式的提醒文本
+    """
+    text_preview = doc.text[:FALLBACK_PREVIEW_LENGTH] + ('...' if len(doc.text) > FALLBACK_PREVIEW_LENGTH else '')
+    for pattern, replacement in MARKDOWN_PATTERNS:
+        text_preview = re.sub(pattern, replacement, text_preview)
+    matched = "、".join(f"#{search.id} \"{search.query}\"" for search in searches)
+    date_str = datetime.fromtimestamp(doc.date).strftime('%Y-%m-%d %H:%M:%S')
+    return (
+        f"🔔 新消息匹配已保存的搜索 {matched}\n\n"
+        f"**{doc.sender_name or '未知发送者'}** 在 **{doc.chat_title or '未知聊天'}** 中发表于 {date_str}\n"
+        f"{text_preview}\n"
+        f"[👉 查看原消息]({doc.message_link or '#'})"
+    )
+
+
+def format_saved_searches_list(searches: List[Any]) -> str:
+    """
+    格式化用户的已保存搜索列表
+
+    Args:
+        searches: 用户的已保存搜索（SavedSearch）
+
+    Returns:
+        str: Markdown 格式的列表文本
+    """
+    if not searches:
+        return "📭 你还没有保存任何搜索。\n使用 `/watch 关键词` 保存一个搜索，新消息匹配时会通知你。"
+    lines = [f"🔔 **已保存的搜索** ({len(searches)})\n"]
+    for search in searches:
+        created = datetime.fromtimestamp(search.created_at).strftime('%Y-%m-%d %H:%M')
+        lines.append(f"`#{search.id}` {search.query}  _({created})_")
+    lines.append("\n使用 `/unwatch <编号>` 删除。")
+    return "\n".join(lines)
+
+
 def format_error_message(error_message: str) -> str:
     """
     格式化错误消息
@@ -210,6 +279,11 @@ def format_help_message() -> str:
 - **时间筛选**: `date:<起始日期>_<结束日期>` (YYYY-MM-DD)
   例如: `/search 会议 date:2023-01-01_2023-12-31`
   (如果只提供起始日期，则默认为搜索到当前日期)
+  也可使用 `after:<日期>` (含当天) 和 `before:<日期>` (不含当天)
+- **聊天/发送者筛选**: `chat:<聊天ID>`、`from:<发送者ID>`
+  例如: `/search 发布 chat:-1001234567890`
+- **排除**: 在筛选条件前加 `-`
+  例如: `/search 公告 -type:channel`
 - **组合使用**: 可以组合上述所有高级语法
   例如: `/search "项目进度" type:group date:2023-01-01_2023-12-31`
 
@@ -218,6 +292,13 @@ def format_help_message() -> str:
 - 点击结果下方的链接可直接跳转到原始消息位置。
 - 使用页面底部的按钮进行翻页。
 
+**已保存的搜索 (新消息提醒):**
+- `/watch <关键词>`: 保存一个搜索，之后写入的新消息匹配时 Bot 会通知你。
+  支持与 `/search` 相同的高级语法，至少需要一个关键词。
+  例如: `/watch 发布 type:group`
+- `/watches`: 查看已保存的搜索及其编号。
+- `/unwatch <编号>`: 删除一个已保存的搜索。
+
 **对话管理:**
 - `/get_dialogs`: 获取当前账户下的所有对话列表，包括对话名称和ID。
   这些ID可用于白名单管理命令。
@@ -0,0 +1,73 @@
+"""
+查询会话存储模块
+
+此模块为搜索结果的分页按钮保存服务端查询状态，包括：
+1. 每次搜索的原始查询、解析后的查询、过滤条件、缓存键和后台获取的游标
+2. 以短的不透明令牌引用会话，使按钮回调数据远低于 Telegram 的 64 字节上限
+3. 条目数量和过期时间双重上限
+"""
+
+import logging
+import secrets
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 默认参数：会话过期后，旧消息上的分页按钮会提示重新搜索
+DEFAULT_MAXSIZE = 5000
+DEFAULT_TTL = 86400
+# 令牌随机字节数（URL 安全 base64 编码后为 8 个字符）
+TOKEN_BYTES = 6
+
+
+class QuerySession:
+    """一次搜索的服务端状态，翻页时无需重新解析查询和构建过滤条件"""
+
+    __slots__ = ("token", "original_query", "parsed_query", "filters_dict",
+                 "meili_filters", "cache_key", "next_cursor")
+
+    def __init__(self, token: str, original_query: str, parsed_query: str,
+                 filters_dict: Optional[Dict[str, Any]], meili_filters: Optional[str],
+                 cache_key: str, next_cursor: Optional[str] = None) -> None:
+        self.token = token
+        self.original_query = original_query
+        self.parsed_query = parsed_query
+        self.filters_dict = filters_dict
+        self.meili_filters = meili_filters
+        self.cache_key = cache_key
+        # 后台获取已到达位置的游标，获取中断后可从此处继续
+        self.next_cursor = next_cursor
+
+
+class QuerySessionStore:
+    """有界的查询会话存储"""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: int = DEFAULT_TTL) -> None:
+        """
+        初始化会话存储
+
+        Args:
+            maxsize: 最大会话数
+            ttl: 会话过期时间（秒）
+        """
+        self._sessions: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def create(self, original_query: str, parsed_query: str, filters_dict: Optional[Dict[str, Any]],
+               meili_filters: Optional[str], cache_key: str) -> QuerySession:
+        """创建会话并分配新令牌"""
+        token = secrets.token_urlsafe(TOKEN_BYTES)
+        while token in self._sessions:
+            token = secrets.token_urlsafe(TOKEN_BYTES)
+        session = QuerySession(token, original_query, parsed_query, filters_dict, meili_filters, cache_key)
+        self._sessions[token] = session
+        logger.debug(f"已创建查询会话: token='{token}', query='{original_query}'")
+        return session
+
+    def get(self, token: str) -> Optional[QuerySession]:
+        """按令牌获取会话，不存在或已过期时返回 None"""
+        return self._sessions.get(token)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
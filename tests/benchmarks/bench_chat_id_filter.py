@@ -0,0 +1,85 @@
+"""
+聊天ID过滤条件基准测试
+
+比较 10、100、1000 个聊天ID时：
+1. 旧的 (chat_id = a OR chat_id = b OR ...) 与 chat_id IN [...] 的过滤字符串长度
+2. 每次请求生成过滤字符串的耗时（逐个 OR 拼接、IN 不缓存、IN 按集合缓存）
+3. 设置 MEILISEARCH_HOST 时，对运行中的 Meilisearch 发送空查询，
+   比较两种过滤条件的服务端处理时间（processingTimeMs，包含过滤条件解析与求值）
+
+运行方式:
+    python -m tests.benchmarks.bench_chat_id_filter
+    MEILISEARCH_HOST=http://localhost:7700 MEILISEARCH_API_KEY=... python -m tests.benchmarks.bench_chat_id_filter
+"""
+
+import os
+import random
+import statistics
+import timeit
+from typing import List
+
+import httpx
+
+from core.query_language import In, build_chat_id_filter, compile_filter
+
+SIZES = (10, 100, 1000)
+BUILD_REPEAT = 2000
+SEARCH_REPEAT = 30
+
+
+def or_chain_filter(chat_ids: List[int]) -> str:
+    """优化前 MeiliSearchService 生成的过滤条件"""
+    return f"({' OR '.join(f'chat_id = {chat_id}' for chat_id in chat_ids)})"
+
+
+def in_filter_uncached(chat_ids: List[int]) -> str:
+    """不使用缓存的 IN 过滤条件"""
+    return compile_filter(In("chat_id", tuple(sorted(set(chat_ids)))))
+
+
+def bench_build() -> None:
+    """过滤字符串长度与生成耗时"""
+    print(f"{'ids':>6} {'OR 长度':>10} {'IN 长度':>10} {'OR μs':>10} {'IN μs':>10} {'IN 缓存 μs':>12}")
+    for size in SIZES:
+        chat_ids = [-1001000000000 - random.randrange(10 ** 9) for _ in range(size)]
+        build_chat_id_filter(chat_ids)  # 预热缓存
+        timings = [
+            timeit.timeit(lambda fn=fn: fn(chat_ids), number=BUILD_REPEAT) / BUILD_REPEAT * 1e6
+            for fn in (or_chain_filter, in_filter_uncached, build_chat_id_filter)
+        ]
+        print(
+            f"{size:>6} {len(or_chain_filter(chat_ids)):>10} {len(build_chat_id_filter(chat_ids)):>10} "
+            f"{timings[0]:>10.1f} {timings[1]:>10.1f} {timings[2]:>12.1f}"
+        )
+
+
+def bench_meilisearch(host: str, api_key: str, index_name: str) -> None:
+    """服务端处理时间（中位数）"""
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+    print(f"\nMeilisearch {host} / {index_name}")
+    print(f"{'ids':>6} {'OR ms':>8} {'IN ms':>8}")
+    with httpx.Client(base_url=host.rstrip("/"), headers=headers, timeout=30) as client:
+        for size in SIZES:
+            chat_ids = [-1001000000000 - random.randrange(10 ** 9) for _ in range(size)]
+            medians = []
+            for filter_expr in (or_chain_filter(chat_ids), build_chat_id_filter(chat_ids)):
+                times = []
+                for _ in range(SEARCH_REPEAT):
+                    response = client.post(
+                        f"/indexes/{index_name}/search",
+                        json={"q": "", "filter": filter_expr, "limit": 1}
+                    )
+                    response.raise_for_status()
+                    times.append(response.json().get("processingTimeMs", 0))
+                medians.append(statistics.median(times))
+            print(f"{size:>6} {medians[0]:>8} {medians[1]:>8}")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    bench_build()
+    meili_host = os.getenv("MEILISEARCH_HOST")
+    if meili_host:
+        bench_meilisearch(
+            meili_host, os.getenv("MEILISEARCH_API_KEY", ""), os.getenv("MEILISEARCH_INDEX", "telegram_messages")
+        )
@@ -0,0 +1,35 @@
+"""
+单元测试共用的测试数据工厂
+
+各测试模块需要不同的默认值时，用 functools.partial 固定对应的参数，而不是重新定义工厂。
+"""
+
+from typing import Any, Dict, Optional
+
+from core.models import MeiliMessageDoc
+
+
+def make_message_doc(message_id: int = 1, chat_id: int = 100, *, text: str = "hello",
+                     chat_type: str = "group", chat_title: Optional[str] = "Dev Team",
+                     sender_id: int = 7, sender_name: Optional[str] = "Alice",
+                     date: Optional[int] = None) -> MeiliMessageDoc:
+    """
+    创建消息文档
+
+    Args:
+        message_id: 消息ID
+        chat_id: 聊天ID，文档ID和消息链接由 chat_id 与 message_id 生成
+        date: 消息时间，默认为 1_700_000_000 + message_id，使文档按消息ID有序
+        其余参数: 对应 MeiliMessageDoc 的字段
+    """
+    return MeiliMessageDoc(
+        id=f"{chat_id}_{message_id}", message_id=message_id, chat_id=chat_id, chat_title=chat_title,
+        chat_type=chat_type, sender_id=sender_id, sender_name=sender_name, text=text,
+        date=1_700_000_000 + message_id if date is None else date,
+        message_link=f"https://t.me/c/{chat_id}/{message_id}"
+    )
+
+
+def make_message_dict(message_id: int = 1, chat_id: int = 100, **fields: Any) -> Dict[str, Any]:
+    """创建消息文档的字典形式（写入 Meilisearch 的格式），参数与 make_message_doc 相同"""
+    return make_message_doc(message_id, chat_id, **fields).model_dump()
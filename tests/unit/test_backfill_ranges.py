@@ -0,0 +1,230 @@
+"""
+区间并行回溯单元测试
+
+测试HistorySyncer按消息ID区间并行回溯，包括：
+1. 按 backfill_workers 切分区间并完整覆盖所有消息
+2. 区间光标持久化，重启后继续回溯
+3. 区间完成后再平衡剩余工作
+4. Meilisearch 任务积压时回溯等待，不发出 Telegram 请求
+5. 写入失败的批次重试成功前，持久化的光标不越过未写入的文档
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+
+from core.index_task_tracker import IndexTaskTracker
+from core.ingest_buffer import IngestBuffer
+from core.models import MeiliMessageDoc
+from core.sync_state_store import SyncStateStore
+from user_bot.history_syncer import HistorySyncer
+
+
+class FakeMessage:
+    """仅包含回溯所需属性的消息"""
+
+    def __init__(self, message_id: int):
+        self.id = message_id
+
+
+class FakeClient:
+    """按 offset_id 倒序返回 1..total 中存在的消息"""
+
+    def __init__(self, message_ids):
+        self.message_ids = sorted(message_ids, reverse=True)
+        self.requests = 0
+
+    async def iter_messages(self, chat_id, offset_id=0, limit=100, **kwargs):
+        self.requests += 1
+        count = 0
+        for message_id in self.message_ids:
+            if offset_id and message_id >= offset_id:
+                continue
+            if count >= limit:
+                break
+            count += 1
+            yield FakeMessage(message_id)
+
+
+class TestBackfillRanges(unittest.TestCase):
+    """测试区间并行回溯"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = SyncStateStore(os.path.join(self.temp_dir, "sync_state.db"), legacy_json_path=None)
+        self.indexed = []
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self.loop.close()
+
+    def _make_syncer(self, client, workers=4, min_range_size=100, task_tracker=None):
+        ingest_buffer = MagicMock()
+        syncer = HistorySyncer(
+            client=client,
+            meili_service=MagicMock(),
+            chat_id=-100,
+            ingest_buffer=ingest_buffer,
+            state_store=self.store,
+            backfill_workers=workers,
+            min_range_size=min_range_size,
+            task_tracker=task_tracker,
+        )
+        syncer._index_to_meili = AsyncMock(side_effect=lambda msg: self.indexed.append(msg.id))
+        # 测试中直接持久化，不经过写入缓冲区
+        ingest_buffer.call_after_flush.side_effect = lambda cb: self.loop.create_task(cb())
+        return syncer
+
+    def _run_steps(self, syncer, max_steps=None):
+        async def scenario():
+            steps = 0
+            while await syncer.backfill_step():
+                steps += 1
+                if max_steps is not None and steps >= max_steps:
+                    break
+            await asyncio.sleep(0)
+            await syncer._persist_state()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_ranges_cover_all_messages(self):
+        """切分后的区间应完整覆盖 cutoff_id 与 next_oldest_id 之间的消息"""
+        client = FakeClient(range(1, 1001))
+        syncer = self._make_syncer(client)
+        syncer.state["next_oldest_id"] = 1001
+
+        self._run_steps(syncer)
+
+        self.assertEqual(sorted(self.indexed), list(range(1, 1001)))
+        self.assertTrue(syncer.backfill_done())
+        self.assertEqual(self.store.get_ranges(-100), [])
+
+    def test_first_step_splits_into_workers(self):
+        """首批即切分为 backfill_workers 个区间并各自推进"""
+        client = FakeClient(range(1, 1001))
+        syncer = self._make_syncer(client)
+        syncer.state["next_oldest_id"] = 1001
+
+        self._run_steps(syncer, max_steps=1)
+
+        self.assertEqual(len(syncer.ranges), 4)
+        self.assertEqual(client.requests, 4)
+        self.assertEqual(len(self.indexed), 400)
+
+    def test_ranges_resume_after_restart(self):
+        """区间光标持久化后，新的同步器应从断点继续"""
+        client = FakeClient(range(1, 1001))
+        syncer = self._make_syncer(client)
+        syncer.state["next_oldest_id"] = 1001
+        self._run_steps(syncer, max_steps=1)
+
+        persisted = self.store.get_ranges(-100)
+        self.assertEqual(len(persisted), 4)
+
+        resumed = self._make_syncer(client)
+        self.assertEqual(resumed.ranges, persisted)
+        self._run_steps(resumed)
+
+        self.assertEqual(sorted(set(self.indexed)), list(range(1, 1001)))
+        self.assertEqual(len(self.indexed), 1000)
+
+    def test_rebalance_splits_largest_range(self):
+        """稀疏区间提前完成后，应二分剩余最大的区间"""
+        # 下半部分没有消息，对应的区间会很快完成
+        client = FakeClient(range(601, 1001))
+        syncer = self._make_syncer(client, workers=2)
+        syncer.state["next_oldest_id"] = 1001
+
+        self._run_steps(syncer, max_steps=1)
+
+        self.assertEqual(len(syncer.ranges), 2)
+        self.assertTrue(all(r["low"] >= 500 for r in syncer.ranges))
+
+        self._run_steps(syncer)
+        self.assertEqual(sorted(self.indexed), list(range(601, 1001)))
+
+    def test_backfill_waits_for_index_backlog(self):
+        """任务积压超过高水位时回溯不发出请求，积压回落后继续"""
+        meili_service = MagicMock()
+        meili_service.get_tasks_async = AsyncMock(return_value=[])
+        tracker = IndexTaskTracker(meili_service, poll_interval=0.1, high_watermark=1, low_watermark=0)
+        client = FakeClient(range(1, 201))
+        syncer = self._make_syncer(client, workers=1, task_tracker=tracker)
+        syncer.state["next_oldest_id"] = 201
+
+        async def scenario():
+            meili_service.get_tasks_async.return_value = [{"uid": 1, "status": "processing"},
+                                                          {"uid": 2, "status": "processing"}]
+            tracker.start()
+            try:
+                tracker.track("telegram_messages", 1, ["-100_1"], [-100])
+                tracker.track("telegram_messages", 2, ["-100_2"], [-100])
+                step = asyncio.ensure_future(syncer.backfill_step())
+                await asyncio.sleep(0.25)
+                self.assertEqual(client.requests, 0)
+                self.assertFalse(step.done())
+
+                # 任务完成后积压清零，回溯继续
+                meili_service.get_tasks_async.return_value = [{"uid": 1, "status": "succeeded"},
+                                                              {"uid": 2, "status": "succeeded"}]
+                self.assertTrue(await asyncio.wait_for(step, 1))
+                self.assertEqual(client.requests, 1)
+            finally:
+                await tracker.stop()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_failed_flush_does_not_advance_persisted_cursor(self):
+        """一批写入失败、下一批成功时，持久化的光标只在失败的文档也写入后才前进"""
+        written = []
+        calls = {"count": 0}
+
+        async def index_bulk(docs):
+            calls["count"] += 1
+            if calls["count"] == 1:
+                raise RuntimeError("meilisearch unavailable")
+            written.extend(doc.message_id for doc in docs)
+            return {"taskUid": calls["count"]}
+
+        meili_service = MagicMock()
+        meili_service.index_messages_bulk_async = AsyncMock(side_effect=index_bulk)
+        buffer = IngestBuffer(meili_service, max_batch_size=1000, flush_interval=60)
+        syncer = HistorySyncer(
+            client=FakeClient(range(1, 301)), meili_service=meili_service, chat_id=-100,
+            ingest_buffer=buffer, state_store=self.store, backfill_workers=1,
+        )
+
+        async def add_doc(msg):
+            await buffer.add(MeiliMessageDoc(
+                id=f"-100_{msg.id}", message_id=msg.id, chat_id=-100, chat_type="group",
+                sender_id=1, text="hello", date=1700000000 + msg.id, message_link=""
+            ))
+
+        syncer._index_to_meili = AsyncMock(side_effect=add_doc)
+
+        async def scenario():
+            syncer.state["next_oldest_id"] = 301
+            await syncer._persist_state()
+
+            self.assertTrue(await syncer.backfill_step())
+            await buffer.flush()
+            # 写入失败：光标保持不变
+            self.assertEqual(self.store.get_cursor(-100)["next_oldest_id"], 301)
+
+            self.assertTrue(await syncer.backfill_step())
+            await buffer.flush()
+            persisted = self.store.get_cursor(-100)["next_oldest_id"]
+            self.assertEqual(persisted, 101)
+            self.assertEqual(sorted(written), list(range(persisted, 301)))
+            await buffer.close()
+
+        self.loop.run_until_complete(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -140,7 +140,7 @@ class TestBuildMeilisearchFilters(unittest.TestCase):
         filters_dict = {'chat_type': 'group'}
         filter_string = self.handler._build_meilisearch_filters(filters_dict)
         
-        self.assertEqual(filter_string, "chat_type = 'group'")
+        self.assertEqual(filter_string, 'chat_type = "group"')
 
     def test_build_date_range_filter(self):
         """测试日期范围过滤条件"""
@@ -165,7 +165,7 @@ class TestBuildMeilisearchFilters(unittest.TestCase):
         }
         filter_string = self.handler._build_meilisearch_filters(filters_dict)
         
-        self.assertTrue("chat_type = 'group'" in filter_string)
+        self.assertTrue('chat_type = "group"' in filter_string)
         self.assertTrue("date >= 1672531200 AND date <= 1704067199" in filter_string)
         self.assertTrue(" AND " in filter_string)
 
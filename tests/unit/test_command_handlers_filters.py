@@ -116,16 +116,13 @@ class TestMeilisearchFiltersBuilding(unittest.TestCase):
         filters_dict = {'chat_type': ['group']}
         filter_string = self.handler._build_meilisearch_filters(filters_dict)
         
-        self.assertEqual(filter_string, "(chat_type = 'group')")
+        self.assertEqual(filter_string, 'chat_type = "group"')
         
         # 测试多个类型
         filters_dict = {'chat_type': ['group', 'channel']}
         filter_string = self.handler._build_meilisearch_filters(filters_dict)
         
-        self.assertTrue("chat_type = 'group'" in filter_string)
-        self.assertTrue("chat_type = 'channel'" in filter_string)
-        self.assertTrue(" OR " in filter_string)
-        self.assertTrue(filter_string.startswith("(") and filter_string.endswith(")"))
+        self.assertEqual(filter_string, 'chat_type IN ["channel", "group"]')
 
     def test_build_combined_with_date_and_chat_type_list(self):
         """测试组合日期范围和多聊天类型过滤条件"""
@@ -138,7 +135,7 @@ class TestMeilisearchFiltersBuilding(unittest.TestCase):
         }
         filter_string = self.handler._build_meilisearch_filters(filters_dict)
         
-        self.assertTrue("(chat_type = 'group' OR chat_type = 'channel')" in filter_string)
+        self.assertTrue('chat_type IN ["channel", "group"]' in filter_string)
         self.assertTrue("date >= 1672531200 AND date <= 1704067199" in filter_string)
         self.assertTrue(" AND " in filter_string)
 
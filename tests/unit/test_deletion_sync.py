@@ -0,0 +1,105 @@
+"""
+删除同步单元测试
+
+测试消息删除的传播，包括：
+1. 带 chat_id 的删除事件按文档ID批量删除
+2. 不带 chat_id 的删除事件在非频道白名单聊天内按 message_id 过滤删除
+3. DeletionReconciler 比对索引与 Telegram 并删除已不存在的消息
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+
+from user_bot.deletion_sync import DeletionReconciler
+from user_bot.event_handlers import handle_message_deleted
+
+
+class TestHandleMessageDeleted(unittest.TestCase):
+    """测试handle_message_deleted"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.config_manager = MagicMock()
+        self.config_manager.get_whitelist.return_value = [-1001234567890, -12345, 42]
+        self.config_manager.is_in_whitelist.side_effect = lambda cid: cid in [-1001234567890, -12345, 42]
+        self.meili_service = MagicMock()
+        self.meili_service.delete_messages_bulk_async = AsyncMock()
+        self.meili_service.delete_messages_by_filter_async = AsyncMock()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, event):
+        self.loop.run_until_complete(handle_message_deleted(
+            event, config_manager=self.config_manager, meili_service=self.meili_service
+        ))
+
+    def test_channel_delete_uses_document_ids(self):
+        """频道删除事件应按文档ID批量删除"""
+        self._run(MagicMock(chat_id=-1001234567890, deleted_ids=[5, 6]))
+
+        self.meili_service.delete_messages_bulk_async.assert_awaited_once_with(
+            ["-1001234567890_5", "-1001234567890_6"]
+        )
+        self.meili_service.delete_messages_by_filter_async.assert_not_awaited()
+
+    def test_non_whitelisted_chat_ignored(self):
+        """非白名单聊天的删除事件应忽略"""
+        self._run(MagicMock(chat_id=-1009999, deleted_ids=[5]))
+
+        self.meili_service.delete_messages_bulk_async.assert_not_awaited()
+
+    def test_delete_without_chat_id_filters_non_channels(self):
+        """不带 chat_id 的删除事件只在非频道白名单聊天内按消息ID删除"""
+        self._run(MagicMock(chat_id=None, deleted_ids=[7, 8]))
+
+        self.meili_service.delete_messages_by_filter_async.assert_awaited_once_with(
+            "chat_id IN [-12345, 42] AND message_id IN [7, 8]", chat_ids=[-12345, 42]
+        )
+
+
+class TestDeletionReconciler(unittest.TestCase):
+    """测试DeletionReconciler"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_reconcile_chat_deletes_missing(self):
+        """Telegram 返回 None 的消息应从索引删除"""
+        pages = [[1, 2, 3, 4], []]
+        meili_service = MagicMock()
+        meili_service.get_indexed_message_ids_async = AsyncMock(side_effect=pages)
+        meili_service.delete_messages_bulk_async = AsyncMock()
+
+        client = MagicMock()
+        client.get_messages = AsyncMock(
+            side_effect=lambda chat_id, ids: [None if i in (2, 4) else MagicMock(id=i) for i in ids]
+        )
+
+        reconciler = DeletionReconciler(client, meili_service, MagicMock())
+        deleted = self.loop.run_until_complete(reconciler.reconcile_chat(100))
+
+        self.assertEqual(deleted, 2)
+        meili_service.delete_messages_bulk_async.assert_awaited_once_with(["100_2", "100_4"])
+        self.assertEqual(reconciler.get_stats()["checked"], 4)
+
+    def test_reconcile_all_continues_after_error(self):
+        """单个聊天对账失败不影响其他聊天"""
+        config_manager = MagicMock()
+        config_manager.get_whitelist.return_value = [1, 2]
+        reconciler = DeletionReconciler(MagicMock(), MagicMock(), config_manager)
+        reconciler.reconcile_chat = AsyncMock(side_effect=[RuntimeError("boom"), 3])
+
+        deleted = self.loop.run_until_complete(reconciler.reconcile_all())
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(reconciler.get_stats()["errors"], 1)
+        self.assertEqual(reconciler.get_stats()["passes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+向前同步协调器单元测试
+
+测试user_bot.forward_sync模块中的ForwardSyncCoordinator，包括：
+1. 更新流消息推进光标（仅频道/超级群组）
+2. 消息 ID 跳号时安排补洞
+3. 重连后对所有聊天补洞
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+
+from user_bot.forward_sync import ForwardSyncCoordinator
+from user_bot.history_syncer import HistorySyncer
+
+
+class TestForwardSyncCoordinator(unittest.TestCase):
+    """测试ForwardSyncCoordinator的补洞调度"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.client = MagicMock()
+        self.client.is_connected = MagicMock(return_value=True)
+        self.ingest_buffer = MagicMock()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _make_syncer(self, chat_id: int, last_newest: int) -> HistorySyncer:
+        state_store = MagicMock()
+        state_store.get_cursor.return_value = None
+        syncer = HistorySyncer(
+            client=self.client,
+            meili_service=MagicMock(),
+            chat_id=chat_id,
+            ingest_buffer=self.ingest_buffer,
+            state_store=state_store,
+        )
+        syncer.state["last_newest_id"] = last_newest
+        syncer.catch_up = AsyncMock(return_value=0)
+        return syncer
+
+    def test_live_message_advances_cursor(self):
+        """连续的新消息直接推进光标，不触发补洞"""
+        async def scenario():
+            coordinator = ForwardSyncCoordinator(self.client)
+            syncer = self._make_syncer(-100, last_newest=10)
+            coordinator.register(syncer)
+            coordinator._dirty.clear()
+
+            await coordinator.on_new_message(-100, 11, ids_are_sequential=True)
+
+            self.assertEqual(syncer.state["last_newest_id"], 11)
+            self.assertEqual(coordinator.get_stats()["pending_catch_ups"], 0)
+            self.ingest_buffer.call_after_flush.assert_called_once()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_gap_schedules_catch_up(self):
+        """频道消息 ID 跳号时不推进光标，并由补洞任务处理"""
+        async def scenario():
+            coordinator = ForwardSyncCoordinator(self.client, resync_interval=0)
+            syncer = self._make_syncer(-100, last_newest=10)
+            coordinator.register(syncer)
+            coordinator._dirty.clear()
+
+            await coordinator.on_new_message(-100, 15, ids_are_sequential=True)
+            self.assertEqual(syncer.state["last_newest_id"], 10)
+            self.assertEqual(coordinator.get_stats()["gaps_detected"], 1)
+
+            coordinator.start()
+            await asyncio.sleep(0.05)
+            syncer.catch_up.assert_awaited_once()
+            await coordinator.stop()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_non_sequential_ids_do_not_trigger_gap(self):
+        """私聊/普通群组的消息 ID 不连续，不应视为空洞；光标也不随更新流推进，留给补洞验证"""
+        async def scenario():
+            coordinator = ForwardSyncCoordinator(self.client)
+            syncer = self._make_syncer(200, last_newest=10)
+            coordinator.register(syncer)
+            coordinator._dirty.clear()
+
+            await coordinator.on_new_message(200, 50, ids_are_sequential=False)
+            self.assertEqual(syncer.state["last_newest_id"], 10)
+            self.assertEqual(coordinator.get_stats()["gaps_detected"], 0)
+            self.assertEqual(coordinator.get_stats()["pending_catch_ups"], 0)
+            self.ingest_buffer.call_after_flush.assert_not_called()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_catch_up_recovers_gap_after_non_sequential_live_message(self):
+        """私聊中先收到新消息、之后才补洞时，补洞仍从已验证的光标开始，不会越过空洞"""
+        async def scenario():
+            coordinator = ForwardSyncCoordinator(self.client)
+            syncer = self._make_syncer(200, last_newest=10)
+            del syncer.catch_up
+            syncer._index_to_meili = AsyncMock()
+            coordinator.register(syncer)
+            coordinator._dirty.clear()
+            requested_min_ids = []
+
+            async def iter_messages(chat_id, min_id, limit, reverse):
+                requested_min_ids.append(min_id)
+                for message_id in (20, 35, 50):
+                    if message_id > min_id:
+                        yield MagicMock(id=message_id)
+
+            self.client.iter_messages = iter_messages
+
+            await coordinator.on_new_message(200, 50, ids_are_sequential=False)
+            self.assertEqual(await syncer.catch_up(), 3)
+
+            self.assertEqual(requested_min_ids, [10])
+            self.assertEqual(syncer.state["last_newest_id"], 50)
+
+        self.loop.run_until_complete(scenario())
+
+    def test_reconnect_marks_all_chats(self):
+        """检测到重连后应对所有已注册聊天补洞"""
+        async def scenario():
+            coordinator = ForwardSyncCoordinator(self.client, connection_check_interval=0.01)
+            for chat_id in (1, 2, 3):
+                coordinator.register(self._make_syncer(chat_id, last_newest=0))
+            coordinator._dirty.clear()
+            coordinator._was_connected = False
+
+            monitor = asyncio.create_task(coordinator._connection_monitor())
+            await asyncio.sleep(0.05)
+            monitor.cancel()
+
+            self.assertEqual(coordinator._dirty, {1, 2, 3})
+            self.assertEqual(coordinator.get_stats()["reconnects"], 1)
+
+        self.loop.run_until_complete(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,8 @@ HistorySyncer 单元测试
 
 import os
 import json
+import shutil
+import tempfile
 import asyncio
 import unittest
 from unittest.mock import MagicMock, AsyncMock, patch
@@ -18,12 +20,9 @@ class TestHistorySyncer(unittest.TestCase):
     
     def setUp(self):
         """测试前准备工作"""
-        # 创建临时同步点文件路径
-        self.test_sync_points_path = "test_sync_points.json"
-        
-        # 清理可能存在的临时文件
-        if os.path.exists(self.test_sync_points_path):
-            os.remove(self.test_sync_points_path)
+        # 同步点保存在临时目录中的独立状态库（setUp 失败时也会清理）
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
         
         # 创建模拟对象
         self.mock_client = MagicMock()
@@ -36,8 +35,9 @@ class TestHistorySyncer(unittest.TestCase):
         self.mock_meili_service = MagicMock()
         self.mock_meili_service.index_messages_bulk = MagicMock(return_value={"taskUid": "mock-task-id"})
         
-        # 创建真实的SyncPointManager，但使用测试文件路径
-        self.sync_point_manager = SyncPointManager(self.test_sync_points_path)
+        # 创建真实的SyncPointManager，但使用临时状态库
+        self.sync_point_manager = SyncPointManager(db_path=os.path.join(self.temp_dir, "sync_state.db"))
+        self.addCleanup(self.sync_point_manager.state_store.close)
         
         # 创建HistorySyncer实例
         self.syncer = HistorySyncer(
@@ -47,12 +47,6 @@ class TestHistorySyncer(unittest.TestCase):
             sync_point_manager=self.sync_point_manager
         )
         
-    def tearDown(self):
-        """测试后清理工作"""
-        # 删除临时同步点文件
-        if os.path.exists(self.test_sync_points_path):
-            os.remove(self.test_sync_points_path)
-
     @patch('user_bot.history_syncer.HistorySyncer._build_message_doc')
     @patch('telethon.client.messages.MessageMethods.iter_messages')
     async def test_incremental_sync(self, mock_iter_messages, mock_build_message_doc):
@@ -0,0 +1,95 @@
+"""
+索引代数单元测试
+
+测试core.index_generations模块及其与搜索结果缓存的配合，包括：
+1. 按聊天递增代数与快照比较
+2. 写入后限定了该聊天或未限定聊天的缓存条目失效
+3. 其他聊天的写入不影响限定聊天的缓存条目
+4. MeiliSearchService 写入路径递增代数
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core import index_generations
+from core.index_generations import IndexGenerations, get_index_generations
+from core.meilisearch_service import MeiliSearchService
+from core.search_result_cache import SearchResultCache
+
+
+class TestIndexGenerations(unittest.TestCase):
+    """测试IndexGenerations"""
+
+    def test_bump_and_snapshot(self):
+        """写入只改变涉及聊天的快照和全局快照"""
+        gens = IndexGenerations()
+        snap_1 = gens.snapshot([1])
+        snap_2 = gens.snapshot([2])
+        snap_all = gens.snapshot()
+
+        gens.bump([1, 1])
+
+        self.assertEqual(gens.get(1), 1)
+        self.assertNotEqual(gens.snapshot([1]), snap_1)
+        self.assertEqual(gens.snapshot([2]), snap_2)
+        self.assertNotEqual(gens.snapshot(), snap_all)
+
+    def test_epoch_invalidates_everything(self):
+        """无法确定聊天的写入使所有快照变化"""
+        gens = IndexGenerations()
+        snap_1 = gens.snapshot([1])
+        gens.bump(None)
+        self.assertNotEqual(gens.snapshot([1]), snap_1)
+        self.assertEqual(gens.get_stats()["epoch"], 1)
+
+
+class TestGenerationAwareCache(unittest.TestCase):
+    """测试搜索结果缓存按索引代数校验"""
+
+    def setUp(self):
+        self._saved = index_generations._index_generations
+        index_generations._index_generations = IndexGenerations()
+        self.cache = SearchResultCache(maxsize=10, ttl=3600)
+
+    def tearDown(self):
+        index_generations._index_generations = self._saved
+
+    def test_write_to_chat_expires_matching_entries(self):
+        """聊天写入后，限定该聊天和未限定聊天的条目过期，其他条目保留"""
+        self.cache.set("only_1", 1, chat_ids=[1])
+        self.cache.set("only_2", 2, chat_ids=[2])
+        self.cache.set("any", 3)
+
+        get_index_generations().bump([1])
+
+        self.assertIsNone(self.cache.get("only_1"))
+        self.assertIsNone(self.cache.get("any"))
+        self.assertEqual(self.cache.get("only_2"), 2)
+        self.assertEqual(self.cache.get_stats()["stale"], 2)
+
+    def test_snapshot_taken_before_search(self):
+        """搜索期间发生的写入应使随后写入的条目过期"""
+        generations = self.cache.snapshot([1])
+        get_index_generations().bump([1])
+        self.cache.set("k", "old", chat_ids=[1], generations=generations)
+
+        self.assertIsNone(self.cache.get("k"))
+
+    def test_service_writes_bump_generations(self):
+        """MeiliSearchService 的写入和删除应递增对应聊天的代数"""
+        with patch("core.meilisearch_service.meilisearch.Client"), \
+                patch.object(MeiliSearchService, "ensure_index_setup"), \
+                patch.object(MeiliSearchService, "ensure_sessions_index_setup"):
+            service = MeiliSearchService("http://localhost:7700", "key")
+        service.index = MagicMock()
+
+        service.delete_messages_bulk(["-100_1", "-100_2", "42_3"])
+
+        gens = get_index_generations()
+        self.assertEqual(gens.get(-100), 1)
+        self.assertEqual(gens.get(42), 1)
+        self.assertEqual(gens.get(7), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+零停机索引重建单元测试
+
+测试 core.index_write_journal 和 core.index_rebuild，包括：
+1. 写入日志只记录正在重建的索引，按写入顺序取出
+2. 暂停写入时异步写入等待恢复
+3. 影子索引重建：复制、重放复制期间的写入、交换后删除旧索引
+4. 失败时删除影子索引，线上索引保持不变
+"""
+
+import asyncio
+import unittest
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.index_rebuild import PHASE_DONE, PHASE_FAILED, IndexRebuilder
+from core.index_write_journal import OP_DELETE, OP_UPSERT, IndexWriteJournal
+from core.meilisearch_service import MESSAGE_INDEX_SETTINGS
+from tests.unit.factories import make_message_dict
+
+INDEX = "telegram_messages"
+
+
+class FakeMeiliService:
+    """内存中的 Meilisearch，任务立即完成"""
+
+    def __init__(self, journal: IndexWriteJournal, docs: List[Dict[str, Any]]) -> None:
+        self.index_name = INDEX
+        self.journal = journal
+        self.indexes: Dict[str, Dict[str, Dict[str, Any]]] = {INDEX: {doc["id"]: doc for doc in docs}}
+        self.settings: Dict[str, Any] = {}
+        self.on_fetch = None
+        self.fail_swap = False
+        self.fetches = 0
+
+    def _task(self) -> Dict[str, int]:
+        return {"taskUid": 1}
+
+    # 线上写入路径：写入当前名为 INDEX 的索引并记录日志
+    async def live_upsert(self, doc: Dict[str, Any]) -> None:
+        await self.journal.wait_writable(INDEX)
+        self.indexes[INDEX][doc["id"]] = doc
+        self.journal.record_upsert(INDEX, [doc])
+
+    async def live_delete(self, doc_id: str) -> None:
+        await self.journal.wait_writable(INDEX)
+        self.indexes[INDEX].pop(doc_id, None)
+        self.journal.record_delete(INDEX, [doc_id])
+
+    async def get_document_count_async(self, index_uid: Optional[str] = None) -> int:
+        return len(self.indexes[index_uid or INDEX])
+
+    async def create_index_async(self, index_uid: str, settings: Dict[str, Any]) -> None:
+        self.indexes[index_uid] = {}
+        self.settings[index_uid] = settings
+
+    async def fetch_documents_after_async(self, after: Optional[Tuple[int, int]] = None,
+                                          limit: int = 1000, index_uid: Optional[str] = None):
+        self.fetches += 1
+        if self.on_fetch is not None:
+            await self.on_fetch(self.fetches)
+        docs = sorted(self.indexes[index_uid or INDEX].values(), key=lambda d: (d["chat_id"], d["message_id"]))
+        if after is not None:
+            docs = [d for d in docs if (d["chat_id"], d["message_id"]) > after]
+        return docs[:limit]
+
+    async def add_documents_async(self, index_uid: str, documents: List[Dict[str, Any]]):
+        self.indexes[index_uid].update({doc["id"]: doc for doc in documents})
+        return self._task()
+
+    async def delete_documents_async(self, index_uid: str, document_ids: List[str]):
+        for doc_id in document_ids:
+            self.indexes[index_uid].pop(doc_id, None)
+        return self._task()
+
+    async def delete_documents_by_filter_async(self, index_uid: str, filter_expr: str):
+        raise AssertionError("unexpected filter delete")
+
+    async def swap_indexes_async(self, first: str, second: str):
+        if self.fail_swap:
+            raise RuntimeError("swap failed")
+        self.indexes[first], self.indexes[second] = self.indexes[second], self.indexes[first]
+        return self._task()
+
+    async def delete_index_async(self, index_uid: str):
+        del self.indexes[index_uid]
+        return self._task()
+
+    async def wait_for_task_async(self, task_uid: int, **kwargs):
+        return {"uid": task_uid, "status": "succeeded"}
+
+
+class TestIndexWriteJournal(unittest.TestCase):
+    """测试IndexWriteJournal"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.journal = IndexWriteJournal()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_records_only_target_index_in_order(self):
+        """只记录正在重建的索引，停止后不再记录"""
+        self.journal.record_upsert(INDEX, [make_message_dict(1, 1)])
+        self.journal.start(INDEX)
+        self.journal.record_upsert(INDEX, [make_message_dict(2, 1)])
+        self.journal.record_upsert("telegram_sessions", [{"id": "x"}])
+        self.journal.record_delete(INDEX, ["1_2"])
+
+        self.assertEqual(self.journal.drain(), [(OP_UPSERT, [make_message_dict(2, 1)]), (OP_DELETE, ["1_2"])])
+        self.assertEqual(self.journal.stop(), [])
+        self.journal.record_delete(INDEX, ["1_3"])
+        self.assertEqual(self.journal.pending_count(), 0)
+        self.journal.start(INDEX)
+        with self.assertRaises(RuntimeError):
+            self.journal.start("other")
+
+    def test_paused_writes_wait_for_resume(self):
+        """暂停期间异步写入等待，恢复后继续"""
+        async def scenario():
+            self.journal.start(INDEX)
+            self.journal.pause_writes()
+            waiter = asyncio.ensure_future(self.journal.wait_writable(INDEX))
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+            await self.journal.wait_writable("telegram_sessions")
+            self.journal.resume_writes()
+            await asyncio.wait_for(waiter, 1)
+
+        self.loop.run_until_complete(scenario())
+
+
+class TestIndexRebuilder(unittest.TestCase):
+    """测试IndexRebuilder"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.journal = IndexWriteJournal()
+        self.service = FakeMeiliService(
+            self.journal, [make_message_dict(message_id, chat_id) for chat_id in (-100, 5) for message_id in range(1, 1501)]
+        )
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_rebuild_copies_catches_up_and_swaps(self):
+        """复制期间的新增、编辑和删除在交换前重放，交换后旧索引被删除"""
+        async def write_during_copy(fetch_number):
+            if fetch_number == 2:
+                await self.service.live_upsert(make_message_dict(1, -100, text="edited"))
+                await self.service.live_upsert(make_message_dict(1, 9))
+                await self.service.live_delete("5_1500")
+
+        self.service.on_fetch = write_during_copy
+        rebuilder = IndexRebuilder(self.service, batch_size=1000, journal=self.journal)
+
+        progress = self.loop.run_until_complete(rebuilder.run())
+
+        self.assertEqual(progress["phase"], PHASE_DONE)
+        self.assertEqual(progress["percent"], 100.0)
+        self.assertEqual(progress["replayed_operations"], 3)
+        self.assertEqual(set(self.service.indexes), {INDEX})
+        live = self.service.indexes[INDEX]
+        self.assertEqual(len(live), 3000)
+        self.assertEqual(live["-100_1"]["text"], "edited")
+        self.assertIn("9_1", live)
+        self.assertNotIn("5_1500", live)
+        self.assertIs(self.service.settings[rebuilder.shadow_uid], MESSAGE_INDEX_SETTINGS)
+        self.assertIsNone(self.journal.index_uid)
+
+    def test_failure_drops_shadow_and_keeps_live_index(self):
+        """交换失败时删除影子索引，线上索引不变，写入恢复"""
+        self.service.fail_swap = True
+        rebuilder = IndexRebuilder(self.service, journal=self.journal)
+
+        progress = self.loop.run_until_complete(rebuilder.run())
+
+        self.assertEqual(progress["phase"], PHASE_FAILED)
+        self.assertIn("swap failed", progress["error"])
+        self.assertEqual(set(self.service.indexes), {INDEX})
+        self.assertEqual(len(self.service.indexes[INDEX]), 3000)
+        self.assertFalse(self.journal.get_stats()["paused"])
+        self.assertFalse(rebuilder.is_running())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+索引设置同步单元测试
+
+测试 core.meilisearch_service 中的索引设置比较与共享实例，包括：
+1. 可过滤、可排序属性按集合比较，其它列表按顺序比较，分面只比较期望的键
+2. 设置已是最新时不提交任何更新
+3. 有差异时只提交一次包含差异项的 update_settings
+4. 索引不存在时创建并提交全部设置；已有索引的排序规则不在启动时修改
+5. 相同连接参数共享同一个服务实例，进程退出时统一关闭连接池
+"""
+
+import asyncio
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from meilisearch.errors import MeilisearchApiError
+
+from core.meilisearch_service import (
+    MESSAGE_INDEX_SETTINGS, SESSION_INDEX_SETTINGS, MeiliSearchService, clear_shared_meilisearch_services,
+    close_shared_meilisearch_services, diff_index_settings, get_shared_meilisearch_service
+)
+
+
+def _current_message_settings():
+    """模拟 Meilisearch 返回的消息索引设置：集合类属性重新排序，分面带额外的键"""
+    settings = json.loads(json.dumps(MESSAGE_INDEX_SETTINGS))
+    settings["filterableAttributes"] = sorted(settings["filterableAttributes"])
+    settings["sortableAttributes"] = list(reversed(settings["sortableAttributes"]))
+    settings["faceting"]["sortFacetValuesBy"] = {"*": "count"}
+    settings["stopWords"] = ["的"]
+    return settings
+
+
+def _not_found_error():
+    response = MagicMock(status_code=404, text=json.dumps({"message": "missing", "code": "index_not_found"}))
+    return MeilisearchApiError("missing", response)
+
+
+class TestDiffIndexSettings(unittest.TestCase):
+    """测试diff_index_settings"""
+
+    def test_unchanged_settings_produce_no_diff(self):
+        """顺序无关的属性重新排序、额外的设置项不视为差异"""
+        self.assertEqual(diff_index_settings(_current_message_settings(), MESSAGE_INDEX_SETTINGS), {})
+
+    def test_granular_filterable_attributes_are_compared_by_name(self):
+        """新版 Meilisearch 的对象形式可过滤属性按属性名比较"""
+        current = _current_message_settings()
+        current["filterableAttributes"] = [{"attributePatterns": MESSAGE_INDEX_SETTINGS["filterableAttributes"]}]
+        self.assertEqual(diff_index_settings(current, MESSAGE_INDEX_SETTINGS), {})
+
+    def test_changed_settings_are_returned_with_desired_values(self):
+        """顺序敏感的设置、缺少的属性和不同的分面设置都会被提交"""
+        current = _current_message_settings()
+        current["rankingRules"] = list(reversed(current["rankingRules"]))
+        current["sortableAttributes"] = ["date"]
+        current["faceting"]["maxValuesPerFacet"] = 10
+
+        diff = diff_index_settings(current, MESSAGE_INDEX_SETTINGS)
+
+        self.assertEqual(sorted(diff), ["faceting", "rankingRules", "sortableAttributes"])
+        self.assertEqual(diff["rankingRules"], MESSAGE_INDEX_SETTINGS["rankingRules"])
+
+    def test_empty_settings_diff_everything(self):
+        """新建索引（无设置）时提交全部设置"""
+        self.assertEqual(diff_index_settings({}, SESSION_INDEX_SETTINGS), SESSION_INDEX_SETTINGS)
+
+
+class TestSyncIndexSettings(unittest.TestCase):
+    """测试MeiliSearchService启动时的设置同步"""
+
+    def setUp(self):
+        clear_shared_meilisearch_services()
+        patcher = patch("core.meilisearch_service.meilisearch.Client")
+        self.mock_client_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(clear_shared_meilisearch_services)
+
+        self.client = self.mock_client_cls.return_value
+        self.messages_index = MagicMock(uid="telegram_messages")
+        self.sessions_index = MagicMock(uid="telegram_sessions")
+        indexes = {"telegram_messages": self.messages_index, "telegram_sessions": self.sessions_index}
+        self.client.index.side_effect = lambda uid: indexes.get(uid) or MagicMock(uid=uid)
+        self.messages_index.get_settings.return_value = _current_message_settings()
+        self.sessions_index.get_settings.return_value = dict(SESSION_INDEX_SETTINGS)
+
+    def test_up_to_date_settings_issue_no_updates(self):
+        """设置已是最新时每个索引只读取一次设置，不提交更新"""
+        MeiliSearchService("http://localhost:7700")
+
+        self.messages_index.get_settings.assert_called_once()
+        self.sessions_index.get_settings.assert_called_once()
+        self.messages_index.update_settings.assert_not_called()
+        self.sessions_index.update_settings.assert_not_called()
+        self.client.get_indexes.assert_not_called()
+
+    def test_changed_settings_issue_single_update(self):
+        """只有差异项通过一次 update_settings 提交"""
+        self.sessions_index.get_settings.return_value = {**SESSION_INDEX_SETTINGS, "sortableAttributes": ["date"]}
+
+        MeiliSearchService("http://localhost:7700")
+
+        self.sessions_index.update_settings.assert_called_once_with(
+            {"sortableAttributes": SESSION_INDEX_SETTINGS["sortableAttributes"]}
+        )
+        self.messages_index.update_settings.assert_not_called()
+
+    def test_ranking_rules_are_not_changed_on_existing_index(self):
+        """已有索引的排序规则与期望不一致时只提交其它差异，排序规则留给索引重建"""
+        current = _current_message_settings()
+        current["rankingRules"] = ["words", "sort", "typo", "proximity", "attribute", "exactness"]
+        current["sortableAttributes"] = ["date"]
+        self.messages_index.get_settings.return_value = current
+
+        with self.assertLogs("core.meilisearch_service", level="WARNING"):
+            MeiliSearchService("http://localhost:7700")
+
+        self.messages_index.update_settings.assert_called_once_with(
+            {"sortableAttributes": MESSAGE_INDEX_SETTINGS["sortableAttributes"]}
+        )
+
+    def test_missing_index_is_created_with_full_settings(self):
+        """索引不存在时以 id 为主键创建并提交全部设置"""
+        self.messages_index.get_settings.side_effect = _not_found_error()
+
+        MeiliSearchService("http://localhost:7700")
+
+        self.client.create_index.assert_called_once_with("telegram_messages", {"primaryKey": "id"})
+        self.messages_index.update_settings.assert_called_once_with(MESSAGE_INDEX_SETTINGS)
+
+    def test_shared_service_is_created_once(self):
+        """相同连接参数返回同一实例，不同索引名创建新实例"""
+        first = get_shared_meilisearch_service("http://localhost:7700", "key", http_pool_size=5)
+        second = get_shared_meilisearch_service("http://localhost:7700", "key")
+
+        self.assertIs(first, second)
+        self.assertEqual(second.http_pool_size, 5)
+        self.assertEqual(self.messages_index.get_settings.call_count, 1)
+        self.assertIsNot(get_shared_meilisearch_service("http://localhost:7700", "key", index_name="other"), first)
+
+
+    def test_close_shared_services_closes_every_pool_once(self):
+        """统一关闭全部共享实例的连接池，实例仍保留供后续请求重新创建连接池"""
+        first = get_shared_meilisearch_service("http://localhost:7700")
+        second = get_shared_meilisearch_service("http://localhost:7700", index_name="other")
+        pools = []
+        for service in (first, second):
+            service._async_client = MagicMock(is_closed=False, aclose=AsyncMock())
+            pools.append(service._async_client)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(close_shared_meilisearch_services())
+        finally:
+            loop.close()
+
+        for pool in pools:
+            pool.aclose.assert_awaited_once()
+        self.assertIs(get_shared_meilisearch_service("http://localhost:7700"), first)
+        self.assertIsNone(first._async_client)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+索引任务跟踪单元测试
+
+测试 core.index_task_tracker，包括：
+1. 按聊天汇总失败文档的消息ID范围
+2. 按批轮询任务状态：成功的任务移出跟踪，失败的任务连同文档范围被记录，已清理的任务计为 lost
+3. 任务结束时递增受影响聊天的索引代数
+4. 积压超过高水位时开始背压，降到低水位后解除；背压期间 wait_for_capacity 等待
+5. 从本地消息归档重新提交失败任务的文档，删除任务不重试
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Any, Dict, List
+
+from core.index_generations import get_index_generations
+from core.index_task_tracker import IndexTaskTracker, summarize_document_ranges
+from core.message_archive import MessageArchive
+from core.models import MeiliMessageDoc
+from tests.unit.factories import make_message_doc
+
+
+class FakeMeiliService:
+    """按 statuses 返回任务状态，记录重新提交的文档"""
+
+    def __init__(self) -> None:
+        self.statuses: Dict[int, Dict[str, Any]] = {}
+        self.requests: List[List[int]] = []
+        self.indexed: List[MeiliMessageDoc] = []
+
+    async def get_tasks_async(self, task_uids: List[int]) -> List[Dict[str, Any]]:
+        self.requests.append(list(task_uids))
+        return [{"uid": uid, **self.statuses[uid]} for uid in task_uids if uid in self.statuses]
+
+    async def index_messages_bulk_async(self, docs: List[MeiliMessageDoc]) -> Dict[str, Any]:
+        self.indexed.extend(docs)
+        return {"taskUid": 99}
+
+
+class TestIndexTaskTracker(unittest.TestCase):
+    """测试IndexTaskTracker"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.service = FakeMeiliService()
+        self.tracker = IndexTaskTracker(self.service, poll_interval=0.1, high_watermark=2, low_watermark=1)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_summarize_document_ranges(self):
+        """按聊天汇总消息ID范围，负数聊天ID正确解析"""
+        ranges = summarize_document_ranges(["-100_5", "-100_2", "7_1", "-100_9", "bad"])
+
+        self.assertEqual(ranges, [
+            {"chat_id": -100, "min_message_id": 2, "max_message_id": 9, "count": 3},
+            {"chat_id": 7, "min_message_id": 1, "max_message_id": 1, "count": 1},
+        ])
+
+    def test_poll_records_failures_and_drops_finished(self):
+        """成功与失败的任务移出跟踪，处理中的任务保留，已清理的任务计为 lost"""
+        self.tracker.track("telegram_messages", 1, ["-100_1", "-100_2"], [-100])
+        self.tracker.track("telegram_messages", 2, ["-100_3", "-100_7", "5_1"], [-100, 5])
+        self.tracker.track("telegram_messages", 3, ["-100_8"], [-100])
+        self.tracker.track("telegram_messages", 4, ["-100_9"], [-100])
+        self.service.statuses = {
+            1: {"status": "succeeded"},
+            2: {"status": "failed", "error": {"message": "disk full"}},
+            3: {"status": "processing"},
+        }
+
+        finished = self.loop.run_until_complete(self.tracker.poll_once())
+
+        self.assertEqual(finished, 3)
+        self.assertEqual(self.service.requests, [[1, 2, 3, 4]])
+        self.assertEqual(self.tracker.backlog(), 1)
+        failures = self.tracker.get_failures()
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0]["task_uid"], 2)
+        self.assertEqual(failures[0]["error"], "disk full")
+        self.assertEqual(failures[0]["ranges"], [
+            {"chat_id": -100, "min_message_id": 3, "max_message_id": 7, "count": 2},
+            {"chat_id": 5, "min_message_id": 1, "max_message_id": 1, "count": 1},
+        ])
+        stats = self.tracker.get_stats()
+        self.assertEqual((stats["succeeded"], stats["failed"], stats["lost"]), (1, 1, 1))
+
+    def test_finished_tasks_bump_generations(self):
+        """任务处理期间生成的代数快照在任务结束后失效，未结束的任务不影响快照"""
+        generations = get_index_generations()
+        self.tracker.track("telegram_messages", 1, ["-100_1"], [-100])
+        self.tracker.track("telegram_messages", 2, ["5_1"], [5])
+        self.tracker.track("telegram_messages", 3, [], None, retryable=False)
+        self.service.statuses = {1: {"status": "succeeded"}, 2: {"status": "processing"}, 3: {"status": "processing"}}
+        # 提交之后、处理完成之前缓存的结果
+        before = {chat_id: generations.snapshot([chat_id]) for chat_id in (-100, 5)}
+        global_before = generations.snapshot()
+
+        self.loop.run_until_complete(self.tracker.poll_once())
+
+        self.assertNotEqual(generations.snapshot([-100]), before[-100])
+        self.assertEqual(generations.snapshot([5]), before[5])
+
+        # 影响范围未知的任务（如按条件删除）结束时使所有快照失效
+        self.service.statuses[3] = {"status": "succeeded"}
+        self.loop.run_until_complete(self.tracker.poll_once())
+        self.assertNotEqual(generations.snapshot([5]), before[5])
+        self.assertNotEqual(generations.snapshot(), global_before)
+
+    def test_backpressure_hysteresis(self):
+        """超过高水位开始背压，积压降到低水位才解除，期间 wait_for_capacity 等待"""
+        async def scenario():
+            self.service.statuses = {uid: {"status": "enqueued"} for uid in (1, 2, 3)}
+            self.tracker.start()
+            try:
+                for uid in (1, 2, 3):
+                    self.tracker.track("telegram_messages", uid, [f"1_{uid}"], [1])
+                self.assertTrue(self.tracker.is_throttling())
+
+                waiter = asyncio.ensure_future(self.tracker.wait_for_capacity())
+                self.service.statuses[1] = {"status": "succeeded"}
+                await asyncio.sleep(0.25)
+                # 积压 2 个，仍高于低水位
+                self.assertTrue(self.tracker.is_throttling())
+                self.assertFalse(waiter.done())
+
+                self.service.statuses[2] = {"status": "succeeded"}
+                await asyncio.wait_for(waiter, 1)
+                self.assertFalse(self.tracker.is_throttling())
+            finally:
+                await self.tracker.stop()
+
+        self.loop.run_until_complete(scenario())
+        self.assertEqual(self.tracker.get_stats()["throttle_events"], 1)
+
+    def test_wait_returns_when_not_running(self):
+        """跟踪器未运行时背压不生效，避免无人轮询时永久等待"""
+        for uid in (1, 2, 3):
+            self.tracker.track("telegram_messages", uid, [f"1_{uid}"], [1])
+
+        self.loop.run_until_complete(asyncio.wait_for(self.tracker.wait_for_capacity(), 1))
+
+    def test_retry_failures_from_archive(self):
+        """从归档读取失败任务的文档重新提交，已删除的文档被跳过"""
+        temp_dir = tempfile.mkdtemp()
+        archive = MessageArchive(os.path.join(temp_dir, "message_archive.db"))
+        try:
+            archive.append([make_message_doc(message_id, -100) for message_id in (1, 2, 3)])
+            archive.append_tombstones(["-100_3"])
+            self.tracker.track("telegram_messages", 1, ["-100_1", "-100_2", "-100_3"], [-100])
+            self.tracker.track("telegram_messages", 2, ["-100_4"], [-100], retryable=False)
+            self.service.statuses = {1: {"status": "canceled"}, 2: {"status": "failed"}}
+            self.loop.run_until_complete(self.tracker.poll_once())
+
+            retried = self.loop.run_until_complete(self.tracker.retry_failures(archive))
+
+            self.assertEqual(retried, 2)
+            self.assertEqual([doc.id for doc in self.service.indexed], ["-100_1", "-100_2"])
+            self.assertEqual([failure["task_uid"] for failure in self.tracker.get_failures()], [2])
+        finally:
+            archive.close()
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
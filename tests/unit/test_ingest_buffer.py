@@ -0,0 +1,218 @@
+"""
+写入缓冲区单元测试
+
+测试core.ingest_buffer模块中的IngestBuffer，包括：
+1. 按数量阈值和时间阈值批量写入
+2. 同一文档id去重
+3. 写入成功后执行回调；失败时文档和回调放回队列，重试成功后再执行回调
+4. 关闭时刷新剩余文档，最终刷新失败时重试并报告未写入的文档
+5. 实时搜索推送和已保存搜索出错不影响写入结果
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from core.ingest_buffer import FINAL_FLUSH_ATTEMPTS, IngestBuffer
+from tests.unit.factories import make_message_doc
+
+
+class TestIngestBuffer(unittest.TestCase):
+    """测试IngestBuffer的批量写入行为"""
+
+    def setUp(self):
+        # 使用独立的事件循环，避免影响其他依赖默认事件循环的测试
+        self.loop = asyncio.new_event_loop()
+        self.meili_service = MagicMock()
+        self.meili_service.index_messages_bulk_async = AsyncMock(return_value={"taskUid": 1})
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_flush_on_batch_size(self):
+        """达到max_batch_size时应立即触发写入"""
+        async def scenario():
+            buffer = IngestBuffer(self.meili_service, max_batch_size=3, flush_interval=60)
+            for i in range(3):
+                await buffer.add(make_message_doc(i))
+            await asyncio.sleep(0.05)
+
+            self.meili_service.index_messages_bulk_async.assert_called_once()
+            self.assertEqual(len(self.meili_service.index_messages_bulk_async.call_args[0][0]), 3)
+            self.assertEqual(buffer.pending_count(), 0)
+            await buffer.close()
+
+        self._run(scenario())
+
+    def test_flush_on_interval(self):
+        """未达到数量阈值时应在flush_interval后写入"""
+        async def scenario():
+            buffer = IngestBuffer(self.meili_service, max_batch_size=100, flush_interval=0.1)
+            await buffer.add(make_message_doc(1))
+            self.meili_service.index_messages_bulk_async.assert_not_called()
+
+            await asyncio.sleep(0.3)
+            self.meili_service.index_messages_bulk_async.assert_called_once()
+            await buffer.close()
+
+        self._run(scenario())
+
+    def test_deduplicates_by_id(self):
+        """同一id的文档在批内只保留最后一次写入"""
+        async def scenario():
+            buffer = IngestBuffer(self.meili_service, max_batch_size=100, flush_interval=60)
+            await buffer.add(make_message_doc(1, text="old"))
+            await buffer.add(make_message_doc(1, text="new"))
+            self.assertEqual(buffer.pending_count(), 1)
+
+            await buffer.flush()
+            batch = self.meili_service.index_messages_bulk_async.call_args[0][0]
+            self.assertEqual(len(batch), 1)
+            self.assertEqual(batch[0].text, "new")
+            await buffer.close()
+
+        self._run(scenario())
+
+    def test_close_flushes_pending(self):
+        """关闭时应写入剩余文档"""
+        async def scenario():
+            buffer = IngestBuffer(self.meili_service, max_batch_size=100, flush_interval=60)
+            await buffer.add_many([make_message_doc(i) for i in range(5)])
+            await buffer.close()
+
+            self.meili_service.index_messages_bulk_async.assert_called_once()
+            stats = buffer.get_stats()
+            self.assertEqual(stats["flushed"], 5)
+            self.assertEqual(stats["pending"], 0)
+            self.assertTrue(stats["closed"])
+
+        self._run(scenario())
+
+    def test_callbacks_run_after_successful_flush(self):
+        """写入成功后应执行已注册的回调"""
+        async def scenario():
+            buffer = IngestBuffer(self.meili_service, max_batch_size=100, flush_interval=60)
+            callback = AsyncMock()
+            await buffer.add(make_message_doc(1))
+            buffer.call_after_flush(callback)
+
+            await buffer.flush()
+            callback.assert_awaited_once()
+            await buffer.close()
+
+        self._run(scenario())
+
+    def test_failed_flush_requeues_docs_and_callbacks(self):
+        """写入失败时文档和回调放回队列，不执行回调；下一次写入成功后一并写入并执行回调"""
+        async def scenario():
+            self.meili_service.index_messages_bulk_async.side_effect = [Exception("boom"), {"taskUid": 2}]
+            buffer = IngestBuffer(self.meili_service, max_batch_size=100, flush_interval=60)
+            callback = AsyncMock()
+            await buffer.add_many([make_message_doc(i) for i in range(4)])
+            buffer.call_after_flush(callback)
+
+            flushed = await buffer.flush()
+            self.assertEqual(flushed, 0)
+            callback.assert_not_awaited()
+            self.assertEqual(buffer.pending_count(), 4)
+            stats = buffer.get_stats()
+            self.assertEqual(stats["failed"], 4)
+            self.assertEqual(stats["failed_batches"], 1)
+
+            # 失败期间更新的同 id 文档保留新版本
+            await buffer.add(make_message_doc(1, text="edited"))
+            self.assertEqual(await buffer.flush(), 4)
+            callback.assert_awaited_once()
+            batch = self.meili_service.index_messages_bulk_async.call_args[0][0]
+            self.assertEqual([doc.message_id for doc in batch], [0, 1, 2, 3])
+            self.assertEqual(batch[1].text, "edited")
+            await buffer.close()
+
+        self._run(scenario())
+
+    def test_flush_loop_retries_with_backoff(self):
+        """后台刷新循环在写入失败后退避并自动重试"""
+        async def scenario():
+            self.meili_service.index_messages_bulk_async.side_effect = [Exception("boom"), {"taskUid": 2}]
+            buffer = IngestBuffer(self.meili_service, max_batch_size=2, flush_interval=0.1)
+            await buffer.add_many([make_message_doc(1), make_message_doc(2)])
+
+            await asyncio.sleep(0.05)
+            self.assertEqual(buffer.pending_count(), 2)
+            await asyncio.sleep(0.3)
+            self.assertEqual(buffer.pending_count(), 0)
+            self.assertEqual(buffer.get_stats()["flushed"], 2)
+            await buffer.close()
+
+        self._run(scenario())
+
+    def test_subscriber_errors_do_not_fail_the_write(self):
+        """实时搜索推送或已保存搜索抛出异常时，已写入的文档不放回队列、不计失败、不退避"""
+        async def scenario():
+            buffer = IngestBuffer(self.meili_service, max_batch_size=2, flush_interval=60)
+            callback = AsyncMock()
+            percolator = MagicMock()
+            percolator.percolate.side_effect = Exception("percolate boom")
+            await buffer.add_many([make_message_doc(i) for i in range(4)])
+            buffer.call_after_flush(callback)
+
+            with patch("core.ingest_buffer.get_live_search_hub") as get_hub, \
+                    patch("core.ingest_buffer.get_percolator", return_value=percolator):
+                get_hub.return_value.publish.side_effect = Exception("publish boom")
+                self.assertEqual(await buffer.flush(), 4)
+
+            self.assertEqual(self.meili_service.index_messages_bulk_async.await_count, 2)
+            self.assertEqual(percolator.percolate.call_count, 2)
+            callback.assert_awaited_once()
+            stats = buffer.get_stats()
+            self.assertEqual(stats["failed"], 0)
+            self.assertEqual(stats["requeued"], 0)
+            self.assertEqual(buffer.pending_count(), 0)
+            self.assertEqual(buffer._retry_delay, 0.0)
+            await buffer.close()
+
+        self._run(scenario())
+
+    def test_close_retries_failed_final_flush(self):
+        """关闭时最终刷新失败会重试，重试成功后执行回调"""
+        async def scenario():
+            self.meili_service.index_messages_bulk_async.side_effect = [Exception("boom"), {"taskUid": 2}]
+            buffer = IngestBuffer(self.meili_service, max_batch_size=100, flush_interval=0.1)
+            callback = AsyncMock()
+            await buffer.add_many([make_message_doc(1), make_message_doc(2)])
+            buffer.call_after_flush(callback)
+
+            await buffer.close()
+            self.assertEqual(self.meili_service.index_messages_bulk_async.await_count, 2)
+            self.assertEqual(buffer.pending_count(), 0)
+            callback.assert_awaited_once()
+
+        self._run(scenario())
+
+    def test_close_reports_docs_lost_after_final_flush_attempts(self):
+        """关闭时重试后仍写入失败，记录未写入的 id 并抛出异常，回调不执行"""
+        async def scenario():
+            self.meili_service.index_messages_bulk_async.side_effect = Exception("boom")
+            buffer = IngestBuffer(self.meili_service, max_batch_size=100, flush_interval=0.1)
+            callback = AsyncMock()
+            await buffer.add_many([make_message_doc(1), make_message_doc(2)])
+            buffer.call_after_flush(callback)
+
+            with self.assertLogs("core.ingest_buffer", level="ERROR") as logs:
+                with self.assertRaises(RuntimeError):
+                    await buffer.close()
+            self.assertTrue(any("100_1, 100_2" in line for line in logs.output))
+            self.assertEqual(
+                self.meili_service.index_messages_bulk_async.await_count, FINAL_FLUSH_ATTEMPTS
+            )
+            callback.assert_not_awaited()
+            self.assertEqual(buffer.pending_count(), 0)
+
+        self._run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
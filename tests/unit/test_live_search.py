@@ -0,0 +1,109 @@
+"""
+实时搜索单元测试
+
+测试 core.live_search，包括：
+1. LiveQuery 的关键词匹配（不区分大小写、双引号短语、多个字段）与过滤条件求值
+2. LiveSearchHub 的订阅、推送、队列溢出丢弃和订阅数上限
+3. 写入缓冲区写入成功后推送给订阅
+"""
+
+import asyncio
+import functools
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from core.ingest_buffer import IngestBuffer
+from core.live_search import LiveQuery, LiveSearchHub, LiveSearchLimitError
+from tests.unit.factories import make_message_doc
+
+
+# 聊天标题参与匹配（"发布" 只出现在标题中）
+_doc = functools.partial(make_message_doc, chat_title="发布群", text="Release plan for Q3")
+
+
+class TestLiveQuery(unittest.TestCase):
+    """测试LiveQuery"""
+
+    def test_terms_match_any_field_case_insensitive(self):
+        """每个词都必须出现在 text、sender_name 或 chat_title 之一中"""
+        self.assertTrue(LiveQuery("release alice").matches(_doc()))
+        self.assertTrue(LiveQuery("发布").matches(_doc()))
+        self.assertFalse(LiveQuery("release bob").matches(_doc()))
+
+    def test_phrase_must_match_as_whole(self):
+        """双引号短语整体匹配"""
+        self.assertTrue(LiveQuery('"plan for"').matches(_doc()))
+        self.assertFalse(LiveQuery('"plan release"').matches(_doc()))
+
+    def test_filters_from_syntax_and_arguments(self):
+        """查询语法中的条件与 chat_types、chat_ids 参数同时生效"""
+        live_query = LiveQuery("release -type:channel", chat_ids=[100, 200])
+
+        self.assertTrue(live_query.matches(_doc()))
+        self.assertFalse(live_query.matches(_doc(chat_id=300)))
+        self.assertFalse(live_query.matches(_doc(chat_type="channel")))
+        self.assertTrue(LiveQuery("", chat_types=["group"]).matches(_doc()))
+
+
+class TestLiveSearchHub(unittest.TestCase):
+    """测试LiveSearchHub"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_publish_to_matching_subscriptions(self):
+        """只推送给匹配的订阅，取消订阅后不再推送"""
+        hub = LiveSearchHub()
+        release = hub.subscribe("release")
+        other = hub.subscribe("budget")
+
+        self.assertEqual(hub.publish([_doc(1), _doc(2, text="budget")]), 2)
+        self.assertEqual(release.queue.get_nowait().message_id, 1)
+        self.assertEqual(other.queue.get_nowait().message_id, 2)
+
+        hub.unsubscribe(release)
+        hub.unsubscribe(release)
+        self.assertEqual(hub.publish([_doc(3)]), 0)
+        self.assertEqual(hub.get_stats()["subscriptions"], 1)
+
+    def test_full_queue_drops_without_blocking(self):
+        """队列已满时丢弃新文档并计数"""
+        hub = LiveSearchHub(queue_size=1)
+        subscription = hub.subscribe("release")
+
+        self.assertEqual(hub.publish([_doc(1), _doc(2)]), 1)
+        self.assertEqual(subscription.dropped, 1)
+        self.assertEqual(hub.get_stats()["dropped"], 1)
+
+    def test_subscription_limit(self):
+        """超过订阅数上限时抛出 LiveSearchLimitError"""
+        hub = LiveSearchHub(max_subscriptions=1)
+        hub.subscribe("a")
+
+        with self.assertRaises(LiveSearchLimitError):
+            hub.subscribe("b")
+
+    def test_ingest_buffer_publishes_flushed_batches(self):
+        """写入缓冲区写入成功后推送文档，写入失败时不推送"""
+        hub = LiveSearchHub()
+        subscription = hub.subscribe("release")
+        meili_service = MagicMock()
+        meili_service.index_messages_bulk_async = AsyncMock()
+        buffer = IngestBuffer(meili_service)
+
+        with patch("core.ingest_buffer.get_live_search_hub", return_value=hub):
+            buffer._pending = {"100_1": _doc(1)}
+            self.loop.run_until_complete(buffer.flush())
+            meili_service.index_messages_bulk_async.side_effect = RuntimeError("down")
+            buffer._pending = {"100_2": _doc(2)}
+            self.loop.run_until_complete(buffer.flush())
+
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertEqual(subscription.queue.get_nowait().message_id, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,295 @@
+"""
+MeiliSearchService 异步接口单元测试
+
+使用 httpx.MockTransport 模拟 Meilisearch HTTP API，测试：
+1. search_async 的请求参数与结果标准化
+2. index_messages_bulk_async / delete_message_async 的请求路径
+3. 连接池复用与关闭
+4. 相同并发搜索的请求合并（single-flight）
+5. multi_search_async 在一次请求中执行消息和会话搜索
+6. facet_search_async 的分面计数与时间直方图
+7. 索引管理：等待任务完成、按主键顺序键集分页读取文档
+"""
+
+import asyncio
+import json
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import httpx
+
+from core.meilisearch_service import MeiliSearchService, _histogram_buckets
+from core.models import MeiliMessageDoc
+from core.single_flight import SingleFlight
+
+
+def _utc(year: int, month: int, day: int) -> int:
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+class TestMeiliSearchServiceAsync(unittest.TestCase):
+    """测试MeiliSearchService的*_async方法"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.requests = []
+        self.task_statuses = []
+        # 设置后分面请求和直方图桶查询模拟 totalHits 被 maxTotalHits（1000）截断
+        self.capped_facets = None
+
+        with patch("core.meilisearch_service.meilisearch.Client"), \
+             patch.object(MeiliSearchService, "ensure_index_setup"), \
+             patch.object(MeiliSearchService, "ensure_sessions_index_setup"):
+            self.service = MeiliSearchService("http://meili.test", api_key="secret")
+        # 使用独立的请求合并器，避免其他测试的统计干扰
+        self.service._search_flight = SingleFlight()
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if request.url.path == "/multi-search":
+                queries = json.loads(request.content)["queries"]
+                if self.capped_facets is not None:
+                    return httpx.Response(200, json={"results": [
+                        {"indexUid": q["indexUid"], "hits": [], "totalHits": 1000, "processingTimeMs": 1,
+                         "query": q["q"], "facetDistribution": {"chat_type": distribution}}
+                        for q, distribution in zip(queries, self.capped_facets)
+                    ]})
+                return httpx.Response(200, json={"results": [
+                    {"indexUid": q["indexUid"], "hits": [{"id": "1"}], "totalHits": 1,
+                     "processingTimeMs": 1, "query": q["q"]}
+                    for q in queries
+                ]})
+            if request.url.path.endswith("/search") and "facets" in json.loads(request.content):
+                if self.capped_facets is not None:
+                    return httpx.Response(200, json={
+                        "hits": [], "totalHits": 1000, "processingTimeMs": 2, "query": "hello",
+                        "facetDistribution": {"chat_type": {"group": 3000, "channel": 1700}},
+                        "facetStats": {"date": {"min": _utc(2024, 1, 15), "max": _utc(2024, 2, 10)}},
+                    })
+                return httpx.Response(200, json={
+                    "hits": [], "totalHits": 5, "processingTimeMs": 2, "query": "hello",
+                    "facetDistribution": {
+                        "chat_id": {"-100": 1, "42": 4},
+                        "chat_type": {"group": 5},
+                        "sender_id": {"7": 5},
+                    },
+                    "facetStats": {"date": {"min": _utc(2024, 1, 15), "max": _utc(2024, 3, 2)}},
+                })
+            if request.url.path.startswith("/tasks/"):
+                status = self.task_statuses.pop(0)
+                return httpx.Response(200, json={
+                    "uid": 7, "status": status, "error": {"message": "bad filter"} if status == "failed" else None
+                })
+            if request.url.path.endswith("/search"):
+                return httpx.Response(200, json={
+                    "hits": [{"id": "1_1", "text": "hello"}],
+                    "totalHits": 42,
+                    "processingTimeMs": 3,
+                    "query": "hello",
+                })
+            return httpx.Response(202, json={"taskUid": 7})
+
+        # 替换底层传输层，保留服务自身的连接池配置
+        self.service._async_client = httpx.AsyncClient(
+            base_url="http://meili.test", transport=httpx.MockTransport(handler)
+        )
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.service.aclose())
+        self.loop.close()
+
+    def test_search_async_builds_params_and_normalizes(self):
+        """search_async应发送与search相同的参数，并补齐estimatedTotalHits"""
+        results = self.loop.run_until_complete(self.service.search_async(
+            "hello", page=2, hits_per_page=5, chat_types=["group"], chat_ids=[100]
+        ))
+
+        request = self.requests[0]
+        self.assertEqual(request.method, "POST")
+        self.assertEqual(request.url.path, "/indexes/telegram_messages/search")
+        body = json.loads(request.content)
+        self.assertEqual(body["q"], "hello")
+        self.assertEqual(body["page"], 2)
+        self.assertEqual(body["hitsPerPage"], 5)
+        self.assertEqual(body["sort"], ["date:desc"])
+        self.assertIn('chat_type = "group"', body["filter"])
+        self.assertIn("chat_id = 100", body["filter"])
+
+        self.assertEqual(results["estimatedTotalHits"], 42)
+        self.assertEqual(len(results["hits"]), 1)
+
+    def test_index_messages_bulk_async(self):
+        """批量索引应一次POST全部文档"""
+        docs = [
+            MeiliMessageDoc(
+                id=f"100_{i}", message_id=i, chat_id=100, chat_type="group",
+                sender_id=1, text="t", date=1700000000, message_link="https://t.me/c/100/1"
+            )
+            for i in range(3)
+        ]
+        result = self.loop.run_until_complete(self.service.index_messages_bulk_async(docs))
+
+        self.assertEqual(result["taskUid"], 7)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.requests[0].url.path, "/indexes/telegram_messages/documents")
+        self.assertEqual(len(json.loads(self.requests[0].content)), 3)
+
+    def test_delete_message_async(self):
+        """删除消息应发送DELETE请求"""
+        self.loop.run_until_complete(self.service.delete_message_async("100_1"))
+        self.assertEqual(self.requests[0].method, "DELETE")
+        self.assertEqual(self.requests[0].url.path, "/indexes/telegram_messages/documents/100_1")
+
+    def test_client_is_reused_and_closed(self):
+        """多次请求复用同一连接池，aclose后重新创建"""
+        client = self.service._get_async_client()
+        self.loop.run_until_complete(self.service.search_async("a"))
+        self.assertIs(self.service._get_async_client(), client)
+
+        self.loop.run_until_complete(self.service.aclose())
+        self.assertTrue(client.is_closed)
+        self.assertIsNone(self.service._async_client)
+
+    def test_concurrent_identical_searches_collapse(self):
+        """规范化后相同的并发搜索只发送一次请求，各调用方拿到独立的结果"""
+        async def scenario():
+            return await asyncio.gather(
+                self.service.search_async("hello"),
+                self.service.search_async("  Hello "),
+                self.service.search_async("other"),
+            )
+
+        first, second, other = self.loop.run_until_complete(scenario())
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(first["hits"], second["hits"])
+        self.assertIsNot(first["hits"], second["hits"])
+        self.assertEqual(second["query"], "  Hello ")
+        stats = self.service.get_search_flight_stats()
+        self.assertEqual(stats["calls"], 3)
+        self.assertEqual(stats["collapsed"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_sequential_searches_not_collapsed(self):
+        """已完成的请求不会被复用"""
+        self.loop.run_until_complete(self.service.search_async("hello"))
+        self.loop.run_until_complete(self.service.search_async("hello"))
+
+        self.assertEqual(len(self.requests), 2)
+
+    def test_multi_search_async_single_round_trip(self):
+        """消息和会话查询在一次 multi-search 请求中完成，结果按顺序标准化"""
+        results = self.loop.run_until_complete(self.service.multi_search_async([
+            {"target": "messages", "query": "hello", "hits_per_page": 5, "chat_ids": [100]},
+            {"target": "sessions", "query": "hello", "session_types": ["group"]},
+        ]))
+
+        self.assertEqual(len(self.requests), 1)
+        queries = json.loads(self.requests[0].content)["queries"]
+        self.assertEqual([q["indexUid"] for q in queries], ["telegram_messages", "telegram_sessions"])
+        self.assertEqual(queries[0]["hitsPerPage"], 5)
+        self.assertIn("chat_id = 100", queries[0]["filter"])
+        self.assertEqual(queries[1]["filter"], '(type = "group")')
+        self.assertEqual([r["estimatedTotalHits"] for r in results], [1, 1])
+
+    def test_multi_search_unknown_target(self):
+        """未知的查询目标应抛出 ValueError 且不发送请求"""
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(self.service.multi_search_async([{"target": "users", "query": "x"}]))
+        self.assertEqual(self.requests, [])
+
+    def test_facet_search_async(self):
+        """一次请求获取分面计数和时间范围，一次 multi-search 获取每个直方图桶的计数"""
+        results = self.loop.run_until_complete(self.service.facet_search_async("hello", chat_types=["group"]))
+
+        self.assertEqual(len(self.requests), 2)
+        facet_params = json.loads(self.requests[0].content)
+        self.assertEqual(facet_params["hitsPerPage"], 0)
+        self.assertEqual(facet_params["facets"], ["chat_id", "chat_type", "sender_id", "date"])
+        self.assertNotIn("sort", facet_params)
+
+        queries = json.loads(self.requests[1].content)["queries"]
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(
+            queries[0]["filter"], f'chat_type = "group" AND date >= {_utc(2024, 1, 15)} AND date <= {_utc(2024, 2, 1) - 1}'
+        )
+
+        self.assertEqual(results["totalHits"], 5)
+        self.assertEqual(results["facets"]["chat_id"], [{"value": 42, "count": 4}, {"value": -100, "count": 1}])
+        self.assertEqual(results["facets"]["chat_type"], [{"value": "group", "count": 5}])
+        self.assertEqual(
+            [(b["start"], b["end"], b["count"]) for b in results["histogram"]["buckets"]],
+            [
+                (_utc(2024, 1, 15), _utc(2024, 2, 1) - 1, 1),
+                (_utc(2024, 2, 1), _utc(2024, 3, 1) - 1, 1),
+                (_utc(2024, 3, 1), _utc(2024, 3, 2), 1),
+            ]
+        )
+        self.assertFalse(results["histogram"]["truncated"])
+
+    def test_facet_search_counts_beyond_max_total_hits(self):
+        """总数和桶计数取自 chat_type 分面计数之和，超过 maxTotalHits 的桶不被截断为 1000"""
+        self.capped_facets = [{"group": 1500, "channel": 700}, {"group": 1500, "channel": 1000}]
+
+        results = self.loop.run_until_complete(self.service.facet_search_async("hello"))
+
+        queries = json.loads(self.requests[1].content)["queries"]
+        self.assertTrue(all(q["facets"] == ["chat_type"] for q in queries))
+        self.assertEqual(results["totalHits"], 4700)
+        self.assertEqual([b["count"] for b in results["histogram"]["buckets"]], [2200, 2500])
+
+    def test_facet_search_invalid_interval(self):
+        """未知的直方图间隔应抛出 ValueError 且不发送请求"""
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(self.service.facet_search_async("hello", interval="year"))
+        self.assertEqual(self.requests, [])
+
+    def test_wait_for_task_async(self):
+        """轮询直到任务成功；任务失败时抛出 RuntimeError"""
+        self.task_statuses = ["enqueued", "processing", "succeeded", "failed"]
+
+        task = self.loop.run_until_complete(self.service.wait_for_task_async(7, poll_interval=0))
+        self.assertEqual(task["status"], "succeeded")
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(self.requests[0].url.path, "/tasks/7")
+
+        with self.assertRaisesRegex(RuntimeError, "bad filter"):
+            self.loop.run_until_complete(self.service.wait_for_task_async(7, poll_interval=0))
+
+    def test_fetch_documents_after_async(self):
+        """按 (chat_id, message_id) 升序读取，非首页以上一页最后的排序键过滤"""
+        self.loop.run_until_complete(self.service.fetch_documents_after_async(None, 5000))
+        hits = self.loop.run_until_complete(self.service.fetch_documents_after_async((-100, 42)))
+
+        first, second = (json.loads(request.content) for request in self.requests)
+        self.assertEqual(first["sort"], ["chat_id:asc", "message_id:asc"])
+        self.assertEqual(first["limit"], 1000)
+        self.assertNotIn("filter", first)
+        self.assertEqual(second["filter"], "chat_id > -100 OR (chat_id = -100 AND message_id > 42)")
+        self.assertEqual(hits, [{"id": "1_1", "text": "hello"}])
+
+
+class TestHistogramBuckets(unittest.TestCase):
+    """测试_histogram_buckets"""
+
+    def test_week_buckets_start_on_monday(self):
+        """周桶从周一开始，首尾两个桶裁剪到给定范围内"""
+        # 2024-01-03 是周三
+        buckets = _histogram_buckets(_utc(2024, 1, 3), _utc(2024, 1, 16), "week")
+
+        self.assertEqual(buckets, [
+            (_utc(2024, 1, 3), _utc(2024, 1, 8) - 1),
+            (_utc(2024, 1, 8), _utc(2024, 1, 15) - 1),
+            (_utc(2024, 1, 15), _utc(2024, 1, 16)),
+        ])
+
+    def test_month_buckets_cross_year(self):
+        """月桶跨年"""
+        buckets = _histogram_buckets(_utc(2023, 12, 31), _utc(2024, 1, 1), "month")
+
+        self.assertEqual(buckets, [(_utc(2023, 12, 31), _utc(2024, 1, 1) - 1), (_utc(2024, 1, 1), _utc(2024, 1, 1))])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+本地消息归档单元测试
+
+测试 core.message_archive，包括：
+1. 归档数据的压缩编码与解码
+2. 追加写入：同一文档以最新版本为准，内容未变化的文档不重复追加
+3. 删除标记与按消息ID查找文档
+4. 按文档ID分页读取最新版本，支持按聊天过滤
+5. reindex_from_archive 按大批量重新写入 Meilisearch
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from core.message_archive import MessageArchive, decode_payload, encode_payload, reindex_from_archive
+from tests.unit.factories import make_message_doc
+
+
+class TestMessageArchive(unittest.TestCase):
+    """测试MessageArchive"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "message_archive.db")
+        self.archive = MessageArchive(self.db_path)
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _all_docs(self, batch_size: int = 100, chat_ids=None):
+        return [doc for batch in self.archive.iter_latest(batch_size, chat_ids) for doc in batch]
+
+    def test_payload_round_trip(self):
+        """编码后可还原为相同的文档"""
+        doc = make_message_doc(1, text="新版本发布计划 " * 10)
+
+        self.assertEqual(decode_payload(encode_payload(doc)), doc)
+
+    def test_latest_version_wins_and_unchanged_skipped(self):
+        """编辑后读取最新版本，内容未变化的文档不再追加"""
+        self.assertEqual(self.archive.append([make_message_doc(1), make_message_doc(2)]), 2)
+        self.assertEqual(self.archive.append([make_message_doc(1), make_message_doc(2, text="edited")]), 1)
+
+        self.assertEqual([doc.text for doc in self._all_docs()], ["hello", "edited"])
+        self.assertEqual(self.archive.get_stats()["rows"], 3)
+
+    def test_tombstones(self):
+        """删除标记隐藏文档，重新写入后恢复；不存在的文档不追加删除标记"""
+        self.archive.append([make_message_doc(1), make_message_doc(2), make_message_doc(3, chat_id=200)])
+
+        self.assertEqual(self.archive.append_tombstones(["100_1", "100_9"]), 1)
+        self.assertEqual([doc.id for doc in self._all_docs()], ["100_2", "200_3"])
+        self.assertEqual(self.archive.find_document_ids([100, 300], [1, 3]), ["100_1"])
+
+        self.archive.append([make_message_doc(1)])
+        self.assertEqual([doc.id for doc in self._all_docs()], ["100_1", "100_2", "200_3"])
+
+    def test_paging_and_chat_filter(self):
+        """小批量分页不会遗漏或重复文档，可只读取指定聊天"""
+        self.archive.append([make_message_doc(i) for i in range(1, 26)] + [make_message_doc(i, chat_id=200) for i in range(1, 6)])
+        self.archive.append_tombstones(["100_5"])
+
+        self.assertEqual(len(self._all_docs(batch_size=7)), 29)
+        self.assertEqual({doc.chat_id for doc in self._all_docs(batch_size=2, chat_ids=[200])}, {200})
+        self.assertEqual(len(self._all_docs(batch_size=2, chat_ids=[200])), 5)
+
+    def test_persists_across_reopen(self):
+        """重新打开后仍能读取"""
+        self.archive.append([make_message_doc(1)])
+        self.archive.close()
+        self.archive = MessageArchive(self.db_path)
+
+        self.assertEqual([doc.id for doc in self._all_docs()], ["100_1"])
+
+
+class TestReindexFromArchive(unittest.TestCase):
+    """测试reindex_from_archive"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive = MessageArchive(os.path.join(self.temp_dir, "message_archive.db"))
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        self.archive.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_bulk_loads_in_batches(self):
+        """按批写入全部未删除文档"""
+        self.archive.append([make_message_doc(i) for i in range(1, 26)])
+        self.archive.append_tombstones(["100_1"])
+        meili_service = mock.MagicMock()
+        meili_service.index_messages_bulk_async = mock.AsyncMock(return_value={"taskUid": 1})
+
+        submitted = self.loop.run_until_complete(reindex_from_archive(self.archive, meili_service, batch_size=10))
+
+        self.assertEqual(submitted, 24)
+        batches = [call.args[0] for call in meili_service.index_messages_bulk_async.await_args_list]
+        self.assertEqual([len(batch) for batch in batches], [9, 10, 5])
+        self.assertEqual(len({doc.id for batch in batches for doc in batch}), 24)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+搜索查询语言单元测试
+
+测试 core.query_language，包括：
+1. type:、chat:、from:、date:、before:、after: 及取反语法的解析
+2. 语义相同的查询得到相同的过滤条件字典和过滤字符串
+3. 语法树编译为规范的 Meilisearch 过滤字符串
+4. 解析结果缓存不会被调用方修改
+5. 聊天ID集合编译为 IN 并按集合缓存
+6. 语法树在进程内对文档求值，关键词拆分为匹配用的词
+"""
+
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from core.query_language import (
+    And, In, Not, Range, build_chat_id_filter, build_filter_ast, build_meilisearch_filter,
+    compile_filter, keyword_terms, match_filter, parse_query
+)
+
+
+def _ts(value: str) -> int:
+    return int(datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp())
+
+
+class TestParseQuery(unittest.TestCase):
+    """测试parse_query"""
+
+    def test_operators_and_negation(self):
+        """识别各类操作符，取反的条件放入 exclude_* 键"""
+        text, filters = parse_query('"发布 计划" chat:-1001 chat:42 from:7 -type:channel -chat:5 notes')
+
+        self.assertEqual(text, '"发布 计划" notes')
+        self.assertEqual(filters, {
+            "chat_id": [-1001, 42],
+            "exclude_chat_id": [5],
+            "exclude_chat_type": ["channel"],
+            "sender_id": [7],
+        })
+
+    def test_date_operators(self):
+        """after 包含当天，before 不包含当天，多个时间条件取交集"""
+        _, filters = parse_query("x after:2024-01-01 before:2024-02-01 date:2023-06-01_2024-01-15")
+
+        self.assertEqual(filters["date_range"], {
+            "start": _ts("2024-01-01 00:00:00"),
+            "end": _ts("2024-01-15 23:59:59"),
+        })
+
+        _, filters = parse_query("x date:2024-01-01")
+        self.assertEqual(filters["date_range"], {"start": _ts("2024-01-01 00:00:00")})
+
+    def test_invalid_operators_kept_as_text(self):
+        """无法识别的操作符或无效值原样保留在关键词中"""
+        text, filters = parse_query("see https://t.me/x type:invalid chat:abc date:2024-13-45")
+
+        self.assertEqual(text, "see https://t.me/x type:invalid chat:abc date:2024-13-45")
+        self.assertEqual(filters, {})
+
+    def test_equivalent_queries_share_filters(self):
+        """操作符顺序、重复和大小写不影响过滤条件"""
+        first = parse_query("hello type:group type:channel")
+        second = parse_query("hello  type:Channel type:group type:group")
+
+        self.assertEqual(first, second)
+        self.assertEqual(build_meilisearch_filter(first[1]), build_meilisearch_filter(second[1]))
+
+    def test_cached_result_not_mutated(self):
+        """调用方修改返回的字典不会影响缓存"""
+        _, filters = parse_query("hello type:group")
+        filters["chat_type"].append("user")
+
+        self.assertEqual(parse_query("hello type:group")[1], {"chat_type": ["group"]})
+
+
+class TestCompileFilter(unittest.TestCase):
+    """测试语法树编译"""
+
+    def test_compile_nodes(self):
+        """单值用 =，多值用 IN，字符串使用双引号并转义，取反用 NOT"""
+        node = And((
+            In("chat_type", ("group",)),
+            Not(In("chat_id", (1, 2))),
+            Range("date", ">=", 10),
+        ))
+
+        self.assertEqual(
+            compile_filter(node),
+            'chat_type = "group" AND NOT (chat_id IN [1, 2]) AND date >= 10'
+        )
+        self.assertEqual(compile_filter(In("chat_title", ('a"b',))), 'chat_title = "a\\"b"')
+        self.assertIsNone(compile_filter(None))
+
+    def test_build_from_filters_dict(self):
+        """过滤条件字典按固定顺序构建语法树"""
+        ast = build_filter_ast({
+            "date_range": {"start": 1, "end": 2},
+            "exclude_sender_id": [9],
+            "chat_type": "user",
+        })
+
+        self.assertEqual(compile_filter(ast), 'chat_type = "user" AND NOT (sender_id = 9) AND date >= 1 AND date <= 2')
+        self.assertIsNone(build_meilisearch_filter({}))
+
+
+class TestChatIdFilter(unittest.TestCase):
+    """测试build_chat_id_filter"""
+
+    def test_in_filter_memoized(self):
+        """多个ID生成一个 IN 条件，同一集合（与顺序无关）复用缓存的字符串"""
+        first = build_chat_id_filter([3, -1, 2, 3])
+        second = build_chat_id_filter([2, 3, -1])
+
+        self.assertEqual(first, "chat_id IN [-1, 2, 3]")
+        self.assertIs(first, second)
+        self.assertEqual(build_chat_id_filter([5]), "chat_id = 5")
+        self.assertIsNone(build_chat_id_filter([]))
+
+
+class TestMatchFilter(unittest.TestCase):
+    """测试match_filter和keyword_terms"""
+
+    def test_evaluate_against_document(self):
+        """对文档属性求值，与编译后的过滤字符串语义一致"""
+        _, filters = parse_query("x type:group -from:9 after:2024-01-01")
+        node = build_filter_ast(filters)
+        doc = SimpleNamespace(chat_type="group", sender_id=7, date=_ts("2024-03-01 12:00:00"))
+
+        self.assertTrue(match_filter(node, doc))
+        self.assertFalse(match_filter(node, SimpleNamespace(chat_type="group", sender_id=9, date=doc.date)))
+        self.assertFalse(match_filter(node, SimpleNamespace(chat_type="group", sender_id=7, date=0)))
+        self.assertTrue(match_filter(None, doc))
+
+    def test_keyword_terms(self):
+        """双引号短语作为整体，词统一小写并去重"""
+        self.assertEqual(keyword_terms('Hello "Release  Plan" hello'), ("hello", "release plan"))
+        self.assertEqual(keyword_terms(""), ())
+
+
+if __name__ == "__main__":
+    unittest.main()
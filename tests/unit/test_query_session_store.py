@@ -0,0 +1,133 @@
+"""
+查询会话存储单元测试
+
+测试基于服务端查询会话的分页，包括：
+1. 会话的创建、查找与过期
+2. 分页按钮只携带会话令牌和页码，长度不超过 Telegram 的 64 字节上限
+3. 会话分页回调从缓存切片、处理过期令牌，并在后台任务中断后从游标继续获取
+"""
+
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from search_bot.callback_query_handlers import CallbackQueryHandlers
+from search_bot.message_formatters import format_search_results
+from search_bot.query_session_store import QuerySessionStore
+
+
+class TestQuerySessionStore(unittest.TestCase):
+    """测试QuerySessionStore"""
+
+    def test_create_and_get(self):
+        """创建的会话可按令牌取回"""
+        store = QuerySessionStore()
+        session = store.create("hello type:group", "hello", {"chat_type": ["group"]},
+                               "chat_type IN ['group']", "bot:key")
+
+        self.assertIs(store.get(session.token), session)
+        self.assertEqual(session.filters_dict, {"chat_type": ["group"]})
+        self.assertIsNone(session.next_cursor)
+        self.assertIsNone(store.get("missing"))
+
+    def test_tokens_unique_and_bounded(self):
+        """令牌互不相同，超出容量时淘汰旧会话"""
+        store = QuerySessionStore(maxsize=3)
+        tokens = {store.create(f"q{i}", f"q{i}", None, None, f"k{i}").token for i in range(5)}
+
+        self.assertEqual(len(tokens), 5)
+        self.assertEqual(len(store), 3)
+
+    def test_expired_session(self):
+        """过期的会话不可取回"""
+        store = QuerySessionStore(ttl=0.05)
+        session = store.create("hello", "hello", None, None, "key")
+        time.sleep(0.1)
+
+        self.assertIsNone(store.get(session.token))
+
+
+class TestSessionPaginationButtons(unittest.TestCase):
+    """测试会话分页按钮"""
+
+    @patch('search_bot.message_formatters.Button')
+    def test_buttons_use_token(self, mock_button):
+        """长查询的按钮回调数据仍然很短"""
+        mock_button.inline.side_effect = lambda text, data: data
+        query = "一个非常长的中文查询 " * 10 + "type:group date:2024-01-01_2024-12-31"
+        results = {"hits": [{"text": "x", "date": 0}], "query": query}
+
+        _, buttons = format_search_results(results, 2, 10, query_original=query, session_token="AbC-_123")
+
+        data = [button for row in buttons for button in row]
+        self.assertIn("sp:AbC-_123:1", data)
+        self.assertIn("sp:AbC-_123:3", data)
+        self.assertIn("sp:AbC-_123:10", data)
+        self.assertTrue(all(len(d.encode("utf-8")) <= 64 for d in data))
+
+
+class TestSessionPaginationCallback(unittest.TestCase):
+    """测试会话分页回调"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.command_handler = MagicMock()
+        self.command_handler.query_sessions = QuerySessionStore()
+        self.command_handler.active_full_fetches = {}
+        self.command_handler._resume_full_fetch.return_value = False
+        self.cache_service = self.command_handler.cache_service
+        self.cache_service.is_cache_enabled.return_value = True
+        self.handler = CallbackQueryHandlers(MagicMock(), self.command_handler)
+        self.session = self.command_handler.query_sessions.create("hello", "hello", None, None, "bot:hello")
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _click(self, data):
+        event = MagicMock()
+        event.data = data.encode("utf-8")
+        event.edit = AsyncMock()
+        event.answer = AsyncMock()
+        self.loop.run_until_complete(self.handler.session_pagination_callback(event))
+        return event
+
+    @patch('search_bot.message_formatters.Button')
+    def test_page_served_from_cache_by_key(self, mock_button):
+        """翻页直接按会话缓存键切片，不重新解析查询"""
+        mock_button.inline.side_effect = lambda text, data: data
+        hits = [{"text": str(i), "date": 0} for i in range(20)]
+        self.cache_service.get_from_cache_by_key.return_value = (hits, False, 20, None)
+
+        event = self._click(f"sp:{self.session.token}:2")
+
+        self.cache_service.get_from_cache_by_key.assert_called_with("bot:hello")
+        self.command_handler._parse_advanced_syntax.assert_not_called()
+        text = event.edit.await_args.args[0]
+        self.assertIn("5. ", text)
+        self.assertNotIn("6. ", text)
+        buttons = event.edit.await_args.kwargs["buttons"]
+        self.assertIn(f"sp:{self.session.token}:3", [b for row in buttons for b in row])
+
+    def test_expired_token(self):
+        """令牌过期时提示重新搜索"""
+        event = self._click("sp:unknown1:2")
+
+        event.answer.assert_awaited_once_with("搜索已过期，请重新搜索", alert=True)
+        event.edit.assert_not_awaited()
+
+    def test_resume_interrupted_fetch(self):
+        """页面超出已获取数据且后台任务已结束时，从会话游标继续获取"""
+        self.session.next_cursor = "c1"
+        self.cache_service.get_from_cache_by_key.return_value = ([{"date": 0}] * 15, True, 1000, None)
+        self.command_handler._resume_full_fetch.return_value = True
+
+        event = self._click(f"sp:{self.session.token}:10")
+
+        self.command_handler._resume_full_fetch.assert_called_once_with(self.session, 15, 1000)
+        event.edit.assert_not_awaited()
+        self.command_handler._get_results_from_meili.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+已保存搜索单元测试
+
+测试 core.aho_corasick 和 core.saved_searches，包括：
+1. Aho-Corasick 自动机找出文本中出现的全部模式（包括重叠和互为后缀的模式）
+2. SavedSearchStore 的持久化与按用户删除
+3. Percolator 的匹配：关键词全部命中、过滤条件、只提醒保存之后的消息、按用户合并提醒
+4. /watch、/watches、/unwatch 命令，存储读写不在事件循环线程中执行
+"""
+
+import asyncio
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from core.aho_corasick import AhoCorasick
+from core.saved_searches import MAX_SAVED_SEARCHES_PER_USER, Percolator, SavedSearchStore
+from search_bot.command_handlers import CommandHandlers
+from tests.unit.factories import make_message_doc
+
+# 消息时间晚于测试中保存搜索的时间，保存之后的消息才会触发提醒
+_doc = functools.partial(make_message_doc, text="新版本发布计划", date=2_000_000_000)
+
+
+class TestAhoCorasick(unittest.TestCase):
+    """测试AhoCorasick"""
+
+    def test_find_overlapping_patterns(self):
+        """重叠、互为后缀的模式都能找到，未出现的模式不返回"""
+        automaton = AhoCorasick(["he", "she", "his", "hers", "发布", ""])
+
+        self.assertEqual(automaton.find("ushers"), {0, 1, 3})
+        self.assertEqual(automaton.find("新版本发布"), {4})
+        self.assertEqual(automaton.find("xyz"), set())
+
+
+class TestPercolator(unittest.TestCase):
+    """测试SavedSearchStore和Percolator"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "saved_searches.db")
+        self.store = SavedSearchStore(self.db_path)
+        self.percolator = Percolator(self.store)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_store_persists_and_removes_own_searches(self):
+        """重新打开后仍能读取，只能删除自己的搜索"""
+        search = self.percolator.add(1, "发布 type:group")
+        self.store.close()
+        self.store = SavedSearchStore(self.db_path)
+
+        self.assertEqual(self.store.list_for_user(1), [search])
+        self.assertFalse(self.store.remove(2, search.id))
+        self.assertTrue(self.store.remove(1, search.id))
+        self.assertEqual(self.store.list_all(), [])
+
+    def test_match_requires_all_terms_and_filters(self):
+        """全部关键词命中且过滤条件满足时才匹配"""
+        both = self.percolator.add(1, "发布 计划")
+        group_only = self.percolator.add(1, "发布 type:group")
+        self.percolator.add(1, "发布 上线")
+        other_chat = self.percolator.add(2, "dev chat:200")
+
+        self.assertEqual(self.percolator.match(_doc()), [both, group_only])
+        self.assertEqual(self.percolator.match(_doc(chat_type="channel")), [both])
+        self.assertEqual(self.percolator.match(_doc(chat_id=200, text="无关")), [other_chat])
+
+    def test_only_messages_after_saving_alert(self):
+        """早于搜索保存时间的消息（如历史同步）不触发提醒"""
+        self.percolator.add(1, "发布")
+
+        self.assertEqual(self.percolator.match(_doc(date=1_000_000_000)), [])
+
+    def test_percolate_merges_alerts_per_user(self):
+        """同一消息命中同一用户的多个搜索时合并为一条提醒"""
+        self.percolator.add(1, "发布")
+        self.percolator.add(1, "计划")
+        self.percolator.add(2, "版本")
+        sent = []
+
+        async def scenario():
+            queued = self.percolator.percolate([_doc()])
+            task = asyncio.create_task(self.percolator.run_notifier(lambda alert: _record(sent, alert)))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            return queued
+
+        loop = asyncio.new_event_loop()
+        try:
+            queued = loop.run_until_complete(scenario())
+        finally:
+            loop.close()
+
+        self.assertEqual(queued, 2)
+        self.assertEqual(sorted((alert.user_id, len(alert.searches)) for alert in sent), [(1, 2), (2, 1)])
+        self.assertEqual(self.percolator.get_stats()["sent"], 2)
+
+    def test_add_validation(self):
+        """没有关键词或超过每个用户的上限时拒绝保存"""
+        with self.assertRaises(ValueError):
+            self.percolator.add(1, "type:group")
+        for i in range(MAX_SAVED_SEARCHES_PER_USER):
+            self.store.add(1, f"term{i}")
+        with self.assertRaises(ValueError):
+            self.percolator.add(1, "another")
+
+    def test_many_searches(self):
+        """大量已保存搜索只匹配关键词全部出现的那些"""
+        for i in range(2000):
+            self.store.add(i, f"关键词{i}号 发布")
+        percolator = Percolator(self.store)
+
+        matched = percolator.match(_doc(text="关键词42号今天发布"))
+        self.assertEqual([search.user_id for search in matched], [42])
+
+
+async def _record(sent, alert):
+    sent.append(alert)
+
+
+class TestWatchCommands(unittest.TestCase):
+    """测试/watch、/watches、/unwatch命令"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = SavedSearchStore(os.path.join(self.temp_dir, "saved_searches.db"))
+        self.percolator = Percolator(self.store)
+        self.handler = CommandHandlers(
+            client=mock.MagicMock(),
+            meilisearch_service=mock.MagicMock(),
+            config_manager=mock.MagicMock(),
+            admin_ids=[],
+            percolator=self.percolator
+        )
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _event(self, text: str):
+        event = mock.MagicMock()
+        event.message.text = text
+        event.get_sender = mock.AsyncMock(return_value=mock.MagicMock(id=42))
+        event.respond = mock.AsyncMock()
+        return event
+
+    def test_watch_list_unwatch(self):
+        """保存、列出并删除搜索"""
+        self.loop.run_until_complete(self.handler.watch_command(self._event("/watch 发布 type:group")))
+        searches = self.percolator.list_for_user(42)
+        self.assertEqual([search.query for search in searches], ["发布 type:group"])
+
+        event = self._event("/watches")
+        self.loop.run_until_complete(self.handler.list_watches_command(event))
+        self.assertIn("发布 type:group", event.respond.call_args[0][0])
+
+        self.loop.run_until_complete(self.handler.unwatch_command(self._event(f"/unwatch {searches[0].id}")))
+        self.assertEqual(self.percolator.list_for_user(42), [])
+
+    def test_store_access_runs_off_event_loop_thread(self):
+        """命令对 SQLite 存储的读写都在线程池中执行"""
+        loop_thread = threading.get_ident()
+        threads = []
+        for name in ("add", "list_for_user", "remove"):
+            original = getattr(self.store, name)
+
+            def recording(*args, _original=original, **kwargs):
+                threads.append(threading.get_ident())
+                return _original(*args, **kwargs)
+
+            setattr(self.store, name, recording)
+
+        self.loop.run_until_complete(self.handler.watch_command(self._event("/watch 发布")))
+        self.loop.run_until_complete(self.handler.list_watches_command(self._event("/watches")))
+        self.loop.run_until_complete(self.handler.unwatch_command(self._event("/unwatch 1")))
+
+        self.assertGreaterEqual(len(threads), 3)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_watch_without_keyword(self):
+        """只有过滤条件时提示错误且不保存"""
+        event = self._event("/watch type:group")
+        self.loop.run_until_complete(self.handler.watch_command(event))
+
+        self.assertIn("至少需要一个关键词", event.respond.call_args[0][0])
+        self.assertEqual(self.percolator.list_for_user(42), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+键集分页单元测试
+
+测试core.search_cursor模块及MeiliSearchService.search_after，包括：
+1. 游标编码/解码与无效令牌
+2. 游标生成的过滤条件
+3. search_after 多取一条判断下一页并生成 nextCursor
+4. Search Bot 后台任务按游标分块获取完整结果
+5. Search Bot 按页码直接获取的页面与键集分页使用相同的匹配策略
+6. 线上索引的排序规则不能保证键集分页的顺序时拒绝键集分页
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from core.meilisearch_service import (
+    KEYSET_MATCHING_STRATEGY, MESSAGE_INDEX_SETTINGS, MeiliSearchService, ranking_rules_support_keyset
+)
+from core.search_cursor import InvalidCursorError, KeysetPaginationUnavailableError, SearchCursor, keyset_sort
+from search_bot.command_handlers import CommandHandlers
+
+
+# sort 紧跟 words 的排序规则，键集分页可以保证顺序
+KEYSET_RANKING_RULES = ["words", "sort", "typo", "proximity", "attribute", "exactness"]
+
+
+def _hit(date, chat_id, message_id):
+    return {"id": f"{chat_id}_{message_id}", "date": date, "chat_id": chat_id, "message_id": message_id}
+
+
+class TestSearchCursor(unittest.TestCase):
+    """测试SearchCursor"""
+
+    def test_round_trip(self):
+        """编码后的令牌应能还原为相同的游标"""
+        cursor = SearchCursor(1700000000, -1001234567890, 42, descending=False)
+        token = cursor.encode()
+
+        self.assertNotIn("=", token)
+        self.assertEqual(SearchCursor.decode(token), cursor)
+
+    def test_invalid_token(self):
+        """无法解析的令牌应抛出 InvalidCursorError"""
+        with self.assertRaises(InvalidCursorError):
+            SearchCursor.decode("not-a-cursor")
+
+    def test_filter_and_sort(self):
+        """降序游标应生成严格小于的三元组比较"""
+        cursor = SearchCursor(100, -5, 7)
+        self.assertEqual(
+            cursor.to_filter(),
+            "(date < 100 OR (date = 100 AND (chat_id < -5 OR (chat_id = -5 AND message_id < 7))))"
+        )
+        self.assertEqual(keyset_sort(False), ["date:asc", "chat_id:asc", "message_id:asc"])
+
+
+class TestSearchAfter(unittest.TestCase):
+    """测试MeiliSearchService.search_after"""
+
+    def setUp(self):
+        with patch("core.meilisearch_service.meilisearch.Client"), \
+                patch.object(MeiliSearchService, "ensure_index_setup"), \
+                patch.object(MeiliSearchService, "ensure_sessions_index_setup"):
+            self.service = MeiliSearchService("http://localhost:7700", "key")
+        self.service.index = MagicMock()
+        self.service.index.get_ranking_rules.return_value = KEYSET_RANKING_RULES
+
+    def test_next_cursor_from_last_returned_hit(self):
+        """多取的一条不返回，nextCursor 指向本页最后一条"""
+        self.service.index.search.return_value = {
+            "hits": [_hit(30, 1, 3), _hit(20, 1, 2), _hit(10, 1, 1)],
+            "estimatedTotalHits": 3, "processingTimeMs": 1,
+        }
+
+        results = self.service.search_after("hello", limit=2, chat_types=["group"])
+
+        self.assertEqual([h["message_id"] for h in results["hits"]], [3, 2])
+        self.assertEqual(SearchCursor.decode(results["nextCursor"]), SearchCursor(20, 1, 2))
+        params = self.service.index.search.call_args[0][1]
+        self.assertEqual(params["limit"], 3)
+        self.assertEqual(params["offset"], 0)
+        self.assertEqual(params["matchingStrategy"], "all")
+        self.assertEqual(params["sort"], keyset_sort(True))
+        self.assertNotIn("page", params)
+
+    def test_page_search_matching_strategy(self):
+        """页码分页默认不指定匹配策略，显式指定时与键集分页一致"""
+        self.service.index.search.return_value = {"hits": [], "estimatedTotalHits": 0}
+
+        self.service.search("hello")
+        self.assertNotIn("matchingStrategy", self.service.index.search.call_args[0][1])
+
+        self.service.search("hello", page=3, matching_strategy=KEYSET_MATCHING_STRATEGY)
+        self.assertEqual(self.service.index.search.call_args[0][1]["matchingStrategy"], "all")
+
+    def test_cursor_filter_applied(self):
+        """提供游标时过滤条件应包含游标位置，最后一页 nextCursor 为 None"""
+        self.service.index.search.return_value = {"hits": [_hit(10, 1, 1)], "estimatedTotalHits": 1}
+        token = SearchCursor(20, 1, 2).encode()
+
+        results = self.service.search_after("hello", cursor=token, limit=2, filters="sender_id = 9")
+
+        params = self.service.index.search.call_args[0][1]
+        self.assertIn("sender_id = 9", params["filter"])
+        self.assertIn(SearchCursor(20, 1, 2).to_filter(), params["filter"])
+        self.assertIsNone(results["nextCursor"])
+
+    def test_ranking_rules_support_keyset(self):
+        """只有 sort 之前没有 words 以外的规则时才能保证键集分页的顺序"""
+        self.assertTrue(ranking_rules_support_keyset(KEYSET_RANKING_RULES))
+        self.assertTrue(ranking_rules_support_keyset(["sort", "words", "typo"]))
+        self.assertFalse(ranking_rules_support_keyset(MESSAGE_INDEX_SETTINGS["rankingRules"]))
+        self.assertFalse(ranking_rules_support_keyset(["words", "typo", "proximity"]))
+        self.assertFalse(ranking_rules_support_keyset(None))
+
+    def test_relevance_first_ranking_rules_refuse_keyset(self):
+        """默认排序规则下非空查询拒绝键集分页；空查询只按 sort 排序，仍可使用"""
+        self.service.index.get_ranking_rules.return_value = MESSAGE_INDEX_SETTINGS["rankingRules"]
+        self.service.index.search.return_value = {"hits": [], "estimatedTotalHits": 0}
+
+        with self.assertRaises(KeysetPaginationUnavailableError):
+            self.service.search_after("hello")
+        self.service.index.search.assert_not_called()
+
+        self.service.search_after("")
+        self.service.index.search.assert_called_once()
+
+    def test_ranking_rules_are_cached(self):
+        """排序规则在缓存时间内只读取一次，交换索引后重新读取"""
+        self.service.index.search.return_value = {"hits": [], "estimatedTotalHits": 0}
+
+        self.service.search_after("hello")
+        self.service.search_after("world")
+        self.service.index.get_ranking_rules.assert_called_once()
+
+        self.service._request_async = AsyncMock(side_effect=[{"taskUid": 1}, MESSAGE_INDEX_SETTINGS["rankingRules"]])
+        self.service.wait_for_task_async = AsyncMock(return_value={"status": "succeeded"})
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.service.swap_indexes_async("a", "b"))
+            with self.assertRaises(KeysetPaginationUnavailableError):
+                loop.run_until_complete(self.service.search_after_async("hello"))
+        finally:
+            loop.close()
+        self.assertEqual(
+            self.service._request_async.await_args.args,
+            ("GET", "/indexes/telegram_messages/settings/ranking-rules")
+        )
+
+
+class TestFullFetchByCursor(unittest.TestCase):
+    """测试Search Bot后台任务按游标分块获取"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_fetch_continues_from_cursor_past_1000(self):
+        """后台任务应从首批游标继续，直到没有下一页"""
+        config_manager = MagicMock()
+        config_manager.get_search_full_fetch_max_results.return_value = 10000
+        handler = CommandHandlers(
+            client=MagicMock(), meilisearch_service=MagicMock(),
+            config_manager=config_manager, admin_ids=[1]
+        )
+        handler.cache_service = MagicMock()
+        chunks = [
+            {"hits": [_hit(i, 1, i) for i in range(500)], "nextCursor": "c2"},
+            {"hits": [_hit(i, 1, i) for i in range(500)], "nextCursor": "c3"},
+            {"hits": [_hit(i, 1, i) for i in range(100)], "nextCursor": None},
+        ]
+        handler._get_results_after_cursor = AsyncMock(side_effect=chunks)
+
+        self.loop.run_until_complete(handler._fetch_all_results_async(
+            "key", "hello", None, None, 15, "c1", 1115
+        ))
+
+        cursors = [c.args[2] for c in handler._get_results_after_cursor.await_args_list]
+        self.assertEqual(cursors, ["c1", "c2", "c3"])
+        self.assertEqual(handler.cache_service.append_to_cache.call_count, 3)
+        handler.cache_service.mark_cache_complete.assert_called_once_with("hello", None)
+
+    def test_page_fallback_uses_keyset_matching_strategy(self):
+        """缓存未命中时按页码获取的页面与首批结果使用相同的匹配策略"""
+        meili_service = MagicMock()
+        meili_service.search_async = AsyncMock(return_value={"hits": [], "estimatedTotalHits": 0})
+        handler = CommandHandlers(
+            client=MagicMock(), meilisearch_service=meili_service,
+            config_manager=MagicMock(), admin_ids=[1]
+        )
+
+        self.loop.run_until_complete(handler._get_results_from_meili("hello", None, ["date:desc"], 3, 10))
+
+        self.assertEqual(meili_service.search_async.await_args.kwargs["matching_strategy"], KEYSET_MATCHING_STRATEGY)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+搜索结果缓存单元测试
+
+测试core.search_result_cache模块中的SearchResultCache，包括：
+1. 缓存键的规范化
+2. 命中/未命中统计与容量上限
+3. 按聊天ID、查询词定向失效
+4. Search Bot 的 SearchCacheService 与 API 共享同一缓存
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.search_result_cache import SearchResultCache
+from search_bot.cache_service import SearchCacheService
+
+
+class TestSearchResultCache(unittest.TestCase):
+    """测试SearchResultCache"""
+
+    def setUp(self):
+        self.cache = SearchResultCache(maxsize=3, ttl=60)
+
+    def test_key_normalization(self):
+        """等价的查询词和过滤条件应得到相同的键"""
+        key1 = SearchResultCache.make_key("api", "  Hello   World ", {"chat_ids": [2, 1], "x": None}, page=1)
+        key2 = SearchResultCache.make_key("api", "hello world", {"chat_ids": [1, 2]}, page=1)
+        key3 = SearchResultCache.make_key("api", "hello world", {"chat_ids": [1, 2]}, page=2)
+        key4 = SearchResultCache.make_key("bot", "hello world", {"chat_ids": [1, 2]}, page=1)
+
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key2, key3)
+        self.assertNotEqual(key2, key4)
+
+    def test_hit_miss_and_maxsize(self):
+        """命中统计正确，超过容量时淘汰旧条目"""
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", {"hits": []})
+        self.assertEqual(self.cache.get("a"), {"hits": []})
+
+        for key in ("b", "c", "d"):
+            self.cache.set(key, key)
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["currsize"], 3)
+
+    def test_invalidate_by_chat(self):
+        """按聊天失效时，限定了其他聊天的条目保留，未限定聊天的条目失效"""
+        self.cache.set("only_1", 1, chat_ids=[1])
+        self.cache.set("only_2", 2, chat_ids=[2])
+        self.cache.set("any", 3)
+
+        self.assertEqual(self.cache.invalidate(chat_ids=[1]), 2)
+        self.assertIsNone(self.cache.get("only_1"))
+        self.assertIsNone(self.cache.get("any"))
+        self.assertEqual(self.cache.get("only_2"), 2)
+
+    def test_invalidate_by_query(self):
+        """按查询词失效匹配包含该子串的条目"""
+        self.cache.set("k1", 1, query="Hello World")
+        self.cache.set("k2", 2, query="other")
+
+        self.assertEqual(self.cache.invalidate(query="hello"), 1)
+        self.assertEqual(self.cache.get("k2"), 2)
+
+    def test_disabled_cache(self):
+        """禁用时不写入也不命中"""
+        cache = SearchResultCache(enabled=False)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestSearchCacheServiceShared(unittest.TestCase):
+    """测试SearchCacheService使用共享缓存"""
+
+    def test_bot_entries_live_in_shared_cache(self):
+        """Bot 写入的条目应出现在共享缓存中并可被清空"""
+        shared = SearchResultCache()
+        config = MagicMock()
+        config.get_search_cache_enabled.return_value = True
+        config.get_search_cache_ttl.return_value = 60
+        config.get_search_cache_initial_fetch_count.return_value = 15
+        config.get_search_cache_maxsize.return_value = 100
+
+        service = SearchCacheService(config)
+        with patch("search_bot.cache_service.get_search_result_cache", return_value=shared):
+            service.store_in_cache("Hello", {"chat_type": ["group"]}, ["r"], 1, is_partial=False)
+        self.assertEqual(service.get_from_cache("hello", {"chat_type": ["group"]}), (["r"], False, 1, None))
+        self.assertEqual(shared.get_stats()["currsize"], 1)
+        self.assertEqual(shared.maxsize, 100)
+
+        shared.invalidate(chat_ids=[123])
+        self.assertIsNone(service.get_from_cache("hello", {"chat_type": ["group"]}))
+
+
+if __name__ == "__main__":
+    unittest.main()
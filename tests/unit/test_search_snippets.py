@@ -0,0 +1,106 @@
+"""
+搜索摘要与字段投影单元测试
+
+测试由 Meilisearch 裁剪和高亮的摘要模式，包括：
+1. 各字段投影的搜索参数（attributesToCrop/cropLength/attributesToRetrieve）
+2. Search Bot 格式化器直接使用裁剪后的窗口并将高亮转换为加粗
+3. API 的摘要生成
+"""
+
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from api.routers.search import _make_text_snippet
+from core.meilisearch_service import (
+    MeiliSearchService, IDS_ONLY_ATTRIBUTES_TO_RETRIEVE, SNIPPET_ATTRIBUTES_TO_RETRIEVE
+)
+from search_bot.message_formatters import format_search_results
+
+
+class TestSnippetSearchParams(unittest.TestCase):
+    """测试摘要模式的搜索参数"""
+
+    def setUp(self):
+        with patch("core.meilisearch_service.meilisearch.Client"), \
+                patch.object(MeiliSearchService, "ensure_index_setup"), \
+                patch.object(MeiliSearchService, "ensure_sessions_index_setup"):
+            self.service = MeiliSearchService("http://localhost:7700", "key")
+
+    def test_crop_params(self):
+        """snippet 投影只检索元数据，text 由服务端裁剪"""
+        params = self.service._build_search_params(crop_length=30, projection="snippet")
+
+        self.assertEqual(params["attributesToCrop"], ["text"])
+        self.assertEqual(params["cropLength"], 30)
+        self.assertEqual(params["attributesToRetrieve"], SNIPPET_ATTRIBUTES_TO_RETRIEVE)
+        self.assertNotIn("text", params["attributesToRetrieve"])
+
+    def test_no_crop_by_default(self):
+        """默认 full 投影，以及未配置摘要长度的 snippet 投影都返回完整文本"""
+        for params in (self.service._build_search_params(crop_length=30),
+                       self.service._build_search_params(crop_length=0, projection="snippet")):
+            self.assertNotIn("attributesToCrop", params)
+            self.assertNotIn("attributesToRetrieve", params)
+            self.assertEqual(params["attributesToHighlight"], ["text"])
+
+    def test_ids_only_params(self):
+        """ids_only 只检索定位字段且不做高亮"""
+        params = self.service._build_search_params(crop_length=30, projection="ids_only")
+
+        self.assertEqual(params["attributesToRetrieve"], IDS_ONLY_ATTRIBUTES_TO_RETRIEVE)
+        self.assertEqual(params["attributesToHighlight"], [])
+        self.assertNotIn("attributesToCrop", params)
+
+    def test_unknown_projection(self):
+        """未知投影应抛出 ValueError"""
+        with self.assertRaises(ValueError):
+            self.service._build_search_params(projection="everything")
+
+
+class TestSnippetFormatting(unittest.TestCase):
+    """测试摘要的展示"""
+
+    def _hit(self, **extra):
+        return {
+            'chat_title': '测试群组',
+            'sender_name': '张三',
+            'date': int(datetime(2023, 5, 20).timestamp()),
+            'message_link': 'https://t.me/c/12345/67890',
+            **extra
+        }
+
+    def test_bot_uses_cropped_window(self):
+        """Bot 应直接使用裁剪窗口，高亮转换为加粗并清理原有 Markdown"""
+        results = {
+            'hits': [self._hit(_formatted={'text': '…关于 <em>Python</em> 和 **机器学习** 的讨论…'})],
+            'query': 'Python', 'estimatedTotalHits': 1, 'processingTimeMs': 1
+        }
+
+        message, _ = format_search_results(results, 1, 1)
+
+        self.assertIn('…关于 **Python** 和 机器学习 的讨论…', message)
+        self.assertNotIn('<em>', message)
+
+    def test_bot_falls_back_to_full_text(self):
+        """结果包含完整 text 时仍按旧方式截取"""
+        results = {
+            'hits': [self._hit(text='长' * 200)],
+            'query': '长', 'estimatedTotalHits': 1, 'processingTimeMs': 1
+        }
+
+        message, _ = format_search_results(results, 1, 1)
+
+        self.assertIn('长' * 150 + '...', message)
+        self.assertNotIn('长' * 151, message)
+
+    def test_api_snippet(self):
+        """API 摘要模式下不再截断裁剪窗口"""
+        window = '…' + 'x' * 400 + '…'
+        self.assertEqual(_make_text_snippet({'_formatted': {'text': window}}), window)
+        self.assertEqual(_make_text_snippet({'text': 'y' * 250}), 'y' * 200 + '...')
+        self.assertEqual(_make_text_snippet({'id': '1_2', 'date': 0}), '')
+
+
+if __name__ == "__main__":
+    unittest.main()
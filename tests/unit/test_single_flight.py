@@ -0,0 +1,78 @@
+"""
+请求合并单元测试
+
+测试core.single_flight模块中的SingleFlight，包括：
+1. 相同键的并发调用只执行一次
+2. 异常传递给所有等待者
+3. 单个调用方被取消不影响其他等待者
+"""
+
+import asyncio
+import unittest
+
+from core.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """测试SingleFlight"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.flight = SingleFlight()
+        self.executions = 0
+
+    def tearDown(self):
+        self.loop.close()
+
+    async def _work(self, result="ok", delay=0.01):
+        self.executions += 1
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def test_concurrent_calls_share_one_execution(self):
+        """相同键只执行一次，不同键各自执行"""
+        async def scenario():
+            return await asyncio.gather(
+                self.flight.do("a", self._work),
+                self.flight.do("a", self._work),
+                self.flight.do("b", self._work),
+            )
+
+        self.assertEqual(self.loop.run_until_complete(scenario()), ["ok", "ok", "ok"])
+        self.assertEqual(self.executions, 2)
+        self.assertEqual(self.flight.get_stats()["collapsed"], 1)
+
+    def test_exception_shared(self):
+        """执行失败时所有等待者都收到异常"""
+        async def scenario():
+            return await asyncio.gather(
+                self.flight.do("a", lambda: self._work(RuntimeError("boom"))),
+                self.flight.do("a", lambda: self._work(RuntimeError("boom"))),
+                return_exceptions=True,
+            )
+
+        results = self.loop.run_until_complete(scenario())
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(self.executions, 1)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """发起者被取消后，其他等待者仍能拿到结果"""
+        async def scenario():
+            leader = asyncio.ensure_future(self.flight.do("a", self._work))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(self.flight.do("a", self._work))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower, leader
+
+        result, leader = self.loop.run_until_complete(scenario())
+        self.assertEqual(result, "ok")
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(self.executions, 1)
+        self.assertEqual(self.flight.get_stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
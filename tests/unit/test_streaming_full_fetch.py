@@ -0,0 +1,151 @@
+"""
+流式完整获取单元测试
+
+测试Search Bot后台任务逐块追加结果到缓存，包括：
+1. 每块到达后立即可从缓存提供对应页面
+2. 全部获取完成后条目标记为完整
+3. 获取期间相关聊天有新写入时中止并不再写入过期结果
+4. 限定聊天的查询不受其它聊天写入的影响，首批搜索期间的写入使条目失效
+5. 索引不支持键集分页时按页码分块获取
+"""
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core import index_generations
+from core.index_generations import IndexGenerations, get_index_generations
+from core.search_result_cache import SearchResultCache
+from search_bot.cache_service import SearchCacheService
+from search_bot.command_handlers import CommandHandlers
+
+
+class TestStreamingFullFetch(unittest.TestCase):
+    """测试流式完整获取"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self._saved_generations = index_generations._index_generations
+        index_generations._index_generations = IndexGenerations()
+
+        config = MagicMock()
+        config.get_search_cache_enabled.return_value = True
+        config.get_search_cache_ttl.return_value = 60
+        config.get_search_cache_initial_fetch_count.return_value = 15
+        config.get_search_cache_maxsize.return_value = 100
+        config.get_search_full_fetch_max_results.return_value = 10000
+
+        self.shared = SearchResultCache()
+        patcher = patch("search_bot.cache_service.get_search_result_cache", return_value=self.shared)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.handler = CommandHandlers(
+            client=MagicMock(), meilisearch_service=MagicMock(), config_manager=config, admin_ids=[1]
+        )
+        self.handler.cache_service = SearchCacheService(config)
+        self.handler.cache_service.store_in_cache("hello", None, list(range(15)), 1015, is_partial=True)
+
+    def tearDown(self):
+        index_generations._index_generations = self._saved_generations
+        self.loop.close()
+
+    def _run(self, fetch_chunk, filters_dict=None):
+        async def fake_fetch(parsed_query, filters, cursor, limit, **kwargs):
+            return fetch_chunk(cursor, limit)
+
+        self.handler._get_results_after_cursor = fake_fetch
+        self.loop.run_until_complete(self.handler._fetch_all_results_async(
+            "key", "hello", filters_dict, None, 15, "c1", 1015
+        ))
+
+    def test_pages_servable_as_chunks_land(self):
+        """第一块到达后、第二块请求前，对应数据已在部分缓存中"""
+        seen_lengths = []
+
+        def fetch_chunk(cursor, limit):
+            entry = self.handler.cache_service.get_from_cache("hello", None)
+            seen_lengths.append((len(entry[0]), entry[1]))
+            if cursor == "c1":
+                return {"hits": list(range(15, 515)), "nextCursor": "c2"}
+            return {"hits": list(range(515, 1015)), "nextCursor": None}
+
+        self._run(fetch_chunk)
+
+        self.assertEqual(seen_lengths, [(15, True), (515, True)])
+        data, is_partial, total_hits, _ = self.handler.cache_service.get_from_cache("hello", None)
+        self.assertEqual(data, list(range(1015)))
+        self.assertFalse(is_partial)
+        self.assertEqual(total_hits, 1015)
+
+    def test_page_fetch_when_keyset_unavailable(self):
+        """提供 sort_options 时按页码分块获取，跳过首批已缓存的部分"""
+        results = list(range(1015))
+        requested_pages = []
+
+        async def fake_page(parsed_query, filters, sort, page, hits_per_page, **kwargs):
+            requested_pages.append((page, hits_per_page))
+            return {"hits": results[(page - 1) * hits_per_page:page * hits_per_page]}
+
+        self.handler._get_results_from_meili = fake_page
+        self.loop.run_until_complete(self.handler._fetch_all_results_async(
+            "key", "hello", None, None, 15, None, 1015, sort_options=["date:desc"]
+        ))
+
+        self.assertEqual(requested_pages, [(1, 500), (2, 500), (3, 500)])
+        data, is_partial, total_hits, _ = self.handler.cache_service.get_from_cache("hello", None)
+        self.assertEqual(data, results)
+        self.assertFalse(is_partial)
+        self.assertEqual(total_hits, 1015)
+
+    def test_write_during_fetch_aborts(self):
+        """获取期间发生写入时，条目失效且后台任务停止"""
+        calls = []
+
+        def fetch_chunk(cursor, limit):
+            calls.append(cursor)
+            get_index_generations().bump([42])
+            return {"hits": list(range(15, 515)), "nextCursor": "c2"}
+
+        self._run(fetch_chunk)
+
+        self.assertEqual(calls, ["c1"])
+        self.assertIsNone(self.handler.cache_service.get_from_cache("hello", None))
+
+
+    def test_chat_scoped_fetch_ignores_other_chats(self):
+        """限定聊天的查询在其它聊天有写入时继续获取，限定的聊天有写入时中止"""
+        cache_service = self.handler.cache_service
+        filters = {"chat_id": [7]}
+        cache_service.store_in_cache(
+            "hello", filters, list(range(15)), 1015, is_partial=True, generations=cache_service.snapshot(filters)
+        )
+
+        def fetch_chunk(cursor, limit):
+            get_index_generations().bump([42])
+            if cursor == "c1":
+                return {"hits": list(range(15, 515)), "nextCursor": "c2"}
+            return {"hits": list(range(515, 1015)), "nextCursor": None}
+
+        self._run(fetch_chunk, filters)
+
+        data, is_partial, _, _ = cache_service.get_from_cache("hello", filters)
+        self.assertEqual((len(data), is_partial), (1015, False))
+
+        get_index_generations().bump([7])
+        self.assertIsNone(cache_service.get_from_cache("hello", filters))
+
+    def test_write_during_initial_search_invalidates_entry(self):
+        """使用搜索前的快照写入条目，首批搜索期间的写入使其失效"""
+        cache_service = self.handler.cache_service
+        filters = {"chat_id": [7]}
+        generations = cache_service.snapshot(filters)
+        get_index_generations().bump([7])
+
+        cache_service.store_in_cache("hello", filters, list(range(15)), 15, is_partial=False, generations=generations)
+
+        self.assertIsNone(cache_service.get_from_cache("hello", filters))
+
+
+if __name__ == "__main__":
+    unittest.main()
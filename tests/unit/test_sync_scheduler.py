@@ -0,0 +1,135 @@
+"""
+同步调度器单元测试
+
+测试core.token_bucket和user_bot.sync_scheduler模块，包括：
+1. 令牌桶的速率限制与冻结
+2. 调度器按优先级和轮转公平执行回溯批次
+3. FloodWait 时冻结共享令牌桶
+"""
+
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from telethon.errors import FloodWaitError
+
+from core.token_bucket import TokenBucket
+from user_bot.sync_scheduler import SyncScheduler
+
+
+class FakeSyncer:
+    """模拟HistorySyncer，记录每次回溯批次"""
+
+    def __init__(self, chat_id: int, batches: int, log: list, flood_on_first: bool = False):
+        self.chat_id = chat_id
+        self.remaining = batches
+        self.log = log
+        self.flood_on_first = flood_on_first
+
+    async def initialize(self):
+        pass
+
+    def start_forward_sync(self):
+        return None
+
+    def backfill_done(self):
+        return self.remaining <= 0
+
+    async def backfill_step(self):
+        if self.flood_on_first:
+            self.flood_on_first = False
+            raise FloodWaitError(request=MagicMock(), capture=0)
+        self.log.append(self.chat_id)
+        self.remaining -= 1
+        return self.remaining > 0
+
+
+class TestTokenBucket(unittest.TestCase):
+    """测试TokenBucket"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_rate_limits_after_burst(self):
+        """突发容量用完后按速率发放令牌"""
+        async def scenario():
+            bucket = TokenBucket(rate=20, capacity=2)
+            start = time.monotonic()
+            for _ in range(4):
+                await bucket.acquire()
+            # 前 2 个立即获得，后 2 个约需 0.1s
+            self.assertGreaterEqual(time.monotonic() - start, 0.08)
+
+        self.loop.run_until_complete(scenario())
+
+    def test_stall_blocks_acquire(self):
+        """冻结期间 acquire 应等待"""
+        async def scenario():
+            bucket = TokenBucket(rate=100, capacity=10)
+            bucket.stall(0.1)
+            start = time.monotonic()
+            await bucket.acquire()
+            self.assertGreaterEqual(time.monotonic() - start, 0.09)
+            self.assertEqual(bucket.get_stats()["stalls"], 1)
+
+        self.loop.run_until_complete(scenario())
+
+
+class TestSyncScheduler(unittest.TestCase):
+    """测试SyncScheduler"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run_until_done(self, scheduler: SyncScheduler, expected_chats: int):
+        async def scenario():
+            scheduler.start()
+            for _ in range(200):
+                if scheduler.get_stats()["completed"] == expected_chats:
+                    break
+                await asyncio.sleep(0.01)
+            await scheduler.stop()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_round_robin_fairness(self):
+        """同优先级的聊天应轮流执行"""
+        log = []
+        scheduler = SyncScheduler(TokenBucket(rate=1000, capacity=1000), max_concurrency=1)
+        scheduler.add_chat(FakeSyncer(1, 3, log))
+        scheduler.add_chat(FakeSyncer(2, 3, log))
+
+        self._run_until_done(scheduler, 2)
+        self.assertEqual(log, [1, 2, 1, 2, 1, 2])
+
+    def test_priority_first(self):
+        """高优先级（数值小）的聊天先完成"""
+        log = []
+        scheduler = SyncScheduler(TokenBucket(rate=1000, capacity=1000), max_concurrency=1)
+        scheduler.add_chat(FakeSyncer(1, 2, log), priority=10)
+        scheduler.add_chat(FakeSyncer(2, 2, log), priority=0)
+
+        self._run_until_done(scheduler, 2)
+        self.assertEqual(log, [2, 2, 1, 1])
+
+    def test_flood_wait_stalls_shared_bucket(self):
+        """FloodWait 应冻结共享令牌桶并重试该聊天"""
+        log = []
+        bucket = TokenBucket(rate=1000, capacity=1000)
+        scheduler = SyncScheduler(bucket, max_concurrency=2)
+        scheduler.add_chat(FakeSyncer(1, 1, log, flood_on_first=True))
+
+        self._run_until_done(scheduler, 1)
+        self.assertEqual(log, [1])
+        self.assertEqual(bucket.get_stats()["stalls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
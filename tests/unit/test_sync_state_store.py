@@ -0,0 +1,109 @@
+"""
+同步状态存储单元测试
+
+测试core.sync_state_store模块中的SyncStateStore，包括：
+1. 光标按聊天 UPSERT 与读取
+2. 同步点与光标共存于同一行
+3. 旧版 sync_points.json 的一次性迁移
+4. SyncPointManager 基于状态库的读写
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.config_manager import SyncPointManager
+from core.sync_state_store import SyncStateStore
+
+
+class TestSyncStateStore(unittest.TestCase):
+    """测试SyncStateStore"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "sync_state.db")
+        self.json_path = os.path.join(self.temp_dir, "sync_points.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _state(self, chat_id, newest, oldest):
+        return {
+            "chat_id": chat_id,
+            "cutoff_ts": 0,
+            "cutoff_id": 0,
+            "last_newest_id": newest,
+            "next_oldest_id": oldest,
+            "overlap": 100,
+        }
+
+    def test_cursor_upsert_per_chat(self):
+        """保存光标只影响对应聊天，重复保存覆盖旧值"""
+        store = SyncStateStore(self.db_path, legacy_json_path=None)
+        store.save_cursor(1, self._state(1, 10, 5))
+        store.save_cursor(2, self._state(2, 20, 15))
+        store.save_cursor(1, self._state(1, 11, 4))
+
+        self.assertEqual(store.get_cursor(1), self._state(1, 11, 4))
+        self.assertEqual(store.get_cursor(2), self._state(2, 20, 15))
+        self.assertIsNone(store.get_cursor(3))
+
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+        store.close()
+
+    def test_cursor_and_sync_point_share_row(self):
+        """同步点与光标互不覆盖"""
+        store = SyncStateStore(self.db_path, legacy_json_path=None)
+        store.save_sync_point(1, {"message_id": 99, "date": 1000})
+        self.assertIsNone(store.get_cursor(1))
+
+        store.save_cursor(1, self._state(1, 10, 5))
+        self.assertEqual(store.get_sync_point(1), {"message_id": 99, "date": 1000})
+        self.assertTrue(store.delete_sync_point(1))
+        self.assertFalse(store.delete_sync_point(1))
+        self.assertEqual(store.get_cursor(1)["last_newest_id"], 10)
+        store.close()
+
+    def test_migrates_legacy_json_once(self):
+        """旧版 JSON 中的光标和同步点应迁移并重命名原文件"""
+        legacy = {
+            "-1001": self._state(-1001, 50, 40),
+            "sync_points": {"-1001": {"message_id": 7, "date": 123}},
+            "updated_at": 1,
+        }
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        store = SyncStateStore(self.db_path, legacy_json_path=self.json_path)
+        self.assertEqual(store.get_cursor(-1001), self._state(-1001, 50, 40))
+        self.assertEqual(store.get_sync_point(-1001)["message_id"], 7)
+        self.assertFalse(os.path.exists(self.json_path))
+        self.assertTrue(os.path.exists(self.json_path + ".migrated"))
+        store.close()
+
+        # 重新打开后数据仍在
+        store = SyncStateStore(self.db_path, legacy_json_path=self.json_path)
+        self.assertEqual(store.get_cursor(-1001)["next_oldest_id"], 40)
+        store.close()
+
+    def test_sync_point_manager_uses_store(self):
+        """SyncPointManager 的更新写入状态库"""
+        store = SyncStateStore(self.db_path, legacy_json_path=None)
+        manager = SyncPointManager(state_store=store)
+
+        manager.update_sync_point(1, 42, 1000)
+        manager.update_sync_status(1, "forward")
+        self.assertEqual(store.get_sync_point(1)["message_id"], 42)
+        self.assertTrue(manager.get_sync_status(1)["forward_sync_complete"])
+        self.assertIn("1", manager.sync_points)
+
+        manager.reset_all_sync_points()
+        self.assertIsNone(manager.get_sync_point(1))
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -39,6 +39,8 @@ class TestUserBotClient(unittest.TestCase):
             ("Telegram", "API_ID"): "12345",
             ("Telegram", "API_HASH"): "test_hash"
         }.get((section, key), default)
+        self.mock_config.get_archive_enabled.return_value = False
+        self.mock_config.get_index_task_poll_interval.return_value = 0
 
     @patch('user_bot.client.Path')
     def test_sessions_dir_creation(self, mock_path):
@@ -276,7 +278,7 @@ class TestUserBotClient(unittest.TestCase):
         loop = asyncio.get_event_loop()
         loop.run_until_complete(async_test())
 
-    @patch('user_bot.client.MeiliSearchService')
+    @patch('user_bot.client.get_shared_meilisearch_service')
     @patch('user_bot.client.TelegramClient')
     def test_get_dialogs_info_success(self, mock_telegram_client, mock_meilisearch_service):
         """
@@ -376,7 +378,7 @@ class TestUserBotClient(unittest.TestCase):
         loop = asyncio.get_event_loop()
         loop.run_until_complete(async_test())
 
-    @patch('user_bot.client.MeiliSearchService')
+    @patch('user_bot.client.get_shared_meilisearch_service')
     @patch('user_bot.client.TelegramClient')
     def test_get_dialogs_info_client_not_initialized(self, mock_telegram_client, mock_meilisearch_service):
         """
@@ -398,7 +400,7 @@ class TestUserBotClient(unittest.TestCase):
         loop = asyncio.get_event_loop()
         loop.run_until_complete(async_test())
 
-    @patch('user_bot.client.MeiliSearchService')
+    @patch('user_bot.client.get_shared_meilisearch_service')
     @patch('user_bot.client.TelegramClient')
     def test_get_dialogs_info_client_not_connected(self, mock_telegram_client, mock_meilisearch_service):
         """
@@ -424,7 +426,7 @@ class TestUserBotClient(unittest.TestCase):
         loop = asyncio.get_event_loop()
         loop.run_until_complete(async_test())
 
-    @patch('user_bot.client.MeiliSearchService')
+    @patch('user_bot.client.get_shared_meilisearch_service')
     @patch('user_bot.client.TelegramClient')
     def test_get_dialogs_info_api_error(self, mock_telegram_client, mock_meilisearch_service):
         """
@@ -18,12 +18,18 @@ from telethon import TelegramClient, events
 from telethon.errors import SessionPasswordNeededError
 
 from core.config_manager import ConfigManager
-from core.meilisearch_service import MeiliSearchService
+from core.meilisearch_service import get_shared_meilisearch_service
 from core.async_task_manager import get_task_manager
+from core.ingest_buffer import get_ingest_buffer
+from core.index_task_tracker import IndexTaskTracker, get_index_task_tracker, set_index_task_tracker
+from core.message_archive import MessageArchive, get_message_archive, set_message_archive
 from core.shutdown_manager import get_shutdown_manager, TelethonClientManager
 from user_bot.avatar_service import AvatarService
-from user_bot.event_handlers import handle_new_message, handle_message_edited
+from user_bot.deletion_sync import get_deletion_reconciler, set_deletion_reconciler
+from user_bot.event_handlers import handle_new_message, handle_message_edited, handle_message_deleted
+from user_bot.forward_sync import get_forward_sync_coordinator, set_forward_sync_coordinator
 from user_bot.history_syncer import initial_sync_all_whitelisted_chats
+from user_bot.sync_scheduler import get_sync_scheduler, set_sync_scheduler
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -86,7 +92,7 @@ class UserBotClient:
         # 头像服务将在客户端启动后初始化
         self.avatar_service: Optional[AvatarService] = None
 
-        # 初始化MeiliSearchService
+        # 获取进程内共享的MeiliSearchService
         # 从配置获取MeiliSearch配置
         host = self.config_manager.get_env("MEILISEARCH_HOST")
         api_key = self.config_manager.get_env("MEILISEARCH_API_KEY")
@@ -97,7 +103,11 @@ class UserBotClient:
         if not api_key:
             api_key = self.config_manager.get_config("MeiliSearch", "API_KEY")
             
-        self.meilisearch_service = MeiliSearchService(host=host, api_key=api_key)
+        self.meilisearch_service = get_shared_meilisearch_service(
+            host=host,
+            api_key=api_key,
+            **self.config_manager.get_meili_http_options()
+        )
         logger.info("已初始化MeiliSearchService")
 
         # 从配置获取会话名称
@@ -193,7 +203,36 @@ class UserBotClient:
             self.avatar_service = AvatarService(self._client, max_concurrent=10)
             logger.info("头像服务已初始化")
 
-            # 注册关闭处理器
+            # 启用时打开本地消息归档，写入路径在写入 Meilisearch 前先归档
+            if self.config_manager.get_archive_enabled() and get_message_archive() is None:
+                set_message_archive(MessageArchive(self.config_manager.get_archive_path()))
+                logger.info(f"本地消息归档已启用: {self.config_manager.get_archive_path()}")
+
+            # 跟踪 Meilisearch 写入任务，积压过多时对历史回溯施加背压
+            poll_interval = self.config_manager.get_index_task_poll_interval()
+            if poll_interval > 0 and get_index_task_tracker() is None:
+                high_watermark, low_watermark = self.config_manager.get_index_backlog_watermarks()
+                tracker = IndexTaskTracker(self.meilisearch_service, poll_interval, high_watermark, low_watermark)
+                set_index_task_tracker(tracker)
+                tracker.start()
+
+            # 注册关闭处理器（逆序执行：先停止向前同步，再断开 Telethon，然后刷新写入缓冲区、
+            # 停止任务跟踪，最后关闭归档）。Meilisearch 连接池由进程内各组件共享，在进程退出时统一关闭
+            self.shutdown_manager.add_handler(
+                "message_archive",
+                self._shutdown_message_archive,
+                timeout=5.0
+            )
+            self.shutdown_manager.add_handler(
+                "index_task_tracker",
+                self._shutdown_index_task_tracker,
+                timeout=5.0
+            )
+            self.shutdown_manager.add_handler(
+                "ingest_buffer",
+                self._shutdown_ingest_buffer,
+                timeout=30.0
+            )
             self.shutdown_manager.add_handler(
                 "avatar_service",
                 self._shutdown_avatar_service,
@@ -204,6 +243,11 @@ class UserBotClient:
                 self._shutdown_telethon_client,
                 timeout=15.0
             )
+            self.shutdown_manager.add_handler(
+                "forward_sync",
+                self._shutdown_forward_sync,
+                timeout=5.0
+            )
 
             # 注册事件处理器
             # 使用functools.partial为事件处理器绑定额外参数（ConfigManager和MeiliSearchService实例）
@@ -218,6 +262,12 @@ class UserBotClient:
                 config_manager=self.config_manager,
                 meili_service=self.meilisearch_service
             )
+
+            deleted_message_handler = functools.partial(
+                handle_message_deleted,
+                config_manager=self.config_manager,
+                meili_service=self.meilisearch_service
+            )
             
             # 注册事件处理器
             self._client.add_event_handler(
@@ -231,6 +281,12 @@ class UserBotClient:
                 events.MessageEdited()
             )
             logger.info("已注册消息编辑事件处理器")
+
+            self._client.add_event_handler(
+                deleted_message_handler,
+                events.MessageDeleted()
+            )
+            logger.info("已注册消息删除事件处理器")
             
             # 执行初始历史同步
             logger.info("开始执行初始历史消息同步...")
@@ -446,7 +502,52 @@ class UserBotClient:
             logger.error(f"刷新会话索引失败: {e}")
             raise
 
-    def search_sessions(self, query: str, session_types: Optional[List[str]] = None, 
+    def format_session_search_results(self, search_results: dict, page: int, hits_per_page: int) -> dict:
+        """
+        将会话搜索结果转换为对话列表格式，并附带已缓存的头像
+
+        Args:
+            search_results: MeiliSearchService 的会话搜索结果
+            page: 页码
+            hits_per_page: 每页结果数
+
+        Returns:
+            与 get_dialogs_info 相同格式的结果字典
+        """
+        # 增强搜索结果，添加头像信息
+        enhanced_hits = []
+        for hit in search_results.get('hits', []):
+            session_id = int(hit['id'])
+            
+            # 从头像服务获取头像
+            avatar_base64 = None
+            if self.avatar_service:
+                avatar_base64 = self.avatar_service.get_cached_avatar(session_id)
+            
+            # 构建增强的会话信息
+            enhanced_session = {
+                "id": session_id,
+                "name": hit['name'],
+                "type": hit['type'],
+                "unread_count": hit.get('unread_count', 0),
+                "date": hit.get('date'),
+                "avatar_base64": avatar_base64
+            }
+            enhanced_hits.append(enhanced_session)
+        
+        # 返回增强的搜索结果
+        return {
+            "items": enhanced_hits,
+            "total": search_results.get('estimatedTotalHits', 0),
+            "page": page,
+            "limit": hits_per_page,
+            "total_pages": (search_results.get('estimatedTotalHits', 0) + hits_per_page - 1) // hits_per_page,
+            "has_avatars": True,
+            "from_search": True,
+            "processing_time_ms": search_results.get('processingTimeMs', 0)
+        }
+
+    async def search_sessions(self, query: str, session_types: Optional[List[str]] = None, 
                        page: int = 1, hits_per_page: int = 20) -> dict:
         """
         搜索会话
@@ -462,7 +563,7 @@ class UserBotClient:
         """
         try:
             # 使用MeiliSearch搜索会话
-            search_results = self.meilisearch_service.search_sessions(
+            search_results = await self.meilisearch_service.search_sessions_async(
                 query=query,
                 session_types=session_types,
                 page=page,
@@ -470,38 +571,7 @@ class UserBotClient:
                 sort=["date:desc"]
             )
             
-            # 增强搜索结果，添加头像信息
-            enhanced_hits = []
-            for hit in search_results.get('hits', []):
-                session_id = int(hit['id'])
-                
-                # 从头像服务获取头像
-                avatar_base64 = None
-                if self.avatar_service:
-                    avatar_base64 = self.avatar_service.get_cached_avatar(session_id)
-                
-                # 构建增强的会话信息
-                enhanced_session = {
-                    "id": session_id,
-                    "name": hit['name'],
-                    "type": hit['type'],
-                    "unread_count": hit.get('unread_count', 0),
-                    "date": hit.get('date'),
-                    "avatar_base64": avatar_base64
-                }
-                enhanced_hits.append(enhanced_session)
-            
-            # 返回增强的搜索结果
-            return {
-                "items": enhanced_hits,
-                "total": search_results.get('estimatedTotalHits', 0),
-                "page": page,
-                "limit": hits_per_page,
-                "total_pages": (search_results.get('estimatedTotalHits', 0) + hits_per_page - 1) // hits_per_page,
-                "has_avatars": True,
-                "from_search": True,
-                "processing_time_ms": search_results.get('processingTimeMs', 0)
-            }
+            return self.format_session_search_results(search_results, page, hits_per_page)
             
         except Exception as e:
             logger.error(f"搜索会话失败: {e}")
@@ -741,6 +811,43 @@ class UserBotClient:
             await self.avatar_service.cancel_all_downloads()
             logger.info("头像服务已关闭")
 
+    async def _shutdown_ingest_buffer(self) -> None:
+        """刷新并关闭写入缓冲区"""
+        logger.info("正在刷新写入缓冲区...")
+        await get_ingest_buffer(self.meilisearch_service).close()
+        logger.info("写入缓冲区已关闭")
+
+    async def _shutdown_message_archive(self) -> None:
+        """关闭本地消息归档（在写入缓冲区刷新之后）"""
+        archive = get_message_archive()
+        if archive is not None:
+            set_message_archive(None)
+            archive.close()
+            logger.info("本地消息归档已关闭")
+
+    async def _shutdown_index_task_tracker(self) -> None:
+        """停止索引任务跟踪（在写入缓冲区刷新之后）"""
+        tracker = get_index_task_tracker()
+        if tracker is not None:
+            set_index_task_tracker(None)
+            await tracker.stop()
+
+    async def _shutdown_forward_sync(self) -> None:
+        """停止向前同步协调器、删除对账任务和同步调度器"""
+        coordinator = get_forward_sync_coordinator()
+        if coordinator is not None:
+            await coordinator.stop()
+            set_forward_sync_coordinator(None)
+        reconciler = get_deletion_reconciler()
+        if reconciler is not None:
+            await reconciler.stop()
+            set_deletion_reconciler(None)
+        scheduler = get_sync_scheduler()
+        if scheduler is not None:
+            await scheduler.stop()
+            # 重启 User Bot 时基于新的客户端重新创建
+            set_sync_scheduler(None)
+
     async def _shutdown_telethon_client(self) -> None:
         """关闭Telethon客户端"""
         if self._client:
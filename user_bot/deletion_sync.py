@@ -0,0 +1,178 @@
+"""
+删除对账模块
+
+MessageDeleted 事件只能覆盖在线期间的删除，此模块定期比对索引与 Telegram：
+1. 按页读取某个聊天已索引的消息ID
+2. 每 100 个ID一次 GetMessages 请求，Telegram 对已删除的消息返回 None
+3. 汇总后批量删除索引中已不存在的消息，并在本地消息归档中追加删除标记
+4. 所有请求共享同步调度器的令牌桶，FloodWait 时冻结整个令牌桶
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+
+from core.config_manager import ConfigManager
+from core.meilisearch_service import MeiliSearchService
+from core.message_archive import archive_deletions
+from core.token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# 默认参数
+DEFAULT_RECONCILE_INTERVAL = 21600.0
+INDEX_PAGE_SIZE = 1000      # 每次从索引读取的消息ID数
+CHECK_CHUNK_SIZE = 100      # 单次 GetMessages 请求的消息ID数
+DELETE_BATCH_SIZE = 1000    # 单次批量删除的文档数
+
+
+class DeletionReconciler:
+    """
+    删除对账任务
+
+    每隔 interval 秒对所有白名单聊天执行一次对账，删除索引中
+    在 Telegram 已不存在的消息。
+    """
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        meili_service: MeiliSearchService,
+        config_manager: ConfigManager,
+        interval: float = DEFAULT_RECONCILE_INTERVAL,
+        rate_limiter: Optional[TokenBucket] = None,
+    ) -> None:
+        """
+        初始化对账任务
+
+        Args:
+            client: 已连接的 TelegramClient
+            meili_service: Meilisearch 服务实例
+            config_manager: 用于读取白名单
+            interval: 两次对账之间的间隔（秒）
+            rate_limiter: 与同步任务共享的令牌桶；为 None 时不限流
+        """
+        self.client = client
+        self.meili_service = meili_service
+        self.config_manager = config_manager
+        self.interval = interval
+        self.rate_limiter = rate_limiter
+        self._task: Optional[asyncio.Task] = None
+
+        self._stats: Dict[str, int] = {
+            "passes": 0,
+            "checked": 0,
+            "deleted": 0,
+            "errors": 0,
+        }
+
+    # ----------------------- 生命周期 -----------------------
+    def start(self) -> None:
+        """启动周期性对账任务"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="deletion_reconciler")
+        logger.info(f"删除对账任务已启动: 间隔={self.interval}s")
+
+    async def stop(self) -> None:
+        """停止对账任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"删除对账任务已停止: {self.get_stats()}")
+
+    async def _run(self) -> None:
+        # 启动时回溯任务最繁忙，首轮对账延后一个周期
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reconcile_all()
+
+    # ----------------------- 对账 -----------------------
+    async def reconcile_all(self) -> int:
+        """
+        对所有白名单聊天执行一次对账
+
+        Returns:
+            int: 本轮删除的文档数
+        """
+        deleted = 0
+        for chat_id in list(self.config_manager.get_whitelist()):
+            while True:
+                try:
+                    deleted += await self.reconcile_chat(chat_id)
+                    break
+                except FloodWaitError as e:
+                    logger.warning(f"[{chat_id}] 删除对账 FloodWait {e.seconds}s")
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.stall(e.seconds)
+                    else:
+                        await asyncio.sleep(e.seconds)
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.error(f"[{chat_id}] 删除对账失败: {e}", exc_info=True)
+                    break
+        self._stats["passes"] += 1
+        logger.info(f"删除对账完成，本轮删除 {deleted} 条消息")
+        return deleted
+
+    async def reconcile_chat(self, chat_id: int) -> int:
+        """
+        对单个聊天执行对账
+
+        Returns:
+            int: 删除的文档数
+        """
+        missing: List[int] = []
+        offset = 0
+        while True:
+            ids = await self.meili_service.get_indexed_message_ids_async(chat_id, offset, INDEX_PAGE_SIZE)
+            if not ids:
+                break
+            offset += len(ids)
+
+            for i in range(0, len(ids), CHECK_CHUNK_SIZE):
+                chunk = ids[i:i + CHECK_CHUNK_SIZE]
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire()
+                messages = await self.client.get_messages(chat_id, ids=chunk)
+                missing.extend(message_id for message_id, msg in zip(chunk, messages) if msg is None)
+                self._stats["checked"] += len(chunk)
+
+        # 全部比对完再删除，避免删除任务改变分页偏移
+        for i in range(0, len(missing), DELETE_BATCH_SIZE):
+            document_ids = [f"{chat_id}_{mid}" for mid in missing[i:i + DELETE_BATCH_SIZE]]
+            await self.meili_service.delete_messages_bulk_async(document_ids)
+            await archive_deletions(document_ids)
+
+        if missing:
+            self._stats["deleted"] += len(missing)
+            logger.info(f"[{chat_id}] 删除对账: 检查 {offset} 条，删除 {len(missing)} 条已不存在的消息")
+        return len(missing)
+
+    # ----------------------- 统计 -----------------------
+    def get_stats(self) -> Dict[str, Any]:
+        """获取对账统计信息"""
+        return {**self._stats, "interval": self.interval}
+
+
+# 全局对账任务实例（由 initial_sync_all_whitelisted_chats 创建）
+_reconciler: Optional[DeletionReconciler] = None
+
+
+def get_deletion_reconciler() -> Optional[DeletionReconciler]:
+    """获取当前的删除对账任务；未启用时返回 None"""
+    return _reconciler
+
+
+def set_deletion_reconciler(reconciler: Optional[DeletionReconciler]) -> None:
+    """设置全局删除对账任务"""
+    global _reconciler
+    _reconciler = reconciler
@@ -5,17 +5,27 @@ Userbot 事件处理模块
 1. 处理新消息事件
 2. 处理消息编辑事件
 3. 将符合条件的消息索引到 Meilisearch
+4. 在更新流模式下推进向前同步光标
+5. 处理消息删除事件，从 Meilisearch 中批量删除对应文档
+6. 新消息索引成功后推送给实时搜索订阅，并执行已保存搜索
 """
 
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 
 from telethon import events, TelegramClient
-from telethon.tl.types import User, Chat, Channel
+from telethon import utils as telethon_utils
+from telethon.tl.types import User, Chat, Channel, PeerChannel
 
 from core.config_manager import ConfigManager
-from core.meilisearch_service import MeiliSearchService
+from core.live_search import get_live_search_hub
+from core.meilisearch_service import MeiliSearchService, get_shared_meilisearch_service
+from core.message_archive import archive_deletions, archive_messages, get_message_archive
 from core.models import MeiliMessageDoc
+from core.saved_searches import get_percolator
+from core.query_language import build_chat_id_filter
+from user_bot.forward_sync import get_forward_sync_coordinator
 from user_bot.utils import generate_message_link, format_sender_name, determine_chat_type
 
 # 配置日志记录器
@@ -66,7 +76,11 @@ def get_meili_search_service() -> MeiliSearchService:
         if not api_key:
             api_key = config.get_config("MeiliSearch", "API_KEY")
             
-        _meili_search_service = MeiliSearchService(host=host, api_key=api_key)
+        _meili_search_service = get_shared_meilisearch_service(
+            host=host,
+            api_key=api_key,
+            **config.get_meili_http_options()
+        )
         
     return _meili_search_service
 
@@ -131,8 +145,9 @@ async def handle_new_message(event, config_manager: Optional[ConfigManager] = No
     
     此处理器将符合条件的消息索引到 Meilisearch：
     1. 检查消息来源是否在白名单中
-    2. 提取消息数据并构建 MeiliMessageDoc 实例
+    2. 提取消息数据并构建 MeiliMessageDoc 实例，写入本地消息归档（启用时）
     3. 将消息索引到 Meilisearch
+    4. 推送给匹配的实时搜索订阅，并对已保存的搜索发送提醒
     
     Args:
         event: Telethon 事件对象
@@ -158,10 +173,11 @@ async def handle_new_message(event, config_manager: Optional[ConfigManager] = No
         
         # 构建 MeiliMessageDoc 实例
         message_doc = MeiliMessageDoc(**message_data)
+        await archive_messages([message_doc])
         
         # 索引消息
         meili_service = meili_service or get_meili_search_service()
-        result = meili_service.index_message(message_doc)
+        result = await meili_service.index_message_async(message_doc)
         
         # 适配新版 Meilisearch API 返回值处理
         task_id = "unknown"
@@ -174,6 +190,15 @@ async def handle_new_message(event, config_manager: Optional[ConfigManager] = No
             task_id = result['taskUid']
             
         logger.info(f"消息索引成功: id={message_doc.id}, task_id={task_id}")
+        get_live_search_hub().publish([message_doc])
+        percolator = get_percolator()
+        if percolator is not None:
+            percolator.percolate([message_doc])
+
+        # 更新流模式下推进该聊天的向前同步光标（频道/超级群组的消息 ID 按聊天连续）
+        coordinator = get_forward_sync_coordinator()
+        if coordinator is not None:
+            await coordinator.on_new_message(chat_id, event.message.id, bool(event.is_channel))
         
     except Exception as e:
         logger.error(f"处理新消息时发生错误: {str(e)}", exc_info=True)
@@ -186,7 +211,7 @@ async def handle_message_edited(event, config_manager: Optional[ConfigManager] =
     
     此处理器将更新 Meilisearch 中已索引的消息：
     1. 检查消息来源是否在白名单中
-    2. 提取消息数据并构建 MeiliMessageDoc 实例
+    2. 提取消息数据并构建 MeiliMessageDoc 实例，写入本地消息归档（启用时）
     3. 更新 Meilisearch 中的消息（通过替换同 ID 文档）
     
     Args:
@@ -213,11 +238,12 @@ async def handle_message_edited(event, config_manager: Optional[ConfigManager] =
         
         # 构建 MeiliMessageDoc 实例
         message_doc = MeiliMessageDoc(**message_data)
+        await archive_messages([message_doc])
         
         # 更新索引中的消息
         # 由于 Meilisearch 会自动替换同 ID 的文档，我们可以直接使用 index_message 方法
         meili_service = meili_service or get_meili_search_service()
-        result = meili_service.index_message(message_doc)
+        result = await meili_service.index_message_async(message_doc)
         
         # 适配新版 Meilisearch API 返回值处理
         task_id = "unknown"
@@ -236,6 +262,62 @@ async def handle_message_edited(event, config_manager: Optional[ConfigManager] =
         logger.error(f"处理消息编辑时发生错误: {str(e)}", exc_info=True)
 
 
+async def handle_message_deleted(event, config_manager: Optional[ConfigManager] = None,
+                                 meili_service: Optional[MeiliSearchService] = None) -> None:
+    """
+    处理消息删除事件
+
+    此处理器从 Meilisearch 中删除已被删除的消息：
+    1. 频道/超级群组的事件带有 chat_id，检查白名单后按文档ID批量删除
+    2. 私聊和普通群组的事件不带 chat_id，但这些聊天的消息ID在账号内全局唯一，
+       因此在白名单中的非频道聊天范围内按 message_id 过滤删除
+
+    删除后在本地消息归档中追加删除标记（启用时）；在线期间错过的删除由 DeletionReconciler 定期对账补齐。
+
+    Args:
+        event: Telethon 事件对象
+        config_manager: 可选的 ConfigManager 实例，如果未提供则使用单例
+        meili_service: 可选的 MeiliSearchService 实例，如果未提供则使用单例
+    """
+    try:
+        deleted_ids = list(event.deleted_ids or [])
+        if not deleted_ids:
+            return
+
+        chat_id = event.chat_id
+        config_manager = config_manager or get_config_manager()
+        meili_service = meili_service or get_meili_search_service()
+
+        if chat_id is not None:
+            if not config_manager.is_in_whitelist(chat_id):
+                logger.debug(f"忽略非白名单消息删除: chat_id={chat_id}")
+                return
+            document_ids = [f"{chat_id}_{message_id}" for message_id in deleted_ids]
+            await meili_service.delete_messages_bulk_async(document_ids)
+            await archive_deletions(document_ids)
+            logger.info(f"已删除聊天 {chat_id} 的 {len(deleted_ids)} 条消息")
+            return
+
+        chat_ids = [
+            cid for cid in config_manager.get_whitelist()
+            if telethon_utils.resolve_id(cid)[1] is not PeerChannel
+        ]
+        if not chat_ids:
+            return
+        filter_expr = (
+            f"{build_chat_id_filter(chat_ids)} AND "
+            f"message_id IN [{', '.join(str(mid) for mid in deleted_ids)}]"
+        )
+        await meili_service.delete_messages_by_filter_async(filter_expr, chat_ids=chat_ids)
+        archive = get_message_archive()
+        if archive is not None:
+            await archive_deletions(await asyncio.to_thread(archive.find_document_ids, chat_ids, deleted_ids))
+        logger.info(f"已按消息ID删除 {len(deleted_ids)} 条私聊/普通群组消息")
+
+    except Exception as e:
+        logger.error(f"处理消息删除时发生错误: {str(e)}", exc_info=True)
+
+
 # 事件处理器注册说明
 """
 为了注册上述事件处理器，应在 Userbot 的启动逻辑中添加以下代码：
@@ -258,6 +340,12 @@ client.add_event_handler(
     event_handlers.handle_message_edited,
     events.MessageEdited()
 )
+
+# 注册消息删除处理器
+client.add_event_handler(
+    event_handlers.handle_message_deleted,
+    events.MessageDeleted()
+)
 ```
 
 注意事项:
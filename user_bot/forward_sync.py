@@ -0,0 +1,228 @@
+"""
+基于更新流的向前同步协调器
+
+此模块用一个全局协调器取代每个聊天独立的轮询循环：
+1. 新消息由 Telethon 更新流（NewMessage 事件）实时写入；频道/超级群组同时推进 last_newest_id，
+   私聊/普通群组的光标只由补洞推进
+2. 仅在需要时轮询补洞：启动时、客户端重连后、收到 UpdatesTooLong、检测到消息 ID 跳号
+3. 所有补洞工作由同一个后台任务串行处理，避免多聊天并发请求触发 FloodWait
+4. 提供低频的兜底全量检查（resync_interval），防止遗漏无法检测到的空洞
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError
+from telethon.tl.types import UpdatesTooLong
+
+from core.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    from user_bot.history_syncer import HistorySyncer
+
+logger = logging.getLogger(__name__)
+
+# 默认参数
+DEFAULT_CONNECTION_CHECK_INTERVAL = 5.0
+DEFAULT_RESYNC_INTERVAL = 600.0
+
+
+class ForwardSyncCoordinator:
+    """
+    全局向前同步协调器
+
+    每个白名单聊天的 HistorySyncer 在初始化后注册到协调器；
+    协调器维护待补洞聊天集合，并由单个后台任务依次调用 syncer.catch_up()。
+    """
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        connection_check_interval: float = DEFAULT_CONNECTION_CHECK_INTERVAL,
+        resync_interval: float = DEFAULT_RESYNC_INTERVAL,
+        rate_limiter: Optional[TokenBucket] = None,
+    ) -> None:
+        """
+        初始化协调器
+
+        Args:
+            client: 已连接的 TelegramClient
+            connection_check_interval: 检查连接状态（用于发现重连）的间隔（秒）
+            resync_interval: 兜底全量补洞间隔（秒），小于等于 0 表示禁用
+            rate_limiter: 与回溯任务共享的令牌桶；收到 FloodWait 时冻结它
+        """
+        self.client = client
+        self.connection_check_interval = connection_check_interval
+        self.resync_interval = resync_interval
+        self.rate_limiter = rate_limiter
+
+        self._syncers: Dict[int, "HistorySyncer"] = {}
+        self._dirty: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._was_connected = True
+
+        self._stats: Dict[str, int] = {
+            "live_messages": 0,
+            "gaps_detected": 0,
+            "catch_ups": 0,
+            "reconnects": 0,
+        }
+
+    # ----------------------- 生命周期 -----------------------
+    def start(self) -> None:
+        """启动补洞任务和连接监控任务，并监听 UpdatesTooLong"""
+        if self._tasks:
+            return
+        self.client.add_event_handler(self._on_updates_too_long, events.Raw(UpdatesTooLong))
+        self._tasks = [
+            asyncio.create_task(self._catch_up_loop(), name="forward_sync_catch_up"),
+            asyncio.create_task(self._connection_monitor(), name="forward_sync_connection_monitor"),
+        ]
+        logger.info(
+            f"向前同步协调器已启动: 连接检查间隔={self.connection_check_interval}s, "
+            f"兜底补洞间隔={self.resync_interval}s"
+        )
+
+    async def stop(self) -> None:
+        """停止所有后台任务"""
+        self.client.remove_event_handler(self._on_updates_too_long)
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        logger.info(f"向前同步协调器已停止: {self.get_stats()}")
+
+    # ----------------------- 注册与标记 -----------------------
+    def register(self, syncer: "HistorySyncer") -> None:
+        """
+        注册聊天同步器，并立即安排一次补洞（覆盖停机期间的消息）
+
+        Args:
+            syncer: 已完成 initialize() 的 HistorySyncer
+        """
+        self._syncers[syncer.chat_id] = syncer
+        self.mark_dirty(syncer.chat_id)
+
+    def unregister(self, chat_id: int) -> None:
+        """移除聊天同步器"""
+        self._syncers.pop(chat_id, None)
+        self._dirty.discard(chat_id)
+
+    def mark_dirty(self, chat_id: Optional[int] = None) -> None:
+        """
+        标记需要补洞的聊天
+
+        Args:
+            chat_id: 聊天 ID；为 None 时标记所有已注册聊天
+        """
+        if chat_id is None:
+            self._dirty.update(self._syncers.keys())
+        elif chat_id in self._syncers:
+            self._dirty.add(chat_id)
+        else:
+            return
+        self._wakeup.set()
+
+    async def on_new_message(self, chat_id: int, message_id: int, ids_are_sequential: bool) -> None:
+        """
+        处理更新流中已成功索引的新消息
+
+        Args:
+            chat_id: 聊天 ID
+            message_id: 消息 ID
+            ids_are_sequential: 该聊天的消息 ID 是否按聊天连续递增（频道/超级群组为 True），
+                                为 True 时可通过 ID 跳号发现空洞
+        """
+        syncer = self._syncers.get(chat_id)
+        if syncer is None:
+            return
+        self._stats["live_messages"] += 1
+        if await syncer.advance_newest(message_id, ids_are_sequential):
+            return
+        # advance_newest 返回 False 表示检测到空洞，交给补洞任务处理
+        self._stats["gaps_detected"] += 1
+        logger.info(f"[{chat_id}] 检测到消息 ID 跳号（收到 {message_id}），安排补洞")
+        self.mark_dirty(chat_id)
+
+    async def _on_updates_too_long(self, event) -> None:
+        """服务器提示更新过多（可能丢失更新），对所有聊天补洞"""
+        logger.warning("收到 UpdatesTooLong，安排所有聊天补洞")
+        self.mark_dirty()
+
+    # ----------------------- 后台任务 -----------------------
+    async def _catch_up_loop(self) -> None:
+        """依次处理待补洞聊天；空闲时按 resync_interval 触发兜底检查"""
+        while True:
+            if not self._dirty:
+                timeout = self.resync_interval if self.resync_interval > 0 else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    logger.debug("执行兜底补洞检查")
+                    self.mark_dirty()
+                self._wakeup.clear()
+                continue
+
+            chat_id = self._dirty.pop()
+            syncer = self._syncers.get(chat_id)
+            if syncer is None:
+                continue
+            try:
+                await syncer.catch_up()
+                self._stats["catch_ups"] += 1
+            except FloodWaitError as e:
+                logger.warning(f"[{chat_id}] 补洞 FloodWait {e.seconds}s")
+                self._dirty.add(chat_id)
+                if self.rate_limiter is not None:
+                    # 冻结共享预算，回溯任务一起退避
+                    self.rate_limiter.stall(e.seconds)
+                else:
+                    await asyncio.sleep(e.seconds)
+            except Exception as e:
+                logger.error(f"[{chat_id}] 补洞失败: {e}", exc_info=True)
+                self._dirty.add(chat_id)
+                await asyncio.sleep(5)
+
+    async def _connection_monitor(self) -> None:
+        """监控客户端连接状态，重连后对所有聊天补洞"""
+        while True:
+            await asyncio.sleep(self.connection_check_interval)
+            connected = self.client.is_connected()
+            if connected and not self._was_connected:
+                self._stats["reconnects"] += 1
+                logger.info("检测到客户端重新连接，安排所有聊天补洞")
+                self.mark_dirty()
+            self._was_connected = connected
+
+    # ----------------------- 统计 -----------------------
+    def get_stats(self) -> Dict[str, int]:
+        """获取协调器统计信息"""
+        return {
+            **self._stats,
+            "registered_chats": len(self._syncers),
+            "pending_catch_ups": len(self._dirty),
+        }
+
+
+# 全局协调器实例（由 initial_sync_all_whitelisted_chats 创建）
+_coordinator: Optional[ForwardSyncCoordinator] = None
+
+
+def get_forward_sync_coordinator() -> Optional[ForwardSyncCoordinator]:
+    """获取当前的向前同步协调器；未启用更新流模式时返回 None"""
+    return _coordinator
+
+
+def set_forward_sync_coordinator(coordinator: Optional[ForwardSyncCoordinator]) -> None:
+    """设置全局向前同步协调器"""
+    global _coordinator
+    _coordinator = coordinator
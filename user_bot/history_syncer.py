@@ -2,22 +2,25 @@
 Telegram → Meilisearch 同步引擎（双光标 + 安全重叠窗口）
 
 该模块完全替换旧版 HistorySyncer 逻辑，核心特性：
-1. forward_sync：向前增量流水线，持续写入新消息；
-2. backward_sync：向后回溯流水线，带重叠窗口补齐历史空洞；
-3. 共享状态文件 config/sync_points.json，原子写入防并发冲突；
+1. forward_sync：向前增量流水线；默认由 ForwardSyncCoordinator 基于更新流驱动，
+   仅在启动、重连或检测到空洞时补洞，也可配置为旧的逐聊天轮询模式；
+2. backward_sync：向后回溯流水线；大聊天按消息ID切分为多个区间并行回溯，
+   每个区间有独立的持久化光标，区间完成后再平衡（二分剩余最大的区间）；
+3. 光标保存在 SQLite 状态库（SyncStateStore），每次只 UPSERT 当前聊天一行；
 4. 支持 cutoff_ts → cutoff_id 首次换算；
 5. 自动处理 FloodWait；
-6. 兼容 user_bot.client 既有入口 initial_sync_all_whitelisted_chats。
+6. 兼容 user_bot.client 既有入口 initial_sync_all_whitelisted_chats；
+7. 所有聊天共享 IngestBuffer 批量写入，光标在登记时拍快照、在文档写入成功后才持久化；
+8. 回溯工作由 SyncScheduler 统一调度，所有请求共享一个令牌桶；
+9. 定期由 DeletionReconciler 清理索引中已在 Telegram 删除的消息；
+10. Meilisearch 写入任务积压超过高水位时回溯暂停（IndexTaskTracker 背压），向前同步不受影响。
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
-import os
 from datetime import datetime
-from pathlib import Path
 from typing import Dict, Any, Optional, Tuple, List
 
 from telethon import TelegramClient
@@ -25,44 +28,30 @@ from telethon.errors import FloodWaitError
 from telethon.tl.types import Message, User
 
 from core.config_manager import ConfigManager
-from core.meilisearch_service import MeiliSearchService
+from core.index_task_tracker import IndexTaskTracker, get_index_task_tracker
+from core.ingest_buffer import IngestBuffer, get_ingest_buffer
+from core.token_bucket import TokenBucket
+from core.meilisearch_service import MeiliSearchService, get_shared_meilisearch_service
 from core.models import MeiliMessageDoc
+from core.sync_state_store import SyncStateStore, get_sync_state_store
+from user_bot.deletion_sync import DeletionReconciler, get_deletion_reconciler, set_deletion_reconciler
+from user_bot.forward_sync import (
+    ForwardSyncCoordinator,
+    get_forward_sync_coordinator,
+    set_forward_sync_coordinator,
+)
+from user_bot.sync_scheduler import SyncScheduler, get_sync_scheduler, set_sync_scheduler
 from user_bot.utils import generate_message_link, format_sender_name
 
 # --------------------------- 常量 ---------------------------
-STATE_FILE = "config/sync_points.json"
 POLL_INTERVAL = 3          # forward_sync 拉取间隔（秒）
 DEFAULT_OVERLAP = 100       # backward_sync 批次重叠
+BATCH_SIZE = 100            # 单次 GetHistory 请求的消息数
+DEFAULT_BACKFILL_WORKERS = 4        # 单个聊天并行回溯的区间数
+DEFAULT_MIN_RANGE_SIZE = 10000      # 切分区间的最小消息ID跨度
 
 _logger = logging.getLogger(__name__)
 
-# --------------------------- 文件级别锁 ---------------------------
-_FILE_LOCK: Optional[asyncio.Lock] = None
-
-def _get_file_lock() -> asyncio.Lock:
-    global _FILE_LOCK
-    if _FILE_LOCK is None:
-        _FILE_LOCK = asyncio.Lock()
-    return _FILE_LOCK
-
-# --------------------------- 工具函数 ---------------------------
-
-def _read_json(path: str) -> Dict[str, Any]:
-    if not os.path.exists(path):
-        return {}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        _logger.warning(f"读取状态文件 {path} 失败: {e}")
-        return {}
-
-def _atomic_write_json(path: str, data: Dict[str, Any]) -> None:
-    tmp_path = f"{path}.tmp"
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    os.replace(tmp_path, path)
-
 # --------------------------- 同步器 ---------------------------
 
 class HistorySyncer:
@@ -75,31 +64,75 @@ class HistorySyncer:
         chat_id: int,
         cutoff_ts: int = 0,
         overlap: int = DEFAULT_OVERLAP,
+        ingest_buffer: Optional[IngestBuffer] = None,
+        forward_coordinator: Optional[ForwardSyncCoordinator] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        state_store: Optional[SyncStateStore] = None,
+        backfill_workers: int = DEFAULT_BACKFILL_WORKERS,
+        min_range_size: int = DEFAULT_MIN_RANGE_SIZE,
+        task_tracker: Optional[IndexTaskTracker] = None,
     ) -> None:
         self.client = client
         self.meili_service = meili_service
+        self.ingest_buffer = ingest_buffer or get_ingest_buffer(meili_service)
+        # 为 None 时使用旧的逐聊天轮询模式
+        self.forward_coordinator = forward_coordinator
+        # 全局请求预算，所有聊天共享；为 None 时不限流
+        self.rate_limiter = rate_limiter
+        # 写入任务积压时对回溯施加背压；为 None 时不等待
+        self.task_tracker = task_tracker
         self.chat_id = chat_id
         self.overlap = overlap
+        # 为 1 时使用单光标串行回溯
+        self.backfill_workers = max(1, backfill_workers)
+        self.min_range_size = max(BATCH_SIZE, min_range_size)
         self._state_lock = asyncio.Lock()
+        self.state_store = state_store or get_sync_state_store()
 
         # 加载或初始化状态
-        all_state = _read_json(STATE_FILE)
-        self.state: Dict[str, Any] = all_state.get(str(chat_id), {
+        self.state: Dict[str, Any] = self.state_store.get_cursor(chat_id) or {
             "chat_id": chat_id,
             "cutoff_ts": cutoff_ts,
             "cutoff_id": 0,
             "last_newest_id": 0,
             "next_oldest_id": 0,
             "overlap": overlap,
-        })
+        }
+        # 并行回溯区间：覆盖 low < message_id < next，各自从 next 向下回溯
+        self.ranges: List[Dict[str, int]] = list(self.state_store.get_ranges(chat_id))
 
     # ----------------------- 状态持久化 -----------------------
     async def _persist_state(self) -> None:
-        async with _get_file_lock():
-            all_state = _read_json(STATE_FILE)
-            all_state[str(self.chat_id)] = self.state
-            Path(os.path.dirname(STATE_FILE)).mkdir(parents=True, exist_ok=True)
-            _atomic_write_json(STATE_FILE, all_state)
+        # 只更新当前聊天的一行，不阻塞事件循环
+        await self._save_cursor(dict(self.state), [dict(r) for r in self.ranges])
+
+    async def _save_cursor(self, state: Dict[str, Any], ranges: List[Dict[str, int]]) -> None:
+        await asyncio.to_thread(self.state_store.save_cursor, self.chat_id, state, ranges)
+
+    def _persist_after_flush(self) -> None:
+        """
+        在已入队的文档全部写入成功后持久化此刻的光标
+
+        光标在登记时拍快照：写入期间继续推进的光标要等对应文档写入后由之后的回调保存，
+        写入失败时回调随文档一起重试，持久化的光标不会越过未写入的文档。
+        """
+        state = dict(self.state)
+        ranges = [dict(r) for r in self.ranges]
+
+        async def persist() -> None:
+            await self._save_cursor(state, ranges)
+
+        self.ingest_buffer.call_after_flush(persist)
+
+    async def _acquire_request_budget(self) -> None:
+        """在每次 Telegram 请求前从共享令牌桶获取预算"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+
+    async def _wait_for_index_capacity(self) -> None:
+        """回溯请求前等待 Meilisearch 任务积压回落；等待期间不占用请求预算，向前同步可使用全部预算"""
+        if self.task_tracker is not None:
+            await self.task_tracker.wait_for_capacity()
 
     # ----------------------- 初始化 -----------------------
     async def initialize(self) -> None:
@@ -109,6 +142,7 @@ class HistorySyncer:
             # Telethon 要求 datetime 类型；兼容 int 时间戳
             offset_dt = datetime.fromtimestamp(ts) if isinstance(ts, (int, float)) else ts
             try:
+                await self._acquire_request_budget()
                 messages = await self.client.get_messages(
                     self.chat_id,
                     limit=1,
@@ -123,6 +157,7 @@ class HistorySyncer:
 
         # 仅在完全空状态（两者皆为 0）时才初始化光标，避免已完成同步后再次全量拉取
         if self.state.get("last_newest_id", 0) == 0 and self.state.get("next_oldest_id", 0) == 0:
+            await self._acquire_request_budget()
             top = await self.client.get_messages(self.chat_id, limit=1)
             top_id = top[0].id if top else 0
             self.state["last_newest_id"] = top_id
@@ -166,36 +201,83 @@ class HistorySyncer:
         )
 
         try:
-            self.meili_service.index_message(doc)
+            await self.ingest_buffer.add(doc)
         except Exception as e:
-            _logger.error(f"[Meili] 索引失败 chat={self.chat_id} id={msg.id}: {e}")
+            _logger.error(f"[Meili] 加入写入缓冲区失败 chat={self.chat_id} id={msg.id}: {e}")
 
     # ----------------------- forward_sync -----------------------
-    async def _forward_sync(self) -> None:
-        while True:
-            try:
-                top = await self.client.get_messages(self.chat_id, limit=1)
-                top_id = top[0].id if top else 0
-
-                async with self._state_lock:
-                    last_newest = self.state["last_newest_id"]
+    async def catch_up(self) -> int:
+        """
+        补齐 last_newest_id 之后的所有消息（一次性）
 
-                if top_id > last_newest:
-                    # 记录同步范围
-                    _logger.info(
-                        f"[{self.chat_id}] forward_sync 开始，同步区间: {last_newest + 1} ~ {top_id}")
+        按 BATCH_SIZE 从旧到新分页拉取，每页一次请求，光标随每页推进。
 
-                    # 使用无限制迭代，确保不漏任何消息
-                    count = 0
-                    async for msg in self.client.iter_messages(self.chat_id, min_id=last_newest):
-                        await self._index_to_meili(msg)
-                        count += 1
-
-                    _logger.info(f"[{self.chat_id}] forward_sync 完成，共索引 {count} 条新消息")
+        Returns:
+            int: 本次索引的消息数
+        """
+        count = 0
+        while True:
+            async with self._state_lock:
+                last_newest = self.state["last_newest_id"]
+
+            await self._acquire_request_budget()
+            batch: List[Message] = []
+            async for msg in self.client.iter_messages(
+                self.chat_id, min_id=last_newest, limit=BATCH_SIZE, reverse=True
+            ):
+                batch.append(msg)
+                await self._index_to_meili(msg)
+
+            if batch:
+                top_id = max(m.id for m in batch)
+                count += len(batch)
+                _logger.info(
+                    f"[{self.chat_id}] forward_sync 已索引区间: {last_newest + 1} ~ {top_id} (共 {len(batch)} 条)")
+                async with self._state_lock:
+                    # 补洞期间更新流可能已推进光标，只前进不后退
+                    self.state["last_newest_id"] = max(self.state["last_newest_id"], top_id)
+                # 待本批文档写入成功后再持久化光标
+                self._persist_after_flush()
+
+            if len(batch) < BATCH_SIZE:
+                break
+
+        if count:
+            _logger.info(f"[{self.chat_id}] forward_sync 完成，共索引 {count} 条新消息")
+        return count
+
+    async def advance_newest(self, message_id: int, ids_are_sequential: bool) -> bool:
+        """
+        根据更新流中已索引的消息推进 last_newest_id
+
+        私聊/普通群组的消息 ID 不按聊天连续，无法从跳号发现空洞：若用更新流推进光标，
+        在空洞被发现之前到达的一条新消息就会让之后的补洞越过空洞。因此这类聊天的光标
+        只由 catch_up() 按 iter_messages 的实际结果推进，更新流不移动光标。
+
+        Args:
+            message_id: 新消息 ID
+            ids_are_sequential: 消息 ID 是否按聊天连续递增（频道/超级群组）
+
+        Returns:
+            bool: 检测到 ID 跳号（需要补洞）时返回 False，光标保持不变
+        """
+        if not ids_are_sequential:
+            return True
+        async with self._state_lock:
+            last_newest = self.state["last_newest_id"]
+            if message_id <= last_newest:
+                return True
+            if message_id > last_newest + 1:
+                return False
+            self.state["last_newest_id"] = message_id
+        self._persist_after_flush()
+        return True
 
-                    async with self._state_lock:
-                        self.state["last_newest_id"] = top_id
-                        await self._persist_state()
+    async def _forward_sync(self) -> None:
+        """旧的轮询模式：每 POLL_INTERVAL 秒检查一次新消息"""
+        while True:
+            try:
+                await self.catch_up()
                 await asyncio.sleep(POLL_INTERVAL)
             except FloodWaitError as e:
                 _logger.warning(f"[{self.chat_id}] forward_sync FloodWait {e.seconds}s")
@@ -205,52 +287,169 @@ class HistorySyncer:
                 await asyncio.sleep(5)
 
     # ----------------------- backward_sync -----------------------
-    async def _backward_sync(self) -> None:
-        while True:
+    def backfill_done(self) -> bool:
+        """向后回溯是否已到达截止 ID（且所有并行区间均已完成）"""
+        return not self.ranges and self.state["next_oldest_id"] <= self.state["cutoff_id"]
+
+    async def backfill_step(self) -> bool:
+        """
+        执行一批向后回溯
+
+        backfill_workers > 1 时每个未完成区间各发出一次 GetHistory 请求（并发执行，
+        受共享令牌桶限流）；否则按单光标执行一次请求。
+        FloodWaitError 等异常直接抛出，由调用方（SyncScheduler 或 _backward_sync）处理。
+
+        Returns:
+            bool: 还有更早的消息需要回溯时返回 True
+        """
+        if self.backfill_workers > 1 or self.ranges:
+            return await self._backfill_ranges_step()
+        return await self._backfill_serial_step()
+
+    def _rebalance_ranges(self) -> None:
+        """
+        切分剩余工作，使活动区间数达到 backfill_workers
+
+        首次调用时把 (cutoff_id, next_oldest_id) 交给区间；之后每当区间数不足时，
+        把剩余跨度最大的区间二分，前半部分保留原光标，后半部分成为新区间。
+        调用方需持有 _state_lock。
+        """
+        next_oldest = self.state["next_oldest_id"]
+        cutoff_id = self.state["cutoff_id"]
+        if next_oldest > cutoff_id:
+            next_id = max((r["id"] for r in self.ranges), default=-1) + 1
+            self.ranges.append({"id": next_id, "low": cutoff_id, "next": next_oldest})
+            # 剩余工作全部由区间负责
+            self.state["next_oldest_id"] = cutoff_id
+
+        while 0 < len(self.ranges) < self.backfill_workers:
+            largest = max(self.ranges, key=lambda r: r["next"] - r["low"])
+            span = largest["next"] - largest["low"]
+            if span < 2 * self.min_range_size:
+                break
+            mid = largest["low"] + span // 2
+            next_id = max(r["id"] for r in self.ranges) + 1
+            # 新区间覆盖 low < id <= mid，原区间缩小为 mid < id < next
+            self.ranges.append({"id": next_id, "low": largest["low"], "next": mid + 1})
+            largest["low"] = mid
+
+    async def _fetch_range_batch(self, rng: Dict[str, int]) -> Optional[int]:
+        """
+        回溯单个区间的一批消息
+
+        Returns:
+            Optional[int]: 区间的新光标；区间已完成时返回 None
+        """
+        await self._wait_for_index_capacity()
+        await self._acquire_request_budget()
+        batch: List[Message] = []
+        async for msg in self.client.iter_messages(self.chat_id, offset_id=rng["next"], limit=BATCH_SIZE):
+            if msg.id <= rng["low"]:
+                break
+            batch.append(msg)
+            await self._index_to_meili(msg)
+
+        if len(batch) < BATCH_SIZE:
+            if batch:
+                _logger.info(
+                    f"[{self.chat_id}] backward_sync 区间 {rng['id']} 已完成: "
+                    f"{min(m.id for m in batch)} ~ {max(m.id for m in batch)} (共 {len(batch)} 条)")
+            return None
+
+        lowest_id = min(m.id for m in batch)
+        _logger.info(
+            f"[{self.chat_id}] backward_sync 区间 {rng['id']} 已索引: "
+            f"{lowest_id} ~ {max(m.id for m in batch)} (共 {len(batch)} 条)")
+        return lowest_id if lowest_id > rng["low"] + 1 else None
+
+    async def _backfill_ranges_step(self) -> bool:
+        async with self._state_lock:
+            self._rebalance_ranges()
+            ranges = [dict(r) for r in self.ranges]
+        if not ranges:
+            return False
+
+        results = await asyncio.gather(
+            *(self._fetch_range_batch(r) for r in ranges), return_exceptions=True
+        )
+
+        error: Optional[BaseException] = None
+        async with self._state_lock:
+            for rng, result in zip(ranges, results):
+                if isinstance(result, BaseException):
+                    # FloodWait 优先抛出，其余异常保留第一个
+                    if error is None or isinstance(result, FloodWaitError):
+                        error = result
+                    continue
+                live = next((r for r in self.ranges if r["id"] == rng["id"]), None)
+                if live is None:
+                    continue
+                if result is None:
+                    self.ranges.remove(live)
+                else:
+                    live["next"] = result
+            self._rebalance_ranges()
+        self._persist_after_flush()
+
+        if error is not None:
+            raise error
+        return not self.backfill_done()
+
+    async def _backfill_serial_step(self) -> bool:
+        """单光标回溯一批（一次 GetHistory 请求）"""
+        async with self._state_lock:
+            next_oldest = self.state["next_oldest_id"]
+            cutoff_id = self.state["cutoff_id"]
+            overlap = self.state["overlap"]
+
+        # 当已到达截止ID (cutoff_id) 时停止向后同步；
+        # 若 cutoff_id 为 0，则表示无限制，需要继续同步直到最早消息。
+        if next_oldest <= cutoff_id:
+            return False
+
+        await self._wait_for_index_capacity()
+        await self._acquire_request_budget()
+        batch: List[Message] = []
+        async for msg in self.client.iter_messages(self.chat_id, offset_id=next_oldest, limit=BATCH_SIZE):
+            if msg.id <= cutoff_id:
+                break
+            batch.append(msg)
+            await self._index_to_meili(msg)
+
+        if batch:
+            highest_id = max(m.id for m in batch)
+            lowest_id = min(m.id for m in batch)
+            _logger.info(
+                f"[{self.chat_id}] backward_sync 已索引区间: {lowest_id} ~ {highest_id} (共 {len(batch)} 条)")
+
+            smallest = lowest_id
+
+            # 计算下一次 offset：
+            # 1. 若 overlap ≥ 本批大小，则直接使用 smallest（无重叠但连续，不会漏）；
+            # 2. 否则保留 overlap 个重叠窗口；
+            if overlap >= len(batch):
+                new_next = smallest
+            else:
+                new_next = max(smallest - overlap, cutoff_id)
+
             async with self._state_lock:
-                next_oldest = self.state["next_oldest_id"]
-                cutoff_id = self.state["cutoff_id"]
-                overlap = self.state["overlap"]
+                self.state["next_oldest_id"] = new_next
+            self._persist_after_flush()
+            return new_next > cutoff_id
 
-            # 当已到达截止ID (cutoff_id) 时停止向后同步；
-            # 若 cutoff_id 为 0，则表示无限制，需要继续同步直到最早消息。
-            if next_oldest <= cutoff_id:
-                await asyncio.sleep(3600)
-                continue
+        # 没有更多旧消息，标记到 cutoff；同样等本聊天已入队的文档写入后再持久化
+        async with self._state_lock:
+            self.state["next_oldest_id"] = cutoff_id
+        self._persist_after_flush()
+        return False
 
+    async def _backward_sync(self) -> None:
+        """独立运行时的回溯循环；由 SyncScheduler 调度时不使用"""
+        while True:
             try:
-                batch: List[Message] = []
-                async for msg in self.client.iter_messages(self.chat_id, offset_id=next_oldest, limit=100):
-                    if msg.id <= cutoff_id:
-                        break
-                    batch.append(msg)
-                    await self._index_to_meili(msg)
-
-                if batch:
-                    highest_id = max(m.id for m in batch)
-                    lowest_id = min(m.id for m in batch)
-                    _logger.info(
-                        f"[{self.chat_id}] backward_sync 已索引区间: {lowest_id} ~ {highest_id} (共 {len(batch)} 条)")
-
-                    smallest = lowest_id
-
-                    # 计算下一次 offset：
-                    # 1. 若 overlap ≥ 本批大小，则直接使用 smallest（无重叠但连续，不会漏）；
-                    # 2. 否则保留 overlap 个重叠窗口；
-                    if overlap >= len(batch):
-                        new_next = smallest
-                    else:
-                        new_next = max(smallest - overlap, cutoff_id)
-
-                    async with self._state_lock:
-                        self.state["next_oldest_id"] = new_next
-                        await self._persist_state()
-                else:
-                    # 没有更多旧消息，标记到 cutoff
-                    async with self._state_lock:
-                        self.state["next_oldest_id"] = cutoff_id
-                        await self._persist_state()
-
+                if not await self.backfill_step():
+                    await asyncio.sleep(3600)
+                    continue
                 await asyncio.sleep(0.2)
             except FloodWaitError as e:
                 _logger.warning(f"[{self.chat_id}] backward_sync FloodWait {e.seconds}s")
@@ -259,9 +458,28 @@ class HistorySyncer:
                 _logger.error(f"[{self.chat_id}] backward_sync error: {e}", exc_info=True)
                 await asyncio.sleep(5)
 
+    def start_forward_sync(self) -> Optional[asyncio.Task]:
+        """
+        初始化完成后启动向前同步
+
+        Returns:
+            Optional[asyncio.Task]: 轮询模式下返回轮询任务；更新流模式下注册到协调器并返回 None
+        """
+        if self.forward_coordinator is not None:
+            # 新消息由更新流驱动，协调器负责补洞
+            self.forward_coordinator.register(self)
+            return None
+        return asyncio.create_task(self._forward_sync(), name=f"forward_sync_{self.chat_id}")
+
     async def run(self) -> None:
+        """独立运行单个聊天的完整同步（不经过 SyncScheduler）"""
         await self.initialize()
-        await asyncio.gather(self._forward_sync(), self._backward_sync())
+        forward_task = self.start_forward_sync()
+        try:
+            await self._backward_sync()
+        finally:
+            if forward_task is not None:
+                forward_task.cancel()
 
 # ----------------------- 兼容入口 -----------------------
 async def initial_sync_all_whitelisted_chats(
@@ -276,17 +494,77 @@ async def initial_sync_all_whitelisted_chats(
     if client is None:
         raise RuntimeError("TelegramClient 未提供")
 
+    whitelist = list(config_manager.get_whitelist())
+    if not whitelist:
+        _logger.info("白名单为空，跳过历史同步")
+        return {}
+
+    # 所有聊天共享同一个写入缓冲区，跨聊天合并批量写入
+    ingest_buffer = get_ingest_buffer(
+        meilisearch_service,
+        max_batch_size=config_manager.get_ingest_batch_size(),
+        flush_interval=config_manager.get_ingest_flush_interval(),
+    )
+
+    # 所有聊天的回溯工作由同一个调度器执行，共享账号级别的请求预算
+    scheduler = get_sync_scheduler()
+    if scheduler is None:
+        rate, burst = config_manager.get_sync_rate_limit()
+        scheduler = SyncScheduler(
+            TokenBucket(rate, burst),
+            max_concurrency=config_manager.get_sync_max_concurrency(),
+            batches_per_turn=config_manager.get_sync_batches_per_turn(),
+        )
+        set_sync_scheduler(scheduler)
+
+    # 更新流模式下所有聊天共享一个向前同步协调器
+    forward_coordinator: Optional[ForwardSyncCoordinator] = None
+    if config_manager.get_forward_sync_mode() == "updates":
+        forward_coordinator = get_forward_sync_coordinator()
+        if forward_coordinator is None or forward_coordinator.client is not client:
+            forward_coordinator = ForwardSyncCoordinator(
+                client,
+                resync_interval=config_manager.get_forward_resync_interval(),
+                rate_limiter=scheduler.rate_limiter,
+            )
+            set_forward_sync_coordinator(forward_coordinator)
+        forward_coordinator.start()
+
+    # 定期对账，清理离线期间被删除的消息
+    reconcile_interval = config_manager.get_deletion_reconcile_interval()
+    if reconcile_interval > 0:
+        reconciler = get_deletion_reconciler()
+        if reconciler is None or reconciler.client is not client:
+            reconciler = DeletionReconciler(
+                client,
+                meilisearch_service,
+                config_manager,
+                interval=reconcile_interval,
+                rate_limiter=scheduler.rate_limiter,
+            )
+            set_deletion_reconciler(reconciler)
+        reconciler.start()
+
+    backfill_workers, min_range_size = config_manager.get_backfill_split()
+    task_tracker = get_index_task_tracker()
     results: Dict[int, Tuple[int, int]] = {}
-    for chat_id in config_manager.get_whitelist():
+    for chat_id in whitelist:
         syncer = HistorySyncer(
             client=client,
             meili_service=meilisearch_service,
             chat_id=chat_id,
             cutoff_ts=cutoff_ts or 0,
+            ingest_buffer=ingest_buffer,
+            forward_coordinator=forward_coordinator,
+            rate_limiter=scheduler.rate_limiter,
+            backfill_workers=backfill_workers,
+            min_range_size=min_range_size,
+            task_tracker=task_tracker,
         )
-        asyncio.create_task(syncer.run(), name=f"sync_chat_{chat_id}")
+        scheduler.add_chat(syncer, priority=config_manager.get_sync_priority(chat_id))
         results[chat_id] = (0, 0)  # 占位返回值，保持旧接口签名
-        _logger.info(f"已启动 chat {chat_id} 同步任务")
+    scheduler.start()
+    _logger.info(f"已将 {len(whitelist)} 个聊天交给同步调度器")
     return results
 
 # ----------------------- 内部辅助 -----------------------
@@ -294,4 +572,4 @@ async def initial_sync_all_whitelisted_chats(
 def _create_meili(config: ConfigManager) -> MeiliSearchService:
     host = config.get_env("MEILISEARCH_HOST") or config.get_config("MeiliSearch", "HOST", "http://localhost:7700")
     api_key = config.get_env("MEILISEARCH_API_KEY") or config.get_config("MeiliSearch", "API_KEY")
-    return MeiliSearchService(host=host, api_key=api_key) 
\ No newline at end of file
+    return get_shared_meilisearch_service(host=host, api_key=api_key, **config.get_meili_http_options())
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+同步调度器模块
+
+此模块集中管理所有白名单聊天的历史回溯工作，包括：
+1. 以有限并发（max_concurrency）执行各聊天的初始化和回溯批次
+2. 所有 Telegram 请求共享一个令牌桶，遵守账号级别的请求预算
+3. 任一聊天收到 FloodWait 时冻结共享令牌桶，所有聊天一起退避
+4. 按优先级调度，同优先级内按轮转保证公平（每轮最多 batches_per_turn 批）
+"""
+
+import asyncio
+import itertools
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+from telethon.errors import FloodWaitError
+
+from core.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    from user_bot.history_syncer import HistorySyncer
+
+logger = logging.getLogger(__name__)
+
+# 默认参数
+DEFAULT_MAX_CONCURRENCY = 3
+DEFAULT_BATCHES_PER_TURN = 1
+DEFAULT_PRIORITY = 10
+ERROR_RETRY_DELAY = 5.0
+
+
+class _ChatJob:
+    """单个聊天在调度器中的状态"""
+
+    def __init__(self, syncer: "HistorySyncer", priority: int) -> None:
+        self.syncer = syncer
+        self.priority = priority
+        self.initialized = False
+        self.done = False
+        self.batches = 0
+        self.errors = 0
+        self.forward_task: Optional[asyncio.Task] = None
+
+
+class SyncScheduler:
+    """
+    全局同步调度器
+
+    每个聊天的工作被切分为若干批次（一次 GetHistory 请求），调度器按
+    (priority, 轮转序号) 从优先队列取出聊天，执行最多 batches_per_turn 批后
+    放回队尾，priority 数值越小越优先。
+    """
+
+    def __init__(
+        self,
+        rate_limiter: TokenBucket,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        batches_per_turn: int = DEFAULT_BATCHES_PER_TURN,
+    ) -> None:
+        """
+        初始化调度器
+
+        Args:
+            rate_limiter: 所有聊天共享的令牌桶
+            max_concurrency: 同时执行的聊天数上限
+            batches_per_turn: 每个聊天每轮最多执行的批次数（公平性粒度）
+        """
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max(1, max_concurrency)
+        self.batches_per_turn = max(1, batches_per_turn)
+
+        self._jobs: Dict[int, _ChatJob] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._retry_tasks: Set[asyncio.Task] = set()
+
+    # ----------------------- 生命周期 -----------------------
+    def start(self) -> None:
+        """启动工作协程"""
+        if self._workers:
+            return
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"sync_scheduler_worker_{i}")
+            for i in range(self.max_concurrency)
+        ]
+        logger.info(
+            f"同步调度器已启动: 并发={self.max_concurrency}, 每轮批次={self.batches_per_turn}, "
+            f"请求速率={self.rate_limiter.rate}/s"
+        )
+
+    async def stop(self) -> None:
+        """停止工作协程以及轮询模式下的向前同步任务"""
+        tasks = list(self._workers) + list(self._retry_tasks)
+        tasks.extend(job.forward_task for job in self._jobs.values() if job.forward_task)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+        logger.info("同步调度器已停止")
+
+    # ----------------------- 任务管理 -----------------------
+    def add_chat(self, syncer: "HistorySyncer", priority: int = DEFAULT_PRIORITY) -> None:
+        """
+        添加聊天到调度器
+
+        Args:
+            syncer: 该聊天的 HistorySyncer
+            priority: 优先级，数值越小越优先
+        """
+        if syncer.chat_id in self._jobs:
+            logger.debug(f"聊天 {syncer.chat_id} 已在调度器中，忽略")
+            return
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        job = _ChatJob(syncer, priority)
+        self._jobs[syncer.chat_id] = job
+        self._enqueue(job)
+        logger.info(f"已添加聊天 {syncer.chat_id} 到同步调度器，优先级={priority}")
+
+    def _enqueue(self, job: _ChatJob) -> None:
+        self._queue.put_nowait((job.priority, next(self._seq), job.syncer.chat_id))
+
+    async def _requeue_later(self, job: _ChatJob, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._enqueue(job)
+
+    # ----------------------- 执行 -----------------------
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            _, _, chat_id = await self._queue.get()
+            job = self._jobs.get(chat_id)
+            if job is None or job.done:
+                continue
+
+            try:
+                has_more = await self._run_turn(job)
+            except FloodWaitError as e:
+                logger.warning(f"[{chat_id}] FloodWait {e.seconds}s，冻结全局请求预算")
+                self.rate_limiter.stall(e.seconds)
+                self._enqueue(job)
+                continue
+            except Exception as e:
+                job.errors += 1
+                logger.error(f"[{chat_id}] 同步任务出错: {e}", exc_info=True)
+                retry_task = asyncio.create_task(self._requeue_later(job, ERROR_RETRY_DELAY))
+                self._retry_tasks.add(retry_task)
+                retry_task.add_done_callback(self._retry_tasks.discard)
+                continue
+
+            if has_more:
+                # 放回队尾，让同优先级的其他聊天先执行
+                self._enqueue(job)
+            else:
+                job.done = True
+                logger.info(f"[{chat_id}] 历史回溯已完成，共执行 {job.batches} 批")
+
+    async def _run_turn(self, job: _ChatJob) -> bool:
+        """
+        执行一个聊天的一轮工作
+
+        Returns:
+            bool: 还有剩余工作时返回 True
+        """
+        syncer = job.syncer
+        if not job.initialized:
+            await syncer.initialize()
+            job.initialized = True
+            job.forward_task = syncer.start_forward_sync()
+            return not syncer.backfill_done()
+
+        for _ in range(self.batches_per_turn):
+            has_more = await syncer.backfill_step()
+            job.batches += 1
+            if not has_more:
+                return False
+        return True
+
+    # ----------------------- 统计 -----------------------
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度器统计信息"""
+        return {
+            "chats": len(self._jobs),
+            "completed": sum(1 for job in self._jobs.values() if job.done),
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batches": sum(job.batches for job in self._jobs.values()),
+            "errors": sum(job.errors for job in self._jobs.values()),
+            "max_concurrency": self.max_concurrency,
+            "batches_per_turn": self.batches_per_turn,
+            "rate_limiter": self.rate_limiter.get_stats(),
+        }
+
+
+# 全局调度器实例（由 initial_sync_all_whitelisted_chats 创建）
+_scheduler: Optional[SyncScheduler] = None
+
+
+def get_sync_scheduler() -> Optional[SyncScheduler]:
+    """获取当前的同步调度器；尚未启动同步时返回 None"""
+    return _scheduler
+
+
+def set_sync_scheduler(scheduler: Optional[SyncScheduler]) -> None:
+    """设置全局同步调度器"""
+    global _scheduler
+    _scheduler = scheduler